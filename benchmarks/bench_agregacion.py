@@ -0,0 +1,67 @@
+# benchmarks/bench_agregacion.py
+# Compara los conteos de estadísticas actuales (bucle + groupby por gráfico) con count_dimensions
+#
+# Uso:
+#   python benchmarks/bench_agregacion.py --filas 1000000
+
+import argparse
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_informe_pdf import crear_tickets_sinteticos
+from engine.aggregation import count_dimensions
+from engine.ticket_store import COLUMNAS_CATEGORICAS
+
+DIMENSIONES = ['tipo', 'prioridad', 'area', 'asignado_a', 'cliente']
+
+
+def conteo_anterior(tickets, df):
+    """Lo que hacía la página de estadísticas: bucle de Python + un groupby por vista y por gráfico"""
+    categorias, prioridades, equipos = {}, {}, {}
+    for ticket in tickets:
+        tipo = ticket.get('tipo', 'Sin clasificar')
+        categorias[tipo] = categorias.get(tipo, 0) + 1
+        prioridad = ticket.get('prioridad', 'Sin prioridad')
+        prioridades[prioridad] = prioridades.get(prioridad, 0) + 1
+        equipo = ticket.get('asignado_a', 'Sin asignar')
+        equipos[equipo] = equipos.get(equipo, 0) + 1
+    return [df.groupby(columna).size() for columna in DIMENSIONES]
+
+
+def cronometrar(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        t = time.perf_counter() - t0
+        mejor = t if mejor is None else min(mejor, t)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de conteos de estadísticas")
+    parser.add_argument("--filas", type=int, default=1000000)
+    args = parser.parse_args()
+
+    df = crear_tickets_sinteticos(args.filas)
+    tickets = df.to_dict('records')
+    df_categorico = df.copy()
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df_categorico.columns:
+            df_categorico[columna] = df_categorico[columna].astype('category')
+
+    print(f"Tickets: {args.filas} | Dimensiones: {', '.join(DIMENSIONES)} + cruce area × prioridad")
+    t = cronometrar(lambda: conteo_anterior(tickets, df))
+    print(f"  anterior (bucle + groupby)        {t * 1000:9.1f} ms")
+    t = cronometrar(lambda: count_dimensions(df, DIMENSIONES, cruces=[('area', 'prioridad')]))
+    print(f"  count_dimensions (texto)          {t * 1000:9.1f} ms")
+    t = cronometrar(lambda: count_dimensions(df_categorico, DIMENSIONES, cruces=[('area', 'prioridad')]))
+    print(f"  count_dimensions (categórico)     {t * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_archivo.py
+# Mide el archivado de los meses viejos: bytes ahorrados en el almacén, compresión de los bloques,
+# velocidad de archivado y latencia de leer un ticket archivado por ID
+#
+# Uso:
+#   python benchmarks/bench_archivo.py --tickets 200000 --meses 3 --formato lzma
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.ticket_archive import FORMATOS, TicketArchive
+from engine.ticket_store import TicketStore
+
+PALABRAS = ("impresora toner escaner correo outlook red wifi vpn lenta clave usuario pantalla mouse "
+            "teclado servidor caido virus archivo no funciona anda error acceso sistema").split()
+
+
+def crear_tickets(n, hoy):
+    """Tickets de los últimos 24 meses, con IDs correlativos en el tiempo"""
+    aleatorio = random.Random(1)
+    tickets = []
+    for i in range(n):
+        numero = hoy.year * 12 + hoy.month - 1 - 23 + i * 24 // n
+        tickets.append({'id_ticket': f"TK{i:08d}", 'fecha': f"{numero // 12:04d}-{numero % 12 + 1:02d}-01",
+                        'contenido': ' '.join(aleatorio.choices(PALABRAS, k=8)),
+                        'cliente': f"cliente {aleatorio.randrange(5000)}", 'area': 'Ventas',
+                        'regla': 'R1', 'tipo': 'HARDWARE', 'prioridad': 'Media', 'version_reglas': 'v1'})
+    return tickets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del archivo frío de tickets")
+    parser.add_argument("--tickets", type=int, default=200000)
+    parser.add_argument("--meses", type=int, default=3)
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default='lzma')
+    parser.add_argument("--lecturas", type=int, default=200)
+    args = parser.parse_args()
+
+    hoy = date.today()
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'facts_storage.json')
+        tickets = crear_tickets(args.tickets, hoy)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'tickets_procesados': tickets}, f)
+
+        resumen = TicketStore(ruta).archive_old(args.meses, formato=args.formato, hoy=hoy)
+        print(f"Archivados {resumen['tickets']} de {args.tickets} tickets ({args.formato}) "
+              f"a {resumen['tickets_por_segundo']:.0f} tickets/s")
+        print(f"Almacén: {resumen['bytes_antes'] / 1e6:.1f} MB -> {resumen['bytes_despues'] / 1e6:.1f} MB | "
+              f"archivo {resumen['bytes_archivo'] / 1e6:.1f} MB | compresión x{resumen['compresion']:.1f} | "
+              f"ahorro {resumen['bytes_ahorrados'] / 1e6:.1f} MB")
+
+        # Lecturas al azar por ID, sin caché de bloques (abre el archivo en cada lectura)
+        aleatorio = random.Random(2)
+        ids = [tickets[aleatorio.randrange(resumen['tickets'])]['id_ticket'] for _ in range(args.lecturas)]
+        t0 = time.perf_counter()
+        for id_ticket in ids:
+            assert TicketArchive(ruta).get_ticket(id_ticket) is not None
+        print(f"get_ticket archivado (índice + un bloque): "
+              f"{(time.perf_counter() - t0) / args.lecturas * 1000:.2f} ms por lectura")
+
+
+if __name__ == "__main__":
+    main()
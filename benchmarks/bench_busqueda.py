@@ -0,0 +1,88 @@
+# benchmarks/bench_busqueda.py
+# Mide el índice de búsqueda de texto: construcción, punto de control (guardar y abrir)
+# y latencia de consultas de distintos tipos con muchos tickets
+#
+# Uso:
+#   python benchmarks/bench_busqueda.py --tickets 1000000
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.search_index import TicketSearchIndex
+
+CLIENTES = ["Ana Pérez", "Luis Gómez", "Marta Díaz", "Diego Cuba", "Gian", "Sofía Ruiz", "Pablo Torres"]
+PRIORIDADES = ["Alta", "Media", "Baja"]
+TIPOS = ["HARDWARE", "SOFTWARE", "REDES", "SEGURIDAD", "PC/LAPTOP"]
+
+CONSULTAS = [
+    ("término", "impresora", {}),
+    ("frase", '"no funciona"', {}),
+    ("prefijo", "impres*", {}),
+    ("booleana", "red OR internet -wifi", {}),
+    ("con filtros", "correo", {'prioridad': 'Alta', 'desde': date(2025, 6, 1)}),
+    ("solo filtros", "", {'tipo': ['REDES', 'HARDWARE'], 'hasta': date(2025, 3, 1)}),
+    ("cliente", "gian", {}),
+]
+
+
+def crear_tickets(textos, n, semilla=29):
+    """Tickets con textos de ejemplo, cliente, fecha, prioridad, tipo e ID únicos"""
+    aleatorio = random.Random(semilla)
+    inicio = date(2025, 1, 1)
+    return [{'id_ticket': f"TK{i:08d}", 'contenido': aleatorio.choice(textos), 'cliente': aleatorio.choice(CLIENTES),
+             'fecha': (inicio + timedelta(days=aleatorio.randrange(365))).isoformat(),
+             'prioridad': aleatorio.choice(PRIORIDADES), 'tipo': aleatorio.choice(TIPOS)} for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de búsqueda de texto")
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'] for t in json.load(f)['tickets']]
+    textos += ["no funciona el correo", "sin internet en la red", "la red wifi anda lenta", "impresión borrosa"]
+    tickets = crear_tickets(textos, args.tickets)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'busqueda.npz')
+        t0 = time.perf_counter()
+        indice = TicketSearchIndex(archivo)
+        indice.sync(tickets)
+        print(f"Construcción y punto de control: {time.perf_counter() - t0:.1f} s "
+              f"({len(indice)} tickets, {len(indice._docs):,} apariciones, {len(indice._terminos):,} términos)")
+        print(f"Punto de control: {os.path.getsize(archivo) / 2 ** 20:.1f} MB")
+
+        # Abrir en otro proceso con 1% de tickets nuevos
+        nuevos = tickets + crear_tickets(textos, args.tickets // 100, semilla=30)
+        t0 = time.perf_counter()
+        abierto = TicketSearchIndex(archivo)
+        agregados = abierto.sync(nuevos)
+        print(f"Abrir el punto de control e indexar {agregados} tickets nuevos: {time.perf_counter() - t0:.2f} s")
+
+    print(f"\n{'Consulta':<14}{'total':>10}{'mediana ms':>12}{'p95 ms':>9}")
+    for nombre, consulta, filtros in CONSULTAS:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            t0 = time.perf_counter()
+            resultado = abierto.search(consulta, **filtros)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        tiempos.sort()
+        print(f"{nombre:<14}{resultado['total']:>10}{statistics.median(tiempos):>12.1f}"
+              f"{tiempos[int(len(tiempos) * 0.95) - 1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_cambios.py
+# Mide los consumidores incrementales del almacén: después de agregar y reclasificar un lote, cuánto
+# tarda cada índice derivado en ponerse al día con tail (solo los cambios) contra reconstruirse desde
+# cero, y lo mismo para un proceso nuevo que parte del punto de control en disco
+#
+# Uso:
+#   python benchmarks/bench_cambios.py --tickets 200000 --lote 1000
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.incidents import IncidentDetector
+from engine.search_index import TicketSearchIndex, archivo_indice
+from engine.similar_index import SimilarTicketIndex
+from engine.ticket_store import TicketStore
+
+PALABRAS = ("impresora toner escaner correo outlook red wifi vpn lenta clave usuario pantalla mouse "
+            "teclado servidor caido virus archivo no funciona anda error acceso sistema").split()
+
+
+def crear_tickets(n, inicio=0, semilla=1):
+    aleatorio = random.Random(semilla)
+    return [{'id_ticket': f"TK{i:08d}", 'contenido': ' '.join(aleatorio.choices(PALABRAS, k=6)),
+             'cliente': f"cliente {aleatorio.randrange(5000)}", 'area': 'Ventas', 'fecha': '2025-10-01',
+             'tipo': 'REDES', 'version_reglas': 'v1'} for i in range(inicio, inicio + n)]
+
+
+def medir(funcion):
+    t0 = time.perf_counter()
+    resultado = funcion()
+    return resultado, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consumidores incrementales (tail)")
+    parser.add_argument("--tickets", type=int, default=200000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'facts_storage.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'tickets_procesados': crear_tickets(args.tickets)}, f)
+        store = TicketStore(ruta)
+        store.get_sketches()
+        indices = {'búsqueda': TicketSearchIndex(archivo_indice(ruta)), 'similares': SimilarTicketIndex(),
+                   'incidentes': IncidentDetector()}
+        for indice in indices.values():
+            indice.follow(store)
+
+        # Un lote nuevo y la reclasificación de otro tanto de tickets viejos
+        aleatorio = random.Random(2)
+        store.add_tickets(crear_tickets(args.lote, inicio=args.tickets, semilla=3))
+        viejos = aleatorio.sample(range(args.tickets), args.lote)
+        store.update_classifications({posicion: {'regla': 'Regla: Otra', 'tipo': 'HARDWARE'} for posicion in viejos},
+                                     'v2')
+        desde = store.secuencia - 2 * args.lote
+        cambios, ms = medir(lambda: sum(1 for _ in store.tail(desde)))
+        print(f"{args.tickets} tickets | tail de {cambios} cambios: {ms:.1f} ms")
+
+        for nombre, indice in indices.items():
+            _, incremental = medir(lambda: indice.follow(store))
+            _, desde_cero = medir(lambda: type(indice)().follow(store))
+            print(f"{nombre:>10}: al día con tail {incremental:8.1f} ms | desde cero {desde_cero:8.1f} ms")
+
+        # Proceso nuevo: relee el almacén y parte de los puntos de control en disco (búsqueda y sketches
+        # guardados antes del último lote)
+        archivo_sketches = os.path.splitext(ruta)[0] + '_sketches.json'
+        with open(archivo_sketches, 'r', encoding='utf-8') as f:
+            sketches_atrasados = f.read()
+        store.add_tickets(crear_tickets(args.lote, inicio=args.tickets + args.lote, semilla=4))
+        otro_store, ms_carga = medir(lambda: TicketStore(ruta))
+        agregados, ms = medir(lambda: TicketSearchIndex(archivo_indice(ruta)).follow(otro_store))
+        print(f"Proceso nuevo: carga del almacén {ms_carga:.0f} ms | búsqueda desde el punto de control "
+              f"{ms:.0f} ms ({agregados} tickets indexados)")
+        with open(archivo_sketches, 'w', encoding='utf-8') as f:
+            f.write(sketches_atrasados)
+        _, incremental = medir(otro_store.get_sketches)
+        os.remove(archivo_sketches)
+        _, desde_cero = medir(TicketStore(ruta).get_sketches)
+        print(f"Sketches: al día con tail {incremental:.0f} ms | recalcular todo {desde_cero:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_fallback.py
+# Mide el modelo estadístico para tickets sin regla: entrenamiento, latencia por ticket (uno a uno y en lote),
+# tamaño del archivo y cuántos tickets sin palabra clave recupera
+#
+# Uso:
+#   python benchmarks/bench_fallback.py --tickets 20000
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_matcher import cronometrar
+from engine.classification_engine import REGLAS_BASE, clasificar_contenido, RESULTADO_SIN_CLASIFICAR
+from engine.fallback_model import FallbackClassifier
+from engine.matcher import RuleMatcher
+from engine.rules_manager import RulesManager
+
+# Palabras de relleno para que los tickets no sean todos iguales
+RELLENO = ("hoy desde temprano oficina piso urgente ayuda favor equipo usuario sistema "
+           "mañana reunión cliente problema error otra vez").split()
+
+
+def historial(textos, matcher, n, semilla=5):
+    """
+    Tickets clasificados por las reglas (como los de facts_storage.json) y versiones de los mismos
+    tickets sin la palabra clave que decidió la regla (las que terminan 'Sin clasificar').
+
+    Returns:
+        (tickets para entrenar, lista de (texto sin palabra clave, clase esperada))
+    """
+    aleatorio = random.Random(semilla)
+    vacio = RuleMatcher([])
+    tickets, sin_palabra = [], []
+    for _ in range(n):
+        texto = f"{aleatorio.choice(textos)} {' '.join(aleatorio.sample(RELLENO, 3))}"
+        resultado = clasificar_contenido(texto, vacio, matcher)
+        if resultado == RESULTADO_SIN_CLASIFICAR:
+            continue
+        tickets.append({'contenido': texto, **resultado})
+        regla = matcher.match(texto)
+        palabra = next((p for p in regla['palabras_clave'] if p in texto), None)
+        if palabra:
+            sin_clave = texto.replace(palabra, ' ')
+            if matcher.match(sin_clave) is None:
+                sin_palabra.append((sin_clave, (resultado['tipo'], resultado['prioridad'], resultado['asignado_a'])))
+    return tickets, sin_palabra
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del modelo estadístico")
+    parser.add_argument("--tickets", type=int, default=20000)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'].lower() for t in json.load(f)['tickets']]
+    matcher = RuleMatcher(RulesManager().get_active_rules() + REGLAS_BASE)
+    tickets, sin_palabra = historial(textos, matcher, args.tickets)
+
+    modelo = FallbackClassifier()
+    t = cronometrar(lambda: FallbackClassifier().fit_tickets(tickets), repeticiones=1)
+    modelo.fit_tickets(tickets)
+    print(f"Entrenamiento: {len(tickets)} tickets, {len(modelo.clases)} clases en {t:.2f} s")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'modelo.npz')
+        modelo.save(archivo)
+        print(f"Archivo del modelo: {os.path.getsize(archivo) / 1024:.1f} KB")
+        t = cronometrar(lambda: FallbackClassifier.load(archivo), repeticiones=3)
+        print(f"Carga: {t * 1000:.1f} ms")
+
+    textos_prueba = [texto for texto, _ in sin_palabra]
+    predicciones = modelo.predict_many(textos_prueba)
+    decididas = [(p[0], esperada) for p, (_, esperada) in zip(predicciones, sin_palabra) if p is not None]
+    aciertos = sum(1 for clase, esperada in decididas if clase == esperada)
+    print(f"Tickets sin palabra clave: {len(sin_palabra)} | Decide el modelo: {len(decididas) / len(sin_palabra):.1%}"
+          f" | Aciertos entre los decididos: {aciertos / max(len(decididas), 1):.1%}")
+
+    t = cronometrar(lambda: [modelo.predict(texto) for texto in textos_prueba], repeticiones=3)
+    print(f"  de a uno  {t / len(textos_prueba) * 1e6:8.1f} µs por ticket")
+    t = cronometrar(lambda: modelo.predict_many(textos_prueba), repeticiones=3)
+    print(f"  en lote   {t / len(textos_prueba) * 1e6:8.1f} µs por ticket")
+
+
+if __name__ == "__main__":
+    main()
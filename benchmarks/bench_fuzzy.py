@@ -0,0 +1,90 @@
+# benchmarks/bench_fuzzy.py
+# Compara coincidencia exacta vs. tolerante a errores de tipeo: recall sobre tickets de ejemplo
+# con una palabra clave mal escrita y latencia por ticket
+#
+# Uso:
+#   python benchmarks/bench_fuzzy.py --tickets 2000
+
+import argparse
+import json
+import os
+import random
+import sys
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_matcher import cronometrar
+from engine.classification_engine import REGLAS_BASE
+from engine.fuzzy_index import distancia_permitida
+from engine.matcher import RuleMatcher
+from engine.rules_manager import RulesManager
+
+LETRAS = "abcdefghijklmnopqrstuvwxyzñ"
+
+
+def con_error(palabra, aleatorio):
+    """La palabra con un error de tipeo: letra borrada, cambiada, agregada o dos letras invertidas"""
+    i = aleatorio.randrange(len(palabra))
+    tipo = aleatorio.choice(['borrar', 'cambiar', 'agregar', 'invertir'])
+    if tipo == 'borrar':
+        return palabra[:i] + palabra[i + 1:]
+    if tipo == 'cambiar':
+        return palabra[:i] + aleatorio.choice(LETRAS.replace(palabra[i], '')) + palabra[i + 1:]
+    if tipo == 'agregar':
+        return palabra[:i] + aleatorio.choice(LETRAS) + palabra[i:]
+    i = min(i, len(palabra) - 2)
+    return palabra[:i] + palabra[i + 1] + palabra[i] + palabra[i + 2:]
+
+
+def tickets_con_errores(textos, matcher, n, semilla=3):
+    """
+    Tickets de ejemplo con una palabra clave (la de la regla que gana) escrita con un error.
+
+    Returns:
+        Lista de (texto con error, id de la regla esperada)
+    """
+    aleatorio = random.Random(semilla)
+    casos = []
+    for texto in textos:
+        regla = matcher.match(texto)
+        if regla is None:
+            continue
+        palabras = [p for p in regla['palabras_clave'] if p in texto and distancia_permitida(p, 1)]
+        if palabras:
+            casos.append((texto, regla['id_regla'], palabras))
+    resultado = []
+    for _ in range(n):
+        texto, id_regla, palabras = aleatorio.choice(casos)
+        palabra = aleatorio.choice(palabras)
+        resultado.append((texto.replace(palabra, con_error(palabra, aleatorio), 1), id_regla))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de coincidencia con errores de tipeo")
+    parser.add_argument("--tickets", type=int, default=2000)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'].lower() for t in json.load(f)['tickets']]
+    textos += ["no tengo internet", "mi impresora no imprime", "necesito instalar office",
+               "creo que tengo un virus", "la computadora está lenta", "olvidé mi contraseña"]
+
+    reglas = RulesManager().get_active_rules() + REGLAS_BASE
+    exacto = RuleMatcher(reglas)
+    casos = tickets_con_errores(textos, exacto, args.tickets)
+    print(f"Reglas: {len(reglas)} | Tickets con un error de tipeo: {len(casos)}")
+
+    for difuso in (0, 1, 2):
+        compilado = RuleMatcher([{**r, 'difuso': difuso} for r in reglas]).compiled()
+        aciertos = sum(1 for texto, id_regla in casos
+                       if (compilado.match(texto) or {}).get('id_regla') == id_regla)
+        t = cronometrar(lambda: [compilado.match(texto) for texto, _ in casos], repeticiones=3)
+        print(f"  difuso={difuso}  recall {aciertos / len(casos):6.1%}  "
+              f"{t / len(casos) * 1e6:8.1f} µs por ticket")
+
+
+if __name__ == "__main__":
+    main()
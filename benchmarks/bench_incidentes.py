@@ -0,0 +1,77 @@
+# benchmarks/bench_incidentes.py
+# Mide el agrupador de tickets casi iguales: tickets por segundo, memoria e incidentes encontrados
+# (con tickets de ejemplo repetidos con variaciones, como en una ráfaga durante una caída)
+#
+# Uso:
+#   python benchmarks/bench_incidentes.py --tickets 1000000
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.incidents import IncidentDetector
+
+AREAS = ["contabilidad", "ventas", "logística", "recursos humanos", "ingeniería", "el piso 3", "la sala b"]
+AGREGADOS = ["desde la mañana", "urgente", "otra vez", "ayuda por favor", "hace una hora", ""]
+
+
+def crear_tickets(textos, n, semilla=17):
+    """Tickets de ejemplo con el área y un agregado al azar; uno de cada diez con palabras inventadas (único)"""
+    aleatorio = random.Random(semilla)
+    tickets = []
+    for i in range(n):
+        texto = f"{aleatorio.choice(textos)} en {aleatorio.choice(AREAS)} {aleatorio.choice(AGREGADOS)}"
+        if i % 10 == 0:
+            texto = ' '.join(''.join(aleatorio.choices(string.ascii_lowercase, k=7)) for _ in range(4))
+        tickets.append({'contenido': texto})
+    return tickets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del agrupador de incidentes")
+    parser.add_argument("--tickets", type=int, default=1000000)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'] for t in json.load(f)['tickets']]
+    textos += ["no tengo internet", "sin internet", "no funciona el correo", "se cayó el sistema"]
+    tickets = crear_tickets(textos, args.tickets)
+
+    t0 = time.perf_counter()
+    detector = IncidentDetector(tickets)
+    segundos = time.perf_counter() - t0
+
+    # Memoria en una segunda pasada (tracemalloc hace más lento el agrupado)
+    tracemalloc.start()
+    medido = IncidentDetector(tickets)
+    memoria, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del medido
+
+    grupos = detector.clusters(minimo=1)
+    repetidos = [g for g in grupos if g['tamano'] >= 2]
+    print(f"Tickets: {len(detector)} en {segundos:.1f} s ({len(detector) / segundos:,.0f} tickets/s)")
+    print(f"Incidentes: {len(grupos)} | Con tickets repetidos: {len(repetidos)} "
+          f"| Tickets agrupados: {sum(g['tamano'] for g in repetidos)}")
+    print(f"Memoria del detector: {memoria / 2 ** 20:.1f} MB (pico {pico / 2 ** 20:.1f} MB)"
+          f" | {memoria / len(detector):.0f} bytes por ticket")
+
+    # Un ticket más cuando ya hay 1M (streaming)
+    nuevos = crear_tickets(textos, 1000, semilla=18)
+    t0 = time.perf_counter()
+    for ticket in nuevos:
+        detector.add(ticket['contenido'])
+    print(f"  de a uno   {(time.perf_counter() - t0) / len(nuevos) * 1e6:8.1f} µs por ticket")
+
+
+if __name__ == "__main__":
+    main()
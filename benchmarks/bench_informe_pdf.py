@@ -0,0 +1,75 @@
+# benchmarks/bench_informe_pdf.py
+# Compara el tiempo y el tamaño del informe PDF con gráficos vectoriales vs plotly + kaleido
+#
+# Uso:
+#   python benchmarks/bench_informe_pdf.py --filas 500
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from engine.report_pdf import generar_informe_pdf, MOTOR_VECTORIAL, MOTOR_PLOTLY
+
+
+def crear_tickets_sinteticos(n, semilla=42):
+    """Crea un DataFrame de tickets con valores aleatorios pero realistas"""
+    rnd = random.Random(semilla)
+    tipos = ["HARDWARE", "SOFTWARE", "REDES", "SEGURIDAD", "EQUIPOS DE IMPRESIÓN/ESCÁNER"]
+    prioridades = ["Alta", "Media", "Baja"]
+    areas = ["Recursos Humanos", "Contabilidad", "Ingeniería", "Logística", "Ventas", "IT"]
+    equipos = ["Equipo de Hardware", "Equipo de Software", "Equipo de Redes", "Equipo de Seguridad"]
+    return pd.DataFrame({
+        "id_ticket": [f"TK{i:07d}" for i in range(n)],
+        "contenido": [rnd.choice(["no tengo internet", "mi impresora no imprime", "necesito instalar office",
+                                  "creo que tengo un virus", "la computadora está lenta"]) for _ in range(n)],
+        "cliente": [f"Cliente {rnd.randint(1, 200)}" for _ in range(n)],
+        "area": [rnd.choice(areas) for _ in range(n)],
+        "fecha": pd.to_datetime([f"2025-10-{rnd.randint(1, 28):02d}" for _ in range(n)]),
+        "tipo": [rnd.choice(tipos) for _ in range(n)],
+        "prioridad": [rnd.choice(prioridades) for _ in range(n)],
+        "asignado_a": [rnd.choice(equipos) for _ in range(n)],
+    })
+
+
+def medir(df, graficos, motor, repeticiones):
+    """Devuelve (mejor tiempo en segundos, tamaño del PDF en bytes)"""
+    mejor = None
+    tamano = 0
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        buffer = generar_informe_pdf(df, graficos, date(2025, 10, 1), date(2025, 10, 31), motor_graficos=motor)
+        t = time.perf_counter() - t0
+        tamano = len(buffer.getvalue())
+        mejor = t if mejor is None else min(mejor, t)
+    return mejor, tamano
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del informe PDF")
+    parser.add_argument("--filas", type=int, default=500)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    df = crear_tickets_sinteticos(args.filas)
+    graficos = ["Tipo", "Prioridad", "Área", "Asignado a"]
+
+    print(f"Tickets: {args.filas} | Gráficos: {', '.join(graficos)}")
+    for motor in (MOTOR_VECTORIAL, MOTOR_PLOTLY):
+        try:
+            segundos, tamano = medir(df, graficos, motor, args.repeticiones)
+            print(f"  {motor:<10} {segundos * 1000:9.1f} ms  {tamano / 1024:9.1f} KiB")
+        except Exception as e:
+            # plotly necesita kaleido + chromium, puede no estar disponible
+            detalle = str(e).strip().splitlines()
+            print(f"  {motor:<10} no disponible: {detalle[0] if detalle else type(e).__name__}")
+
+
+if __name__ == "__main__":
+    main()
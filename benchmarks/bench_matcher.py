@@ -0,0 +1,76 @@
+# benchmarks/bench_matcher.py
+# Compara el costo de aplicar una edición de regla: recompilar todo el índice vs. aplicar el evento,
+# y el costo de un lote de tickets con todas las reglas globales vs. repartidas por área
+#
+# Uso:
+#   python benchmarks/bench_matcher.py --reglas 5000 --areas 20
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.matcher import RuleMatcher
+
+
+def crear_reglas(n, semilla=11):
+    """Reglas sintéticas con 5 palabras clave de 2 a 3 sílabas cada una"""
+    aleatorio = random.Random(semilla)
+    silabas = ["ra", "to", "mi", "sel", "pan", "co", "red", "fi", "lu", "ver", "tal", "nos"]
+    return [{
+        'id_regla': f"R{i:05d}",
+        'nombre': f"Regla {i}",
+        'palabras_clave': ["".join(aleatorio.choices(silabas, k=aleatorio.randint(2, 3))) + str(i) for _ in range(5)],
+        'activa': True
+    } for i in range(n)]
+
+
+def cronometrar(funcion, repeticiones=5):
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        t = time.perf_counter() - t0
+        mejor = t if mejor is None else min(mejor, t)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de actualización del índice de reglas")
+    parser.add_argument("--reglas", type=int, default=5000)
+    parser.add_argument("--areas", type=int, default=20, help="Áreas entre las que se reparten las reglas")
+    args = parser.parse_args()
+
+    reglas = crear_reglas(args.reglas)
+    matcher = RuleMatcher(reglas)
+    regla = reglas[len(reglas) // 2]
+    alternar = {'evento': 'toggle', 'id_regla': regla['id_regla'], 'regla': {**regla, 'activa': False}}
+    restaurar = {'evento': 'toggle', 'id_regla': regla['id_regla'], 'regla': regla}
+
+    print(f"Reglas: {args.reglas}")
+    t = cronometrar(lambda: RuleMatcher(reglas))
+    print(f"  recompilar todo el índice         {t * 1000:9.3f} ms")
+    t = cronometrar(lambda: (matcher.aplicar_evento(alternar), matcher.aplicar_evento(restaurar)))
+    print(f"  aplicar evento (desactivar+activar) {t * 1000:7.3f} ms")
+    texto = "el equipo no conecta " + regla['palabras_clave'][2]
+    t = cronometrar(lambda: matcher.match(texto), repeticiones=50)
+    print(f"  match de un ticket                {t * 1000:9.3f} ms")
+
+    # Mismas reglas, pero el 90 % limitadas a una de las áreas (tabla de despacho por área)
+    por_area = [{**r, 'areas': [f"A{i % args.areas:03d}"]} if i % 10 else r for i, r in enumerate(reglas)]
+    despachado = RuleMatcher(por_area)
+    textos = [" ".join(r['palabras_clave'][:2]) + " no funciona" for r in reglas[::7]]
+    compilado, compilado_areas = matcher.compiled(), despachado.compiled()
+    areas = [f"A{i % args.areas:03d}" for i in range(len(textos))]
+    t = cronometrar(lambda: compilado.match_many(textos), repeticiones=3)
+    print(f"  lote de {len(textos)} tickets, reglas globales  {t * 1000:9.3f} ms")
+    t = cronometrar(lambda: compilado_areas.match_many(textos, areas), repeticiones=3)
+    print(f"  lote de {len(textos)} tickets, por área ({args.areas})   {t * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_palabras.py
+# Mide la búsqueda de palabras clave en tickets sin clasificar: tickets por segundo y memoria de los
+# contadores con historiales de distinto tamaño (la memoria tiene que quedar fija)
+#
+# Uso:
+#   python benchmarks/bench_palabras.py --tickets 200000
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.keyword_miner import KeywordMiner
+
+PROBLEMAS = ["el lector de huellas no reconoce mi dedo", "la cámara web se ve borrosa",
+             "no puedo firmar el documento digital", "el proyector de la sala parpadea"]
+
+
+def crear_tickets(textos, n, semilla=23):
+    """Tickets sin clasificar: la mitad con un problema repetido y palabras inventadas en todos (cola larga)"""
+    aleatorio = random.Random(semilla)
+    tickets = []
+    for i in range(n):
+        inventadas = ' '.join(''.join(aleatorio.choices(string.ascii_lowercase, k=6)) for _ in range(3))
+        base = aleatorio.choice(PROBLEMAS) if i % 2 else aleatorio.choice(textos)
+        tickets.append({'contenido': f"{base} {inventadas}", 'regla': 'Sin clasificar'})
+    return tickets
+
+
+def medir(tickets):
+    """Cuenta los tickets y retorna (segundos, memoria de los contadores en bytes, candidatas)"""
+    t0 = time.perf_counter()
+    minero = KeywordMiner()
+    minero.add_tickets(tickets)
+    segundos = time.perf_counter() - t0
+
+    tracemalloc.start()
+    medido = KeywordMiner()
+    medido.add_tickets(tickets)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del medido
+    return segundos, memoria, minero.candidates(top=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de palabras clave")
+    parser.add_argument("--tickets", type=int, default=200000)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'] for t in json.load(f)['tickets']]
+
+    for n in (args.tickets // 10, args.tickets):
+        segundos, memoria, candidatas = medir(crear_tickets(textos, n))
+        print(f"Tickets: {n:>9,} en {segundos:6.1f} s ({n / segundos:,.0f} tickets/s) "
+              f"| Memoria de los contadores: {memoria / 2 ** 20:.1f} MB")
+    for candidata in candidatas:
+        print(f"  {candidata['tickets']:>8,} '{candidata['palabra']}'")
+
+
+if __name__ == "__main__":
+    main()
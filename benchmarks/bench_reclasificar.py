@@ -0,0 +1,89 @@
+# benchmarks/bench_reclasificar.py
+# Mide la reclasificación después de agregar una palabra clave a una regla: solo se reclasifican
+# los tickets que el índice de texto encuentra con esa palabra (más los asignados a la regla),
+# contra reclasificar y guardar todo el almacén
+#
+# Uso:
+#   python benchmarks/bench_reclasificar.py --tickets 200000
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.classification_engine import clasificar_contenido, version_reglas
+from engine.matcher import RuleMatcher
+from engine.reclassifier import affected_tickets, reclassify_after_edit, rule_impact
+from engine.ticket_store import TicketStore, get_search_index
+
+PALABRAS = ("impresora toner escaner correo outlook red wifi vpn lenta clave usuario pantalla mouse "
+            "teclado servidor caido virus archivo no funciona anda error acceso sistema").split()
+
+REGLAS = [
+    {'id_regla': 'R1', 'nombre': 'Impresoras', 'palabras_clave': ['impresora', 'toner'], 'tipo': 'HARDWARE',
+     'prioridad': 'Media', 'asignado_a': 'Soporte', 'activa': True},
+    {'id_regla': 'R2', 'nombre': 'Correo', 'palabras_clave': ['correo', 'outlook'], 'tipo': 'SOFTWARE',
+     'prioridad': 'Media', 'asignado_a': 'Mensajería', 'activa': True},
+    {'id_regla': 'R3', 'nombre': 'VPN', 'palabras_clave': ['vpn'], 'tipo': 'REDES',
+     'prioridad': 'Alta', 'asignado_a': 'Redes', 'activa': True},
+]
+
+
+def crear_tickets(n, reglas):
+    aleatorio = random.Random(1)
+    matcher = RuleMatcher(reglas)
+    version = version_reglas(reglas)
+    tickets = []
+    for i in range(n):
+        contenido = ' '.join(aleatorio.choices(PALABRAS, k=6)) + f" equipo {aleatorio.randrange(50000)}"
+        tickets.append({'id_ticket': f"TK{i:08d}", 'contenido': contenido, 'fecha': '2025-10-01',
+                        **clasificar_contenido(contenido, matcher), 'version_reglas': version})
+    return tickets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de reclasificación acotada")
+    parser.add_argument("--tickets", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'facts_storage.json')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'tickets_procesados': crear_tickets(args.tickets, REGLAS)}, f)
+        store = TicketStore(ruta)
+        t0 = time.perf_counter()
+        indice = get_search_index(ruta)
+        print(f"{args.tickets} tickets | índice de búsqueda en {time.perf_counter() - t0:.1f} s")
+
+        # Una palabra clave poco frecuente (aparece en los números de equipo '4242x')
+        despues = copy.deepcopy(REGLAS)
+        despues[2]['palabras_clave'].append('4242')
+        t0 = time.perf_counter()
+        candidatos = affected_tickets(store.get_all_tickets(), indice, rule_impact(REGLAS, despues))
+        print(f"Búsqueda de candidatos: {len(candidatos)} en {(time.perf_counter() - t0) * 1000:.0f} ms")
+        resumen = reclassify_after_edit(store, REGLAS, despues, indice=indice)
+        print(f"Acotada: {resumen['candidatos']} candidatos, {resumen['reclasificados']} reclasificados "
+              f"en {resumen['segundos']:.2f} s")
+
+        # Comparación: reclasificar todo el almacén y guardar
+        t0 = time.perf_counter()
+        matcher = RuleMatcher(despues)
+        version = version_reglas(despues)
+        resultados = {}
+        for posicion, ticket in enumerate(store.get_all_tickets()):
+            resultado = clasificar_contenido(ticket['contenido'].lower(), matcher)
+            if resultado['regla'] != ticket['regla']:
+                resultados[posicion] = resultado
+        store.update_classifications(resultados, version, confirmados=range(args.tickets))
+        print(f"Todo el almacén: {args.tickets} reclasificados en {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_similares.py
+# Mide la búsqueda de tickets similares: construcción del índice, latencia por consulta con poda
+# max-score y comparación con sumar las listas completas de todos los términos
+#
+# Uso:
+#   python benchmarks/bench_similares.py --tickets 1000000 --consultas 200
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_matcher import cronometrar
+from engine.similar_index import SimilarTicketIndex, terminos
+
+# Palabras sueltas para variar los tickets (marcas, lugares, detalles)
+DETALLES = [f"{prefijo}{i}" for prefijo in ("equipo", "piso", "sala", "modelo", "codigo") for i in range(2000)]
+
+
+def crear_tickets(textos, n, semilla=11):
+    """Tickets con una frase de ejemplo más dos detalles al azar"""
+    aleatorio = random.Random(semilla)
+    return [{'id_ticket': f"TK{i:07d}",
+             'contenido': f"{aleatorio.choice(textos)} {aleatorio.choice(DETALLES)} {aleatorio.choice(DETALLES)}"}
+            for i in range(n)]
+
+
+def sin_poda(indice, contenido, k=5):
+    """Referencia: suma las listas completas de todos los términos de la consulta"""
+    n = len(indice)
+    puntajes = np.zeros(n)
+    for termino, veces in terminos(contenido).items():
+        lista = indice._listas.get(termino)
+        if lista is not None:
+            docs, pesos = lista.arrays()
+            puntajes[docs] += np.log(1.0 + n / len(docs)) * (1.0 + np.log(veces)) * pesos
+    return np.argpartition(puntajes, n - k)[-k:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de tickets similares")
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    ruta = os.path.join(os.path.dirname(__file__), '..', 'tests', 'default_tickets.json')
+    with open(ruta, 'r', encoding='utf-8') as f:
+        textos = [t['contenido'] for t in json.load(f)['tickets']]
+    tickets = crear_tickets(textos, args.tickets)
+
+    t0 = time.perf_counter()
+    indice = SimilarTicketIndex(tickets)
+    print(f"Índice: {len(indice)} tickets, {len(indice._listas)} términos en {time.perf_counter() - t0:.1f} s")
+
+    consultas = [ticket['contenido'] for ticket in crear_tickets(textos, args.consultas, semilla=12)]
+    indice.search(consultas[0])  # Junta los agregados pendientes de las listas
+    for nombre, funcion in (("max-score", lambda: [indice.search(c) for c in consultas]),
+                            ("sin poda", lambda: [sin_poda(indice, c) for c in consultas])):
+        t = cronometrar(funcion, repeticiones=3)
+        print(f"  {nombre:10} {t / len(consultas) * 1000:8.2f} ms por consulta")
+
+    agregados = crear_tickets(textos, 1000, semilla=13)
+    t = cronometrar(lambda: indice.add_many(agregados), repeticiones=1)
+    print(f"  agregar   {t / len(agregados) * 1e6:8.1f} µs por ticket")
+
+
+if __name__ == "__main__":
+    main()
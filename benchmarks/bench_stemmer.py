@@ -0,0 +1,61 @@
+# benchmarks/bench_stemmer.py
+# Mide el stemmer (palabras por segundo con y sin cache) y cuánto achica las tablas de palabras clave
+#
+# Uso:
+#   python benchmarks/bench_stemmer.py --tickets 20000
+
+import argparse
+import os
+import sys
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_informe_pdf import crear_tickets_sinteticos
+from benchmarks.bench_matcher import cronometrar
+from engine.classification_engine import REGLAS_BASE
+from engine.matcher import RuleMatcher, _disparadoras
+from engine.rules_manager import RulesManager
+from engine.stemmer import stem, stem_sin_cache, tokens
+
+# Frases de tickets con palabras en distintas formas (para que no todo sea la misma palabra)
+FRASES = [
+    "la impresora no imprime y las impresoras del piso tampoco",
+    "necesito instalar office, la instalación falló al instalarlo",
+    "internet está muy lento, las conexiones se cortan",
+    "olvidé mi contraseña y no puedo cambiar las contraseñas",
+    "la computadora se reinicia sola, las computadoras nuevas también",
+    "me llegó un correo sospechoso con un enlace raro",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del stemmer")
+    parser.add_argument("--tickets", type=int, default=20000)
+    args = parser.parse_args()
+
+    df = crear_tickets_sinteticos(args.tickets)
+    textos = [f"{c} {FRASES[i % len(FRASES)]} equipo{i % 500}" for i, c in enumerate(df['contenido'])]
+    palabras = [token for texto in textos for token in tokens(texto.lower())]
+    print(f"Palabras: {len(palabras)} | Distintas: {len(set(palabras))}")
+
+    t = cronometrar(lambda: [stem_sin_cache(p) for p in palabras], repeticiones=3)
+    print(f"  sin cache   {len(palabras) / t:12,.0f} palabras/s")
+    stem.cache_clear()
+    t = cronometrar(lambda: [stem(p) for p in palabras], repeticiones=3)
+    print(f"  con cache   {len(palabras) / t:12,.0f} palabras/s  ({stem.cache_info().currsize} raíces en cache)")
+
+    # Tablas de palabras clave: todas las reglas exactas vs. todas por raíz
+    reglas = RulesManager().get_active_rules() + REGLAS_BASE
+    for raices in (False, True):
+        con_raices = [{**r, 'raices': raices} for r in reglas]
+        en_trie = set().union(*(_disparadoras(r) for r in con_raices))
+        matcher = RuleMatcher(con_raices)
+        compilado = matcher.compiled()
+        patron = compilado._regex.pattern if compilado._regex is not None else ''
+        print(f"  raices={str(raices):5}  palabras en el trie {len(en_trie):4}  raíces {len(matcher._raices):4}"
+              f"  expresión regular {len(patron):6} caracteres")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_tabla_detalle.py
+# Mide tiempo y memoria pico de la tabla de detalle del informe PDF
+#
+# Uso:
+#   python benchmarks/bench_tabla_detalle.py --filas 10000 100000 --modos streaming
+#
+# Cada modo se mide con la tabla entera (sin tope de filas) y después con el tope "top N + resumen"
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_informe_pdf import crear_tickets_sinteticos
+from engine.report_pdf import generar_informe_pdf, generar_detalle_csv, TABLA_STREAMING, TABLA_COMPLETA
+
+
+def medir(df, **opciones):
+    """Devuelve (segundos, memoria pico en MiB, tamaño del PDF en KiB)"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    buffer = generar_informe_pdf(df, [], date(2025, 10, 1), date(2025, 10, 31), **opciones)
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 2**20, len(buffer.getvalue()) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la tabla de detalle del PDF")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--modos", nargs="*", default=[TABLA_STREAMING, TABLA_COMPLETA])
+    parser.add_argument("--max-filas", type=int, default=1000, help="Tope para el modo top N + resumen")
+    args = parser.parse_args()
+
+    for n in args.filas:
+        df = crear_tickets_sinteticos(n)
+        print(f"Tickets: {n}")
+        for modo in args.modos:
+            # Tabla entera: todas las filas del periodo, sin recortar al top N
+            segundos, pico, tamano = medir(df, modo_tabla=modo, max_filas_detalle=None)
+            print(f"  {modo + ' sin tope':<22} {segundos:8.2f} s  pico {pico:8.1f} MiB  pdf {tamano:9.1f} KiB")
+
+        segundos, pico, tamano = medir(df, max_filas_detalle=args.max_filas)
+        print(f"  {'top ' + str(args.max_filas) + ' + resumen':<22} {segundos:8.2f} s  pico {pico:8.1f} MiB  pdf {tamano:9.1f} KiB")
+
+        t0 = time.perf_counter()
+        csv_gz = generar_detalle_csv(df)
+        print(f"  {'csv.gz adjunto':<22} {time.perf_counter() - t0:8.2f} s  {len(csv_gz.getvalue()) / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
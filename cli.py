@@ -0,0 +1,351 @@
+# cli.py
+# Línea de comandos del sistema experto (sin interfaz gráfica)
+#
+# Ejemplos:
+#   python cli.py informe --periodo diario --salida informes/
+#   python cli.py informe --desde 2025-10-01 --hasta 2025-10-31 --graficos Tipo Prioridad --salida octubre.pdf
+#   python cli.py informe --periodo semanal --por area --procesos 4 --salida informes/
+#   python cli.py analizar-reglas --podar
+#   python cli.py entrenar-modelo
+#   python cli.py minar-palabras --top 20 --cargar
+#   python cli.py deduplicar
+#   python cli.py archivar --meses 12 --formato lzma
+#   python cli.py buscar '"no enciende" impres* -toner' --prioridad Alta --desde 2025-10-01
+
+import argparse
+import copy
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from engine.ticket_store import TicketStore, get_search_index
+from engine.report_pdf import generar_informe_pdf, MOTOR_VECTORIAL, MOTOR_PLOTLY
+from engine.rules_manager import RulesManager
+from engine.rule_analyzer import analyze_rules, prune_rules, ORIGEN_PERSONALIZADA
+from engine.fallback_model import FallbackClassifier, ARCHIVO_MODELO, get_fallback_model
+from engine.keyword_miner import mine_keywords, propose_rules, load_proposals, MIN_TICKETS
+from engine.reclassifier import reclassify_after_edit
+from engine.ticket_archive import FORMATOS, FORMATO_PREDETERMINADO
+
+# Agrupaciones permitidas para generar un informe por grupo
+AGRUPACIONES = {'area': 'area', 'equipo': 'asignado_a'}
+
+
+def _fecha(texto):
+    """Convierte AAAA-MM-DD a date (para argparse)"""
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def _positivo(texto):
+    """Convierte a int un valor que debe ser 1 o más (para argparse)"""
+    valor = int(texto)
+    if valor < 1:
+        raise argparse.ArgumentTypeError(f"debe ser 1 o más: {valor}")
+    return valor
+
+
+def _rango_periodo(periodo, hasta=None):
+    """
+    Calcula el rango de fechas de un periodo predefinido.
+    'diario' es el día anterior y 'semanal' los 7 días que terminan el día anterior.
+    """
+    fin = hasta or (date.today() - timedelta(days=1))
+    dias = 1 if periodo == 'diario' else 7
+    return fin - timedelta(days=dias - 1), fin
+
+
+def _nombre_archivo(grupo, inicio, fin):
+    """Nombre de archivo seguro para el informe de un grupo"""
+    texto = unicodedata.normalize('NFKD', str(grupo)).encode('ascii', 'ignore').decode('ascii')
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', texto).strip('_') or 'sin_grupo'
+    return f"informe_{slug}_{inicio}_{fin}.pdf"
+
+
+def _generar_un_informe(df, graficos, inicio, fin, ruta_salida, motor_graficos, max_filas_detalle):
+    """Trabajo de un proceso del pool: genera un PDF y lo escribe en disco"""
+    buffer = generar_informe_pdf(df, graficos, inicio, fin,
+                                 motor_graficos=motor_graficos,
+                                 max_filas_detalle=max_filas_detalle)
+    with open(ruta_salida, 'wb') as f:
+        f.write(buffer.getvalue())
+    return ruta_salida, len(df)
+
+
+def comando_informe(args):
+    """Genera uno o varios informes PDF para el rango de fechas pedido"""
+    if args.periodo:
+        inicio, fin = _rango_periodo(args.periodo, args.hasta)
+    elif args.desde and args.hasta:
+        inicio, fin = args.desde, args.hasta
+    else:
+        print("Indica --periodo o bien --desde y --hasta")
+        return 2
+
+    # Los meses del rango que ya se archivaron se leen del archivo frío
+    df = TicketStore(args.almacen).to_dataframe(inicio, fin)
+    if df.empty:
+        print(f"No hay tickets entre {inicio} y {fin}")
+        return 1
+
+    # Un solo informe o uno por grupo (área o equipo)
+    if args.por:
+        columna = AGRUPACIONES[args.por]
+        os.makedirs(args.salida, exist_ok=True)
+        lotes = [(grupo, df_grupo) for grupo, df_grupo in df.groupby(columna, observed=True)]
+        destinos = [os.path.join(args.salida, _nombre_archivo(grupo, inicio, fin)) for grupo, _ in lotes]
+    else:
+        lotes = [('todos', df)]
+        if os.path.isdir(args.salida) or args.salida.endswith(os.sep):
+            os.makedirs(args.salida, exist_ok=True)
+            destinos = [os.path.join(args.salida, _nombre_archivo('todos', inicio, fin))]
+        else:
+            destinos = [args.salida]
+
+    motor = MOTOR_PLOTLY if args.plotly else MOTOR_VECTORIAL
+    max_filas = args.max_filas or None
+
+    # reportlab es Python puro: para varios informes se usan procesos, no hilos
+    with ProcessPoolExecutor(max_workers=min(args.procesos, len(lotes))) as pool:
+        futuros = [
+            pool.submit(_generar_un_informe, df_lote, args.graficos, inicio, fin, destino, motor, max_filas)
+            for (_, df_lote), destino in zip(lotes, destinos)
+        ]
+        errores = 0
+        for futuro in futuros:
+            try:
+                ruta, cantidad = futuro.result()
+                print(f"✓ {ruta} ({cantidad} tickets)")
+            except Exception as e:
+                errores += 1
+                print(f"✗ Error al generar informe: {e}")
+
+    return 1 if errores else 0
+
+
+def comando_analizar_reglas(args):
+    """Muestra las reglas que nunca se aplican y las palabras clave que sobran; opcionalmente las poda"""
+    manager = RulesManager(args.reglas)
+    analisis = analyze_rules(manager.get_all_rules())
+
+    print(f"Reglas activas: {analisis['total_reglas']} | Palabras clave: {analisis['total_palabras']} "
+          f"| Efectivas: {analisis['palabras_efectivas']}")
+
+    print(f"\nReglas sombreadas (nunca se aplican): {len(analisis['sombreadas'])}")
+    for sombreada in analisis['sombreadas']:
+        print(f"  ✗ [{sombreada['origen']}] {sombreada['id_regla']} {sombreada['nombre']}"
+              f" -> la tapan {', '.join(sombreada['ganadoras'])}")
+
+    print(f"\nPalabras clave muertas: {len(analisis['palabras_muertas'])}")
+    for muerta in analisis['palabras_muertas']:
+        print(f"  - [{muerta['origen']}] {muerta['id_regla']} '{muerta['palabra']}'"
+              f" -> gana '{muerta['palabra_ganadora']}' de {muerta['id_ganadora']}")
+
+    print(f"\nPalabras clave repetidas en varias reglas: {len(analisis['duplicadas'])}")
+    for duplicada in analisis['duplicadas']:
+        print(f"  = '{duplicada['palabra']}': {', '.join(duplicada['reglas'])}")
+
+    if not args.podar:
+        podables = sum(1 for m in analisis['palabras_muertas'] if m['origen'] == ORIGEN_PERSONALIZADA)
+        if podables:
+            print(f"\n{podables} palabras clave de reglas personalizadas se pueden podar con --podar")
+        return 0
+
+    antes = copy.deepcopy(manager.get_all_rules())
+    resultado = prune_rules(manager, desactivar=args.desactivar)
+    if resultado is None:
+        return 1
+    accion = "desactivadas" if args.desactivar else "eliminadas"
+    print(f"\n✓ Reglas {accion}: {resultado['reglas']} | Palabras clave quitadas: {resultado['palabras']}")
+
+    # Solo se reclasifican los tickets guardados que la poda pudo cambiar
+    reclasificacion = reclassify_after_edit(TicketStore(args.almacen), antes, manager.get_all_rules())
+    if reclasificacion is None:
+        return 1
+    print(f"✓ {args.almacen}: {reclasificacion['candidatos']} tickets revisados | "
+          f"Reclasificados: {reclasificacion['reclasificados']} ({reclasificacion['segundos']:.2f} s)")
+    return 0
+
+
+def comando_entrenar_modelo(args):
+    """Entrena el modelo estadístico con los tickets que clasificó una regla (solo los nuevos, salvo --desde-cero)"""
+    store = TicketStore(args.almacen)
+    modelo = None if args.desde_cero else FallbackClassifier.load(args.salida)
+    if modelo is None or modelo.secuencia > store.secuencia or \
+            (modelo.generacion is None and modelo.vistos > len(store.get_all_tickets())):
+        # Sin modelo previo, o el almacén se reescribió: entrenar con todo (también lo archivado)
+        modelo = FallbackClassifier()
+
+    usados, revisados = modelo.fit_store(store)
+    if not len(modelo):
+        print("No hay tickets clasificados por reglas para entrenar")
+        return 1
+    if not modelo.save(args.salida):
+        return 1
+    print(f"✓ {args.salida}: {usados} tickets nuevos de {revisados} "
+          f"| Total: {len(modelo)} tickets, {len(modelo.clases)} clases")
+    return 0
+
+
+def comando_minar_palabras(args):
+    """Propone palabras clave a partir de los tickets sin clasificar; opcionalmente las carga como reglas inactivas"""
+    manager = RulesManager(args.reglas)
+    candidatas, contados = mine_keywords(TicketStore(args.almacen).get_all_tickets(), manager.get_all_rules(),
+                                         top=args.top, min_tickets=args.min_tickets)
+    print(f"Tickets sin clasificar: {contados} | Palabras clave candidatas: {len(candidatas)}")
+    if not candidatas:
+        return 0
+
+    propuestas = propose_rules(candidatas, get_fallback_model())
+    for candidata, propuesta in zip(candidatas, propuestas):
+        confianza = f" ({propuesta['confianza']:.0%})" if propuesta['confianza'] is not None else ""
+        print(f"  {candidata['tickets']:6d} tickets | solapamiento {candidata['solapamiento']:.0%} "
+              f"| '{candidata['palabra']}' -> {propuesta['tipo']} / {propuesta['prioridad']} "
+              f"/ {propuesta['asignado_a']}{confianza}")
+
+    if not args.cargar:
+        print("\nLas propuestas se agregan como reglas inactivas con --cargar")
+        return 0
+    cargadas = load_proposals(manager, propuestas)
+    if cargadas is None:
+        return 1
+    print(f"\n✓ Reglas propuestas agregadas (inactivas): {cargadas}")
+    return 0
+
+
+def comando_deduplicar(args):
+    """Deja un solo registro por id_ticket en el almacén (el último procesado)"""
+    store = TicketStore(args.almacen)
+    total = len(store.get_all_tickets())
+    eliminados = store.compact_duplicates()
+    if eliminados is None:
+        return 1
+    print(f"✓ {args.almacen}: {eliminados} registros repetidos eliminados | Quedan {total - eliminados} tickets")
+    return 0
+
+
+def _megabytes(cantidad):
+    return f"{cantidad / 1e6:.2f} MB"
+
+
+def comando_archivar(args):
+    """Pasa los tickets de los meses viejos al archivo comprimido y reporta el ahorro"""
+    store = TicketStore(args.almacen)
+    resumen = store.archive_old(args.meses, formato=args.formato)
+    if resumen is None:
+        return 1
+    # Los bloques que quedaron sin usar al reemplazar tickets archivados se descartan
+    liberados = store.get_archive().compact()
+    if liberados is None:
+        return 1
+    if liberados:
+        print(f"✓ Archivo compactado: -{_megabytes(liberados)} de bloques reemplazados")
+    if not resumen['tickets']:
+        print(f"No hay tickets de más de {args.meses} meses para archivar")
+        return 0
+    print(f"✓ Archivados {resumen['tickets']} tickets de {len(resumen['meses'])} meses "
+          f"({resumen['meses'][0]} a {resumen['meses'][-1]}) con {args.formato}")
+    print(f"  Almacén: {_megabytes(resumen['bytes_antes'])} -> {_megabytes(resumen['bytes_despues'])} "
+          f"| Archivo: +{_megabytes(resumen['bytes_archivo'])} (compresión x{resumen['compresion']})")
+    print(f"  Ahorro: {_megabytes(resumen['bytes_ahorrados'])} "
+          f"({resumen['bytes_ahorrados'] / resumen['bytes_antes']:.0%}) "
+          f"| Velocidad: {resumen['tickets_por_segundo']} tickets/s")
+    return 0
+
+
+def comando_buscar(args):
+    """Busca tickets por texto con filtros de fecha, prioridad y tipo"""
+    indice = get_search_index(args.almacen)
+    tickets = TicketStore(args.almacen).get_all_tickets()
+    inicio = time.perf_counter()
+    resultado = indice.search(args.consulta, desde=args.desde, hasta=args.hasta,
+                              prioridad=args.prioridad, tipo=args.tipo, limite=args.limite)
+    milisegundos = (time.perf_counter() - inicio) * 1000
+
+    print(f"Tickets encontrados: {resultado['total']} ({milisegundos:.1f} ms)")
+    for posicion in resultado['posiciones']:
+        ticket = tickets[posicion]
+        print(f"  {ticket.get('id_ticket', 'N/A')} | {ticket.get('fecha', 'N/A')} | {ticket.get('prioridad', 'N/A'):5} "
+              f"| {ticket.get('tipo', 'N/A')} | {str(ticket.get('contenido', ''))[:80]}")
+    if resultado['total'] > len(resultado['posiciones']):
+        print(f"  ... y {resultado['total'] - len(resultado['posiciones'])} más (--limite)")
+    return 0
+
+
+def crear_parser():
+    """Construye el parser de argumentos con todos los subcomandos"""
+    parser = argparse.ArgumentParser(description="Sistema Experto de Service Desk - línea de comandos")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    informe = subparsers.add_parser('informe', help="Genera informes ejecutivos en PDF")
+    informe.add_argument('--desde', type=_fecha, help="Fecha inicial AAAA-MM-DD")
+    informe.add_argument('--hasta', type=_fecha, help="Fecha final AAAA-MM-DD (también fin del periodo)")
+    informe.add_argument('--periodo', choices=['diario', 'semanal'], help="Rango predefinido que termina ayer")
+    informe.add_argument('--graficos', nargs='*', default=['Tipo', 'Prioridad'],
+                         help="Gráficos a incluir: Tipo Prioridad Área Cliente 'Asignado a' Regla")
+    informe.add_argument('--salida', default='.', help="Archivo PDF o carpeta de destino")
+    informe.add_argument('--por', choices=sorted(AGRUPACIONES), help="Genera un informe por área o por equipo")
+    informe.add_argument('--procesos', type=_positivo, default=os.cpu_count() or 1, help="Informes en paralelo")
+    informe.add_argument('--max-filas', type=int, default=1000, help="Tope de la tabla de detalle (0 = todos)")
+    informe.add_argument('--plotly', action='store_true', help="Usar gráficos PNG de plotly (necesita kaleido)")
+    informe.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    informe.set_defaults(funcion=comando_informe)
+
+    analizar = subparsers.add_parser('analizar-reglas', help="Detecta reglas sombreadas y palabras clave que sobran")
+    analizar.add_argument('--podar', action='store_true', help="Elimina lo que nunca se aplica (solo reglas personalizadas)")
+    analizar.add_argument('--desactivar', action='store_true', help="Al podar, desactiva las reglas sombreadas en vez de eliminarlas")
+    analizar.add_argument('--reglas', default='knowledge/rules_data.json', help="Archivo de reglas personalizadas")
+    analizar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets a reclasificar al podar")
+    analizar.set_defaults(funcion=comando_analizar_reglas)
+
+    entrenar = subparsers.add_parser('entrenar-modelo', help="Entrena el modelo para los tickets que no coinciden con reglas")
+    entrenar.add_argument('--desde-cero', action='store_true', help="Descarta el modelo guardado y usa todo el historial")
+    entrenar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    entrenar.add_argument('--salida', default=ARCHIVO_MODELO, help="Archivo del modelo")
+    entrenar.set_defaults(funcion=comando_entrenar_modelo)
+
+    minar = subparsers.add_parser('minar-palabras', help="Propone palabras clave con los tickets sin clasificar")
+    minar.add_argument('--top', type=int, default=20, help="Cantidad de propuestas")
+    minar.add_argument('--min-tickets', type=int, default=MIN_TICKETS, help="Tickets mínimos por palabra clave")
+    minar.add_argument('--cargar', action='store_true', help="Agrega las propuestas como reglas inactivas")
+    minar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    minar.add_argument('--reglas', default='knowledge/rules_data.json', help="Archivo de reglas personalizadas")
+    minar.set_defaults(funcion=comando_minar_palabras)
+
+    deduplicar = subparsers.add_parser('deduplicar', help="Elimina los registros repetidos de un mismo id_ticket")
+    deduplicar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    deduplicar.set_defaults(funcion=comando_deduplicar)
+
+    archivar = subparsers.add_parser('archivar', help="Comprime los tickets de los meses viejos en el archivo frío")
+    archivar.add_argument('--meses', type=int, default=12, help="Meses que quedan en el almacén además del actual")
+    archivar.add_argument('--formato', choices=sorted(FORMATOS), default=FORMATO_PREDETERMINADO,
+                          help="Compresión de los bloques")
+    archivar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    archivar.set_defaults(funcion=comando_archivar)
+
+    buscar = subparsers.add_parser('buscar', help="Busca tickets por texto (AND, OR, -excluir, \"frases\", prefijos*)")
+    buscar.add_argument('consulta', nargs='?', default='', help="Consulta; vacía = todos los que cumplen los filtros")
+    buscar.add_argument('--desde', type=_fecha, help="Fecha inicial AAAA-MM-DD")
+    buscar.add_argument('--hasta', type=_fecha, help="Fecha final AAAA-MM-DD")
+    buscar.add_argument('--prioridad', nargs='*', help="Prioridades a incluir")
+    buscar.add_argument('--tipo', nargs='*', help="Tipos a incluir")
+    buscar.add_argument('--limite', type=int, default=20, help="Tickets que se muestran (los más nuevos)")
+    buscar.add_argument('--almacen', default='knowledge/facts_storage.json', help="Archivo de tickets procesados")
+    buscar.set_defaults(funcion=comando_buscar)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# engine/aggregation.py
+# Conteos de estadísticas en una sola llamada sobre columnas categóricas
+# Lo usan la página de estadísticas y el informe PDF
+
+import numpy as np
+import pandas as pd
+
+
+def _codigos(serie):
+    """
+    Retorna los códigos enteros y las categorías de una columna.
+    Si la columna ya es categórica se reutilizan sus códigos (no se copia nada).
+    Los valores nulos quedan con código -1.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    codigos, categorias = pd.factorize(serie, sort=False)
+    return codigos, pd.Index(categorias)
+
+
+def _contar(codigos, num_categorias):
+    """Cuenta los códigos válidos con np.bincount (los nulos -1 se descartan)"""
+    validos = codigos[codigos >= 0]
+    return np.bincount(validos, minlength=num_categorias)
+
+
+def count_dimensions(df, dimensiones, cruces=None):
+    """
+    Calcula los conteos de varias dimensiones (y cruces opcionales) en una sola llamada.
+    Cada columna se convierte una vez a códigos enteros y se cuenta con np.bincount,
+    sin bucles de Python por ticket ni un groupby distinto por gráfico.
+
+    Args:
+        df: DataFrame de tickets (idealmente con columnas categóricas)
+        dimensiones: Lista de columnas a contar, por ejemplo ['tipo', 'prioridad']
+        cruces: Lista opcional de pares de columnas, por ejemplo [('area', 'prioridad')]
+
+    Returns:
+        Diccionario {columna: Series} con los conteos ordenados de mayor a menor,
+        y {(columna_a, columna_b): DataFrame} con la tabla cruzada de cada par
+    """
+    cruces = [tuple(par) for par in (cruces or [])]
+    columnas = list(dict.fromkeys(list(dimensiones) + [c for par in cruces for c in par]))
+
+    codigos = {}
+    categorias = {}
+    for columna in columnas:
+        codigos[columna], categorias[columna] = _codigos(df[columna])
+
+    resultado = {}
+    for columna in dimensiones:
+        conteos = _contar(codigos[columna], len(categorias[columna]))
+        serie = pd.Series(conteos, index=categorias[columna], name='Cantidad')
+        serie.index.name = columna
+        resultado[columna] = serie[serie > 0].sort_values(ascending=False, kind='stable')
+
+    for columna_a, columna_b in cruces:
+        codigos_a, codigos_b = codigos[columna_a], codigos[columna_b]
+        num_a, num_b = len(categorias[columna_a]), len(categorias[columna_b])
+
+        # Cada par (a, b) se codifica como un solo entero a * num_b + b
+        validos = (codigos_a >= 0) & (codigos_b >= 0)
+        combinados = codigos_a[validos].astype(np.int64) * num_b + codigos_b[validos]
+        matriz = np.bincount(combinados, minlength=num_a * num_b).reshape(num_a, num_b)
+
+        tabla = pd.DataFrame(matriz, index=categorias[columna_a], columns=categorias[columna_b])
+        tabla.index.name, tabla.columns.name = columna_a, columna_b
+        resultado[(columna_a, columna_b)] = tabla.loc[tabla.sum(axis=1) > 0, tabla.sum(axis=0) > 0]
+
+    return resultado
+
+
+def to_frame(conteo, columna):
+    """
+    Convierte los conteos de una dimensión al formato [columna, 'Cantidad'] que usan los gráficos.
+
+    Args:
+        conteo: Series retornada por count_dimensions
+        columna: Nombre de la columna de etiquetas
+
+    Returns:
+        DataFrame con las columnas columna y 'Cantidad'
+    """
+    frame = conteo.rename_axis(columna).reset_index(name='Cantidad')
+    frame[columna] = frame[columna].astype(object)
+    return frame
@@ -1,10 +1,15 @@
 # engine/areas_manager.py
 # Gestor de áreas de la empresa
 
+import copy
 import json
 import os
+import threading
 from datetime import datetime
 
+from engine.file_utils import escritura_atomica
+from engine.text_utils import plegar
+
 class AreasManager:
     """
     Clase para gestionar las áreas de la empresa.
@@ -20,36 +25,117 @@ class AreasManager:
         """
         self.areas_file = areas_file
         self.areas = []
+        self._por_id = {}  # id_area -> área
+        self._por_nombre = {}  # nombre plegado (sin mayúsculas ni tildes) -> área
+        self._max_num = 0  # Número más alto de los IDs 'Annn' (para generar el siguiente)
+        self._firma = None  # (mtime_ns, tamaño) del archivo tras la última carga o guardado
+        self._suscriptores = []  # Funciones que reciben el catálogo después de cada guardado
+        # El gestor compartido lo usan a la vez todas las sesiones de la interfaz: cargas, guardados y
+        # lotes de cambios (con su respaldo) se hacen con el candado tomado
+        self._lock = threading.RLock()
         self.load_areas()
-    
+
+    def _ruta(self):
+        """Ruta absoluta del archivo de áreas"""
+        return os.path.join(os.path.dirname(__file__), '..', self.areas_file)
+
+    def _firma_archivo(self):
+        """Firma del archivo de áreas para detectar cambios hechos por otro proceso"""
+        try:
+            estado = os.stat(self._ruta())
+            return (estado.st_mtime_ns, estado.st_size)
+        except OSError:
+            return None
+
+    def _reindexar(self):
+        """Reconstruye los índices por ID y por nombre y el contador de IDs"""
+        self._por_id = {area.get('id_area'): area for area in self.areas}
+        self._por_nombre = {plegar(area.get('nombre')): area for area in self.areas}
+        self._max_num = 0
+        for id_area in self._por_id:
+            self._registrar_id(id_area)
+
+    def _registrar_id(self, id_area):
+        """Actualiza el número más alto si el ID tiene la forma 'Annn'"""
+        if isinstance(id_area, str) and id_area.startswith('A') and id_area[1:].isdigit():
+            self._max_num = max(self._max_num, int(id_area[1:]))
+
+    def subscribe(self, callback):
+        """
+        Registra una función que recibe el catálogo (lista de áreas) después de cada guardado o recarga.
+
+        Args:
+            callback: Función que recibe la lista de áreas
+        """
+        self._suscriptores.append(callback)
+
+    def unsubscribe(self, callback):
+        """Deja de enviar el catálogo a la función"""
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _notificar(self):
+        """Envía el catálogo actual a los suscriptores"""
+        for callback in list(self._suscriptores):
+            try:
+                callback(self.areas)
+            except Exception as e:
+                print(f"Error al notificar cambio de áreas: {e}")
+
     def load_areas(self):
         """Carga las áreas desde el archivo JSON"""
-        try:
-            ruta = os.path.join(os.path.dirname(__file__), '..', self.areas_file)
-            with open(ruta, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.areas = data.get('areas', [])
-            return True
-        except FileNotFoundError:
-            print(f"Archivo {self.areas_file} no encontrado. Creando uno nuevo...")
-            self.areas = []
-            self.save_areas()
-            return False
-        except Exception as e:
-            print(f"Error al cargar áreas: {e}")
-            return False
+        with self._lock:
+            try:
+                ruta = self._ruta()
+                firma = self._firma_archivo()
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.areas = data.get('areas', [])
+                self._reindexar()
+                self._firma = firma
+                self._notificar()
+                return True
+            except FileNotFoundError:
+                print(f"Archivo {self.areas_file} no encontrado. Creando uno nuevo...")
+                self.areas = []
+                self._reindexar()
+                self.save_areas()
+                return False
+            except Exception as e:
+                print(f"Error al cargar áreas: {e}")
+                return False
     
+    def reload_if_changed(self):
+        """
+        Recarga las áreas si el archivo cambió desde la última carga o guardado
+        (por ejemplo, editado por otro proceso).
+
+        Returns:
+            True si se recargaron, False si no hubo cambios
+        """
+        with self._lock:
+            if self._firma_archivo() == self._firma:
+                return False
+            return self.load_areas()
+
     def save_areas(self):
-        """Guarda las áreas en el archivo JSON"""
-        try:
-            ruta = os.path.join(os.path.dirname(__file__), '..', self.areas_file)
-            data = {'areas': self.areas}
-            with open(ruta, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error al guardar áreas: {e}")
-            return False
+        """
+        Guarda las áreas en el archivo JSON.
+        Se escribe un archivo temporal y se reemplaza el original en un solo paso,
+        así un error a mitad de escritura nunca deja el archivo de áreas corrupto.
+        """
+        with self._lock:
+            try:
+                ruta = self._ruta()
+                data = {'areas': self.areas}
+                with escritura_atomica(ruta) as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                self._firma = self._firma_archivo()
+                self._notificar()
+                return True
+            except Exception as e:
+                print(f"Error al guardar áreas: {e}")
+                return False
     
     def get_all_areas(self):
         """Retorna todas las áreas"""
@@ -69,14 +155,11 @@ class AreasManager:
         Returns:
             El área si se encuentra, None en caso contrario
         """
-        for area in self.areas:
-            if area.get('id_area') == id_area:
-                return area
-        return None
+        return self._por_id.get(id_area)
     
     def get_area_by_name(self, nombre):
         """
-        Busca un área por su nombre.
+        Busca un área por su nombre, sin distinguir mayúsculas ni tildes.
         
         Args:
             nombre: Nombre del área a buscar
@@ -84,10 +167,80 @@ class AreasManager:
         Returns:
             El área si se encuentra, None en caso contrario
         """
-        for area in self.areas:
-            if area.get('nombre').lower() == nombre.lower():
-                return area
-        return None
+        return self._por_nombre.get(plegar(nombre))
+
+    def _agregar(self, nombre, descripcion=""):
+        """
+        Agrega un área en memoria (sin guardar).
+
+        Returns:
+            El área nueva, o None si el nombre está vacío o ya existe
+        """
+        if not plegar(nombre):
+            print("El nombre del área está vacío")
+            return None
+        if self.get_area_by_name(nombre):
+            print(f"El área '{nombre}' ya existe")
+            return None
+
+        self._max_num += 1
+        nueva_area = {
+            'id_area': f"A{self._max_num:03d}",
+            'nombre': nombre,
+            'descripcion': descripcion,
+            'fecha_creacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.areas.append(nueva_area)
+        self._por_id[nueva_area['id_area']] = nueva_area
+        self._por_nombre[plegar(nombre)] = nueva_area
+        return nueva_area
+
+    def _actualizar(self, id_area, nombre=None, descripcion=None):
+        """
+        Actualiza un área en memoria (sin guardar).
+
+        Returns:
+            True si se actualizó, False si no existe o el nombre nuevo ya está en uso
+        """
+        area = self.get_area_by_id(id_area)
+        if not area:
+            print(f"Área {id_area} no encontrada")
+            return False
+
+        if nombre is not None:
+            # Verificar que el nuevo nombre no exista ya
+            area_existente = self.get_area_by_name(nombre)
+            if area_existente and area_existente['id_area'] != id_area:
+                print(f"Ya existe un área con el nombre '{nombre}'")
+                return False
+            if not plegar(nombre):
+                print("El nombre del área está vacío")
+                return False
+            self._por_nombre.pop(plegar(area.get('nombre')), None)
+            area['nombre'] = nombre
+            self._por_nombre[plegar(nombre)] = area
+
+        if descripcion is not None:
+            area['descripcion'] = descripcion
+
+        area['fecha_modificacion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return True
+
+    def _en_lote(self, cambios):
+        """
+        Aplica una función de cambios en memoria y guarda una sola vez.
+        Si algún cambio falla o no se puede guardar, se restauran las áreas anteriores.
+        """
+        with self._lock:
+            respaldo = copy.deepcopy(self.areas)
+            try:
+                if cambios() and self.save_areas():
+                    return True
+            except Exception as e:
+                print(f"Error al modificar áreas: {e}")
+            self.areas = respaldo
+            self._reindexar()
+            return False
     
     def add_area(self, nombre, descripcion=""):
         """
@@ -101,38 +254,25 @@ class AreasManager:
             True si se agregó exitosamente, False en caso contrario
         """
         try:
-            # Verificar si ya existe
-            if self.get_area_by_name(nombre):
-                print(f"El área '{nombre}' ya existe")
-                return False
-            
-            # Generar ID único
-            if self.areas:
-                # Obtener el número más alto de las áreas existentes
-                ids_existentes = [int(a['id_area'][1:]) for a in self.areas if a['id_area'].startswith('A')]
-                nuevo_num = max(ids_existentes) + 1 if ids_existentes else 1
-            else:
-                nuevo_num = 1
-            
-            nuevo_id = f"A{nuevo_num:03d}"
-            
-            # Crear el nuevo área
-            nueva_area = {
-                'id_area': nuevo_id,
-                'nombre': nombre,
-                'descripcion': descripcion,
-                'fecha_creacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            # Agregar a la lista
-            self.areas.append(nueva_area)
-            
-            # Guardar en archivo
-            return self.save_areas()
+            return self._en_lote(lambda: self._agregar(nombre, descripcion) is not None)
         
         except Exception as e:
             print(f"Error al agregar área: {e}")
             return False
+
+    def add_areas(self, areas):
+        """
+        Agrega varias áreas con una sola escritura del archivo.
+        Si alguna no se puede agregar (nombre repetido o vacío), no se agrega ninguna.
+
+        Args:
+            areas: Lista de diccionarios con 'nombre' y 'descripcion' (opcional)
+
+        Returns:
+            True si se agregaron todas, False en caso contrario
+        """
+        return self._en_lote(lambda: all(self._agregar(area.get('nombre'), area.get('descripcion', ""))
+                                         for area in areas))
     
     def update_area(self, id_area, nombre=None, descripcion=None):
         """
@@ -147,30 +287,26 @@ class AreasManager:
             True si se actualizó exitosamente, False en caso contrario
         """
         try:
-            area = self.get_area_by_id(id_area)
-            if not area:
-                print(f"Área {id_area} no encontrada")
-                return False
-            
-            # Actualizar campos proporcionados
-            if nombre is not None:
-                # Verificar que el nuevo nombre no exista ya
-                area_existente = self.get_area_by_name(nombre)
-                if area_existente and area_existente['id_area'] != id_area:
-                    print(f"Ya existe un área con el nombre '{nombre}'")
-                    return False
-                area['nombre'] = nombre
-            
-            if descripcion is not None:
-                area['descripcion'] = descripcion
-            
-            area['fecha_modificacion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            return self.save_areas()
+            return self._en_lote(lambda: self._actualizar(id_area, nombre, descripcion))
         
         except Exception as e:
             print(f"Error al actualizar área: {e}")
             return False
+
+    def update_areas(self, cambios):
+        """
+        Actualiza varias áreas con una sola escritura del archivo.
+        Si algún cambio falla, no se aplica ninguno.
+
+        Args:
+            cambios: Lista de diccionarios con 'id_area' y, opcionalmente, 'nombre' y 'descripcion'
+
+        Returns:
+            True si se aplicaron todos, False en caso contrario
+        """
+        return self._en_lote(lambda: all(self._actualizar(cambio.get('id_area'), cambio.get('nombre'),
+                                                          cambio.get('descripcion'))
+                                         for cambio in cambios))
     
     def delete_area(self, id_area):
         """
@@ -183,13 +319,16 @@ class AreasManager:
             True si se eliminó exitosamente, False en caso contrario
         """
         try:
-            area = self.get_area_by_id(id_area)
-            if not area:
-                print(f"Área {id_area} no encontrada")
-                return False
-            
-            self.areas.remove(area)
-            return self.save_areas()
+            def quitar():
+                area = self._por_id.get(id_area)
+                if not area:
+                    print(f"Área {id_area} no encontrada")
+                    return False
+                self.areas.remove(area)
+                self._reindexar()
+                return True
+
+            return self._en_lote(quitar)
         
         except Exception as e:
             print(f"Error al eliminar área: {e}")
@@ -206,3 +345,28 @@ class AreasManager:
             'total': len(self.areas),
             'nombres': self.get_areas_names()
         }
+
+
+# Gestores compartidos por archivo (los usan la interfaz, el motor y la simulación)
+_gestores = {}
+_lock_gestores = threading.Lock()
+
+
+def get_areas_manager(areas_file='knowledge/areas_empresa.json'):
+    """
+    Retorna el gestor de áreas compartido del archivo.
+    El catálogo se lee una vez por proceso; solo se vuelve a leer si el archivo cambió por fuera.
+
+    Args:
+        areas_file: Ruta al archivo JSON de áreas
+
+    Returns:
+        Instancia de AreasManager
+    """
+    with _lock_gestores:
+        manager = _gestores.get(areas_file)
+        if manager is None:
+            manager = _gestores[areas_file] = AreasManager(areas_file)
+            return manager
+    manager.reload_if_changed()
+    return manager
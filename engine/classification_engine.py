@@ -7,10 +7,307 @@ import collections.abc
 collections.Mapping = collections.abc.Mapping
 collections.MutableMapping = collections.abc.MutableMapping
 
+import hashlib
+import json
+import time
+
 from experta import KnowledgeEngine, Rule
 from engine.ticket_fact import Ticket
-import json
-import os
+from engine.matcher import RuleMatcher
+from engine.rules_manager import get_rules_manager
+from engine.areas_manager import get_areas_manager
+from engine.metrics import get_metrics
+from engine.fallback_model import REGLA_MODELO, get_fallback_model
+from engine.similar_index import K_SIMILARES
+from engine.ticket_store import get_similar_index
+
+# Reglas base del sistema, en orden de evaluación (se usan si no coincide ninguna personalizada)
+REGLAS_BASE = [
+    # Regla: Seguridad informática - Malware / Phishing (Prioridad Alta)
+    {
+        'id_regla': 'BASE-01',
+        'nombre': 'Incidente de Seguridad',
+        'palabras_clave': ['virus', 'malware', 'ransomware', 'phishing', 'phising', 'adjunto sospechoso', 'suplantación'],
+        'tipo': 'SEGURIDAD',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Seguridad'
+    },
+    # Regla: Pérdida de datos / Recuperación (Prioridad Alta)
+    {
+        'id_regla': 'BASE-02',
+        'nombre': 'Recuperación de Datos',
+        'palabras_clave': ['perdí', 'perdida', 'archivo eliminado', 'no encuentro', 'restaurar', 'recuperar', 'backup perdido', 'datos borrados'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: ERP / Finanzas / Contabilidad (Prioridad Alta)
+    {
+        'id_regla': 'BASE-03',
+        'nombre': 'Sistema ERP/Finanzas',
+        'palabras_clave': ['erp', 'contabilidad', 'facturación', 'finanzas', 'nomina', 'siga', 'siaf', 'sistema contable'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: VPN / Acceso remoto (Prioridad Alta)
+    {
+        'id_regla': 'BASE-04',
+        'nombre': 'Acceso Remoto / VPN',
+        'palabras_clave': ['vpn', 'acceso remoto', 'escritorio remoto', 'teamviewer', 'conexión remota', 'remote desktop'],
+        'tipo': 'REDES',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Redes'
+    },
+    # Regla: Equipo no enciende - Prioridad Alta
+    {
+        'id_regla': 'BASE-05',
+        'nombre': 'Equipo No Enciende',
+        'palabras_clave': ['no enciende', 'no prende', 'pantalla negra', 'no inicia'],
+        'tipo': 'HARDWARE',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Hardware'
+    },
+    # Regla: Problemas de red - Prioridad Alta
+    {
+        'id_regla': 'BASE-06',
+        'nombre': 'Problema de Red',
+        'palabras_clave': ['red', 'internet', 'wifi', 'conexion', 'dominio'],
+        'tipo': 'REDES',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Redes'
+    },
+    # Regla: Problemas con sistemas corporativos - Prioridad Alta
+    {
+        'id_regla': 'BASE-07',
+        'nombre': 'Problema de Sistema Corporativo',
+        'palabras_clave': ['siga', 'siaf', 'sgd', 'sisper', 'sistema', 'intranet'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Alta',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: Periféricos (mouse, teclado, monitor, webcam) - Prioridad Media
+    {
+        'id_regla': 'BASE-08',
+        'nombre': 'Problema de Periféricos',
+        'palabras_clave': ['mouse', 'ratón', 'teclado', 'monitor', 'pantalla', 'webcam', 'microfono', 'altavoz', 'parlante'],
+        'tipo': 'HARDWARE',
+        'prioridad': 'Media',
+        'asignado_a': 'Equipo de Hardware'
+    },
+    # Regla: Equipo lento - Prioridad Media
+    {
+        'id_regla': 'BASE-09',
+        'nombre': 'Equipo Lento',
+        'palabras_clave': ['lento', 'lenta', 'lentos', 'lentas', 'demora', 'tarda', 'rendimiento', 'optimizar'],
+        'tipo': 'HARDWARE',
+        'prioridad': 'Media',
+        'asignado_a': 'Equipo de Hardware'
+    },
+    # Regla: Problemas con impresoras - Prioridad Media
+    {
+        'id_regla': 'BASE-10',
+        'nombre': 'Problema de Impresora',
+        'palabras_clave': ['impresora', 'toner', 'impresion', 'escaner', 'atasco'],
+        'tipo': 'HARDWARE',
+        'prioridad': 'Media',
+        'asignado_a': 'Equipo de Hardware'
+    },
+    # Regla: Problemas de contraseña - Prioridad Media
+    {
+        'id_regla': 'BASE-11',
+        'nombre': 'Problema de Contraseña',
+        'palabras_clave': ['contraseña', 'password', 'bloqueada', 'expirada', 'restablecimiento'],
+        'tipo': 'SEGURIDAD',
+        'prioridad': 'Media',
+        'asignado_a': 'Equipo de Seguridad'
+    },
+    # Regla: Correo corporativo - Prioridad Media
+    {
+        'id_regla': 'BASE-12',
+        'nombre': 'Problema de Correo',
+        'palabras_clave': ['correo', 'email', 'gmail', 'outlook', 'corporativo'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Media',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: Asesoría general - Prioridad Baja
+    {
+        'id_regla': 'BASE-13',
+        'nombre': 'Asesoría General',
+        'palabras_clave': ['asesoria', 'ayuda', 'como', 'consulta', 'duda'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Baja',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: Habilitaciones y configuraciones - Prioridad Baja
+    {
+        'id_regla': 'BASE-14',
+        'nombre': 'Habilitación/Configuración',
+        'palabras_clave': ['habilitar', 'configurar', 'activar', 'crear', 'backup'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Baja',
+        'asignado_a': 'Equipo de Software'
+    },
+    # Regla: Instalación de software - Prioridad Baja
+    {
+        'id_regla': 'BASE-15',
+        'nombre': 'Instalación de Software',
+        'palabras_clave': ['instalacion', 'instalar', 'software', 'programa', 'aplicacion'],
+        'tipo': 'SOFTWARE',
+        'prioridad': 'Baja',
+        'asignado_a': 'Equipo de Software'
+    }
+]
+
+# Índice de las reglas base (no cambian mientras corre la aplicación)
+MATCHER_BASE = RuleMatcher(REGLAS_BASE)
+
+# Índice de las reglas personalizadas, se mantiene con los eventos del gestor de reglas
+_matcher_personalizado = None
+
+
+def obtener_matcher():
+    """
+    Retorna el índice compartido de reglas personalizadas.
+    La primera vez se compila desde el gestor de reglas y se suscribe a sus eventos,
+    así cada alta, edición, activación o baja solo actualiza las palabras de esa regla.
+    Las reglas limitadas a áreas se reparten por ID de área según el catálogo de AreasManager,
+    que también avisa al índice cuando cambia (por ejemplo, al renombrar un área).
+    """
+    global _matcher_personalizado
+    manager = get_rules_manager()
+    if _matcher_personalizado is None:
+        areas_manager = get_areas_manager()
+        _matcher_personalizado = RuleMatcher(manager.get_all_rules(), areas=areas_manager.get_all_areas())
+        manager.subscribe(_matcher_personalizado.aplicar_evento)
+        areas_manager.subscribe(_matcher_personalizado.set_areas)
+    return _matcher_personalizado
+
+
+# Resultados fijos del motor
+RESULTADO_VACIO = {
+    'regla': 'Error: Contenido vacío',
+    'tipo': 'ERROR',
+    'prioridad': 'Baja',
+    'asignado_a': 'Sin asignar'
+}
+RESULTADO_SIN_CLASIFICAR = {
+    'regla': 'Sin clasificar',
+    'tipo': 'SOFTWARE',
+    'prioridad': 'Baja',
+    'asignado_a': 'Equipo de Software'
+}
+
+
+def resultado_regla_personalizada(regla):
+    """Resultado del motor cuando coincide una regla personalizada"""
+    return {
+        'regla': f"Regla Personalizada: {regla['nombre']} ({regla['id_regla']})",
+        'tipo': regla.get('tipo', 'SOFTWARE'),
+        'prioridad': regla.get('prioridad', 'Media'),
+        'asignado_a': regla.get('asignado_a', 'Equipo de Software')
+    }
+
+
+def resultado_regla_base(regla):
+    """Resultado del motor cuando coincide una regla base"""
+    return {
+        'regla': f"Regla: {regla['nombre']}",
+        'tipo': regla['tipo'],
+        'prioridad': regla['prioridad'],
+        'asignado_a': regla['asignado_a']
+    }
+
+
+def resultado_modelo(clase, confianza):
+    """Resultado del motor cuando ninguna regla coincide y decide el modelo estadístico"""
+    tipo, prioridad, asignado_a = clase
+    return {
+        'regla': REGLA_MODELO,
+        'tipo': tipo,
+        'prioridad': prioridad,
+        'asignado_a': asignado_a,
+        'confianza': round(confianza, 3)
+    }
+
+
+def clasificar_contenido(contenido, indice_personalizado, indice_base=None, area=None, modelo=None):
+    """
+    Clasifica un texto: primero reglas personalizadas, luego reglas base, después el modelo
+    estadístico (si hay uno entrenado y está seguro) y por último el fallback.
+    Es la lógica de la regla del motor, separada para reutilizarla sin crear un motor por ticket.
+
+    Args:
+        contenido: Texto del ticket en minúsculas
+        indice_personalizado: RuleMatcher (o CompiledMatcher) con las reglas personalizadas
+        indice_base: Índice de las reglas base (por defecto MATCHER_BASE)
+        area: Área del cliente (para las reglas personalizadas con condición de área)
+        modelo: FallbackClassifier para los tickets sin regla (None: sin modelo)
+
+    Returns:
+        Diccionario con regla, tipo, prioridad y asignado_a
+    """
+    # Verificar que el contenido no esté vacío
+    if not contenido or contenido.isspace():
+        return dict(RESULTADO_VACIO)
+
+    # Primero intentar con reglas personalizadas desde JSON
+    regla = indice_personalizado.match(contenido, area)
+    if regla is not None:
+        return resultado_regla_personalizada(regla)
+
+    # Si no coincide con reglas personalizadas, aplicar las reglas base
+    regla = (indice_base or MATCHER_BASE).match(contenido)
+    if regla is not None:
+        return resultado_regla_base(regla)
+
+    # Si no coincide con ninguna regla, probar con el modelo estadístico
+    if modelo is not None:
+        prediccion = modelo.predict(contenido)
+        if prediccion is not None:
+            return resultado_modelo(*prediccion)
+
+    # Si el modelo tampoco está seguro - Fallback
+    return dict(RESULTADO_SIN_CLASIFICAR)
+
+
+def version_reglas(reglas=None):
+    """
+    Versión de lo que decide la clasificación: reglas personalizadas activas (en orden), reglas base
+    y modelo estadístico. Cambia con cualquier edición que pueda cambiar un resultado; se guarda en
+    cada ticket para saber con qué reglas se clasificó.
+
+    Args:
+        reglas: Reglas personalizadas (por defecto las del gestor compartido)
+
+    Returns:
+        Texto hexadecimal de 12 caracteres
+    """
+    if reglas is None:
+        reglas = get_rules_manager().get_all_rules()
+    modelo = get_fallback_model()
+    datos = [[regla for regla in reglas if regla.get('activa', True)], REGLAS_BASE,
+             None if modelo is None else [modelo.vistos, len(modelo)]]
+    texto = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=6).hexdigest()
+
+
+def buscar_tickets_similares(contenido, k=K_SIMILARES, storage_file='knowledge/facts_storage.json'):
+    """
+    Busca los tickets procesados más parecidos a un texto, para ver cómo se resolvieron.
+
+    Args:
+        contenido: Texto del ticket
+        k: Cantidad de tickets a devolver
+        storage_file: Archivo de tickets procesados
+
+    Returns:
+        Lista de tickets (id, fecha, contenido, tipo, prioridad, asignado_a, regla y similitud),
+        del más parecido al menos
+    """
+    return get_similar_index(storage_file).search(contenido, k)
+
 
 class TicketClassificationEngine(KnowledgeEngine):
     """
@@ -22,19 +319,24 @@ class TicketClassificationEngine(KnowledgeEngine):
     def __init__(self):
         super().__init__()
         self.resultados = []  # Aquí guardamos los resultados de cada ticket
-        self.reglas_personalizadas = self.cargar_reglas_personalizadas()
+        self.indice_reglas = obtener_matcher()  # Índice compartido, no se recarga el JSON por ticket
+        self.modelo = get_fallback_model()  # Modelo para los tickets sin regla (None si no se entrenó)
     
     def cargar_reglas_personalizadas(self):
-        """Carga las reglas personalizadas desde JSON"""
-        try:
-            ruta = os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'rules_data.json')
-            with open(ruta, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Filtrar solo las reglas activas
-                return [r for r in data.get('reglas_personalizadas', []) if r.get('activa', True)]
-        except Exception as e:
-            print(f"Error al cargar reglas personalizadas: {e}")
-            return []
+        """Retorna las reglas personalizadas activas, en orden de evaluación"""
+        return self.indice_reglas.get_active_rules()
+
+    def run(self, steps=float('inf')):
+        """Ejecuta el motor y registra la regla aplicada y la duración de cada clasificación"""
+        inicio = time.perf_counter()
+        previos = len(self.resultados)
+        super().run(steps)
+        nuevos = self.resultados[previos:]
+        if nuevos:
+            segundos = (time.perf_counter() - inicio) / len(nuevos)
+            metricas = get_metrics()
+            for resultado in nuevos:
+                metricas.record(resultado['regla'], segundos)
     
     @Rule(Ticket())
     def clasificar_ticket(self):
@@ -46,192 +348,14 @@ class TicketClassificationEngine(KnowledgeEngine):
         """
         # Buscar el ticket en los facts
         contenido = ""
+        area = None
         for fact in self.facts.values():
             if isinstance(fact, Ticket):
                 contenido = str(fact.get('contenido', '')).lower()
+                area = fact.get('area')
                 break
 
-        # Verificar que el contenido no esté vacío
-        if not contenido or contenido.isspace():
-          self.resultados.append({
-            'regla': 'Error: Contenido vacío',
-            'tipo': 'ERROR',
-            'prioridad': 'Baja',
-            'asignado_a': 'Sin asignar'
-          })
-          return
-        
-        # Primero intentar con reglas personalizadas desde JSON
-        for regla_json in self.reglas_personalizadas:
-            palabras_clave = regla_json.get('palabras_clave', [])
-            if any(palabra.lower() in contenido for palabra in palabras_clave):
-                self.resultados.append({
-                    'regla': f"Regla Personalizada: {regla_json['nombre']} ({regla_json['id_regla']})",
-                    'tipo': regla_json.get('tipo', 'SOFTWARE'),
-                    'prioridad': regla_json.get('prioridad', 'Media'),
-                    'asignado_a': regla_json.get('asignado_a', 'Equipo de Software')
-                })
-                return
-        
-        # Si no coincide con reglas personalizadas, aplicar reglas hardcodeadas
-
-        # Regla: Seguridad informática - Malware / Phishing (Prioridad Alta)
-        if any(palabra in contenido for palabra in ['virus', 'malware', 'ransomware', 'phishing', 'phising', 'adjunto sospechoso', 'suplantación']):
-            self.resultados.append({
-              'regla': 'Regla: Incidente de Seguridad',
-              'tipo': 'SEGURIDAD',
-              'prioridad': 'Alta',
-              'asignado_a': 'Equipo de Seguridad'
-            })
-            return
-
-        # Regla: Pérdida de datos / Recuperación (Prioridad Alta)
-        if any(palabra in contenido for palabra in ['perdí', 'perdida', 'archivo eliminado', 'no encuentro', 'restaurar', 'recuperar', 'backup perdido', 'datos borrados']):
-            self.resultados.append({
-              'regla': 'Regla: Recuperación de Datos',
-              'tipo': 'SOFTWARE',
-              'prioridad': 'Alta',
-              'asignado_a': 'Equipo de Software'
-            })
-            return
-
-        # Regla: ERP / Finanzas / Contabilidad (Prioridad Alta)
-        if any(palabra in contenido for palabra in ['erp', 'contabilidad', 'facturación', 'finanzas', 'nomina', 'siga', 'siaf', 'sistema contable']):
-            self.resultados.append({
-              'regla': 'Regla: Sistema ERP/Finanzas',
-              'tipo': 'SOFTWARE',
-              'prioridad': 'Alta',
-              'asignado_a': 'Equipo de Software'
-            })
-            return
-
-        # Regla: VPN / Acceso remoto (Prioridad Alta)
-        if any(palabra in contenido for palabra in ['vpn', 'acceso remoto', 'escritorio remoto', 'teamviewer', 'conexión remota', 'remote desktop']):
-            self.resultados.append({
-              'regla': 'Regla: Acceso Remoto / VPN',
-              'tipo': 'REDES',
-              'prioridad': 'Alta',
-              'asignado_a': 'Equipo de Redes'
-            })
-            return
-
-        # Regla: Equipo no enciende - Prioridad Alta
-        if any(palabra in contenido for palabra in ['no enciende', 'no prende', 'pantalla negra', 'no inicia']):
-            self.resultados.append({
-                'regla': 'Regla: Equipo No Enciende',
-                'tipo': 'HARDWARE',
-                'prioridad': 'Alta',
-                'asignado_a': 'Equipo de Hardware'
-            })
-            return
-        
-        # Regla: Problemas de red - Prioridad Alta
-        if any(palabra in contenido for palabra in ['red', 'internet', 'wifi', 'conexion', 'dominio']):
-            self.resultados.append({
-                'regla': 'Regla: Problema de Red',
-                'tipo': 'REDES',
-                'prioridad': 'Alta',
-                'asignado_a': 'Equipo de Redes'
-            })
-            return
-            
-        # Regla: Problemas con sistemas corporativos - Prioridad Alta
-        if any(palabra in contenido for palabra in ['siga', 'siaf', 'sgd', 'sisper', 'sistema', 'intranet']):
-            self.resultados.append({
-                'regla': 'Regla: Problema de Sistema Corporativo',
-                'tipo': 'SOFTWARE',
-                'prioridad': 'Alta',
-                'asignado_a': 'Equipo de Software'
-            })
-            return
-
-        # Regla: Periféricos (mouse, teclado, monitor, webcam) - Prioridad Media
-        if any(palabra in contenido for palabra in ['mouse', 'ratón', 'teclado', 'monitor', 'pantalla', 'webcam', 'microfono', 'altavoz', 'parlante']):
-            self.resultados.append({
-              'regla': 'Regla: Problema de Periféricos',
-              'tipo': 'HARDWARE',
-              'prioridad': 'Media',
-              'asignado_a': 'Equipo de Hardware'
-            })
-            return
-
-        # Regla: Equipo lento - Prioridad Media
-        if any(palabra in contenido for palabra in ['lento', 'lenta', 'lentos', 'lentas', 'demora', 'tarda', 'rendimiento', 'optimizar']):
-            self.resultados.append({
-                'regla': 'Regla: Equipo Lento',
-                'tipo': 'HARDWARE',
-                'prioridad': 'Media',
-                'asignado_a': 'Equipo de Hardware'
-            })
-            return
-        
-        # Regla: Problemas con impresoras - Prioridad Media
-        if any(palabra in contenido for palabra in ['impresora', 'toner', 'impresion', 'escaner', 'atasco']):
-            self.resultados.append({
-                'regla': 'Regla: Problema de Impresora',
-                'tipo': 'HARDWARE',
-                'prioridad': 'Media',
-                'asignado_a': 'Equipo de Hardware'
-            })
-            return
-        
-        # Regla: Problemas de contraseña - Prioridad Media
-        if any(palabra in contenido for palabra in ['contraseña', 'password', 'bloqueada', 'expirada', 'restablecimiento']):
-            self.resultados.append({
-                'regla': 'Regla: Problema de Contraseña',
-                'tipo': 'SEGURIDAD',
-                'prioridad': 'Media',
-                'asignado_a': 'Equipo de Seguridad'
-            })
-            return
-        
-        # Regla: Correo corporativo - Prioridad Media
-        if any(palabra in contenido for palabra in ['correo', 'email', 'gmail', 'outlook', 'corporativo']):
-            self.resultados.append({
-                'regla': 'Regla: Problema de Correo',
-                'tipo': 'SOFTWARE',
-                'prioridad': 'Media',
-                'asignado_a': 'Equipo de Software'
-            })
-            return
-        
-        # Regla: Asesoría general - Prioridad Baja
-        if any(palabra in contenido for palabra in ['asesoria', 'ayuda', 'como', 'consulta', 'duda']):
-            self.resultados.append({
-                'regla': 'Regla: Asesoría General',
-                'tipo': 'SOFTWARE',
-                'prioridad': 'Baja',
-                'asignado_a': 'Equipo de Software'
-            })
-            return
-        
-        # Regla: Habilitaciones y configuraciones - Prioridad Baja
-        if any(palabra in contenido for palabra in ['habilitar', 'configurar', 'activar', 'crear', 'backup']):
-            self.resultados.append({
-                'regla': 'Regla: Habilitación/Configuración',
-                'tipo': 'SOFTWARE',
-                'prioridad': 'Baja',
-                'asignado_a': 'Equipo de Software'
-            })
-            return
-        
-        # Regla: Instalación de software - Prioridad Baja
-        if any(palabra in contenido for palabra in ['instalacion', 'instalar', 'software', 'programa', 'aplicacion']):
-            self.resultados.append({
-                'regla': 'Regla: Instalación de Software',
-                'tipo': 'SOFTWARE',
-                'prioridad': 'Baja',
-                'asignado_a': 'Equipo de Software'
-            })
-            return
-        
-        # Si no coincide con ninguna regla - Fallback
-        self.resultados.append({
-            'regla': 'Sin clasificar',
-            'tipo': 'SOFTWARE',
-            'prioridad': 'Baja',
-            'asignado_a': 'Equipo de Software'
-        })
+        self.resultados.append(clasificar_contenido(contenido, self.indice_reglas, area=area, modelo=self.modelo))
     
     def reset_resultados(self):
         """Limpia los resultados para procesar un nuevo ticket"""
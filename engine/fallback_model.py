@@ -0,0 +1,308 @@
+# engine/fallback_model.py
+# Clasificador estadístico para los tickets que no coinciden con ninguna regla
+# Naive Bayes multinomial sobre bolsas de palabras con hashing: cada palabra (por su raíz) va a una
+# de N columnas fijas, así el modelo no guarda vocabulario y se puede entrenar de a poco con tickets nuevos.
+# Se entrena con los tickets ya clasificados por reglas (facts_storage.json) y solo se usa cuando
+# ninguna regla coincide; si no está seguro, el ticket sigue como 'Sin clasificar'.
+
+import json
+import os
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from engine.file_utils import escritura_atomica
+from engine.stemmer import stem, tokens
+from engine.text_utils import PALABRAS_VACIAS
+
+# Archivo del modelo (junto a las reglas)
+ARCHIVO_MODELO = 'knowledge/fallback_model.npz'
+
+# Columnas de la bolsa de palabras (potencia de 2), suavizado y confianza mínima para usar la predicción
+N_CARACTERISTICAS = 1 << 16
+ALFA = 0.05
+UMBRAL_CONFIANZA = 0.7
+
+# Etiqueta de la regla en los resultados que vienen del modelo
+REGLA_MODELO = 'Modelo estadístico'
+
+# Resultados que no sirven para entrenar (no los decidió una regla)
+REGLAS_NO_ENTRENABLES = ('Sin clasificar', REGLA_MODELO)
+CAMPOS_CLASE = ('tipo', 'prioridad', 'asignado_a')
+
+
+@lru_cache(maxsize=50000)
+def _hash_palabra(token):
+    """Hash estable (igual entre procesos) de la raíz de una palabra"""
+    return zlib.crc32(stem(token).encode('utf-8'))
+
+
+def etiqueta_entrenamiento(ticket):
+    """
+    Clase (tipo, prioridad, asignado_a) de un ticket procesado, si sirve para entrenar.
+
+    Returns:
+        Tupla con la clase, o None si el ticket no lo clasificó una regla
+    """
+    regla = str(ticket.get('regla') or '')
+    if not regla or regla.startswith('Error') or regla.startswith(REGLAS_NO_ENTRENABLES):
+        return None
+    if not str(ticket.get('contenido') or '').strip():
+        return None
+    return tuple(str(ticket.get(campo) or '') for campo in CAMPOS_CLASE)
+
+
+class FallbackClassifier:
+    """
+    Naive Bayes multinomial con características por hashing.
+    Los conteos se acumulan con partial_fit (entrenamiento incremental) y las probabilidades
+    se recalculan al predecir si hubo cambios.
+    """
+
+    def __init__(self, n_caracteristicas=N_CARACTERISTICAS, alfa=ALFA, umbral=UMBRAL_CONFIANZA):
+        """
+        Inicializa un modelo vacío.
+
+        Args:
+            n_caracteristicas: Columnas de la bolsa de palabras
+            alfa: Suavizado de Laplace/Lidstone
+            umbral: Probabilidad mínima para usar la predicción
+        """
+        self.n_caracteristicas = n_caracteristicas
+        self.alfa = alfa
+        self.umbral = umbral
+        self.clases = []  # Lista de tuplas (tipo, prioridad, asignado_a)
+        # Punto de control en el almacén (ver TicketStore.changes_since): generación, último número de
+        # secuencia y cantidad de registros ya usados para entrenar. generacion None: modelo nuevo, o
+        # guardado con el formato anterior si vistos > 0 (entonces vistos es una posición)
+        self.generacion = None
+        self.secuencia = 0
+        self.vistos = 0
+        self._conteos = np.zeros((0, n_caracteristicas), dtype=np.float64)  # clase x columna
+        self._documentos = np.zeros(0, dtype=np.float64)  # Tickets por clase
+        self._log_prob_t = None  # columna x clase, se calcula al predecir
+        self._log_prior = None
+        self._conocidas = None  # Columnas vistas en el entrenamiento
+
+    def __len__(self):
+        """Cantidad de tickets con que se entrenó"""
+        return int(self._documentos.sum())
+
+    def _columnas(self, texto):
+        """Columnas de la bolsa de palabras de un texto (con repetidos)"""
+        return [_hash_palabra(token) % self.n_caracteristicas
+                for token in tokens(str(texto).lower()) if token not in PALABRAS_VACIAS]
+
+    def _indice_clase(self, clase):
+        """Posición de la clase (se agrega si es nueva)"""
+        try:
+            return self.clases.index(clase)
+        except ValueError:
+            self.clases.append(clase)
+            self._conteos = np.vstack([self._conteos, np.zeros((1, self.n_caracteristicas))])
+            self._documentos = np.append(self._documentos, 0.0)
+            return len(self.clases) - 1
+
+    def partial_fit(self, textos, clases):
+        """
+        Suma tickets al modelo sin volver a entrenar desde cero.
+
+        Args:
+            textos: Lista de textos
+            clases: Lista de clases (tuplas tipo, prioridad, asignado_a), una por texto
+        """
+        for texto, clase in zip(textos, clases):
+            fila = self._indice_clase(tuple(clase))
+            np.add.at(self._conteos[fila], self._columnas(texto), 1.0)
+            self._documentos[fila] += 1
+        self._log_prob_t = None
+
+    def fit_tickets(self, tickets, desde=0):
+        """
+        Entrena con los tickets procesados que clasificó una regla.
+
+        Args:
+            tickets: Lista de tickets del almacén (con contenido, regla, tipo, prioridad y asignado_a)
+            desde: Posición del primer ticket nuevo (los anteriores ya se usaron)
+
+        Returns:
+            Cantidad de tickets usados
+        """
+        textos, clases = [], []
+        for ticket in tickets[desde:]:
+            clase = etiqueta_entrenamiento(ticket)
+            if clase is not None:
+                textos.append(ticket['contenido'])
+                clases.append(clase)
+        self.partial_fit(textos, clases)
+        self.vistos = len(tickets)
+        return len(textos)
+
+    def fit_store(self, store):
+        """
+        Entrena con los tickets del almacén que llegaron después del punto de control y lo avanza.
+        En la misma generación se usan los registros agregados al final (los reemplazados ya se contaron:
+        el modelo no descuenta). Si se archivó o se compactó, las posiciones cambiaron: se usan los
+        registros del almacén y del archivo con número de secuencia posterior, que conservan aunque se muevan.
+
+        Args:
+            store: TicketStore
+
+        Returns:
+            (tickets usados, tickets revisados)
+        """
+        if self.generacion is None and self.vistos:
+            # Modelo guardado con el formato anterior: el punto de control es una posición
+            nuevos = store.get_all_tickets()[self.vistos:]
+        else:
+            cambios = None if self.generacion is None else store.changes_since(self.generacion, self.secuencia,
+                                                                              self.vistos)
+            if cambios is not None:
+                nuevos = cambios[1]
+            else:
+                nuevos = [ticket for _, _, ticket in store.tail(self.secuencia)]
+                nuevos += list(store.get_archive().iter_since(self.secuencia))
+        usados = self.fit_tickets(nuevos)
+        self.generacion, self.secuencia = store.generacion, store.secuencia
+        self.vistos = len(store.get_all_tickets())
+        return usados, len(nuevos)
+
+    def _preparar(self):
+        """Log-probabilidades suavizadas a partir de los conteos"""
+        if self._log_prob_t is None:
+            totales = self._conteos.sum(axis=1, keepdims=True)
+            log_prob = np.log(self._conteos + self.alfa) - np.log(totales + self.alfa * self.n_caracteristicas)
+            self._log_prob_t = np.ascontiguousarray(log_prob.T)
+            self._log_prior = np.log(self._documentos / self._documentos.sum())
+            self._conocidas = self._conteos.sum(axis=0) > 0
+
+    def predict_many(self, textos):
+        """
+        Predice la clase de un lote de textos con operaciones vectorizadas.
+
+        Args:
+            textos: Lista de textos
+
+        Returns:
+            Lista de (clase, confianza) por texto; None si el modelo no está seguro
+            o el texto no tiene ninguna palabra conocida
+        """
+        if not self.clases or not len(textos):
+            return [None] * len(textos)
+        self._preparar()
+
+        columnas = [self._columnas(texto) for texto in textos]
+        largos = np.fromiter((len(c) for c in columnas), dtype=np.int64, count=len(columnas))
+        planas = np.fromiter((c for fila in columnas for c in fila), dtype=np.int64, count=int(largos.sum()))
+        filas = np.repeat(np.arange(len(textos)), largos)
+        conocidas = self._conocidas[planas]
+        filas, planas = filas[conocidas], planas[conocidas]
+
+        puntajes = np.tile(self._log_prior, (len(textos), 1))
+        if len(planas):
+            # Suma por texto de las log-probabilidades de sus palabras (filas ordenadas: reduceat)
+            con_palabras, inicios = np.unique(filas, return_index=True)
+            puntajes[con_palabras] += np.add.reduceat(self._log_prob_t[planas], inicios, axis=0)
+        else:
+            con_palabras = np.zeros(0, dtype=np.int64)
+
+        puntajes -= puntajes.max(axis=1, keepdims=True)
+        probabilidades = np.exp(puntajes)
+        probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+        mejores = probabilidades.argmax(axis=1)
+        confianzas = probabilidades[np.arange(len(textos)), mejores]
+        seguras = np.zeros(len(textos), dtype=bool)
+        seguras[con_palabras] = True
+        seguras &= confianzas >= self.umbral
+
+        return [(self.clases[clase], float(confianza)) if segura else None
+                for clase, confianza, segura in zip(mejores.tolist(), confianzas.tolist(), seguras.tolist())]
+
+    def predict(self, texto):
+        """Igual que predict_many para un solo texto"""
+        return self.predict_many([texto])[0]
+
+    def save(self, ruta=ARCHIVO_MODELO):
+        """
+        Guarda el modelo comprimido y solo con los conteos distintos de cero.
+        Se escribe un archivo temporal y se reemplaza el original en un solo paso.
+
+        Returns:
+            True si se guardó, False en caso contrario
+        """
+        try:
+            ruta = os.path.join(os.path.dirname(__file__), '..', ruta)
+            clases, columnas = np.nonzero(self._conteos)
+            datos = {
+                'clases': np.array(json.dumps(self.clases, ensure_ascii=False)),
+                'parametros': np.array([self.n_caracteristicas, self.vistos,
+                                        -1 if self.generacion is None else self.generacion, self.secuencia],
+                                       dtype=np.int64),
+                'suavizado': np.array([self.alfa, self.umbral]),
+                'documentos': self._documentos.astype(np.int64),
+                'fila': clases.astype(np.int32),
+                'columna': columnas.astype(np.int32),
+                'cantidad': self._conteos[clases, columnas].astype(np.int32),
+            }
+            with escritura_atomica(ruta, 'wb') as f:
+                np.savez_compressed(f, **datos)
+            return True
+        except Exception as e:
+            print(f"Error al guardar el modelo: {e}")
+            return False
+
+    @classmethod
+    def load(cls, ruta=ARCHIVO_MODELO):
+        """
+        Carga un modelo guardado con save.
+
+        Returns:
+            El modelo, o None si el archivo no existe o no se pudo leer
+        """
+        try:
+            ruta = os.path.join(os.path.dirname(__file__), '..', ruta)
+            with np.load(ruta, allow_pickle=False) as datos:
+                parametros = [int(valor) for valor in datos['parametros']]
+                n_caracteristicas, vistos = parametros[:2]
+                alfa, umbral = (float(valor) for valor in datos['suavizado'])
+                modelo = cls(n_caracteristicas, alfa, umbral)
+                modelo.clases = [tuple(clase) for clase in json.loads(str(datos['clases']))]
+                modelo.vistos = vistos
+                if len(parametros) > 2:
+                    modelo.generacion = None if parametros[2] < 0 else parametros[2]
+                    modelo.secuencia = parametros[3]
+                modelo._documentos = datos['documentos'].astype(np.float64)
+                modelo._conteos = np.zeros((len(modelo.clases), n_caracteristicas), dtype=np.float64)
+                modelo._conteos[datos['fila'], datos['columna']] = datos['cantidad']
+            return modelo
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error al cargar el modelo: {e}")
+            return None
+
+
+# Modelos compartidos por archivo: (firma del archivo, modelo)
+_modelos = {}
+_lock_modelos = threading.Lock()
+
+
+def get_fallback_model(ruta=ARCHIVO_MODELO):
+    """
+    Retorna el modelo guardado, cargado una vez por proceso (se recarga si el archivo cambió).
+
+    Returns:
+        FallbackClassifier, o None si todavía no se entrenó ninguno
+    """
+    try:
+        estado = os.stat(os.path.join(os.path.dirname(__file__), '..', ruta))
+        firma = (estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        return None
+    with _lock_modelos:
+        guardado = _modelos.get(ruta)
+        if guardado is None or guardado[0] != firma:
+            guardado = _modelos[ruta] = (firma, FallbackClassifier.load(ruta))
+        return guardado[1]
@@ -0,0 +1,45 @@
+# engine/file_utils.py
+# Utilidades de archivos compartidas por los gestores, los índices y las métricas
+
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+# Permisos de un archivo que todavía no existe (lectura para todos, como lo crearía open())
+PERMISOS_PREDETERMINADOS = 0o644
+
+
+@contextmanager
+def escritura_atomica(ruta, modo='w', encoding='utf-8'):
+    """
+    Escribe un archivo temporal en la misma carpeta y, si el bloque termina sin errores,
+    reemplaza el original en un solo paso: un error a mitad de escritura nunca deja el archivo corrupto.
+    El archivo conserva los permisos del original (o 0644 si es nuevo); mkstemp crea el temporal
+    con 0600 y el reemplazo se quedaría con esos permisos.
+
+    Ejemplo:
+        with escritura_atomica(ruta) as f:
+            json.dump(datos, f)
+
+    Args:
+        ruta: Archivo de destino
+        modo: 'w' para texto o 'wb' para binario
+        encoding: Codificación del texto (no se usa en modo binario)
+
+    Yields:
+        Archivo temporal abierto para escribir
+    """
+    try:
+        permisos = stat.S_IMODE(os.stat(ruta).st_mode)
+    except FileNotFoundError:
+        permisos = PERMISOS_PREDETERMINADOS
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(ruta)), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, modo, encoding=None if 'b' in modo else encoding) as f:
+            yield f
+        os.chmod(temporal, permisos)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
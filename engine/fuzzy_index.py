@@ -0,0 +1,152 @@
+# engine/fuzzy_index.py
+# Índice de borrados (estilo SymSpell) para encontrar palabras clave con errores de tipeo
+# Cada palabra clave se guarda junto con las variantes que resultan de borrarle hasta d letras.
+# Dos palabras a distancia de edición <= d comparten alguna variante, así que para una palabra
+# del ticket basta generar sus borrados y buscarlos en el diccionario: el costo depende del largo
+# de la palabra y no de cuántas palabras clave hay. Los candidatos se confirman con la distancia real.
+
+import re
+
+# Largo mínimo de una palabra clave para tolerar 1 o 2 errores (en palabras cortas un error
+# ya las confunde con otras: 'red' a distancia 1 de 'sed' o 'rex')
+LARGO_MINIMO_DIFUSO = {1: 4, 2: 7}
+MAX_DISTANCIA_DIFUSA = 2
+
+# Palabras del ticket cuyo resultado se recuerda (las mismas palabras se repiten mucho entre tickets)
+MAX_CACHE_PALABRAS = 20000
+
+_PALABRA = re.compile(r'\w+')
+
+
+def distancia_permitida(palabra, distancia):
+    """Errores que se toleran en la palabra clave según su largo (0 = solo exacta)"""
+    if not _PALABRA.fullmatch(palabra or ''):
+        return 0  # Frases y palabras con signos solo coinciden exactas
+    while distancia and len(palabra) < LARGO_MINIMO_DIFUSO[distancia]:
+        distancia -= 1
+    return distancia
+
+
+def borrados(palabra, distancia):
+    """Variantes de la palabra con hasta 'distancia' letras borradas (incluye la palabra)"""
+    variantes = {palabra}
+    nivel = {palabra}
+    for _ in range(distancia):
+        nivel = {p[:i] + p[i + 1:] for p in nivel for i in range(len(p))}
+        variantes |= nivel
+    return variantes
+
+
+def distancia_edicion(a, b, maximo):
+    """
+    Distancia de Damerau-Levenshtein (alineamiento óptimo) entre dos palabras.
+    Corta en cuanto se sabe que supera el máximo.
+
+    Returns:
+        La distancia, o maximo + 1 si es mayor que el máximo
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior_2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        actual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            costo = 0 if a[i - 1] == b[j - 1] else 1
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if (anterior_2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                actual[j] = min(actual[j], anterior_2[j - 2] + 1)
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior_2, anterior = anterior, actual
+    return anterior[-1] if anterior[-1] <= maximo else maximo + 1
+
+
+class FuzzyIndex:
+    """
+    Índice de palabras clave con tolerancia a errores de tipeo.
+    Cada regla indica cuántos errores acepta en sus palabras clave (ver distancia_permitida).
+    """
+
+    def __init__(self):
+        self._variantes = {}  # variante con borrados -> palabras clave de las que sale
+        self._reglas = {}  # palabra clave -> {id_regla: errores tolerados}
+        self._maximo = {}  # palabra clave -> distancia con la que se generaron sus variantes
+        self._cache = {}  # palabra del ticket -> IDs de reglas que encuentra (se vacía al cambiar el índice)
+
+    def __bool__(self):
+        return bool(self._reglas)
+
+    def copy(self):
+        """Copia independiente (para el índice compilado)"""
+        copia = FuzzyIndex()
+        copia._variantes = {variante: set(palabras) for variante, palabras in self._variantes.items()}
+        copia._reglas = {palabra: dict(ids) for palabra, ids in self._reglas.items()}
+        copia._maximo = dict(self._maximo)
+        copia._cache = dict(self._cache)
+        return copia
+
+    def add(self, palabra, id_regla, distancia):
+        """Registra la palabra clave de una regla con los errores que tolera"""
+        distancia = distancia_permitida(palabra, distancia)
+        if not distancia:
+            return
+        self._cache = {}
+        self._reglas.setdefault(palabra, {})[id_regla] = distancia
+        if distancia > self._maximo.get(palabra, 0):
+            self._maximo[palabra] = distancia
+            for variante in borrados(palabra, distancia):
+                self._variantes.setdefault(variante, set()).add(palabra)
+
+    def remove(self, palabra, id_regla):
+        """Quita la palabra clave de la regla (y sus variantes si ya no la usa nadie)"""
+        ids = self._reglas.get(palabra)
+        if not ids or ids.pop(id_regla, None) is None:
+            return
+        self._cache = {}
+        if ids:
+            return
+        del self._reglas[palabra]
+        for variante in borrados(palabra, self._maximo.pop(palabra)):
+            palabras = self._variantes.get(variante)
+            if palabras is not None:
+                palabras.discard(palabra)
+                if not palabras:
+                    del self._variantes[variante]
+
+    def lookup(self, texto):
+        """
+        Busca las palabras clave que están, con errores tolerados, entre las palabras del texto.
+
+        Args:
+            texto: Texto en minúsculas
+
+        Returns:
+            Conjunto de IDs de las reglas con alguna palabra clave encontrada
+        """
+        encontradas = set()
+        if not self._reglas:
+            return encontradas
+        for token in set(_PALABRA.findall(texto)):
+            if len(token) >= LARGO_MINIMO_DIFUSO[1] - 1:
+                ids = self._cache.get(token)
+                if ids is None:
+                    ids = self._buscar_palabra(token)
+                    if len(self._cache) >= MAX_CACHE_PALABRAS:
+                        self._cache = {}
+                    self._cache[token] = ids
+                encontradas.update(ids)
+        return encontradas
+
+    def _buscar_palabra(self, token):
+        """IDs de las reglas con una palabra clave a distancia tolerada de la palabra del ticket"""
+        candidatas = set()
+        for variante in borrados(token, max(self._maximo.values())):
+            candidatas.update(self._variantes.get(variante, ()))
+        encontradas = set()
+        for palabra in candidatas:
+            distancia = distancia_edicion(token, palabra, self._maximo[palabra])
+            encontradas.update(id_regla for id_regla, tolerados in self._reglas[palabra].items()
+                               if distancia <= tolerados)
+        return frozenset(encontradas)
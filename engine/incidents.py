@@ -0,0 +1,275 @@
+# engine/incidents.py
+# Agrupa tickets casi iguales en incidentes (MinHash + LSH, en streaming)
+# Cuando se cae un servicio llegan muchos tickets parecidos ("no tengo internet",
+# "sin internet en contabilidad"). Cada ticket se resume en una firma MinHash de los trigramas de su
+# contenido plegado (sin palabras vacías); las bandas de la firma (LSH) dan, sin recorrer todos los
+# incidentes, los pocos que pueden parecerse. Si la similitud estimada con el primer ticket de alguno
+# alcanza el umbral, el ticket se suma a ese incidente; si no, abre uno nuevo.
+
+from array import array
+
+import numpy as np
+
+from engine.stemmer import tokens
+from engine.text_utils import PALABRAS_VACIAS, plegar
+
+# Firma: 64 permutaciones en 32 bandas de 2 filas. Dos textos con Jaccard 0.25 comparten alguna
+# banda con probabilidad ~0.87 (0.4: ~0.99); con Jaccard 0.1, ~0.27 (esos se descartan al comparar firmas)
+NUM_PERMUTACIONES = 64
+FILAS_POR_BANDA = 2
+BANDAS = NUM_PERMUTACIONES // FILAS_POR_BANDA
+
+# Jaccard (estimado) mínimo con el primer ticket del incidente. Tickets distintos de ejemplo
+# no pasan de 0.18; "no tengo internet" y "sin internet en contabilidad" dan ~0.3
+UMBRAL_SIMILITUD = 0.25
+
+# Largo de los trozos de texto (shingles) y tickets por bloque al procesar lotes
+LARGO_SHINGLE = 3
+TICKETS_POR_BLOQUE = 1024
+
+# Incidentes que siguen recibiendo tickets (con sus bandas en las cubetas). Al pasarse, se olvidan las
+# bandas de la mitad usada hace más tiempo: la memoria no crece con el historial y las ráfagas son recientes
+MAX_INCIDENTES_ACTIVOS = 20000
+
+# Sin incidente (ticket vacío)
+SIN_INCIDENTE = -1
+
+# Coeficientes de las permutaciones h(x) = a * x + b (mod 2^32, a impar), fijos para que las firmas sean estables
+_aleatorio = np.random.default_rng(20251019)
+_MULTIPLICADORES = (_aleatorio.integers(0, 2 ** 31, NUM_PERMUTACIONES, dtype=np.uint32) * np.uint32(2)
+                    + np.uint32(1))
+_SUMANDOS = _aleatorio.integers(0, 2 ** 32, NUM_PERMUTACIONES, dtype=np.uint32)
+_MEZCLA = np.uint32(0x9E3779B1)  # Dispersa los trigramas (24 bits) antes de permutar
+
+
+def _texto_comparable(contenido):
+    """Contenido plegado y sin palabras vacías ('' si no queda nada); los textos cortos se completan a un trigrama"""
+    texto = ' '.join(palabra for palabra in tokens(plegar(contenido)) if palabra not in PALABRAS_VACIAS)
+    return texto.ljust(LARGO_SHINGLE) if texto else ''
+
+
+def _trigramas(textos):
+    """
+    Trigramas (de bytes) de varios textos a la vez, sin cortar entre textos.
+
+    Returns:
+        (códigos uint32 de los trigramas, número de texto de cada uno), ordenados por texto
+    """
+    datos = np.frombuffer(('\0'.join(textos) + '\0').encode('utf-8'), dtype=np.uint8)
+    if len(datos) < LARGO_SHINGLE:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    a, b, c = datos[:-2].astype(np.uint32), datos[1:-1].astype(np.uint32), datos[2:].astype(np.uint32)
+    validos = (a != 0) & (b != 0) & (c != 0)
+    numero = np.cumsum(datos == 0)[:-2] - (a == 0)  # El separador cuenta para el texto siguiente
+    return ((a << 16) | (b << 8) | c)[validos], numero[validos]
+
+
+def shingles(contenido):
+    """
+    Trigramas del contenido plegado, sin palabras vacías.
+
+    Returns:
+        Lista ordenada de códigos distintos (vacía si el ticket no tiene palabras)
+    """
+    texto = _texto_comparable(contenido)
+    return np.unique(_trigramas([texto])[0]).tolist() if texto else []
+
+
+def firmas(contenidos):
+    """
+    Firmas MinHash de un lote de textos (vectorizado).
+
+    Returns:
+        (array uint32 de forma (textos, NUM_PERMUTACIONES), array bool de textos con contenido)
+    """
+    textos = [_texto_comparable(contenido) for contenido in contenidos]
+    con_contenido = np.fromiter((bool(texto) for texto in textos), dtype=bool, count=len(textos))
+    resultado = np.zeros((len(textos), NUM_PERMUTACIONES), dtype=np.uint32)
+    if not con_contenido.any():
+        return resultado, con_contenido
+    indices = np.flatnonzero(con_contenido)
+    codigos, numero = _trigramas([textos[i] for i in indices.tolist()])
+    mezclados = codigos * _MEZCLA
+    mezclados ^= mezclados >> np.uint32(15)
+    # Mínimo de cada permutación por texto (los trigramas ya vienen agrupados por texto)
+    # (una fila por permutación: reduceat recorre memoria contigua)
+    permutados = _MULTIPLICADORES[:, None] * mezclados + _SUMANDOS[:, None]
+    inicios = np.searchsorted(numero, np.arange(len(indices)))
+    resultado[indices] = np.minimum.reduceat(permutados, inicios, axis=1).T
+    return resultado, con_contenido
+
+
+class IncidentDetector:
+    """
+    Agrupador en streaming de tickets casi iguales.
+    Cada incidente guarda la firma de su primer ticket y sus bandas en las cubetas LSH
+    (si dos incidentes caen en la misma cubeta, queda el más reciente: las ráfagas son recientes).
+    Solo los MAX_INCIDENTES_ACTIVOS usados más recientemente reciben tickets nuevos; los demás
+    conservan sus tickets pero un ticket parecido que llegue después abre otro incidente.
+    """
+
+    def __init__(self, tickets=None, umbral=UMBRAL_SIMILITUD):
+        """
+        Inicializa el detector.
+
+        Args:
+            tickets: Lista inicial de tickets procesados (opcional)
+            umbral: Jaccard mínimo estimado para sumar un ticket a un incidente
+        """
+        self.umbral = umbral
+        self._reiniciar()
+        if tickets:
+            self.add_many(tickets)
+
+    def _reiniciar(self):
+        """Deja el detector sin tickets ni incidentes"""
+        self._cubetas = [{} for _ in range(BANDAS)]  # Por banda: clave -> incidente
+        self._firmas = np.zeros((0, NUM_PERMUTACIONES), dtype=np.uint32)  # Firma del primer ticket de cada incidente
+        self._ultimo_uso = np.zeros(0, dtype=np.int64)  # Posición del último ticket de cada incidente
+        self._activo = np.zeros(0, dtype=bool)  # Si sus bandas siguen en las cubetas
+        self._incidentes = 0
+        self._activos = 0
+        self._asignados = array('q')  # Incidente de cada ticket, por posición
+        self._ultimo_contenido = None  # Para reconocer si el almacén solo agregó tickets al final
+        self.generacion, self.secuencia = None, 0  # Punto de control en el almacén (ver follow)
+
+    def __len__(self):
+        return len(self._asignados)
+
+    @staticmethod
+    def _claves(firmas_bloque):
+        """Clave de cada banda de cada firma: las dos filas de 32 bits en un entero de 64"""
+        pares = firmas_bloque.reshape(len(firmas_bloque), BANDAS, FILAS_POR_BANDA).astype(np.uint64)
+        return ((pares[:, :, 0] << np.uint64(32)) | pares[:, :, 1]).tolist()
+
+    def _nuevo_incidente(self, firma, claves, posicion):
+        """Abre un incidente con la firma del ticket y registra sus bandas"""
+        incidente = self._incidentes
+        if incidente == len(self._firmas):
+            # Capacidad al doble (no se copian los arrays en cada incidente)
+            extra = max(incidente, 64)
+            self._firmas = np.concatenate([self._firmas, np.zeros((extra, NUM_PERMUTACIONES), dtype=np.uint32)])
+            self._ultimo_uso = np.concatenate([self._ultimo_uso, np.zeros(extra, dtype=np.int64)])
+            self._activo = np.concatenate([self._activo, np.zeros(extra, dtype=bool)])
+        self._firmas[incidente] = firma
+        self._ultimo_uso[incidente] = posicion
+        self._activo[incidente] = True
+        for cubeta, clave in zip(self._cubetas, claves):
+            cubeta[clave] = incidente
+        self._incidentes += 1
+        self._activos += 1
+        if self._activos > MAX_INCIDENTES_ACTIVOS:
+            self._olvidar_antiguos()
+        return incidente
+
+    def _olvidar_antiguos(self):
+        """Saca de las cubetas la mitad de los incidentes activos usada hace más tiempo"""
+        activos = np.flatnonzero(self._activo[:self._incidentes])
+        cantidad = len(activos) // 2
+        viejos = activos[np.argpartition(self._ultimo_uso[activos], cantidad)[:cantidad]]
+        for incidente, claves in zip(viejos.tolist(), self._claves(self._firmas[viejos])):
+            for cubeta, clave in zip(self._cubetas, claves):
+                if cubeta.get(clave) == incidente:
+                    del cubeta[clave]
+        self._activo[viejos] = False
+        self._activos -= cantidad
+
+    def _asignar(self, firma, claves, posicion):
+        """Incidente para un ticket: el candidato más parecido de las cubetas o uno nuevo"""
+        candidatos = {cubeta[clave] for cubeta, clave in zip(self._cubetas, claves) if clave in cubeta}
+        if candidatos:
+            candidatos = list(candidatos)
+            iguales = np.count_nonzero(self._firmas[candidatos] == firma, axis=1)
+            mejor = int(iguales.argmax())
+            if iguales[mejor] >= self.umbral * NUM_PERMUTACIONES:
+                self._ultimo_uso[candidatos[mejor]] = posicion
+                return candidatos[mejor]
+        return self._nuevo_incidente(firma, claves, posicion)
+
+    def add_many(self, tickets):
+        """
+        Asigna un incidente a cada ticket, en orden, procesando por bloques.
+
+        Args:
+            tickets: Lista de tickets (se usa su 'contenido')
+
+        Returns:
+            Lista con el incidente de cada ticket (SIN_INCIDENTE si está vacío)
+        """
+        asignados = []
+        posicion = len(self._asignados)
+        for inicio in range(0, len(tickets), TICKETS_POR_BLOQUE):
+            bloque = [ticket.get('contenido') for ticket in tickets[inicio:inicio + TICKETS_POR_BLOQUE]]
+            firmas_bloque, con_contenido = firmas(bloque)
+            for firma, claves, valido in zip(firmas_bloque, self._claves(firmas_bloque), con_contenido.tolist()):
+                asignados.append(self._asignar(firma, claves, posicion) if valido else SIN_INCIDENTE)
+                posicion += 1
+        self._asignados.extend(asignados)
+        if tickets:
+            self._ultimo_contenido = tickets[-1].get('contenido')
+        return asignados
+
+    def add(self, contenido):
+        """Asigna el incidente de un ticket suelto"""
+        return self.add_many([{'contenido': contenido}])[0]
+
+    def update(self, posicion, ticket):
+        """Los incidentes dependen solo del contenido: reclasificar un ticket no cambia nada"""
+
+    def sync(self, tickets):
+        """
+        Deja el detector al día con la lista completa de tickets del almacén.
+        Si solo se agregaron tickets al final se agrupan esos; si no, se empieza de nuevo.
+
+        Returns:
+            Cantidad de tickets agrupados en esta llamada
+        """
+        procesados = len(self._asignados)
+        if procesados > len(tickets) or (procesados and tickets[procesados - 1].get('contenido') != self._ultimo_contenido):
+            self._reiniciar()
+            procesados = 0
+        self.add_many(tickets[procesados:])
+        self.generacion = None  # Una lista no es un punto de control del almacén
+        return len(tickets) - procesados
+
+    def follow(self, store):
+        """
+        Deja el detector al día leyendo del almacén solo los cambios posteriores a su punto de control
+        (ver TicketStore.changes_since). Los reclasificados no cambian nada y los agregados se agrupan;
+        si el almacén cambió de generación se empieza de nuevo.
+
+        Returns:
+            Cantidad de tickets agrupados en esta llamada
+        """
+        procesados = len(self._asignados)
+        cambios = store.changes_since(self.generacion, self.secuencia, procesados)
+        if cambios is None or (procesados and store.tickets[procesados - 1].get('contenido') != self._ultimo_contenido):
+            self._reiniciar()
+            cambios = store.changes_since(store.generacion, 0, 0)
+        self.add_many(cambios[1])
+        self.generacion, self.secuencia = store.generacion, store.secuencia
+        return len(cambios[1])
+
+    def incident_of(self, posicion):
+        """Incidente del ticket en esa posición del almacén"""
+        return self._asignados[posicion]
+
+    def clusters(self, minimo=2):
+        """
+        Incidentes con al menos 'minimo' tickets, del más grande al más chico.
+
+        Returns:
+            Lista de diccionarios con 'incidente', 'tamano' y 'posiciones' (la primera es la del ticket que lo abrió)
+        """
+        asignados = np.frombuffer(self._asignados, dtype=np.int64) if self._asignados else np.zeros(0, dtype=np.int64)
+        validos = np.flatnonzero(asignados != SIN_INCIDENTE)
+        if not len(validos):
+            return []
+        # Agrupar posiciones por incidente: orden estable por incidente conserva el orden de llegada
+        orden = validos[np.argsort(asignados[validos], kind='stable')]
+        incidentes, inicios, tamanos = np.unique(asignados[orden], return_index=True, return_counts=True)
+        grandes = np.flatnonzero(tamanos >= minimo)
+        grandes = grandes[np.argsort(-tamanos[grandes], kind='stable')]
+        return [{'incidente': int(incidentes[g]), 'tamano': int(tamanos[g]),
+                 'posiciones': orden[inicios[g]:inicios[g] + tamanos[g]].tolist()}
+                for g in grandes.tolist()]
@@ -0,0 +1,263 @@
+# engine/keyword_miner.py
+# Palabras clave candidatas a partir de los tickets que ninguna regla clasificó
+# Recorre los tickets "Sin clasificar" una sola vez y cuenta frases de 1 a 3 palabras (plegadas y sin
+# palabras vacías en los extremos) con Count-Min + montículo (HeavyHitters): la memoria no depende
+# del tamaño del historial.
+# Las frases se ordenan por tickets en los que aparecen y por lo poco que se parecen a las palabras clave
+# que ya existen; las mejores se proponen como reglas inactivas para revisar en la gestión de reglas.
+
+from collections import Counter
+
+from engine.classification_engine import REGLAS_BASE, RESULTADO_SIN_CLASIFICAR
+from engine.sketches import HeavyHitters
+from engine.stemmer import tokens
+from engine.text_utils import PALABRAS_VACIAS, plegar
+
+# Largo máximo de las frases (1 = palabras sueltas, 2 = pares, 3 = tríos)
+MAX_PALABRAS = 3
+
+# Frases que se siguen por cada largo (el resto solo queda en el Count-Min)
+K_CANDIDATOS = 200
+
+# Tickets mínimos en los que tiene que aparecer una frase para proponerla
+MIN_TICKETS = 3
+
+# Una frase corta se descarta si una más larga que la contiene aparece en esta fracción de sus tickets
+FRACCION_CONTENIDA = 0.8
+
+# Prefijo del nombre de las reglas propuestas
+PREFIJO_PROPUESTA = 'Propuesta: '
+
+
+def _vacia(palabra, plegada):
+    """True si la palabra no puede empezar ni terminar una frase"""
+    return palabra in PALABRAS_VACIAS or plegada in PALABRAS_VACIAS
+
+
+def frases(contenido):
+    """
+    Frases de 1 a MAX_PALABRAS palabras seguidas de un texto. Pueden tener palabras vacías en el medio
+    ('lector de huellas') pero no empezar ni terminar con una; los números cortan las frases.
+
+    Args:
+        contenido: Texto del ticket
+
+    Returns:
+        Diccionario frase plegada -> frase como está escrita (en minúsculas), sin repetidos
+    """
+    resultado = {}
+    tramo = []  # (escrita, plegada) de las últimas palabras seguidas desde el último número
+    for palabra in tokens(str(contenido or '').lower()):
+        plegada = plegar(palabra)
+        if plegada.isdigit():
+            tramo = []
+            continue
+        tramo = tramo[-(MAX_PALABRAS - 1):] + [(palabra, plegada)]
+        if _vacia(palabra, plegada):
+            continue
+        for largo in range(1, len(tramo) + 1):
+            ultimas = tramo[-largo:]
+            if _vacia(*ultimas[0]) or (largo == 1 and len(plegada) < 3):
+                continue
+            clave = ' '.join(p for _, p in ultimas)
+            resultado.setdefault(clave, ' '.join(e for e, _ in ultimas))
+    return resultado
+
+
+def _palabras_con_sentido(frase):
+    """Palabras de una frase plegada sin las vacías"""
+    return [palabra for palabra in frase.split() if palabra not in PALABRAS_VACIAS]
+
+
+def palabras_existentes(reglas):
+    """
+    Palabras plegadas que ya usan las reglas (clave y requeridas), sueltas.
+
+    Args:
+        reglas: Lista de reglas (personalizadas y base)
+
+    Returns:
+        Conjunto de palabras
+    """
+    existentes = set()
+    for regla in reglas:
+        for campo in ('palabras_clave', 'palabras_requeridas'):
+            for palabra in regla.get(campo) or []:
+                existentes.update(tokens(plegar(palabra)))
+    return existentes
+
+
+class KeywordMiner:
+    """
+    Cuenta las frases de los tickets sin clasificar con memoria fija y propone palabras clave.
+    Cada frase se cuenta una vez por ticket, así la frecuencia es la cantidad de tickets que la usan.
+    """
+
+    def __init__(self, k=K_CANDIDATOS, ancho=1 << 14, profundidad=4):
+        """
+        Inicializa los contadores.
+
+        Args:
+            k: Frases que se siguen por cada largo
+            ancho: Ancho del Count-Min de cada largo
+            profundidad: Filas del Count-Min de cada largo
+        """
+        self.contadores = {largo: HeavyHitters(k, ancho, profundidad) for largo in range(1, MAX_PALABRAS + 1)}
+        self.tickets = 0
+        self._escrituras = {}  # frase plegada -> Counter de cómo se escribió (solo las del top)
+
+    def add(self, contenido):
+        """Cuenta las frases de un ticket"""
+        self.tickets += 1
+        for clave, escrita in frases(contenido).items():
+            contador = self.contadores[clave.count(' ') + 1]
+            contador.add(clave)
+            if clave in contador.top_actual:
+                self._escrituras.setdefault(clave, Counter())[escrita] += 1
+        if len(self._escrituras) > 2 * sum(c.k for c in self.contadores.values()):
+            # Se olvidan las escrituras de las frases que salieron del top
+            self._escrituras = {clave: escrituras for clave, escrituras in self._escrituras.items()
+                                if clave in self.contadores[clave.count(' ') + 1].top_actual}
+
+    def add_tickets(self, tickets):
+        """
+        Cuenta los tickets que quedaron sin clasificar (los demás se saltean).
+
+        Args:
+            tickets: Iterable de tickets procesados
+
+        Returns:
+            Cantidad de tickets contados
+        """
+        contados = 0
+        for ticket in tickets:
+            if ticket.get('regla') == RESULTADO_SIN_CLASIFICAR['regla']:
+                self.add(ticket.get('contenido'))
+                contados += 1
+        return contados
+
+    def candidates(self, existentes=(), top=20, min_tickets=MIN_TICKETS):
+        """
+        Frases candidatas a palabra clave, de la más útil a la menos útil.
+        El puntaje es tickets × (1 - solapamiento), con el solapamiento como la fracción de palabras
+        de la frase (sin contar las vacías) que ya están en alguna palabra clave.
+
+        Args:
+            existentes: Palabras plegadas que ya usan las reglas (ver palabras_existentes)
+            top: Cantidad máxima de candidatas
+            min_tickets: Tickets mínimos en los que aparece la frase
+
+        Returns:
+            Lista de diccionarios con 'palabra', 'frase', 'tickets', 'solapamiento' y 'puntaje'
+        """
+        frecuentes = {}
+        for contador in self.contadores.values():
+            for clave, veces in contador.top_actual.items():
+                if veces >= min_tickets:
+                    frecuentes[clave] = veces
+
+        # Una frase corta casi siempre dentro de una más larga no agrega nada: se queda la larga
+        contenidas = set()
+        for larga, veces_larga in frecuentes.items():
+            palabras = larga.split()
+            for largo in range(1, len(palabras)):
+                for inicio in range(len(palabras) - largo + 1):
+                    corta = ' '.join(palabras[inicio:inicio + largo])
+                    if corta in frecuentes and veces_larga >= FRACCION_CONTENIDA * frecuentes[corta]:
+                        contenidas.add(corta)
+
+        existentes = set(existentes)
+        candidatas = []
+        for clave, veces in frecuentes.items():
+            if clave in contenidas:
+                continue
+            palabras = _palabras_con_sentido(clave)
+            solapamiento = sum(1 for p in palabras if p in existentes) / len(palabras)
+            if solapamiento == 1:
+                continue
+            escrituras = self._escrituras.get(clave)
+            candidatas.append({
+                'palabra': escrituras.most_common(1)[0][0] if escrituras else clave,
+                'frase': clave,
+                'tickets': veces,
+                'solapamiento': round(solapamiento, 3),
+                'puntaje': round(veces * (1 - solapamiento), 3),
+            })
+        candidatas.sort(key=lambda c: (-c['puntaje'], -c['tickets'], c['frase']))
+        return candidatas[:top]
+
+
+def propose_rules(candidatas, modelo=None):
+    """
+    Arma una regla inactiva por candidata; la clase sale del modelo estadístico si está seguro.
+
+    Args:
+        candidatas: Lista de KeywordMiner.candidates
+        modelo: FallbackClassifier para sugerir tipo, prioridad y equipo (opcional)
+
+    Returns:
+        Lista de reglas (argumentos de RulesManager.add_rule) con 'tickets' y 'confianza' aparte
+    """
+    predicciones = modelo.predict_many([c['palabra'] for c in candidatas]) if modelo else [None] * len(candidatas)
+    propuestas = []
+    for candidata, prediccion in zip(candidatas, predicciones):
+        if prediccion is None:
+            clase = (RESULTADO_SIN_CLASIFICAR['tipo'], RESULTADO_SIN_CLASIFICAR['prioridad'],
+                     RESULTADO_SIN_CLASIFICAR['asignado_a'])
+            confianza = None
+        else:
+            clase, confianza = prediccion
+        tipo, prioridad, asignado_a = clase
+        propuestas.append({
+            'nombre': f"{PREFIJO_PROPUESTA}{candidata['palabra']}",
+            'palabras_clave': [candidata['palabra']],
+            'tipo': tipo,
+            'prioridad': prioridad,
+            'asignado_a': asignado_a,
+            'activa': False,
+            'tickets': candidata['tickets'],
+            'confianza': None if confianza is None else round(confianza, 3),
+        })
+    return propuestas
+
+
+def load_proposals(rules_manager, propuestas):
+    """
+    Agrega las reglas propuestas en una transacción: se guardan todas o ninguna.
+
+    Args:
+        rules_manager: Instancia de RulesManager
+        propuestas: Lista de propose_rules
+
+    Returns:
+        Cantidad de reglas agregadas, o None si no se pudo guardar
+    """
+    try:
+        with rules_manager.transaction():
+            for propuesta in propuestas:
+                campos = {campo: valor for campo, valor in propuesta.items() if campo not in ('tickets', 'confianza')}
+                if not rules_manager.add_rule(**campos):
+                    raise ValueError(f"no se pudo agregar '{propuesta['nombre']}'")
+    except Exception as e:
+        print(f"Error al cargar propuestas: {e}")
+        return None
+    return len(propuestas)
+
+
+def mine_keywords(tickets, reglas, top=20, min_tickets=MIN_TICKETS):
+    """
+    Recorre los tickets una vez y retorna las candidatas contra las palabras clave actuales.
+
+    Args:
+        tickets: Iterable de tickets procesados
+        reglas: Reglas personalizadas (las base se agregan solas)
+        top: Cantidad máxima de candidatas
+        min_tickets: Tickets mínimos en los que aparece la frase
+
+    Returns:
+        Tupla (candidatas, tickets sin clasificar contados)
+    """
+    minero = KeywordMiner()
+    contados = minero.add_tickets(tickets)
+    existentes = palabras_existentes(list(reglas) + REGLAS_BASE)
+    return minero.candidates(existentes, top=top, min_tickets=min_tickets), contados
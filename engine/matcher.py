@@ -0,0 +1,680 @@
+# engine/matcher.py
+# Índice compilado de palabras clave para encontrar la primera regla que coincide con un ticket
+# Se actualiza regla por regla con los eventos de RulesManager (sin recompilar todo)
+# Las reglas compuestas (todas / ninguna) se evalúan con máscaras de bits de palabras encontradas
+# y las reglas de un área van en un índice aparte que solo recorren los tickets de esa área
+# Las reglas con 'difuso' también coinciden con palabras clave mal escritas (ver fuzzy_index)
+# y las reglas con 'raices' comparan sus palabras clave sueltas por raíz (ver stemmer)
+
+import re
+import threading
+
+import numpy as np
+
+from engine.fuzzy_index import FuzzyIndex
+from engine.stemmer import StemIndex
+from engine.rules_manager import CAMPOS_CONDICION
+from engine.text_utils import plegar
+
+# Bits por palabra de las matrices de NumPy (máscaras de Python partidas en enteros de 64 bits)
+_BITS_PALABRA = 64
+_MASCARA_64 = (1 << _BITS_PALABRA) - 1
+
+# Desde cuántos textos candidatos conviene evaluar una regla compuesta con NumPy en match_many
+MIN_FILAS_LOTE = 64
+
+_PALABRA_SUELTA = re.compile(r'\w+')
+
+
+def es_compuesta(regla):
+    """True si la regla tiene condiciones además de 'alguna palabra clave'"""
+    return any(regla.get(campo) for campo in CAMPOS_CONDICION)
+
+
+def normalizar_area(area):
+    """Área en la forma en que se comparan las condiciones de las reglas (como los nombres de AreasManager)"""
+    return plegar(area)
+
+
+def alias_areas(catalogo):
+    """
+    Tabla para resolver un área por su ID o por su nombre.
+
+    Args:
+        catalogo: Lista de áreas de AreasManager (diccionarios con id_area y nombre)
+
+    Returns:
+        Diccionario {id o nombre normalizado: id_area}
+    """
+    alias = {}
+    for area in catalogo or []:
+        id_area = area.get('id_area')
+        for valor in (area.get('nombre'), id_area):
+            if valor:
+                alias[normalizar_area(valor)] = id_area
+    return alias
+
+
+def _palabras(regla, campo='palabras_clave'):
+    """Palabras normalizadas de un grupo de la regla (sin repetidos)"""
+    return {str(palabra).lower() for palabra in regla.get(campo) or []}
+
+
+def palabras_por_raiz(regla):
+    """Palabras clave sueltas que la regla compara por raíz (vacío si la regla no usa raíces)"""
+    if not regla.get('raices'):
+        return set()
+    return {palabra for palabra in _palabras(regla) if _PALABRA_SUELTA.fullmatch(palabra)}
+
+
+def _disparadoras(regla):
+    """
+    Palabras del trie que hacen candidata a la regla: las clave, o las requeridas si no tiene clave.
+    Las que se comparan por raíz van al índice de raíces y no al trie.
+    """
+    return (_palabras(regla) or _palabras(regla, 'palabras_requeridas')) - palabras_por_raiz(regla)
+
+
+def _condicionales(regla):
+    """Todas las palabras de una regla compuesta que hay que detectar en el texto"""
+    return _palabras(regla) | _palabras(regla, 'palabras_requeridas') | _palabras(regla, 'palabras_excluidas')
+
+
+def _a_palabras_64(mascara, cantidad):
+    """Parte una máscara de Python en enteros de 64 bits (fila de la matriz de NumPy)"""
+    return [(mascara >> (_BITS_PALABRA * i)) & _MASCARA_64 for i in range(cantidad)]
+
+
+class _Condicion:
+    """
+    Condición compuesta de una regla como máscaras de bits sobre las palabras encontradas:
+    alguna de 'cualquiera' (si hay), todas las de 'todas' y ninguna de 'ninguna'.
+    (El área no es parte de la condición: se resuelve eligiendo el índice del área.)
+    """
+    __slots__ = ('cualquiera', 'todas', 'ninguna')
+
+    def __init__(self, cualquiera, todas, ninguna):
+        self.cualquiera = cualquiera
+        self.todas = todas
+        self.ninguna = ninguna
+
+    def cumple(self, aciertos):
+        """Evalúa la condición con la máscara de palabras encontradas en un ticket"""
+        return ((not self.cualquiera or aciertos & self.cualquiera)
+                and aciertos & self.todas == self.todas
+                and not aciertos & self.ninguna)
+
+    def cumple_lote(self, aciertos):
+        """
+        Evalúa la condición para un lote de tickets a la vez.
+
+        Args:
+            aciertos: Matriz uint64 (tickets x palabras de 64 bits) con las palabras encontradas
+
+        Returns:
+            Arreglo booleano con los tickets que cumplen
+        """
+        if not self.cualquiera and not self.todas:
+            # Sin palabras que la disparen la regla nunca es candidata
+            return np.zeros(len(aciertos), dtype=bool)
+        columnas = aciertos.shape[1]
+        todas = np.array(_a_palabras_64(self.todas, columnas), dtype=np.uint64)
+        ninguna = np.array(_a_palabras_64(self.ninguna, columnas), dtype=np.uint64)
+        cumple = ((aciertos & todas) == todas).all(axis=1) & ~(aciertos & ninguna).any(axis=1)
+        if self.cualquiera:
+            cualquiera = np.array(_a_palabras_64(self.cualquiera, columnas), dtype=np.uint64)
+            cumple &= (aciertos & cualquiera).any(axis=1)
+        return cumple
+
+
+def _con_aproximada(condicion, aciertos, aproximada):
+    """
+    Máscara con 'alguna palabra clave' cumplida si la regla coincidió por una palabra con errores
+    o con la misma raíz (esas palabras no tienen bit). Solo se prenden las palabras clave que no son
+    también requeridas ni excluidas: esas se siguen comparando exactas.
+    """
+    if not aproximada:
+        return aciertos
+    return aciertos | (condicion.cualquiera & ~(condicion.todas | condicion.ninguna))
+
+
+def _aproximadas(difuso, raices, texto):
+    """Reglas que coinciden con el texto por una palabra clave con errores de tipeo o por raíz"""
+    encontradas = difuso.lookup(texto) if difuso else set()
+    if raices:
+        encontradas |= raices.lookup(texto)
+    return encontradas
+
+
+class _Nodo:
+    """Nodo del trie de palabras clave"""
+    __slots__ = ('hijos', 'reglas', 'usos')
+
+    def __init__(self):
+        self.hijos = {}
+        self.reglas = set()  # IDs de las reglas candidatas cuando aparece la palabra que termina aquí
+        self.usos = 0  # Cuántas condiciones de reglas compuestas usan esta palabra
+
+
+class RuleMatcher:
+    """
+    Índice de palabras clave (trie) para reglas de clasificación.
+    Conserva la semántica del motor: gana la primera regla activa (en orden de la lista)
+    que tenga alguna palabra clave contenida en el texto.
+    Las reglas compuestas además exigen todas sus palabras requeridas y ninguna excluida:
+    cada palabra de esas condiciones tiene un bit y las palabras encontradas en un ticket
+    forman una máscara (ver _Condicion).
+
+    Las reglas limitadas a áreas no entran al trie general: cada área tiene su propio índice
+    (tabla de despacho área -> reglas) y un ticket solo recorre el general y el de su área.
+
+    Una regla con 'difuso' = 1 o 2 también es candidata cuando el ticket tiene una palabra a esa
+    distancia de edición de alguna de sus palabras clave (solo palabras clave; las requeridas y
+    excluidas se comparan exactas). Con 'raices' sus palabras clave sueltas no van al trie sino al
+    índice de raíces: coinciden las palabras del ticket con la misma raíz ('lentas' con 'lento').
+
+    Agregar, editar, activar o eliminar una regla solo toca los nodos de sus
+    palabras clave, así el costo depende del tamaño de la regla y no de cuántas reglas hay.
+    """
+
+    def __init__(self, reglas=None, areas=None):
+        """
+        Inicializa el índice.
+
+        Args:
+            reglas: Lista inicial de reglas (diccionarios con id_regla y palabras_clave)
+            areas: Catálogo de áreas de AreasManager, para resolver áreas por ID o por nombre
+        """
+        self._lock = threading.RLock()
+        self._alias_areas = alias_areas(areas)
+        self.rebuild(reglas or [])
+
+    def rebuild(self, reglas):
+        """Reconstruye el índice completo (carga inicial o recarga del archivo)"""
+        with self._lock:
+            self._raiz = _Nodo()
+            self._reglas = {}  # id_regla -> regla
+            self._orden = {}  # id_regla -> posición (solo crece, no hay que desplazar al eliminar)
+            self._siguiente = 0
+            self._bits = {}  # palabra de condición -> máscara de un bit (solo crece)
+            self._condiciones = {}  # id_regla -> _Condicion (solo reglas compuestas activas)
+            self._por_area = {}  # id_area -> RuleMatcher con las reglas de esa área
+            self._difuso = FuzzyIndex()  # Palabras clave de las reglas que toleran errores de tipeo
+            self._raices = StemIndex()  # Raíces de las palabras clave de las reglas que usan raíces
+            for regla in reglas:
+                self.add_rule(regla)
+
+    def set_areas(self, areas):
+        """Cambia el catálogo de áreas (por ejemplo, al renombrar un área) y reconstruye el índice"""
+        with self._lock:
+            self._alias_areas = alias_areas(areas)
+            self.rebuild([self._reglas[i] for i in sorted(self._orden, key=self._orden.__getitem__)])
+
+    def area_key(self, area):
+        """ID del área (o su nombre normalizado si no está en el catálogo)"""
+        clave = normalizar_area(area)
+        return self._alias_areas.get(clave, clave)
+
+    def _areas_regla(self, regla):
+        """Áreas a las que se limita la regla (vacío = todas)"""
+        return {self.area_key(area) for area in regla.get('areas') or [] if normalizar_area(area)}
+
+    def _nodo(self, palabra):
+        """Nodo de la palabra en el trie (se crea si no existe)"""
+        nodo = self._raiz
+        for caracter in palabra:
+            siguiente = nodo.hijos.get(caracter)
+            if siguiente is None:
+                siguiente = nodo.hijos[caracter] = _Nodo()
+            nodo = siguiente
+        return nodo
+
+    def _bit(self, palabra):
+        """Máscara de un bit de la palabra (se asigna la primera vez)"""
+        bit = self._bits.get(palabra)
+        if bit is None:
+            bit = self._bits[palabra] = 1 << len(self._bits)
+        return bit
+
+    def _mascara(self, palabras):
+        """OR de los bits de varias palabras"""
+        mascara = 0
+        for palabra in palabras:
+            mascara |= self._bit(palabra)
+        return mascara
+
+    def _indexar(self, id_regla, regla):
+        """Agrega las palabras de la regla al trie (y su condición si es compuesta)"""
+        areas = self._areas_regla(regla)
+        if areas:
+            # Va al índice de cada una de sus áreas, con la misma posición en el orden
+            general = {campo: valor for campo, valor in regla.items() if campo != 'areas'}
+            for area in areas:
+                indice = self._por_area.get(area)
+                if indice is None:
+                    indice = self._por_area[area] = RuleMatcher()
+                indice.add_rule(general, posicion=self._orden[id_regla])
+            return
+        for palabra in _disparadoras(regla):
+            self._nodo(palabra).reglas.add(id_regla)
+        if regla.get('difuso'):
+            for palabra in _palabras(regla):
+                self._difuso.add(palabra, id_regla, regla['difuso'])
+        for palabra in palabras_por_raiz(regla):
+            self._raices.add(palabra, id_regla)
+        if es_compuesta(regla):
+            for palabra in _condicionales(regla):
+                self._nodo(palabra).usos += 1
+            self._condiciones[id_regla] = _Condicion(
+                self._mascara(_palabras(regla)),
+                self._mascara(_palabras(regla, 'palabras_requeridas')),
+                self._mascara(_palabras(regla, 'palabras_excluidas'))
+            )
+
+    def _podar(self, palabra, id_regla=None, usos=0):
+        """Quita la regla (o usos) del nodo de la palabra y poda los nodos vacíos"""
+        camino = [self._raiz]
+        for caracter in palabra:
+            nodo = camino[-1].hijos.get(caracter)
+            if nodo is None:
+                return
+            camino.append(nodo)
+        camino[-1].reglas.discard(id_regla)
+        camino[-1].usos -= usos
+        # Podar desde la hoja hacia arriba
+        for i in range(len(palabra), 0, -1):
+            nodo = camino[i]
+            if nodo.reglas or nodo.hijos or nodo.usos:
+                break
+            del camino[i - 1].hijos[palabra[i - 1]]
+
+    def _desindexar(self, id_regla, regla):
+        """Quita las palabras de la regla del trie y poda los nodos vacíos"""
+        areas = self._areas_regla(regla)
+        if areas:
+            for area in areas:
+                indice = self._por_area.get(area)
+                if indice is not None:
+                    indice.remove_rule(id_regla)
+                    if not indice._reglas:
+                        del self._por_area[area]
+            return
+        for palabra in _disparadoras(regla):
+            self._podar(palabra, id_regla=id_regla)
+        if regla.get('difuso'):
+            for palabra in _palabras(regla):
+                self._difuso.remove(palabra, id_regla)
+        for palabra in palabras_por_raiz(regla):
+            self._raices.remove(palabra, id_regla)
+        if self._condiciones.pop(id_regla, None) is not None:
+            for palabra in _condicionales(regla):
+                self._podar(palabra, usos=1)
+
+    def add_rule(self, regla, posicion=None):
+        """
+        Agrega una regla al final del orden.
+
+        Args:
+            regla: Diccionario de la regla
+            posicion: Posición en el orden (la usan los índices por área para seguir al general)
+        """
+        with self._lock:
+            id_regla = regla.get('id_regla')
+            if id_regla in self._reglas:
+                self.update_rule(regla)
+                return
+            self._reglas[id_regla] = dict(regla)
+            self._orden[id_regla] = self._siguiente if posicion is None else posicion
+            self._siguiente = max(self._siguiente, self._orden[id_regla]) + 1
+            if regla.get('activa', True):
+                self._indexar(id_regla, regla)
+
+    def update_rule(self, regla):
+        """Reemplaza una regla manteniendo su posición"""
+        with self._lock:
+            id_regla = regla.get('id_regla')
+            anterior = self._reglas.get(id_regla)
+            if anterior is None:
+                self.add_rule(regla)
+                return
+            if anterior.get('activa', True):
+                self._desindexar(id_regla, anterior)
+            self._reglas[id_regla] = dict(regla)
+            if regla.get('activa', True):
+                self._indexar(id_regla, regla)
+
+    def remove_rule(self, id_regla):
+        """Elimina una regla del índice"""
+        with self._lock:
+            regla = self._reglas.pop(id_regla, None)
+            if regla is None:
+                return
+            del self._orden[id_regla]
+            if regla.get('activa', True):
+                self._desindexar(id_regla, regla)
+
+    def aplicar_evento(self, evento):
+        """
+        Aplica un evento de cambio emitido por RulesManager.subscribe.
+
+        Args:
+            evento: Diccionario con 'evento' (add, update, toggle, delete o reload),
+                    'id_regla', 'regla' y 'anterior' ('reglas' en reload)
+        """
+        tipo = evento.get('evento')
+        if tipo == 'add':
+            self.add_rule(evento['regla'])
+        elif tipo in ('update', 'toggle'):
+            self.update_rule(evento['regla'])
+        elif tipo == 'delete':
+            self.remove_rule(evento['id_regla'])
+        elif tipo == 'reload':
+            self.rebuild(evento.get('reglas', []))
+
+    def match(self, texto, area=None):
+        """
+        Busca la primera regla activa que coincide con el texto.
+
+        Args:
+            texto: Texto del ticket (ya en minúsculas)
+            area: Área del cliente, por ID o por nombre (también se evalúan las reglas de esa área)
+
+        Returns:
+            La regla que coincide, o None si ninguna coincide
+        """
+        with self._lock:
+            regla = self._match_general(texto)
+            indice = self._por_area.get(self.area_key(area)) if self._por_area and area else None
+            if indice is not None:
+                del_area = indice._match_general(texto)
+                if del_area is not None and (regla is None or self._orden[del_area['id_regla']] <
+                                             self._orden[regla['id_regla']]):
+                    regla = self._reglas[del_area['id_regla']]
+            return regla
+
+    def _match_general(self, texto):
+        """Primera regla del trie general (sin las reglas de áreas)"""
+        with self._lock:
+            raiz = self._raiz
+            candidatas = set(raiz.reglas)
+            compuestas = bool(self._condiciones)
+            aciertos = self._bits.get('', 0) if compuestas and raiz.usos else 0
+            for inicio in range(len(texto)):
+                nodo = raiz.hijos.get(texto[inicio])
+                posicion = inicio + 1
+                while nodo is not None:
+                    if nodo.reglas:
+                        candidatas.update(nodo.reglas)
+                    if compuestas and nodo.usos:
+                        aciertos |= self._bits[texto[inicio:posicion]]
+                    if posicion >= len(texto):
+                        break
+                    nodo = nodo.hijos.get(texto[posicion])
+                    posicion += 1
+            aproximadas = _aproximadas(self._difuso, self._raices, texto)
+            candidatas.update(aproximadas)
+            if not candidatas:
+                return None
+            if not compuestas:
+                return self._reglas[min(candidatas, key=self._orden.__getitem__)]
+            # Gana la primera candidata cuya condición se cumple
+            for id_regla in sorted(candidatas, key=self._orden.__getitem__):
+                condicion = self._condiciones.get(id_regla)
+                if condicion is None or condicion.cumple(
+                        _con_aproximada(condicion, aciertos, id_regla in aproximadas)):
+                    return self._reglas[id_regla]
+            return None
+
+    def keywords_in(self, texto):
+        """
+        Busca todas las palabras clave contenidas en el texto (no solo la ganadora).
+
+        Args:
+            texto: Texto en minúsculas
+
+        Returns:
+            Diccionario {palabra clave: conjunto de IDs de reglas que la tienen}
+        """
+        with self._lock:
+            encontradas = {}
+            if self._raiz.reglas:
+                encontradas[''] = set(self._raiz.reglas)
+            for inicio in range(len(texto)):
+                nodo = self._raiz.hijos.get(texto[inicio])
+                posicion = inicio + 1
+                while nodo is not None:
+                    if nodo.reglas:
+                        encontradas.setdefault(texto[inicio:posicion], set()).update(nodo.reglas)
+                    if posicion >= len(texto):
+                        break
+                    nodo = nodo.hijos.get(texto[posicion])
+                    posicion += 1
+            return encontradas
+
+    def position(self, id_regla):
+        """Posición de la regla en el orden de evaluación (menor gana)"""
+        with self._lock:
+            return self._orden[id_regla]
+
+    def get_active_rules(self):
+        """Reglas activas en orden de prioridad de evaluación"""
+        with self._lock:
+            return [self._reglas[i] for i in sorted(self._orden, key=self._orden.__getitem__)
+                    if self._reglas[i].get('activa', True)]
+
+    def compiled(self):
+        """
+        Retorna una copia congelada del índice compilada a una sola expresión regular
+        con forma de trie. Sirve para clasificar muchos textos seguidos (el recorrido
+        lo hace el motor de expresiones regulares en C); no se actualiza con los eventos.
+        """
+        with self._lock:
+            por_area = {area: indice.compiled() for area, indice in self._por_area.items()}
+            return CompiledMatcher(self._raiz, self._reglas, self._orden, self._bits, self._condiciones,
+                                   por_area, self._alias_areas, self._difuso.copy(), self._raices.copy())
+
+
+class CompiledMatcher:
+    """
+    Versión de solo lectura de RuleMatcher para clasificar en lote.
+    En cada posición del texto la expresión encuentra la palabra clave más larga que empieza ahí;
+    las palabras más cortas en esa posición son prefijos de ella, así que por cada palabra
+    se precalcula la regla simple de menor orden entre ella y sus prefijos, y también las reglas
+    compuestas candidatas y la máscara de bits de esos prefijos.
+    """
+
+    def __init__(self, raiz, reglas, orden, bits=None, condiciones=None, por_area=None, alias=None,
+                 difuso=None, raices=None):
+        self._reglas = dict(reglas)
+        self._orden = dict(orden)
+        self._bits = dict(bits or {})
+        self._condiciones = dict(condiciones or {})
+        self._por_area = dict(por_area or {})  # id_area -> CompiledMatcher de las reglas del área
+        self._alias_areas = dict(alias or {})
+        self._difuso = difuso or FuzzyIndex()
+        self._raices = raices or StemIndex()
+        self._mejor = {}  # palabra -> id de la regla simple ganadora entre ella y sus prefijos
+        self._compuestas = {}  # palabra -> reglas compuestas candidatas entre ella y sus prefijos
+        self._aciertos = {}  # palabra -> máscara de las palabras de condición entre ella y sus prefijos
+        simples = [i for i in raiz.reglas if i not in self._condiciones]
+        self._siempre = self._menor(simples, orden)  # Palabra clave vacía: coincide siempre
+        self._compuestas_raiz = tuple(i for i in raiz.reglas if i in self._condiciones)
+        self._aciertos_raiz = self._bits.get('', 0) if raiz.usos else 0
+        self._recorrer(raiz, orden)
+        patron = self._patron(raiz, raiz=True)
+        self._regex = re.compile(f"(?=({patron}))") if patron else None
+
+    @staticmethod
+    def _menor(ids, orden, actual=None):
+        """ID con menor orden entre ids y actual"""
+        for id_regla in ids:
+            if actual is None or orden[id_regla] < orden[actual]:
+                actual = id_regla
+        return actual
+
+    def _recorrer(self, raiz, orden):
+        """Precalcula lo que aporta cada palabra con sus prefijos (recorrido en profundidad)"""
+        pila = [(raiz, '', self._siempre, self._compuestas_raiz, self._aciertos_raiz)]
+        while pila:
+            nodo, prefijo, mejor, compuestas, aciertos = pila.pop()
+            if prefijo and (nodo.reglas or nodo.usos):
+                if nodo.reglas:
+                    mejor = self._menor([i for i in nodo.reglas if i not in self._condiciones], orden, mejor)
+                    nuevas = tuple(i for i in nodo.reglas if i in self._condiciones)
+                    if nuevas:
+                        compuestas = compuestas + nuevas
+                if nodo.usos:
+                    aciertos |= self._bits[prefijo]
+                if mejor is not None:
+                    self._mejor[prefijo] = mejor
+                if compuestas:
+                    self._compuestas[prefijo] = compuestas
+                if aciertos:
+                    self._aciertos[prefijo] = aciertos
+            for caracter, hijo in nodo.hijos.items():
+                pila.append((hijo, prefijo + caracter, mejor, compuestas, aciertos))
+
+    def _patron(self, nodo, raiz=False):
+        """Expresión regular equivalente al subárbol (las ramas más largas se prueban primero)"""
+        alternativas = [re.escape(caracter) + self._patron(hijo) for caracter, hijo in nodo.hijos.items()]
+        if not alternativas:
+            return ''
+        grupo = alternativas[0] if len(alternativas) == 1 else '(?:' + '|'.join(alternativas) + ')'
+        # Si aquí termina una palabra, seguir bajando es opcional
+        return f"(?:{grupo})?" if (nodo.reglas or nodo.usos) and not raiz else grupo
+
+    def _recorrer_texto(self, texto):
+        """
+        Recorre el texto una vez.
+
+        Returns:
+            Tupla (regla simple ganadora, reglas compuestas candidatas, máscara de palabras encontradas,
+                   reglas compuestas encontradas por una palabra clave con errores o por raíz)
+        """
+        mejor = self._siempre
+        compuestas = set(self._compuestas_raiz)
+        aciertos = self._aciertos_raiz
+        if self._regex is not None:
+            for coincidencia in self._regex.finditer(texto):
+                palabra = coincidencia.group(1)
+                candidata = self._mejor.get(palabra)
+                if candidata is not None and (mejor is None or self._orden[candidata] < self._orden[mejor]):
+                    mejor = candidata
+                if self._condiciones:
+                    compuestas.update(self._compuestas.get(palabra, ()))
+                    aciertos |= self._aciertos.get(palabra, 0)
+        aproximadas = set()
+        for id_regla in _aproximadas(self._difuso, self._raices, texto):
+            if id_regla in self._condiciones:
+                aproximadas.add(id_regla)
+            elif mejor is None or self._orden[id_regla] < self._orden[mejor]:
+                mejor = id_regla
+        compuestas |= aproximadas
+        return mejor, compuestas, aciertos, aproximadas
+
+    def area_key(self, area):
+        """Igual que RuleMatcher.area_key"""
+        clave = normalizar_area(area)
+        return self._alias_areas.get(clave, clave)
+
+    def _primera(self, regla, otra):
+        """La regla de menor orden entre dos (cualquiera puede ser None)"""
+        if otra is None or (regla is not None and self._orden[regla['id_regla']] <= self._orden[otra['id_regla']]):
+            return regla
+        return self._reglas[otra['id_regla']]
+
+    def match(self, texto, area=None):
+        """Igual que RuleMatcher.match"""
+        mejor, compuestas, aciertos, aproximadas = self._recorrer_texto(texto)
+        for id_regla in compuestas:
+            condicion = self._condiciones[id_regla]
+            if ((mejor is None or self._orden[id_regla] < self._orden[mejor])
+                    and condicion.cumple(_con_aproximada(condicion, aciertos, id_regla in aproximadas))):
+                mejor = id_regla
+        regla = self._reglas[mejor] if mejor is not None else None
+        indice = self._por_area.get(self.area_key(area)) if self._por_area and area else None
+        return self._primera(regla, indice.match(texto)) if indice is not None else regla
+
+    def match_many(self, textos, areas=None):
+        """
+        Clasifica un lote de textos. Las reglas simples se resuelven con el índice y cada regla
+        compuesta se evalúa una sola vez para todo el lote con operaciones de bits de NumPy.
+        Los textos se agrupan por área y cada grupo se evalúa además con el índice de su área.
+
+        Args:
+            textos: Lista de textos en minúsculas
+            areas: Lista de áreas de cada texto (o None)
+
+        Returns:
+            Lista con la regla que coincide con cada texto (o None)
+        """
+        resultado = self._match_many_general(textos)
+        if areas is None or not self._por_area:
+            return resultado
+        grupos = {}
+        for i, area in enumerate(areas):
+            clave = self.area_key(area)
+            if clave in self._por_area:
+                grupos.setdefault(clave, []).append(i)
+        for clave, posiciones in grupos.items():
+            del_area = self._por_area[clave].match_many([textos[i] for i in posiciones])
+            for i, regla in zip(posiciones, del_area):
+                resultado[i] = self._primera(resultado[i], regla)
+        return resultado
+
+    def _match_many_general(self, textos):
+        """match_many con el índice general (sin las reglas de áreas)"""
+        if not self._condiciones:
+            return [self.match(texto) for texto in textos]
+
+        sin_regla = max(self._orden.values(), default=0) + 1  # Posición mayor que todas
+        mejores = [sin_regla] * len(textos)
+        mascaras = [0] * len(textos)
+        filas_por_regla = {}  # regla compuesta -> textos en los que es candidata
+        aproximadas_por_regla = {}  # regla compuesta -> textos en los que coincidió por errores de tipeo o raíz
+        for i, texto in enumerate(textos):
+            mejor, compuestas, mascara, aproximadas = self._recorrer_texto(texto)
+            if mejor is not None:
+                mejores[i] = self._orden[mejor]
+            if compuestas:
+                mascaras[i] = mascara
+                for id_regla in compuestas:
+                    if id_regla in aproximadas:
+                        aproximadas_por_regla.setdefault(id_regla, []).append(i)
+                    else:
+                        filas_por_regla.setdefault(id_regla, []).append(i)
+
+        # Las reglas candidatas en muchos textos se evalúan con NumPy sobre esas filas;
+        # las demás, texto por texto con la máscara de Python
+        aciertos = None
+        masivas = {id_regla: filas for id_regla, filas in filas_por_regla.items() if len(filas) >= MIN_FILAS_LOTE}
+        if masivas:
+            columnas = -(-len(self._bits) // _BITS_PALABRA) or 1
+            aciertos = np.empty((len(textos), columnas), dtype=np.uint64)
+            for columna in range(columnas):
+                desplazamiento = _BITS_PALABRA * columna
+                aciertos[:, columna] = [(mascara >> desplazamiento) & _MASCARA_64 for mascara in mascaras]
+            mejores = np.array(mejores, dtype=np.int64)
+        for id_regla, filas in filas_por_regla.items():
+            posicion = self._orden[id_regla]
+            condicion = self._condiciones[id_regla]
+            if id_regla in masivas:
+                filas = np.array(filas, dtype=np.int64)
+                filas = filas[mejores[filas] > posicion]
+                mejores[filas[condicion.cumple_lote(aciertos[filas])]] = posicion
+            else:
+                for i in filas:
+                    if mejores[i] > posicion and condicion.cumple(mascaras[i]):
+                        mejores[i] = posicion
+        # Coincidencias con errores de tipeo o por raíz (pocas): una por una
+        for id_regla, filas in aproximadas_por_regla.items():
+            posicion = self._orden[id_regla]
+            condicion = self._condiciones[id_regla]
+            for i in filas:
+                if mejores[i] > posicion and condicion.cumple(_con_aproximada(condicion, mascaras[i], True)):
+                    mejores[i] = posicion
+
+        if aciertos is not None:
+            mejores = mejores.tolist()
+        por_orden = {posicion: self._reglas[id_regla] for id_regla, posicion in self._orden.items()}
+        return [por_orden.get(posicion) for posicion in mejores]
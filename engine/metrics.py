@@ -0,0 +1,215 @@
+# engine/metrics.py
+# Métricas del motor de clasificación: aciertos por regla, tickets sin clasificar y latencia
+# Cada hilo escribe en sus propios contadores (sin locks en el camino caliente) y se suman al leer
+
+import threading
+import weakref
+from bisect import bisect_left
+
+from engine.file_utils import escritura_atomica
+
+# Límites superiores (en segundos) de los buckets del histograma de latencia
+LIMITES_LATENCIA = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Archivo por defecto para el volcado en formato Prometheus (colector de archivos de texto)
+ARCHIVO_PROMETHEUS = 'knowledge/metricas_clasificacion.prom'
+
+# Etiquetas de resultado que no corresponden a una regla
+REGLA_SIN_CLASIFICAR = 'Sin clasificar'
+
+
+class _ContadoresHilo:
+    """Contadores de un solo hilo (solo ese hilo los modifica)"""
+    __slots__ = ('reglas', 'buckets', 'suma', 'cantidad')
+
+    def __init__(self, num_buckets):
+        self.reglas = {}  # etiqueta de la regla -> aciertos
+        self.buckets = [0] * num_buckets  # el último es +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def sumar(self, otros):
+        """Suma a estos contadores los de otro hilo"""
+        # dict() copia de forma atómica aunque el hilo dueño siga escribiendo
+        for regla, aciertos in dict(otros.reglas).items():
+            self.reglas[regla] = self.reglas.get(regla, 0) + aciertos
+        for i, valor in enumerate(list(otros.buckets)):
+            self.buckets[i] += valor
+        self.suma += otros.suma
+        self.cantidad += otros.cantidad
+
+
+class ClassificationMetrics:
+    """
+    Métricas de clasificación con contadores por hilo.
+    record() solo toca los contadores del hilo actual; snapshot() los suma.
+    Los contadores de los hilos que ya terminaron se pasan a un total común,
+    así un servidor que crea un hilo por pedido no acumula un contador por cada uno.
+    """
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        """
+        Inicializa las métricas.
+
+        Args:
+            limites: Límites superiores de los buckets de latencia, en segundos
+        """
+        self.limites = tuple(limites)
+        self._local = threading.local()
+        self._hilos = []  # (referencia débil al hilo, contadores) de los hilos vivos que registraron algo
+        self._terminados = _ContadoresHilo(len(self.limites) + 1)  # Suma de los hilos que ya terminaron
+        self._lock = threading.Lock()  # Solo para registrar un hilo nuevo, leer o reiniciar
+
+    def _contadores(self):
+        """Contadores del hilo actual (se crean la primera vez)"""
+        contadores = getattr(self._local, 'contadores', None)
+        if contadores is None:
+            contadores = _ContadoresHilo(len(self.limites) + 1)
+            with self._lock:
+                self._recoger_terminados()
+                self._hilos.append((weakref.ref(threading.current_thread()), contadores))
+            self._local.contadores = contadores
+        return contadores
+
+    def _recoger_terminados(self):
+        """Pasa al total común los contadores de los hilos que terminaron (con el lock tomado)"""
+        vivos = []
+        for hilo, contadores in self._hilos:
+            actual = hilo()
+            if actual is not None and actual.is_alive():
+                vivos.append((hilo, contadores))
+            else:
+                # Un hilo terminado ya no escribe: sus contadores se pueden sumar una sola vez
+                self._terminados.sumar(contadores)
+        self._hilos = vivos
+
+    def record(self, regla, segundos):
+        """
+        Registra una clasificación.
+
+        Args:
+            regla: Etiqueta de la regla aplicada (por ejemplo 'Regla: Problema de Red' o 'Sin clasificar')
+            segundos: Duración de la clasificación
+        """
+        contadores = self._contadores()
+        contadores.reglas[regla] = contadores.reglas.get(regla, 0) + 1
+        contadores.buckets[bisect_left(self.limites, segundos)] += 1
+        contadores.suma += segundos
+        contadores.cantidad += 1
+
+    def reset(self):
+        """Reinicia todos los contadores"""
+        with self._lock:
+            self._hilos = []
+            self._terminados = _ContadoresHilo(len(self.limites) + 1)
+            self._local = threading.local()
+
+    def snapshot(self):
+        """
+        Suma los contadores de todos los hilos.
+
+        Returns:
+            Diccionario con 'clasificaciones', 'sin_clasificar', 'por_regla' {regla: aciertos}
+            (de mayor a menor), 'buckets' [(límite, cantidad)] no acumulados, 'suma' y 'cantidad'
+        """
+        total = _ContadoresHilo(len(self.limites) + 1)
+        with self._lock:
+            self._recoger_terminados()
+            total.sumar(self._terminados)
+            hilos = [contadores for _, contadores in self._hilos]
+        for contadores in hilos:
+            total.sumar(contadores)
+
+        por_regla = total.reglas
+        return {
+            'clasificaciones': sum(por_regla.values()),
+            'sin_clasificar': por_regla.get(REGLA_SIN_CLASIFICAR, 0),
+            'por_regla': dict(sorted(por_regla.items(), key=lambda item: item[1], reverse=True)),
+            'buckets': list(zip(list(self.limites) + [float('inf')], total.buckets)),
+            'suma': total.suma,
+            'cantidad': total.cantidad
+        }
+
+    @staticmethod
+    def percentile(snapshot, q):
+        """
+        Percentil aproximado de latencia (límite superior del bucket donde cae).
+
+        Args:
+            snapshot: Resultado de snapshot()
+            q: Percentil entre 0 y 1
+
+        Returns:
+            Segundos, o None si no hay datos
+        """
+        if not snapshot['cantidad']:
+            return None
+        objetivo = q * snapshot['cantidad']
+        acumulado = 0
+        for limite, cantidad in snapshot['buckets']:
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return limite
+        return float('inf')
+
+    def to_prometheus(self):
+        """Métricas en formato de texto de Prometheus"""
+        datos = self.snapshot()
+        lineas = [
+            "# HELP ticket_classifications_total Tickets clasificados por el motor",
+            "# TYPE ticket_classifications_total counter",
+            f"ticket_classifications_total {datos['clasificaciones']}",
+            "# HELP ticket_unclassified_total Tickets sin regla aplicable (fallback)",
+            "# TYPE ticket_unclassified_total counter",
+            f"ticket_unclassified_total {datos['sin_clasificar']}",
+            "# HELP ticket_rule_hits_total Aciertos por regla",
+            "# TYPE ticket_rule_hits_total counter",
+        ]
+        for regla, aciertos in datos['por_regla'].items():
+            lineas.append(f'ticket_rule_hits_total{{regla="{_escapar(regla)}"}} {aciertos}')
+
+        lineas += [
+            "# HELP ticket_classification_seconds Duración de cada clasificación",
+            "# TYPE ticket_classification_seconds histogram",
+        ]
+        acumulado = 0
+        for limite, cantidad in datos['buckets']:
+            acumulado += cantidad
+            le = "+Inf" if limite == float('inf') else repr(limite)
+            lineas.append(f'ticket_classification_seconds_bucket{{le="{le}"}} {acumulado}')
+        lineas.append(f"ticket_classification_seconds_sum {datos['suma']}")
+        lineas.append(f"ticket_classification_seconds_count {datos['cantidad']}")
+        return "\n".join(lineas) + "\n"
+
+    def write_prometheus(self, ruta):
+        """
+        Escribe las métricas en un archivo de texto (reemplazo atómico, apto para node_exporter).
+
+        Args:
+            ruta: Archivo de destino
+
+        Returns:
+            True si se escribió exitosamente, False en caso contrario
+        """
+        try:
+            with escritura_atomica(ruta) as f:
+                f.write(self.to_prometheus())
+            return True
+        except Exception as e:
+            print(f"Error al escribir métricas: {e}")
+            return False
+
+
+def _escapar(texto):
+    """Escapa un valor de etiqueta de Prometheus"""
+    return str(texto).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Métricas del proceso (las comparten el motor y la interfaz)
+_metricas = ClassificationMetrics()
+
+
+def get_metrics():
+    """Retorna las métricas de clasificación del proceso"""
+    return _metricas
@@ -0,0 +1,165 @@
+# engine/reclassifier.py
+# Reclasificación acotada de los tickets guardados después de editar reglas
+# Compara las reglas de antes y de después de la edición: las palabras clave agregadas o quitadas
+# (todas las de la regla si se agregó, se eliminó o le cambió una condición) se buscan en el índice
+# de texto, sin recorrer los contenidos, y se suman los tickets asignados hoy a una regla cambiada.
+# Solo ese subconjunto se vuelve a clasificar y los cambios se guardan en un lote. El resto conserva
+# su clasificación y, si estaba al día con las reglas de antes, queda marcado con la versión nueva.
+
+import time
+
+import numpy as np
+
+from engine.areas_manager import get_areas_manager
+from engine.classification_engine import clasificar_contenido, resultado_regla_personalizada, version_reglas
+from engine.fallback_model import get_fallback_model
+from engine.fuzzy_index import distancia_permitida
+from engine.matcher import RuleMatcher, palabras_por_raiz
+from engine.ticket_store import get_search_index
+
+# Condiciones de una regla además de sus palabras clave: si cambia alguna, cualquier ticket
+# con una palabra clave de la regla puede cambiar
+CAMPOS_CONDICION = ('palabras_requeridas', 'palabras_excluidas', 'areas', 'difuso', 'raices')
+
+# Campos guardados de la clasificación (si ninguno cambia, el ticket solo se marca con la versión nueva)
+CAMPOS_CLASIFICACION = ('regla', 'tipo', 'prioridad', 'asignado_a', 'confianza')
+
+
+def _activas(reglas):
+    """Reglas activas por ID, en el orden de evaluación"""
+    return {regla.get('id_regla'): regla for regla in reglas if regla.get('activa', True)}
+
+
+def _disparadoras(regla):
+    """Palabras (en minúsculas) sin las cuales la regla no coincide: las clave, o las requeridas si no tiene"""
+    claves = {str(palabra).lower() for palabra in regla.get('palabras_clave') or []}
+    return claves or {str(palabra).lower() for palabra in regla.get('palabras_requeridas') or []}
+
+
+def rule_impact(antes, despues):
+    """
+    Calcula qué puede cambiar con una edición de reglas personalizadas.
+
+    Args:
+        antes: Reglas personalizadas antes de la edición
+        despues: Reglas personalizadas después de la edición
+
+    Returns:
+        Diccionario con 'todos' (True si cambió el orden de las reglas: puede cambiar cualquier ticket),
+        'palabras' (se buscan como subcadenas), 'difusas' (palabra -> errores tolerados),
+        'raices' (se comparan por raíz) y 'etiquetas' (valor de 'regla' de los tickets asignados
+        a una regla cambiada)
+    """
+    actuales, nuevas = _activas(antes), _activas(despues)
+    alcance = {'todos': False, 'palabras': set(), 'difusas': {}, 'raices': set(), 'etiquetas': set()}
+    if [i for i in actuales if i in nuevas] != [i for i in nuevas if i in actuales]:
+        alcance['todos'] = True
+        return alcance
+
+    for id_regla in list(actuales) + [i for i in nuevas if i not in actuales]:
+        anterior, nueva = actuales.get(id_regla), nuevas.get(id_regla)
+        if anterior == nueva:
+            continue
+        if anterior is not None:
+            alcance['etiquetas'].add(resultado_regla_personalizada(anterior)['regla'])
+        if anterior is not None and nueva is not None and all(anterior.get(campo) == nueva.get(campo)
+                                                              for campo in CAMPOS_CONDICION):
+            # Mismas condiciones: un ticket no asignado a la regla solo cambia si tiene una palabra nueva
+            # (las quitadas se suman para no depender de eso)
+            cambiadas = _disparadoras(anterior) ^ _disparadoras(nueva)
+        else:
+            cambiadas = set().union(*(_disparadoras(regla) for regla in (anterior, nueva) if regla is not None))
+
+        for regla in (anterior, nueva):
+            if regla is None:
+                continue
+            por_raiz = palabras_por_raiz(regla)
+            for palabra in cambiadas & _disparadoras(regla):
+                if palabra in por_raiz:
+                    alcance['raices'].add(palabra)
+                    continue
+                alcance['palabras'].add(palabra)
+                distancia = distancia_permitida(palabra, regla.get('difuso') or 0)
+                if distancia > alcance['difusas'].get(palabra, 0):
+                    alcance['difusas'][palabra] = distancia
+    return alcance
+
+
+def affected_tickets(tickets, indice, alcance):
+    """
+    Posiciones de los tickets guardados cuya clasificación puede cambiar (puede haber de más, nunca de menos).
+
+    Args:
+        tickets: Lista de tickets del almacén
+        indice: TicketSearchIndex al día con esos tickets
+        alcance: Resultado de rule_impact
+
+    Returns:
+        Arreglo ordenado de posiciones
+    """
+    todos = np.arange(len(tickets))
+    if alcance['todos']:
+        return todos
+    listas = []
+    for palabra in alcance['palabras']:
+        docs = indice.containing(palabra)
+        if docs is None:
+            return todos  # Palabra clave sin letras ni números: no se puede buscar en el índice
+        listas.append(docs)
+    for palabra, distancia in alcance['difusas'].items():
+        listas.append(indice.similar_to(palabra, distancia))
+    for palabra in alcance['raices']:
+        listas.append(indice.with_stem(palabra))
+    if alcance['etiquetas']:
+        listas.append(np.array([posicion for posicion, ticket in enumerate(tickets)
+                                if ticket.get('regla') in alcance['etiquetas']], dtype=np.int64))
+    if not listas:
+        return todos[:0]
+    posiciones = np.unique(np.concatenate(listas))
+    return posiciones[posiciones < len(tickets)]
+
+
+def reclassify_after_edit(store, antes, despues, indice=None):
+    """
+    Reclasifica los tickets guardados que una edición de reglas pudo cambiar y guarda los cambios
+    en una sola escritura. Los que no cambian se marcan con la versión nueva de las reglas
+    (los candidatos, y los demás si se habían clasificado con las reglas de antes).
+
+    Args:
+        store: TicketStore con los tickets procesados
+        antes: Copia de las reglas personalizadas antes de la edición
+        despues: Reglas personalizadas después de la edición
+        indice: TicketSearchIndex del almacén (por defecto el compartido, ver get_search_index)
+
+    Returns:
+        Diccionario con 'candidatos', 'reclasificados', 'confirmados' y 'segundos', o None si no se pudo guardar
+    """
+    inicio = time.perf_counter()
+    version_antes, version_nueva = version_reglas(antes), version_reglas(despues)
+    tickets = store.get_all_tickets()
+    if indice is None:
+        indice = get_search_index(store.storage_file)
+    candidatos = affected_tickets(tickets, indice, rule_impact(antes, despues))
+
+    matcher = RuleMatcher(despues, areas=get_areas_manager().get_all_areas())
+    modelo = get_fallback_model()
+    resultados = {}
+    for posicion in candidatos.tolist():
+        ticket = tickets[posicion]
+        resultado = clasificar_contenido(str(ticket.get('contenido', '')).lower(), matcher,
+                                         area=ticket.get('area'), modelo=modelo)
+        if any(resultado.get(campo) != ticket.get(campo) for campo in CAMPOS_CLASIFICACION):
+            resultados[posicion] = resultado
+
+    es_candidato = np.zeros(len(tickets), dtype=bool)
+    es_candidato[candidatos] = True
+    confirmados = [posicion for posicion, ticket in enumerate(tickets)
+                   if es_candidato[posicion] or ticket.get('version_reglas') == version_antes]
+    if not store.update_classifications(resultados, version_nueva, confirmados):
+        return None
+    return {
+        'candidatos': int(len(candidatos)),
+        'reclasificados': len(resultados),
+        'confirmados': len(confirmados) - len(resultados),
+        'segundos': round(time.perf_counter() - inicio, 3),
+    }
@@ -0,0 +1,287 @@
+# engine/replay.py
+# Simulación "qué pasaría si": reclasifica los tickets históricos con un borrador de reglas
+# y compara el resultado con las reglas actuales, sin crear un motor experta por ticket
+
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine.classification_engine import (REGLAS_BASE, RESULTADO_VACIO, RESULTADO_SIN_CLASIFICAR,
+                                          resultado_regla_personalizada, resultado_regla_base, resultado_modelo)
+from engine.fallback_model import get_fallback_model
+from engine.fuzzy_index import FuzzyIndex
+from engine.matcher import RuleMatcher, palabras_por_raiz
+from engine.stemmer import StemIndex
+from engine.areas_manager import get_areas_manager
+
+# Campos del resultado del motor y campos que se comparan en el diff
+CAMPOS_RESULTADO = ['regla', 'tipo', 'prioridad', 'asignado_a']
+CAMPOS_DIFF = ['tipo', 'prioridad', 'asignado_a']
+
+# Con menos textos distintos que esto no conviene repartir en procesos
+MIN_TEXTOS_PARALELO = 50000
+
+
+def draft_ruleset(reglas, regla_editada):
+    """
+    Arma un borrador de reglas reemplazando (o agregando al final) una regla, sin guardar nada.
+
+    Args:
+        reglas: Lista actual de reglas
+        regla_editada: Regla con los cambios (se identifica por id_regla)
+
+    Returns:
+        Nueva lista de reglas
+    """
+    borrador = []
+    reemplazada = False
+    for regla in reglas:
+        if regla.get('id_regla') == regla_editada.get('id_regla'):
+            borrador.append(regla_editada)
+            reemplazada = True
+        else:
+            borrador.append(regla)
+    if not reemplazada:
+        borrador.append(regla_editada)
+    return borrador
+
+
+def _indice_combinado(reglas, catalogo_areas=None):
+    """
+    Arma un solo índice compilado con las reglas personalizadas seguidas de las reglas base.
+    Como las personalizadas tienen precedencia, la primera coincidencia de este índice es
+    la misma que da clasificar_contenido; así cada texto se recorre una sola vez.
+
+    Returns:
+        Tupla (CompiledMatcher, lista de resultados como tuplas, {clave de regla: posición en la lista})
+    """
+    combinadas = []
+    resultados = [tuple(RESULTADO_VACIO[c] for c in CAMPOS_RESULTADO),
+                  tuple(RESULTADO_SIN_CLASIFICAR[c] for c in CAMPOS_RESULTADO)]
+    posiciones = {}
+    for origen, lista, resultado in (('personalizada', reglas, resultado_regla_personalizada),
+                                     ('base', REGLAS_BASE, resultado_regla_base)):
+        for regla in lista:
+            clave = (origen, regla.get('id_regla'))
+            combinadas.append({**regla, 'id_regla': clave})
+            posiciones[clave] = len(resultados)
+            datos = resultado(regla)
+            resultados.append(tuple(datos[c] for c in CAMPOS_RESULTADO))
+    return RuleMatcher(combinadas, areas=catalogo_areas).compiled(), resultados, posiciones
+
+
+def _clasificar_lote(reglas, textos, areas=None, catalogo_areas=None, modelo=None):
+    """
+    Clasifica una lista de textos en minúsculas (trabajo de un proceso).
+    Las reglas compuestas se evalúan para todo el lote a la vez (CompiledMatcher.match_many)
+    y, como en el motor, los textos sin regla los decide el modelo estadístico si está seguro.
+
+    Args:
+        reglas: Reglas personalizadas
+        textos: Textos en minúsculas
+        areas: Área de cada texto (solo si alguna regla tiene condición de área)
+        catalogo_areas: Áreas de AreasManager (para resolver las áreas de las reglas por ID o nombre)
+        modelo: FallbackClassifier para los textos sin regla (None: sin modelo)
+
+    Returns:
+        Tupla (resultados posibles como tuplas, posición del resultado de cada texto)
+    """
+    indice, resultados, posiciones = _indice_combinado(reglas, catalogo_areas)
+    codigos = np.zeros(len(textos), dtype=np.int32)  # 0 = contenido vacío
+    validos = [i for i, texto in enumerate(textos) if texto and not texto.isspace()]
+    encontradas = indice.match_many([textos[i] for i in validos],
+                                    [areas[i] for i in validos] if areas is not None else None)
+    for i, regla in zip(validos, encontradas):
+        codigos[i] = 1 if regla is None else posiciones[regla['id_regla']]
+
+    if modelo is not None:
+        # Una fila por clase del modelo, en su orden: todos los lotes comparten la misma tabla
+        por_clase = {clase: len(resultados) + numero for numero, clase in enumerate(modelo.clases)}
+        resultados = resultados + [tuple(resultado_modelo(clase, 0)[c] for c in CAMPOS_RESULTADO)
+                                   for clase in modelo.clases]
+        sin_regla = np.flatnonzero(codigos == 1)
+        for i, prediccion in zip(sin_regla, modelo.predict_many([textos[i] for i in sin_regla])):
+            if prediccion is not None:
+                codigos[i] = por_clase[prediccion[0]]
+    return resultados, codigos
+
+
+def _patron_afectados(reglas_actuales, reglas_borrador):
+    """
+    Función que detecta los textos cuya clasificación puede cambiar con el borrador:
+    los que contienen alguna palabra clave de una regla agregada, eliminada o modificada
+    (o una palabra a la distancia que tolera la regla, si es difusa, o con la misma raíz, si usa raíces).
+    Los demás textos coinciden con las mismas reglas sin cambios y en el mismo orden.
+
+    Returns:
+        Función texto -> bool, None si no hay cambios, o False si cambió el orden (hay que reclasificar todo)
+    """
+    actuales = {r.get('id_regla'): r for r in reglas_actuales}
+    borrador = {r.get('id_regla'): r for r in reglas_borrador}
+    comunes_actuales = [i for i in actuales if i in borrador]
+    comunes_borrador = [i for i in borrador if i in actuales]
+    if comunes_actuales != comunes_borrador:
+        return False
+
+    palabras = set()
+    difuso = FuzzyIndex()
+    raices = StemIndex()
+    for id_regla in set(actuales) | set(borrador):
+        antes, despues = actuales.get(id_regla), borrador.get(id_regla)
+        if antes != despues:
+            for regla in (antes, despues):
+                if regla is not None:
+                    # Una regla solo puede coincidir si aparece alguna palabra clave o requerida
+                    for campo in ('palabras_clave', 'palabras_requeridas'):
+                        palabras.update(str(p).lower() for p in regla.get(campo) or [])
+                    if regla.get('difuso'):
+                        for palabra in regla.get('palabras_clave') or []:
+                            difuso.add(str(palabra).lower(), id_regla, regla['difuso'])
+                    for palabra in palabras_por_raiz(regla):
+                        raices.add(palabra, id_regla)
+    if not palabras:
+        return None
+    if '' in palabras:
+        return False
+    patron = re.compile('|'.join(re.escape(p) for p in sorted(palabras, key=len, reverse=True)))
+    if not difuso and not raices:
+        return patron.search
+    return lambda texto: bool(patron.search(texto) or difuso.lookup(texto) or raices.lookup(texto))
+
+
+def _clasificar_textos(reglas, textos, procesos=1, areas=None):
+    """Clasifica textos distintos, en paralelo si son muchos. Retorna (DataFrame de resultados, códigos)."""
+    catalogo = get_areas_manager().get_all_areas() if areas is not None else None
+    modelo = get_fallback_model()
+    if procesos > 1 and len(textos) >= MIN_TEXTOS_PARALELO:
+        tamano = -(-len(textos) // procesos)
+        inicios = range(0, len(textos), tamano)
+        lotes = [textos[i:i + tamano] for i in inicios]
+        lotes_areas = [areas[i:i + tamano] for i in inicios] if areas is not None else [None] * len(lotes)
+        with ProcessPoolExecutor(max_workers=len(lotes)) as pool:
+            parciales = list(pool.map(_clasificar_lote, [reglas] * len(lotes), lotes, lotes_areas,
+                                      [catalogo] * len(lotes), [modelo] * len(lotes)))
+    else:
+        parciales = [_clasificar_lote(reglas, textos, areas, catalogo, modelo)]
+
+    # Todos los lotes usan la misma tabla de resultados (depende solo de las reglas y del modelo)
+    resultados = pd.DataFrame(parciales[0][0], columns=CAMPOS_RESULTADO)
+    return resultados, np.concatenate([codigos for _, codigos in parciales])
+
+
+def _usa_areas(*listas):
+    """True si alguna regla tiene condición de área (el resultado depende también del área)"""
+    return any(regla.get('areas') for reglas in listas for regla in reglas)
+
+
+def _textos_distintos(df, con_area=False):
+    """
+    Códigos de contenido por ticket y contenidos distintos en minúsculas.
+    Con con_area se distinguen los pares (contenido, área).
+
+    Returns:
+        Tupla (códigos por ticket, lista de textos, lista de áreas o None)
+    """
+    contenidos = df['contenido'].fillna('').astype(str)
+    if not con_area:
+        codigos_texto, unicos = pd.factorize(contenidos)
+        return codigos_texto, pd.Series(unicos, dtype=object).str.lower().tolist(), None
+    areas = df['area'].fillna('').astype(str) if 'area' in df.columns else pd.Series('', index=df.index)
+    codigos_texto, unicos = pd.factorize(pd.MultiIndex.from_arrays([contenidos, areas]))
+    textos = pd.Series(unicos.get_level_values(0), dtype=object).str.lower().tolist()
+    return codigos_texto, textos, list(unicos.get_level_values(1))
+
+
+def classify_tickets(df, reglas, procesos=1):
+    """
+    Clasifica todos los tickets de un DataFrame con un conjunto de reglas.
+    Cada contenido distinto se clasifica una sola vez y el resultado se reparte
+    a los tickets con códigos enteros.
+
+    Args:
+        df: DataFrame de tickets con la columna 'contenido'
+        reglas: Lista de reglas personalizadas (las reglas base se aplican después)
+        procesos: Procesos a usar si hay muchos contenidos distintos
+
+    Returns:
+        DataFrame con regla, tipo, prioridad y asignado_a por ticket (mismo índice que df)
+    """
+    codigos_texto, textos, areas = _textos_distintos(df, _usa_areas(reglas))
+    resultados, codigos = _clasificar_textos(reglas, textos, procesos, areas)
+    por_ticket = codigos[codigos_texto]
+    return pd.DataFrame({campo: resultados[campo].to_numpy()[por_ticket] for campo in CAMPOS_RESULTADO},
+                        index=df.index)
+
+
+def replay_diff(df, reglas_borrador, reglas_actuales, procesos=1, max_ejemplos=20):
+    """
+    Reclasifica los tickets con las reglas actuales y con el borrador y compara los resultados.
+
+    Args:
+        df: DataFrame de tickets (por ejemplo TicketStore().to_dataframe(), ya filtrado por fechas)
+        reglas_borrador: Lista de reglas con los cambios propuestos
+        reglas_actuales: Lista de reglas vigentes
+        procesos: Procesos a usar si hay muchos contenidos distintos
+        max_ejemplos: Cantidad máxima de tickets de ejemplo
+
+    Returns:
+        Diccionario con 'total', 'distintos' (contenidos distintos), 'cambiados',
+        'por_campo' {campo: tickets que cambian}, 'transiciones' {campo: DataFrame antes/después/cantidad},
+        'ejemplos' (DataFrame) y 'segundos'
+    """
+    inicio = time.perf_counter()
+    codigos_texto, textos, areas = _textos_distintos(df, _usa_areas(reglas_actuales, reglas_borrador))
+    pesos = np.bincount(codigos_texto[codigos_texto >= 0], minlength=len(textos))
+
+    # Se compara por contenido distinto (el resultado solo depende del texto) y se pondera por cantidad
+    tabla_antes, codigos_antes = _clasificar_textos(reglas_actuales, textos, procesos, areas)
+
+    # Con el borrador solo se reclasifican los textos que contienen palabras de reglas cambiadas
+    patron = _patron_afectados(reglas_actuales, reglas_borrador)
+    if patron is False:
+        tabla_despues, codigos_despues = _clasificar_textos(reglas_borrador, textos, procesos, areas)
+    else:
+        afectados = np.array([i for i, t in enumerate(textos) if patron(t)] if patron else [], dtype=np.int64)
+        tabla_parcial, codigos_parcial = _clasificar_textos(
+            reglas_borrador, [textos[i] for i in afectados], procesos,
+            [areas[i] for i in afectados] if areas is not None else None)
+        tabla_despues = pd.concat([tabla_antes, tabla_parcial], ignore_index=True)
+        codigos_despues = codigos_antes.copy()
+        codigos_despues[afectados] = codigos_parcial + len(tabla_antes)
+
+    cambia = np.zeros(len(textos), dtype=bool)
+    por_campo = {}
+    transiciones = {}
+    for campo in CAMPOS_DIFF:
+        antes = tabla_antes[campo].to_numpy()[codigos_antes]
+        despues = tabla_despues[campo].to_numpy()[codigos_despues]
+        distinto = antes != despues
+        cambia |= distinto
+        por_campo[campo] = int(pesos[distinto].sum())
+        transiciones[campo] = (
+            pd.DataFrame({'antes': antes[distinto], 'despues': despues[distinto], 'cantidad': pesos[distinto]})
+            .groupby(['antes', 'despues'], as_index=False)['cantidad'].sum()
+            .sort_values('cantidad', ascending=False, kind='stable')
+            .reset_index(drop=True)
+        )
+
+    # Ejemplos: primeros tickets cuyo contenido cambia de clasificación
+    filas = np.flatnonzero(cambia[codigos_texto])[:max_ejemplos]
+    ejemplos = df.iloc[filas][[c for c in ('id_ticket', 'fecha', 'contenido') if c in df.columns]].copy()
+    codigos_fila = codigos_texto[filas]
+    for campo in CAMPOS_RESULTADO:
+        ejemplos[f"{campo}_antes"] = tabla_antes[campo].to_numpy()[codigos_antes[codigos_fila]]
+        ejemplos[f"{campo}_despues"] = tabla_despues[campo].to_numpy()[codigos_despues[codigos_fila]]
+
+    return {
+        'total': len(df),
+        'distintos': len(textos),
+        'cambiados': int(pesos[cambia].sum()),
+        'por_campo': por_campo,
+        'transiciones': transiciones,
+        'ejemplos': ejemplos.reset_index(drop=True),
+        'segundos': time.perf_counter() - inicio
+    }
@@ -0,0 +1,184 @@
+# engine/report_jobs.py
+# Cola de trabajos en segundo plano para generar informes sin bloquear la interfaz
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Estados posibles de un trabajo
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+LISTO = "listo"
+ERROR = "error"
+
+
+def file_version(ruta, *otras):
+    """
+    Calcula una versión barata de un archivo de datos (fecha de modificación y tamaño).
+    Si el archivo cambia, cambia la versión y los informes en caché dejan de servir.
+
+    Args:
+        ruta: Ruta del archivo
+        otras: Otros archivos de los que salen los datos (por ejemplo, el índice del archivo frío);
+            la versión cambia si cambia cualquiera
+
+    Returns:
+        String con la versión, o "0" si el archivo no existe
+    """
+    if otras:
+        return "+".join(file_version(archivo) for archivo in (ruta, *otras))
+    try:
+        info = os.stat(ruta)
+        return f"{info.st_mtime_ns}-{info.st_size}"
+    except OSError:
+        return "0"
+
+
+class ReportJob:
+    """
+    Representa un informe solicitado.
+    Guarda los parámetros, el estado, la fase actual con su avance y el resultado final.
+    """
+
+    def __init__(self, clave, parametros):
+        self.clave = clave
+        self.parametros = parametros
+        self.estado = PENDIENTE
+        self.fase = "En cola"
+        self.avance = 0.0
+        self.resultado = None
+        self.error = None
+        self.fecha_solicitud = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.fecha_fin = None
+
+    def actualizar_progreso(self, fase, avance):
+        """Callback que recibe el generador para informar la fase y el avance (0 a 1)"""
+        self.fase = fase
+        self.avance = max(0.0, min(float(avance), 1.0))
+
+    def terminado(self):
+        """True si el trabajo ya no está en cola ni en proceso"""
+        return self.estado in (LISTO, ERROR)
+
+
+class ReportJobManager:
+    """
+    Ejecuta los informes en un pool de hilos y guarda los resultados en caché.
+    La clave de caché combina los parámetros del informe con la versión de los datos,
+    así dos solicitudes idénticas comparten el mismo trabajo (en curso o terminado).
+    """
+
+    def __init__(self, generador, max_workers=2, max_informes=20):
+        """
+        Inicializa el gestor de trabajos.
+
+        Args:
+            generador: Función generador(df, parametros, progreso) que devuelve el resultado
+            max_workers: Cantidad de informes que se generan a la vez
+            max_informes: Cantidad de trabajos que se mantienen en caché
+        """
+        self.generador = generador
+        self.max_informes = max_informes
+        self.trabajos = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="informe")
+
+    @staticmethod
+    def build_key(parametros, version_datos):
+        """
+        Calcula la clave de caché de una solicitud.
+
+        Args:
+            parametros: Diccionario con los parámetros del informe
+            version_datos: Versión de los datos de origen
+
+        Returns:
+            Hash hexadecimal de los parámetros y la versión
+        """
+        texto = json.dumps({'parametros': parametros, 'version_datos': version_datos},
+                           sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+    def submit(self, df, parametros, version_datos):
+        """
+        Encola un informe. Si ya existe un trabajo con la misma clave (en curso o listo)
+        se devuelve ese mismo trabajo en lugar de generar otro.
+
+        Args:
+            df: DataFrame con los tickets del informe
+            parametros: Diccionario con los parámetros del informe
+            version_datos: Versión de los datos de origen
+
+        Returns:
+            El ReportJob correspondiente
+        """
+        clave = self.build_key(parametros, version_datos)
+
+        with self._lock:
+            trabajo = self.trabajos.get(clave)
+            if trabajo is not None and trabajo.estado != ERROR:
+                self.trabajos.move_to_end(clave)
+                return trabajo
+
+            trabajo = ReportJob(clave, parametros)
+            self.trabajos[clave] = trabajo
+            self._limpiar_cache()
+
+        self._pool.submit(self._ejecutar, trabajo, df)
+        return trabajo
+
+    def get_job(self, clave):
+        """Busca un trabajo por su clave, None si no existe"""
+        with self._lock:
+            return self.trabajos.get(clave)
+
+    def get_jobs(self):
+        """Retorna todos los trabajos, del más reciente al más antiguo"""
+        with self._lock:
+            return list(reversed(self.trabajos.values()))
+
+    def discard(self, clave):
+        """
+        Quita un trabajo terminado de la caché.
+
+        Returns:
+            True si se quitó, False si no existe o sigue en proceso
+        """
+        with self._lock:
+            trabajo = self.trabajos.get(clave)
+            if trabajo is None or not trabajo.terminado():
+                return False
+            del self.trabajos[clave]
+            return True
+
+    def shutdown(self, wait=True):
+        """Detiene el pool de hilos"""
+        self._pool.shutdown(wait=wait)
+
+    def _limpiar_cache(self):
+        """Descarta los trabajos terminados más antiguos si se supera el máximo"""
+        sobrantes = len(self.trabajos) - self.max_informes
+        for clave in list(self.trabajos.keys()):
+            if sobrantes <= 0:
+                break
+            if self.trabajos[clave].terminado():
+                del self.trabajos[clave]
+                sobrantes -= 1
+
+    def _ejecutar(self, trabajo, df):
+        """Corre en un hilo del pool: genera el informe y actualiza el estado del trabajo"""
+        trabajo.estado = EN_PROCESO
+        try:
+            trabajo.resultado = self.generador(df, trabajo.parametros, trabajo.actualizar_progreso)
+            trabajo.actualizar_progreso("Listo", 1.0)
+            trabajo.estado = LISTO
+        except Exception as e:
+            print(f"Error al generar informe: {e}")
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        finally:
+            trabajo.fecha_fin = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
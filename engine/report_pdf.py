@@ -0,0 +1,375 @@
+# engine/report_pdf.py
+# Generación del informe ejecutivo en PDF (sin dependencias de Streamlit)
+# Lo usan la página de estadísticas, la cola de informes y la línea de comandos
+
+import os
+
+from engine.aggregation import count_dimensions, to_frame
+from reportlab.lib.pagesizes import letter # Tamaño carta
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.graphics.shapes import Drawing, String # Gráficos vectoriales nativos de reportlab
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.piecharts import Pie
+import io
+import gzip
+import tempfile
+import textwrap
+from xml.sax.saxutils import escape
+from reportlab.lib.styles import ParagraphStyle
+
+# Motores disponibles para dibujar los gráficos del informe
+MOTOR_VECTORIAL = "vectorial" # reportlab.graphics, sin kaleido ni navegador
+MOTOR_PLOTLY = "plotly"       # PNG rasterizado con plotly + kaleido (necesita chromium)
+
+# Paleta fija parecida a Viridis para los gráficos vectoriales
+PALETA_VECTORIAL = ["#440154", "#3b528b", "#21918c", "#5ec962", "#fde725",
+                    "#31688e", "#35b779", "#90d743", "#443983", "#287c8e"]
+
+
+def _grafico_vectorial(conteo, columna, categoria, tipo="barras"):
+    """
+    Dibuja un gráfico de barras o de pastel con reportlab.graphics a partir de los conteos.
+    El dibujo queda como vectores dentro del PDF, así que no se rasteriza ninguna imagen.
+
+    Args:
+        conteo: DataFrame con la columna de categoría y la columna 'Cantidad'
+        columna: Nombre de la columna con las etiquetas
+        categoria: Nombre legible de la categoría (para el título)
+        tipo: "barras" o "pastel"
+
+    Returns:
+        Un Drawing listo para agregar a los elementos del PDF
+    """
+    ancho, alto = 6*inch, 3*inch
+    etiquetas = [textwrap.shorten(str(v), width=18, placeholder="...") for v in conteo[columna]]
+    valores = [int(v) for v in conteo["Cantidad"]]
+
+    dibujo = Drawing(ancho, alto)
+    dibujo.add(String(ancho / 2, alto - 14, f"Distribución por {categoria}",
+                      fontName="Helvetica-Bold", fontSize=10, textAnchor="middle"))
+
+    if tipo == "pastel":
+        pastel = Pie()
+        pastel.x, pastel.y = 1.9*inch, 0.25*inch
+        pastel.width = pastel.height = 2.2*inch
+        pastel.data = valores
+        pastel.labels = [f"{e} ({v})" for e, v in zip(etiquetas, valores)]
+        pastel.sideLabels = True
+        pastel.slices.fontSize = 7
+        pastel.slices.strokeColor = colors.white
+        for i in range(len(valores)):
+            pastel.slices[i].fillColor = colors.HexColor(PALETA_VECTORIAL[i % len(PALETA_VECTORIAL)])
+        dibujo.add(pastel)
+    else:
+        barras = VerticalBarChart()
+        barras.x, barras.y = 0.5*inch, 0.8*inch
+        barras.width, barras.height = 5.2*inch, 1.8*inch
+        barras.data = [valores]
+        barras.valueAxis.valueMin = 0
+        barras.valueAxis.labels.fontSize = 7
+        barras.categoryAxis.categoryNames = etiquetas
+        barras.categoryAxis.labels.fontSize = 7
+        barras.categoryAxis.labels.angle = 30
+        barras.categoryAxis.labels.boxAnchor = "ne"
+        barras.barSpacing = 2
+        barras.bars.strokeColor = None
+        for i in range(len(valores)):
+            barras.bars[(0, i)].fillColor = colors.HexColor(PALETA_VECTORIAL[i % len(PALETA_VECTORIAL)])
+        dibujo.add(barras)
+
+    return dibujo
+
+
+# Modos de construcción de la tabla de detalle
+TABLA_STREAMING = "streaming" # LongTable por bloques, solo las celdas largas van en Paragraph
+TABLA_COMPLETA = "completa"   # Una sola Table con todas las celdas en Paragraph (modo original)
+FILAS_POR_BLOQUE = 500
+PADDING_CELDA = 12 # Relleno horizontal por defecto de una celda (6 pt a cada lado)
+
+# Orden de relevancia para el "top N" del detalle
+ORDEN_PRIORIDAD = {'Alta': 0, 'Media': 1, 'Baja': 2}
+
+# Columnas de la tabla de detalle y del CSV, en este orden. Los campos internos del almacén
+# (huella, version, version_reglas, historial y el número de secuencia 'seq') no son parte del informe
+COLUMNAS_INFORME = ['id_ticket', 'fecha', 'cliente', 'area', 'contenido', 'regla', 'tipo', 'prioridad',
+                    'asignado_a', 'fecha_procesamiento']
+
+
+def _estilo_tabla_detalle():
+    """Estilo común de las tablas de detalle"""
+    return TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#00DED2")),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.gray),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,-1), 7),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ])
+
+
+def _anchos_columnas(num_cols):
+    """Reparte el ancho útil de la página entre las columnas"""
+    total_width = 7.5 * inch  # ancho de página útil en letter
+    return [total_width / num_cols for _ in range(num_cols)]
+
+
+def _columnas_informe(df):
+    """Deja solo las columnas del informe que tenga el DataFrame (ver COLUMNAS_INFORME)"""
+    return df[[columna for columna in COLUMNAS_INFORME if columna in df.columns]]
+
+
+def _recortar_detalle(df, max_filas):
+    """
+    Separa los N tickets más relevantes (mayor prioridad, más recientes) del resto.
+
+    Returns:
+        Tupla (df_detalle, df_omitidos)
+    """
+    if not max_filas or len(df) <= max_filas:
+        return df, df.iloc[0:0]
+
+    orden = df["prioridad"].astype(object).map(ORDEN_PRIORIDAD).fillna(len(ORDEN_PRIORIDAD)) if "prioridad" in df.columns else None
+    if orden is not None:
+        df = df.assign(_orden=orden)
+        columnas_orden = ["_orden"] + (["fecha"] if "fecha" in df.columns else [])
+        ascendente = [True] + ([False] if "fecha" in df.columns else [])
+        df = df.sort_values(columnas_orden, ascending=ascendente, kind="stable").drop(columns="_orden")
+
+    return df.iloc[:max_filas], df.iloc[max_filas:]
+
+
+def _tabla_resumen_omitidos(df_omitidos):
+    """Tabla pequeña con los conteos por tipo y prioridad de los tickets que no se listan"""
+    data = [["Tipo", "Prioridad", "Cantidad"]]
+    columnas = [c for c in ("tipo", "prioridad") if c in df_omitidos.columns]
+    if len(columnas) == 2:
+        conteo = df_omitidos.groupby(columnas, observed=True).size().reset_index(name="Cantidad")
+        data += conteo.astype(str).values.tolist()
+    else:
+        data.append(["-", "-", str(len(df_omitidos))])
+
+    tabla = Table(data, repeatRows=1, colWidths=[2.5*inch, 1.5*inch, 1*inch])
+    tabla.setStyle(_estilo_tabla_detalle())
+    return tabla
+
+
+def _tabla_completa(df, estilo_celda):
+    """Construye una sola Table convirtiendo todas las celdas a Paragraph (modo original)"""
+    # Convertir DataFrame en lista de listas
+    data = [list(df.columns)] + df.astype(str).values.tolist()
+
+    # Aplicar a todas las celdas menos la cabecera
+    for i in range(1, len(data)):
+        for j in range(len(data[i])):
+            data[i][j] = Paragraph(str(data[i][j]), estilo_celda)
+
+    tabla = Table(data, repeatRows=1, colWidths=_anchos_columnas(len(data[0])))
+    tabla.setStyle(_estilo_tabla_detalle())
+    return tabla
+
+
+def _celda(valor, estilo_celda, ancho_util):
+    """Las celdas que caben en la columna quedan como texto plano; solo las largas se envuelven en Paragraph"""
+    if stringWidth(valor, "Helvetica", 7) <= ancho_util:
+        return valor
+    return Paragraph(escape(valor), estilo_celda)
+
+
+def _tablas_por_bloques(df, estilo_celda, filas_por_bloque=FILAS_POR_BLOQUE, progreso=None):
+    """
+    Construye la tabla de detalle como varias LongTable de tamaño fijo.
+    Cada bloque se convierte por separado, así nunca se tiene en memoria
+    la lista de celdas de todo el DataFrame ni una tabla gigante que reportlab deba partir.
+
+    Args:
+        progreso: Función opcional progreso(avance) que se llama después de cada bloque, con avance entre 0 y 1
+
+    Returns:
+        Lista de LongTable (una por bloque)
+    """
+    cabecera = list(df.columns)
+    anchos = _anchos_columnas(len(cabecera))
+    ancho_util = anchos[0] - PADDING_CELDA
+    estilo = _estilo_tabla_detalle()
+    tablas = []
+
+    for inicio in range(0, len(df), filas_por_bloque):
+        bloque = df.iloc[inicio:inicio + filas_por_bloque].astype(str).to_numpy()
+        data = [cabecera] + [[_celda(valor, estilo_celda, ancho_util) for valor in fila] for fila in bloque]
+        tabla = LongTable(data, repeatRows=1, colWidths=anchos)
+        tabla.setStyle(estilo)
+        tablas.append(tabla)
+        if progreso is not None:
+            progreso(min(inicio + filas_por_bloque, len(df)) / len(df))
+
+    if not tablas:
+        tabla = LongTable([cabecera], repeatRows=1, colWidths=anchos)
+        tabla.setStyle(estilo)
+        tablas.append(tabla)
+
+    return tablas
+
+
+def generar_detalle_csv(df):
+    """
+    Exporta el detalle completo de tickets como CSV comprimido con gzip.
+    Se usa como adjunto del informe cuando la tabla del PDF está recortada.
+
+    Returns:
+        BytesIO con el archivo .csv.gz
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+        with io.TextIOWrapper(gz, encoding="utf-8", newline="") as texto:
+            _columnas_informe(df).to_csv(texto, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+def generar_informe_pdf(df_filtrado, graficos_seleccionados, inicio, fin, motor_graficos=MOTOR_VECTORIAL,
+                        modo_tabla=TABLA_STREAMING, max_filas_detalle=None, filas_por_bloque=FILAS_POR_BLOQUE,
+                        progreso=None):
+    """
+    Genera el informe ejecutivo PDF con los gráficos seleccionados y tabla completa.
+
+    Args:
+        df_filtrado: DataFrame con los tickets del periodo
+        graficos_seleccionados: Lista de categorías a graficar ("Tipo", "Prioridad", ...)
+        inicio: Fecha inicial del periodo
+        fin: Fecha final del periodo
+        motor_graficos: MOTOR_VECTORIAL (reportlab, por defecto) o MOTOR_PLOTLY (PNG con kaleido)
+        modo_tabla: TABLA_STREAMING (LongTable por bloques, por defecto) o TABLA_COMPLETA (una sola Table)
+        max_filas_detalle: Si se indica, solo se listan los N tickets más relevantes más un resumen del resto
+        filas_por_bloque: Filas de cada LongTable en el modo streaming
+        progreso: Función opcional progreso(fase, avance) con avance entre 0 y 1
+
+    Returns:
+        BytesIO con el PDF generado
+    """
+    # Si no se pide progreso se usa una función vacía
+    if progreso is None:
+        progreso = lambda fase, avance: None
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter,
+                            rightMargin=30, leftMargin=30,
+                            topMargin=30, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    elements = []
+    estilo_celda = ParagraphStyle(
+        name="TablaCelda",
+        parent=styles["BodyText"],
+        fontSize=7,        # 👈 aquí cambias el tamaño
+        leading=9,         # separación entre líneas
+        alignment=1,       # 0=izq, 1=centro, 2=der, 4=justificado
+    )
+
+    # --- ENCABEZADO ---
+    elements.append(Paragraph("<b>Informe Ejecutivo de Tickets del Sistema</b>", styles['Title']))
+    elements.append(Paragraph(
+        f"Periodo analizado: {inicio.strftime('%Y-%m-%d')} a {fin.strftime('%Y-%m-%d')}",
+        styles['Normal']
+    ))
+    elements.append(Spacer(1, 12))
+
+    # --- RESUMEN PRINCIPAL ---
+    total_tickets = len(df_filtrado)
+    elementos_resumen = f"""
+    Total de tickets analizados: <b>{total_tickets}</b><br/>
+    Categorías incluidas: {', '.join(graficos_seleccionados)}
+    """
+    elements.append(Paragraph(elementos_resumen, styles['Normal']))
+    elements.append(Spacer(1, 18))
+
+    # --- GRÁFICOS SELECCIONADOS ---
+    # Todos los conteos de los gráficos se calculan juntos
+    columnas_graficos = {}
+    for categoria in graficos_seleccionados:
+        columna = categoria.lower().replace(" ", "_").replace("área", "area")
+        if columna in df_filtrado.columns:
+            columnas_graficos[categoria] = columna
+    conteos = count_dimensions(df_filtrado, list(dict.fromkeys(columnas_graficos.values())))
+
+    temp_files = []
+    for i, (categoria, columna) in enumerate(columnas_graficos.items()):
+        progreso("Gráficos", i / len(columnas_graficos))
+        conteo = to_frame(conteos[columna], columna)
+
+        elements.append(Paragraph(f"<b>Gráfico: {categoria}</b>", styles['Heading2']))
+
+        if motor_graficos == MOTOR_PLOTLY:
+            import plotly.express as px # Solo se necesita para el motor PNG (kaleido)
+
+            fig = px.bar(
+                conteo,
+                x=columna,
+                y="Cantidad",
+                title=f"Distribución por {categoria}",
+                color="Cantidad",
+                color_continuous_scale="Viridis"
+            )
+
+            # Guardar imagen temporal del gráfico (nombre único, puede haber varios informes a la vez)
+            descriptor, temp_path = tempfile.mkstemp(prefix=f"grafico_{columna}_", suffix=".png")
+            os.close(descriptor)
+            fig.write_image(temp_path)
+            temp_files.append(temp_path)
+
+            elements.append(Image(temp_path, width=6*inch, height=3*inch))
+        else:
+            # La prioridad se muestra como pastel, igual que en el dashboard
+            tipo = "pastel" if columna == "prioridad" else "barras"
+            elements.append(_grafico_vectorial(conteo, columna, categoria, tipo))
+
+        elements.append(Spacer(1, 12))
+
+    # --- TABLA FINAL DE TICKETS ---
+    progreso("Tabla de detalle", 0)
+    elements.append(Paragraph("<b>📋 Detalle de Tickets Analizados</b>", styles['Heading2']))
+
+    df_detalle, df_omitidos = _recortar_detalle(_columnas_informe(df_filtrado), max_filas_detalle)
+    if not df_omitidos.empty:
+        elements.append(Paragraph(
+            f"Se muestran los <b>{len(df_detalle)}</b> tickets más relevantes (mayor prioridad y más recientes). "
+            f"Se omitieron <b>{len(df_omitidos)}</b> tickets, resumidos en la tabla siguiente.",
+            styles['Normal']
+        ))
+        elements.append(Spacer(1, 6))
+        elements.append(_tabla_resumen_omitidos(df_omitidos))
+        elements.append(Spacer(1, 12))
+
+    if modo_tabla == TABLA_COMPLETA:
+        elements.append(_tabla_completa(df_detalle, estilo_celda))
+        progreso("Tabla de detalle", 1.0)
+    else:
+        elements.extend(_tablas_por_bloques(df_detalle, estilo_celda, filas_por_bloque,
+                                            lambda avance: progreso("Tabla de detalle", avance)))
+
+    # --- GENERAR PDF ---
+    # reportlab informa cuántos flowables lleva procesados; con eso se calcula el avance
+    total_flowables = [max(len(elements), 1)]
+    def _progreso_build(tipo, valor):
+        if tipo == 'SIZE_EST':
+            total_flowables[0] = max(valor, 1)
+        elif tipo == 'PROGRESS':
+            progreso("Construyendo PDF", min(valor / total_flowables[0], 1.0))
+
+    progreso("Construyendo PDF", 0)
+    doc.setProgressCallBack(_progreso_build)
+    doc.build(elements)
+    buffer.seek(0)
+    progreso("Listo", 1.0)
+
+    # Limpiar archivos temporales
+    for f in temp_files:
+        try:
+            os.remove(f)
+        except:
+            pass
+
+    return buffer
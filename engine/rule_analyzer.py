@@ -0,0 +1,166 @@
+# engine/rule_analyzer.py
+# Análisis estático de las reglas: reglas que nunca se aplican y palabras clave que sobran
+# Como gana la primera regla que coincide, una palabra clave que contiene a otra palabra de una
+# regla anterior (o de la misma regla) nunca decide la clasificación: todo texto que la tenga
+# también tiene la otra. Quitarla no cambia ningún resultado y achica el índice del motor.
+# Una regla compuesta (requeridas / excluidas / áreas) no siempre se aplica, así que no tapa a otras.
+# Las palabras que una regla acepta con errores de tipeo ('difuso') o por raíz ('raices') nunca están
+# muertas: sus variantes pueden no contener a la otra palabra.
+
+from engine.classification_engine import REGLAS_BASE
+from engine.fuzzy_index import distancia_permitida
+from engine.matcher import RuleMatcher, es_compuesta, palabras_por_raiz
+
+# Origen de cada regla en el orden de evaluación (primero las personalizadas)
+ORIGEN_PERSONALIZADA = 'personalizada'
+ORIGEN_BASE = 'base'
+
+
+def _reglas_en_orden(reglas, reglas_base):
+    """
+    Reglas activas personalizadas seguidas de las base, con id (origen, id_regla)
+    y solo sus palabras clave ('alguna de').
+
+    Returns:
+        Tupla (lista de reglas, conjunto de ids de las reglas compuestas)
+    """
+    combinadas = []
+    compuestas = set()
+    for origen, lista in ((ORIGEN_PERSONALIZADA, reglas), (ORIGEN_BASE, reglas_base)):
+        for regla in lista:
+            if regla.get('activa', True):
+                clave = (origen, regla.get('id_regla'))
+                combinadas.append({'id_regla': clave, 'nombre': regla.get('nombre', ''),
+                                   'palabras_clave': regla.get('palabras_clave') or [],
+                                   'difuso': regla.get('difuso', 0), 'raices': regla.get('raices', False)})
+                if es_compuesta(regla):
+                    compuestas.add(clave)
+    return combinadas, compuestas
+
+
+def analyze_rules(reglas, reglas_base=REGLAS_BASE):
+    """
+    Busca reglas sombreadas, palabras clave muertas y palabras clave repetidas.
+    Usa el índice de palabras clave: por cada palabra se buscan en el trie las palabras
+    contenidas en ella, así el costo crece con el largo de las palabras y no con reglas².
+    Las reglas inactivas no se analizan (no participan en la clasificación) y las compuestas
+    solo cuentan como tapadas, nunca como las que tapan.
+
+    Args:
+        reglas: Reglas personalizadas (se evalúan primero)
+        reglas_base: Reglas base del motor
+
+    Returns:
+        Diccionario con:
+            'palabras_muertas': lista de {origen, id_regla, nombre, palabra,
+                                          origen_ganadora, id_ganadora, nombre_ganadora, palabra_ganadora}
+            'sombreadas': lista de {origen, id_regla, nombre, ganadoras} (reglas sin ninguna palabra efectiva)
+            'duplicadas': lista de {palabra, reglas} con las palabras que aparecen en varias reglas
+            'total_reglas', 'total_palabras' y 'palabras_efectivas'
+    """
+    combinadas, compuestas = _reglas_en_orden(reglas, reglas_base)
+    matcher = RuleMatcher(combinadas)
+    nombres = {regla['id_regla']: regla.get('nombre', '') for regla in combinadas}
+
+    muertas = []
+    sombreadas = []
+    duplicadas = {}
+    total_palabras = 0
+
+    for regla in combinadas:
+        if not regla['palabras_clave']:
+            continue  # Solo palabras requeridas: no hay palabras 'alguna de' que analizar
+        clave = regla['id_regla']
+        posicion = matcher.position(clave)
+        ganadoras = []
+        vivas = 0
+        por_raiz = palabras_por_raiz(regla)
+
+        for palabra in sorted({str(p).lower() for p in regla.get('palabras_clave', [])}):
+            total_palabras += 1
+            mejor = None  # (posición, largo, id, palabra) de la regla que gana con esta palabra
+            for contenida, ids in matcher.keywords_in(palabra).items():
+                if contenida == palabra and len(ids) > 1:
+                    duplicadas[palabra] = ids
+                for otra in ids:
+                    if otra == clave:
+                        if contenida == palabra:
+                            continue
+                        candidata = (posicion, len(contenida), otra, contenida)
+                    else:
+                        posicion_otra = matcher.position(otra)
+                        if posicion_otra > posicion or otra in compuestas:
+                            continue
+                        candidata = (posicion_otra, len(contenida), otra, contenida)
+                    if mejor is None or candidata[:2] < mejor[:2]:
+                        mejor = candidata
+
+            if mejor is None or palabra in por_raiz or distancia_permitida(palabra, regla['difuso']):
+                vivas += 1
+                continue
+            _, _, ganadora, palabra_ganadora = mejor
+            muertas.append({
+                'origen': clave[0], 'id_regla': clave[1], 'nombre': nombres[clave], 'palabra': palabra,
+                'origen_ganadora': ganadora[0], 'id_ganadora': ganadora[1],
+                'nombre_ganadora': nombres[ganadora], 'palabra_ganadora': palabra_ganadora
+            })
+            if ganadora != clave and ganadora[1] not in ganadoras:
+                ganadoras.append(ganadora[1])
+
+        if not vivas:
+            sombreadas.append({'origen': clave[0], 'id_regla': clave[1], 'nombre': nombres[clave],
+                               'ganadoras': ganadoras})
+
+    return {
+        'palabras_muertas': muertas,
+        'sombreadas': sombreadas,
+        'duplicadas': [
+            {'palabra': palabra, 'reglas': [id_regla for _, id_regla in sorted(ids, key=matcher.position)]}
+            for palabra, ids in sorted(duplicadas.items())
+        ],
+        'total_reglas': len(combinadas),
+        'total_palabras': total_palabras,
+        'palabras_efectivas': total_palabras - len(muertas)
+    }
+
+
+def prune_rules(rules_manager, desactivar=False, reglas_base=REGLAS_BASE):
+    """
+    Poda las reglas personalizadas según el análisis: elimina (o desactiva) las reglas sombreadas
+    y quita las palabras clave muertas del resto. Las reglas base no se tocan.
+    Todo se hace en una transacción: se guarda una vez o no se guarda nada.
+
+    Args:
+        rules_manager: Instancia de RulesManager
+        desactivar: Si es True las reglas sombreadas se desactivan en lugar de eliminarse
+        reglas_base: Reglas base del motor
+
+    Returns:
+        Diccionario con 'reglas' (eliminadas o desactivadas) y 'palabras' (quitadas),
+        o None si no se pudo guardar
+    """
+    analisis = analyze_rules(rules_manager.get_all_rules(), reglas_base)
+    sombreadas = [s['id_regla'] for s in analisis['sombreadas'] if s['origen'] == ORIGEN_PERSONALIZADA]
+    muertas = {}
+    for muerta in analisis['palabras_muertas']:
+        if muerta['origen'] == ORIGEN_PERSONALIZADA and muerta['id_regla'] not in sombreadas:
+            muertas.setdefault(muerta['id_regla'], set()).add(muerta['palabra'])
+
+    palabras_quitadas = 0
+    try:
+        with rules_manager.transaction():
+            for id_regla in sombreadas:
+                if desactivar:
+                    rules_manager.toggle_rule_status(id_regla)
+                else:
+                    rules_manager.delete_rule(id_regla)
+            for id_regla, palabras in muertas.items():
+                regla = rules_manager.get_rule_by_id(id_regla)
+                quedan = [p for p in regla['palabras_clave'] if str(p).lower() not in palabras]
+                palabras_quitadas += len(regla['palabras_clave']) - len(quedan)
+                rules_manager.update_rule(id_regla, palabras_clave=quedan)
+    except Exception as e:
+        print(f"Error al podar reglas: {e}")
+        return None
+
+    return {'reglas': len(sombreadas), 'palabras': palabras_quitadas}
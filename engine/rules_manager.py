@@ -1,10 +1,35 @@
 # engine/rules_manager.py
 # Gestor de reglas personalizadas para el sistema experto
 
+import copy
+import csv
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+from engine.file_utils import escritura_atomica
+
+# Campos obligatorios de una regla y prioridades válidas
+CAMPOS_REGLA = ['id_regla', 'nombre', 'palabras_clave', 'tipo', 'prioridad', 'asignado_a', 'activa']
+PRIORIDADES = ['Alta', 'Media', 'Baja']
+
+# Condiciones opcionales de una regla compuesta (listas; vacías = sin condición)
+#   palabras_clave: alguna de ellas | palabras_requeridas: todas | palabras_excluidas: ninguna
+#   areas: el ticket debe ser de alguna de estas áreas
+CAMPOS_CONDICION = ['palabras_requeridas', 'palabras_excluidas', 'areas']
+
+# Errores de tipeo que tolera una regla en sus palabras clave (0 = solo coincidencia exacta)
+CAMPO_DIFUSO = 'difuso'
+DISTANCIAS_DIFUSAS = [0, 1, 2]
+
+# Si la regla compara sus palabras clave por raíz ('lento' también encuentra 'lentas')
+CAMPO_RAICES = 'raices'
+
+# Separador de palabras clave en CSV (las palabras pueden contener comas)
+SEPARADOR_PALABRAS = ';'
+
 class RulesManager:
     """
     Clase para gestionar las reglas personalizadas del sistema.
@@ -20,36 +45,143 @@ class RulesManager:
         """
         self.rules_file = rules_file
         self.rules = []
+        self._indice = {}  # id_regla -> regla
+        self._max_num = 0  # Número más alto de los IDs 'Rnn' (para generar el siguiente)
+        self._transaccion = 0  # Profundidad de transacciones abiertas
+        self._pendiente = False  # Hay cambios sin guardar dentro de la transacción
+        self._suscriptores = []  # Funciones que reciben los eventos de cambio
+        self._eventos_pendientes = []  # Eventos de la transacción, se emiten al guardar
+        self._firma = None  # (mtime_ns, tamaño) del archivo tras la última carga o guardado
+        # El gestor compartido lo usan a la vez todas las sesiones de la interfaz: las ediciones y las
+        # transacciones (de principio a fin) se hacen con el candado tomado
+        self._lock = threading.RLock()
         self.load_rules()
+
+    def _ruta(self):
+        """Ruta absoluta del archivo de reglas"""
+        return os.path.join(os.path.dirname(__file__), '..', self.rules_file)
+
+    def _reindexar(self):
+        """Reconstruye el índice por ID y el contador de IDs"""
+        self._indice = {regla.get('id_regla'): regla for regla in self.rules}
+        self._max_num = 0
+        for id_regla in self._indice:
+            self._registrar_id(id_regla)
+
+    def _registrar_id(self, id_regla):
+        """Actualiza el contador si el ID tiene la forma 'Rnn'"""
+        if isinstance(id_regla, str) and id_regla.startswith('R') and id_regla[1:].isdigit():
+            self._max_num = max(self._max_num, int(id_regla[1:]))
+
+    def _nuevo_id(self):
+        """Genera el siguiente ID único 'Rnn'"""
+        self._max_num += 1
+        return f"R{self._max_num:02d}"
+
+    def _firma_archivo(self):
+        """Firma del archivo de reglas para detectar cambios hechos por otro proceso"""
+        try:
+            estado = os.stat(self._ruta())
+            return (estado.st_mtime_ns, estado.st_size)
+        except OSError:
+            return None
+
+    def subscribe(self, callback):
+        """
+        Registra una función que recibe los cambios de reglas.
+        Cada evento es un diccionario con 'evento' (add, update, toggle, delete o reload),
+        'id_regla', 'regla' (copia después del cambio) y 'anterior' (copia antes del cambio).
+        El evento reload trae además 'reglas' con la lista completa.
+
+        Args:
+            callback: Función que recibe el diccionario del evento
+        """
+        self._suscriptores.append(callback)
+
+    def unsubscribe(self, callback):
+        """Deja de enviar eventos a la función"""
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _emitir(self, evento, id_regla=None, regla=None, anterior=None):
+        """Notifica un cambio (dentro de una transacción se espera a que se guarde)"""
+        if not self._suscriptores:
+            return
+        datos = {
+            'evento': evento,
+            'id_regla': id_regla,
+            'regla': copy.deepcopy(regla),
+            'anterior': anterior
+        }
+        if evento == 'reload':
+            datos['reglas'] = copy.deepcopy(self.rules)
+        if self._transaccion:
+            self._eventos_pendientes.append(datos)
+            return
+        for callback in list(self._suscriptores):
+            try:
+                callback(datos)
+            except Exception as e:
+                print(f"Error al notificar cambio de regla: {e}")
+
+    def _persistir(self):
+        """Guarda ahora, o al cerrar la transacción si hay una abierta"""
+        if self._transaccion:
+            self._pendiente = True
+            return True
+        return self.save_rules()
     
     def load_rules(self):
         """Carga las reglas desde el archivo JSON"""
-        try:
-            ruta = os.path.join(os.path.dirname(__file__), '..', self.rules_file)
-            with open(ruta, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.rules = data.get('reglas_personalizadas', [])
-            return True
-        except FileNotFoundError:
-            print(f"Archivo {self.rules_file} no encontrado. Creando uno nuevo...")
-            self.rules = []
-            self.save_rules()
-            return False
-        except Exception as e:
-            print(f"Error al cargar reglas: {e}")
-            return False
+        with self._lock:
+            try:
+                with open(self._ruta(), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.rules = data.get('reglas_personalizadas', [])
+                self._reindexar()
+                self._firma = self._firma_archivo()
+                self._emitir('reload')
+                return True
+            except FileNotFoundError:
+                print(f"Archivo {self.rules_file} no encontrado. Creando uno nuevo...")
+                self.rules = []
+                self._reindexar()
+                self.save_rules()
+                return False
+            except Exception as e:
+                print(f"Error al cargar reglas: {e}")
+                return False
     
+    def reload_if_changed(self):
+        """
+        Recarga las reglas si el archivo cambió desde la última carga o guardado
+        (por ejemplo, editado por otro proceso).
+
+        Returns:
+            True si se recargaron, False si no hubo cambios
+        """
+        with self._lock:
+            if self._transaccion or self._firma_archivo() == self._firma:
+                return False
+            return self.load_rules()
+
     def save_rules(self):
-        """Guarda las reglas en el archivo JSON"""
-        try:
-            ruta = os.path.join(os.path.dirname(__file__), '..', self.rules_file)
-            data = {'reglas_personalizadas': self.rules}
-            with open(ruta, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error al guardar reglas: {e}")
-            return False
+        """
+        Guarda las reglas en el archivo JSON.
+        Se escribe un archivo temporal y se reemplaza el original en un solo paso,
+        así un error a mitad de escritura nunca deja el archivo de reglas corrupto.
+        """
+        with self._lock:
+            try:
+                ruta = self._ruta()
+                data = {'reglas_personalizadas': self.rules}
+                with escritura_atomica(ruta) as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                self._firma = self._firma_archivo()
+                return True
+            except Exception as e:
+                print(f"Error al guardar reglas: {e}")
+                return False
     
     def get_all_rules(self):
         """Retorna todas las reglas"""
@@ -69,61 +201,173 @@ class RulesManager:
         Returns:
             La regla si se encuentra, None en caso contrario
         """
+        return self._indice.get(id_regla)
+
+    def validate_rule(self, regla):
+        """
+        Valida una regla.
+
+        Args:
+            regla: Diccionario de la regla
+
+        Returns:
+            Lista de errores (vacía si la regla es válida)
+        """
+        errores = []
+        id_regla = regla.get('id_regla', '?')
+        for campo in CAMPOS_REGLA:
+            if campo not in regla:
+                errores.append(f"{id_regla}: falta el campo '{campo}'")
+        if not str(regla.get('nombre', '')).strip():
+            errores.append(f"{id_regla}: el nombre está vacío")
+        palabras = regla.get('palabras_clave')
+        for campo in ['palabras_clave'] + CAMPOS_CONDICION:
+            valor = regla.get(campo, [])
+            if not isinstance(valor, list) or not all(isinstance(p, str) and p.strip() for p in valor):
+                errores.append(f"{id_regla}: {campo} debe ser una lista de textos")
+        if not palabras and not regla.get('palabras_requeridas'):
+            errores.append(f"{id_regla}: palabras_clave debe ser una lista de textos no vacía")
+        positivas = [p for campo in ('palabras_clave', 'palabras_requeridas')
+                     if isinstance(regla.get(campo), list) for p in regla[campo]]
+        excluidas = regla.get('palabras_excluidas') if isinstance(regla.get('palabras_excluidas'), list) else []
+        contradictorias = {str(p).lower() for p in excluidas} & {str(p).lower() for p in positivas}
+        if contradictorias:
+            errores.append(f"{id_regla}: palabras a la vez requeridas y excluidas: {', '.join(sorted(contradictorias))}")
+        if 'prioridad' in regla and regla['prioridad'] not in PRIORIDADES:
+            errores.append(f"{id_regla}: prioridad inválida '{regla['prioridad']}'")
+        if 'activa' in regla and not isinstance(regla['activa'], bool):
+            errores.append(f"{id_regla}: activa debe ser True o False")
+        difuso = regla.get(CAMPO_DIFUSO, 0)
+        if isinstance(difuso, bool) or difuso not in DISTANCIAS_DIFUSAS:
+            errores.append(f"{id_regla}: {CAMPO_DIFUSO} debe ser 0, 1 o 2")
+        if not isinstance(regla.get(CAMPO_RAICES, False), bool):
+            errores.append(f"{id_regla}: {CAMPO_RAICES} debe ser True o False")
+        return errores
+
+    def validate_rules(self):
+        """Valida todas las reglas y que los IDs no se repitan. Retorna la lista de errores."""
+        errores = []
         for regla in self.rules:
-            if regla.get('id_regla') == id_regla:
-                return regla
-        return None
+            errores.extend(self.validate_rule(regla))
+        if len(self._indice) != len(self.rules):
+            errores.append("Hay IDs de regla repetidos")
+        return errores
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa varias ediciones en un solo guardado validado y atómico.
+        Dentro del bloque add_rule, update_rule, delete_rule y toggle_rule_status
+        no escriben el archivo; al salir se validan todas las reglas y se guarda una vez.
+        Si hay una excepción o la validación falla, se restauran las reglas anteriores.
+        Mientras dura el bloque ningún otro hilo puede editar las reglas.
+
+        Ejemplo:
+            with rules_manager.transaction():
+                rules_manager.add_rule(...)
+                rules_manager.delete_rule('R03')
+
+        Raises:
+            ValueError: Si las reglas resultantes no son válidas
+            IOError: Si no se pudo guardar el archivo
+        """
+        with self._lock:
+            if self._transaccion:
+                # Transacción anidada: se integra a la exterior
+                yield self
+                return
+
+            respaldo = copy.deepcopy(self.rules)
+            self._transaccion = 1
+            self._pendiente = False
+            try:
+                yield self
+                if self._pendiente:
+                    errores = self.validate_rules()
+                    if errores:
+                        raise ValueError("Reglas inválidas: " + "; ".join(errores[:10]))
+                    if not self.save_rules():
+                        raise IOError(f"No se pudo guardar {self.rules_file}")
+            except BaseException:
+                self.rules = respaldo
+                self._reindexar()
+                self._eventos_pendientes = []
+                raise
+            finally:
+                self._transaccion = 0
+                self._pendiente = False
+
+            # Guardado exitoso: se notifican los cambios en el orden en que se hicieron
+            eventos, self._eventos_pendientes = self._eventos_pendientes, []
+            for datos in eventos:
+                for callback in list(self._suscriptores):
+                    try:
+                        callback(datos)
+                    except Exception as e:
+                        print(f"Error al notificar cambio de regla: {e}")
+    
     
-    def add_rule(self, nombre, palabras_clave, tipo, prioridad, asignado_a, activa=True):
+    def add_rule(self, nombre, palabras_clave, tipo, prioridad, asignado_a, activa=True,
+                 palabras_requeridas=None, palabras_excluidas=None, areas=None, difuso=0, raices=False):
         """
         Agrega una nueva regla al sistema.
         
         Args:
             nombre: Nombre descriptivo de la regla
-            palabras_clave: Lista de palabras clave que activan la regla
+            palabras_clave: Lista de palabras clave que activan la regla (basta con una)
             tipo: Tipo de ticket (HARDWARE, SOFTWARE, REDES, SEGURIDAD)
             prioridad: Prioridad del ticket (Alta, Media, Baja)
             asignado_a: Equipo o persona asignada
             activa: Estado de la regla (True/False)
+            palabras_requeridas: Palabras que deben estar todas en el ticket
+            palabras_excluidas: Palabras que no deben estar en el ticket
+            areas: Áreas del cliente a las que se aplica (vacío = todas)
+            difuso: Errores de tipeo tolerados en las palabras clave (0, 1 o 2)
+            raices: Si es True las palabras clave sueltas se comparan por raíz
             
         Returns:
             True si se agregó exitosamente, False en caso contrario
         """
-        try:
-            # Generar ID único
-            if self.rules:
-                # Obtener el número más alto de las reglas existentes
-                ids_existentes = [int(r['id_regla'][1:]) for r in self.rules if r['id_regla'].startswith('R')]
-                nuevo_num = max(ids_existentes) + 1 if ids_existentes else 1
-            else:
-                nuevo_num = 1
-            
-            nuevo_id = f"R{nuevo_num:02d}"
+        with self._lock:
+            try:
+                # Generar ID único (el contador se mantiene al cargar y agregar reglas)
+                nuevo_id = self._nuevo_id()
             
-            # Crear la nueva regla
-            nueva_regla = {
-                'id_regla': nuevo_id,
-                'nombre': nombre,
-                'palabras_clave': palabras_clave,
-                'tipo': tipo,
-                'prioridad': prioridad,
-                'asignado_a': asignado_a,
-                'activa': activa,
-                'fecha_creacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+                # Crear la nueva regla
+                nueva_regla = {
+                    'id_regla': nuevo_id,
+                    'nombre': nombre,
+                    'palabras_clave': palabras_clave,
+                    'tipo': tipo,
+                    'prioridad': prioridad,
+                    'asignado_a': asignado_a,
+                    'activa': activa,
+                    'palabras_requeridas': palabras_requeridas or [],
+                    'palabras_excluidas': palabras_excluidas or [],
+                    'areas': areas or [],
+                    CAMPO_DIFUSO: difuso,
+                    CAMPO_RAICES: raices,
+                    'fecha_creacion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
             
-            # Agregar a la lista
-            self.rules.append(nueva_regla)
+                # Agregar a la lista y al índice
+                self.rules.append(nueva_regla)
+                self._indice[nuevo_id] = nueva_regla
             
-            # Guardar en archivo
-            return self.save_rules()
+                # Guardar en archivo
+                if not self._persistir():
+                    return False
+                self._emitir('add', nuevo_id, nueva_regla)
+                return True
         
-        except Exception as e:
-            print(f"Error al agregar regla: {e}")
-            return False
+            except Exception as e:
+                print(f"Error al agregar regla: {e}")
+                return False
     
     def update_rule(self, id_regla, nombre=None, palabras_clave=None, tipo=None, 
-                   prioridad=None, asignado_a=None, activa=None):
+                   prioridad=None, asignado_a=None, activa=None,
+                   palabras_requeridas=None, palabras_excluidas=None, areas=None, difuso=None,
+                   raices=None):
         """
         Actualiza una regla existente.
         
@@ -134,33 +378,46 @@ class RulesManager:
         Returns:
             True si se actualizó exitosamente, False en caso contrario
         """
-        try:
-            regla = self.get_rule_by_id(id_regla)
-            if not regla:
-                print(f"Regla {id_regla} no encontrada")
-                return False
+        with self._lock:
+            try:
+                regla = self.get_rule_by_id(id_regla)
+                if not regla:
+                    print(f"Regla {id_regla} no encontrada")
+                    return False
+                anterior = copy.deepcopy(regla)
             
-            # Actualizar campos proporcionados
-            if nombre is not None:
-                regla['nombre'] = nombre
-            if palabras_clave is not None:
-                regla['palabras_clave'] = palabras_clave
-            if tipo is not None:
-                regla['tipo'] = tipo
-            if prioridad is not None:
-                regla['prioridad'] = prioridad
-            if asignado_a is not None:
-                regla['asignado_a'] = asignado_a
-            if activa is not None:
-                regla['activa'] = activa
+                # Actualizar campos proporcionados
+                if nombre is not None:
+                    regla['nombre'] = nombre
+                if palabras_clave is not None:
+                    regla['palabras_clave'] = palabras_clave
+                if tipo is not None:
+                    regla['tipo'] = tipo
+                if prioridad is not None:
+                    regla['prioridad'] = prioridad
+                if asignado_a is not None:
+                    regla['asignado_a'] = asignado_a
+                if activa is not None:
+                    regla['activa'] = activa
+                for campo, valor in (('palabras_requeridas', palabras_requeridas),
+                                     ('palabras_excluidas', palabras_excluidas), ('areas', areas)):
+                    if valor is not None:
+                        regla[campo] = valor
+                if difuso is not None:
+                    regla[CAMPO_DIFUSO] = difuso
+                if raices is not None:
+                    regla[CAMPO_RAICES] = raices
             
-            regla['fecha_modificacion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                regla['fecha_modificacion'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            return self.save_rules()
+                if not self._persistir():
+                    return False
+                self._emitir('update', id_regla, regla, anterior)
+                return True
         
-        except Exception as e:
-            print(f"Error al actualizar regla: {e}")
-            return False
+            except Exception as e:
+                print(f"Error al actualizar regla: {e}")
+                return False
     
     def delete_rule(self, id_regla):
         """
@@ -172,18 +429,23 @@ class RulesManager:
         Returns:
             True si se eliminó exitosamente, False en caso contrario
         """
-        try:
-            regla = self.get_rule_by_id(id_regla)
-            if not regla:
-                print(f"Regla {id_regla} no encontrada")
-                return False
+        with self._lock:
+            try:
+                regla = self.get_rule_by_id(id_regla)
+                if not regla:
+                    print(f"Regla {id_regla} no encontrada")
+                    return False
             
-            self.rules.remove(regla)
-            return self.save_rules()
+                self.rules.remove(regla)
+                del self._indice[id_regla]
+                if not self._persistir():
+                    return False
+                self._emitir('delete', id_regla, None, regla)
+                return True
         
-        except Exception as e:
-            print(f"Error al eliminar regla: {e}")
-            return False
+            except Exception as e:
+                print(f"Error al eliminar regla: {e}")
+                return False
     
     def toggle_rule_status(self, id_regla):
         """
@@ -195,18 +457,130 @@ class RulesManager:
         Returns:
             True si se cambió exitosamente, False en caso contrario
         """
-        try:
-            regla = self.get_rule_by_id(id_regla)
-            if not regla:
-                return False
+        with self._lock:
+            try:
+                regla = self.get_rule_by_id(id_regla)
+                if not regla:
+                    return False
             
-            regla['activa'] = not regla.get('activa', True)
-            return self.save_rules()
+                anterior = copy.deepcopy(regla)
+                regla['activa'] = not regla.get('activa', True)
+                if not self._persistir():
+                    return False
+                self._emitir('toggle', id_regla, regla, anterior)
+                return True
         
+            except Exception as e:
+                print(f"Error al cambiar estado de regla: {e}")
+                return False
+    
+    def export_rules(self, ruta, formato=None):
+        """
+        Exporta todas las reglas a un archivo CSV o JSON.
+
+        Args:
+            ruta: Archivo de destino
+            formato: 'csv' o 'json' (por defecto según la extensión del archivo)
+
+        Returns:
+            True si se exportó exitosamente, False en caso contrario
+        """
+        try:
+            formato = formato or os.path.splitext(ruta)[1].lstrip('.').lower()
+            if formato == 'csv':
+                with open(ruta, 'w', encoding='utf-8', newline='') as f:
+                    escritor = csv.DictWriter(f, fieldnames=CAMPOS_REGLA + CAMPOS_CONDICION + [CAMPO_DIFUSO, CAMPO_RAICES],
+                                             extrasaction='ignore')
+                    escritor.writeheader()
+                    for regla in self.rules:
+                        escritor.writerow({**regla, **{campo: SEPARADOR_PALABRAS.join(regla.get(campo) or [])
+                                                       for campo in ['palabras_clave'] + CAMPOS_CONDICION}})
+            elif formato == 'json':
+                with open(ruta, 'w', encoding='utf-8') as f:
+                    json.dump({'reglas_personalizadas': self.rules}, f, indent=2, ensure_ascii=False)
+            else:
+                raise ValueError(f"Formato no soportado: {formato}")
+            return True
         except Exception as e:
-            print(f"Error al cambiar estado de regla: {e}")
+            print(f"Error al exportar reglas: {e}")
             return False
-    
+
+    def _leer_reglas(self, ruta, formato):
+        """Lee las reglas de un archivo CSV o JSON y las normaliza a diccionarios de regla"""
+        if formato == 'json':
+            with open(ruta, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('reglas_personalizadas', []) if isinstance(data, dict) else data
+        if formato == 'csv':
+            reglas = []
+            with open(ruta, 'r', encoding='utf-8', newline='') as f:
+                for fila in csv.DictReader(f):
+                    regla = {campo: (fila.get(campo) or '').strip() for campo in CAMPOS_REGLA}
+                    regla['palabras_clave'] = [p.strip() for p in regla['palabras_clave'].split(SEPARADOR_PALABRAS) if p.strip()]
+                    for campo in CAMPOS_CONDICION:
+                        if fila.get(campo):
+                            regla[campo] = [p.strip() for p in fila[campo].split(SEPARADOR_PALABRAS) if p.strip()]
+                    regla['activa'] = regla['activa'].lower() not in ('false', '0', 'no', 'inactiva')
+                    if (fila.get(CAMPO_DIFUSO) or '').strip():
+                        regla[CAMPO_DIFUSO] = int(fila[CAMPO_DIFUSO])
+                    if (fila.get(CAMPO_RAICES) or '').strip():
+                        regla[CAMPO_RAICES] = fila[CAMPO_RAICES].strip().lower() in ('true', '1', 'si', 'sí')
+                    reglas.append(regla)
+            return reglas
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    def import_rules(self, ruta, formato=None, reemplazar=False):
+        """
+        Importa reglas desde un archivo CSV o JSON con una sola escritura.
+        Las reglas con un ID existente se actualizan; las que no traen ID reciben uno nuevo.
+
+        Args:
+            ruta: Archivo de origen
+            formato: 'csv' o 'json' (por defecto según la extensión del archivo)
+            reemplazar: Si es True, las reglas actuales se eliminan antes de importar
+
+        Returns:
+            Cantidad de reglas importadas, o -1 si hubo un error (no se modifica nada)
+        """
+        try:
+            formato = formato or os.path.splitext(ruta)[1].lstrip('.').lower()
+            importadas = self._leer_reglas(ruta, formato)
+            fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            with self.transaction():
+                if reemplazar:
+                    self.rules = []
+                    self._reindexar()
+                for datos in importadas:
+                    regla = {campo: datos[campo] for campo in CAMPOS_REGLA + CAMPOS_CONDICION + [CAMPO_DIFUSO, CAMPO_RAICES]
+                             if campo in datos}
+                    regla.setdefault('activa', True)
+                    existente = self._indice.get(regla.get('id_regla'))
+                    if existente is not None:
+                        anterior = None if reemplazar else copy.deepcopy(existente)
+                        existente.update(regla)
+                        existente['fecha_modificacion'] = fecha
+                        if not reemplazar:
+                            self._emitir('update', existente['id_regla'], existente, anterior)
+                    else:
+                        if not regla.get('id_regla'):
+                            regla['id_regla'] = self._nuevo_id()
+                        else:
+                            self._registrar_id(regla['id_regla'])
+                        regla['fecha_creacion'] = datos.get('fecha_creacion', fecha)
+                        self.rules.append(regla)
+                        self._indice[regla['id_regla']] = regla
+                        if not reemplazar:
+                            self._emitir('add', regla['id_regla'], regla)
+                if reemplazar:
+                    # Se reemplazó todo: un solo evento con la lista completa
+                    self._emitir('reload')
+                self._pendiente = True
+            return len(importadas)
+        except Exception as e:
+            print(f"Error al importar reglas: {e}")
+            return -1
+
     def get_statistics(self):
         """
         Retorna estadísticas sobre las reglas.
@@ -237,3 +611,29 @@ class RulesManager:
             'por_tipo': tipos,
             'por_prioridad': prioridades
         }
+
+
+# Gestores compartidos por archivo (los usan la interfaz y el motor de clasificación)
+_gestores = {}
+_lock_gestores = threading.Lock()
+
+
+def get_rules_manager(rules_file='knowledge/rules_data.json'):
+    """
+    Retorna el gestor de reglas compartido del archivo.
+    Así los cambios hechos desde la interfaz llegan por eventos al matcher del motor
+    sin recargar las reglas; si el archivo cambió por fuera, se recarga.
+
+    Args:
+        rules_file: Ruta al archivo JSON de reglas
+
+    Returns:
+        Instancia de RulesManager
+    """
+    with _lock_gestores:
+        manager = _gestores.get(rules_file)
+        if manager is None:
+            manager = _gestores[rules_file] = RulesManager(rules_file)
+            return manager
+    manager.reload_if_changed()
+    return manager
@@ -0,0 +1,515 @@
+# engine/search_index.py
+# Búsqueda de texto en los tickets procesados (índice invertido con posiciones)
+# Se indexan contenido, cliente e id_ticket plegados (sin mayúsculas ni tildes). Cada término guarda
+# sus apariciones como (ticket, posición): con eso se responden términos, prefijos ("impres*")
+# y frases ("no enciende"). Las consultas combinan términos con AND (por defecto), OR y NOT/-
+# y se filtran por fecha, prioridad y tipo con columnas de NumPy.
+#
+# Las apariciones se guardan en formato CSR (ordenadas por término) y las de los tickets nuevos en
+# arreglos pendientes que se integran cuando crecen. En disco se guarda un punto de control (.npz);
+# al abrir se indexan solo los tickets agregados después, y se vuelve a guardar cuando ya son muchos.
+#
+# Además del buscador, el índice responde qué tickets pueden tener una palabra clave de regla
+# (dentro de otra palabra, con errores de tipeo o con la misma raíz) recorriendo el vocabulario
+# y no los contenidos: es lo que usa la reclasificación después de editar reglas.
+
+import json
+import os
+import re
+import zlib
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+import numpy as np
+
+from engine.file_utils import escritura_atomica
+from engine.fuzzy_index import distancia_edicion
+from engine.stemmer import stem, tokens
+from engine.text_utils import plegar
+
+# Campos del ticket que se indexan, en este orden
+CAMPOS_INDEXADOS = ('contenido', 'cliente', 'id_ticket')
+
+# Campos que se pueden filtrar por valor exacto
+CAMPOS_FILTRO = ('prioridad', 'tipo')
+
+# Las posiciones se guardan en 16 bits: las palabras que siguen en tickets muy largos no se indexan
+MAX_POSICION = (1 << 16) - 1
+
+# Tickets por consulta que se devuelven por defecto (los más nuevos)
+LIMITE_RESULTADOS = 100
+
+# Tickets sin fecha válida
+SIN_FECHA = -1
+
+# Versión del formato del punto de control (los de otra versión se descartan y se reconstruyen)
+VERSION_FORMATO = 2
+
+# Con más términos que esto, los tickets de varios términos se juntan con una máscara sobre todo el CSR
+MAX_TERMINOS_SUELTOS = 256
+
+_CONSULTA = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+
+
+def _huella(ticket):
+    """Resumen del ticket para comprobar que el índice corresponde a los mismos tickets"""
+    return zlib.crc32(f"{ticket.get('id_ticket')}\x00{ticket.get('contenido')}".encode('utf-8'))
+
+
+def _dia(valor):
+    """Fecha 'AAAA-MM-DD...' (o date) como número de día; SIN_FECHA si no se puede leer"""
+    try:
+        if isinstance(valor, date):
+            return valor.toordinal()
+        return date.fromisoformat(str(valor)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return SIN_FECHA
+
+
+def palabras_indexadas(texto):
+    """Palabras plegadas de un texto en el orden en que aparecen"""
+    return tokens(plegar(texto))
+
+
+def archivo_indice(storage_file):
+    """Punto de control del índice de búsqueda de un archivo de tickets"""
+    return os.path.splitext(storage_file)[0] + '_busqueda.npz'
+
+
+class TicketSearchIndex:
+    """
+    Índice de búsqueda de los tickets procesados.
+    Los tickets se agregan en el orden del almacén; su posición es su número dentro del índice.
+    """
+
+    def __init__(self, ruta=None):
+        """
+        Inicializa el índice vacío.
+
+        Args:
+            ruta: Archivo del punto de control (opcional; sin ruta el índice vive solo en memoria)
+        """
+        self.ruta = ruta
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._vocabulario = {}  # término -> número
+        self._terminos = []  # número -> término
+        self._ordenados = None  # Términos ordenados para los prefijos (se recalcula si cambia el vocabulario)
+        self._juntos = None  # Vocabulario en un solo texto, para buscar subcadenas (ídem)
+        self._comienzos = None  # Dónde empieza cada término dentro de _juntos
+        # Apariciones integradas (CSR): las del término t están en [inicio[t], inicio[t + 1])
+        self._inicio = np.zeros(1, dtype=np.int64)
+        self._docs = np.zeros(0, dtype=np.int32)
+        self._pos = np.zeros(0, dtype=np.uint16)
+        # Apariciones pendientes (tickets agregados después de integrar)
+        self._p_termino, self._p_doc, self._p_pos = array('i'), array('i'), array('H')
+        # Columnas para filtrar
+        self._fechas = array('i')
+        self._codigos = {campo: array('h') for campo in CAMPOS_FILTRO}
+        self._valores = {campo: {} for campo in CAMPOS_FILTRO}  # valor -> código
+        self._columnas = None  # Copia de NumPy de las columnas (se rehace si hay tickets nuevos)
+        self._huella = None  # Huella del último ticket indexado
+        self._guardados = 0  # Tickets incluidos en el último punto de control
+        self.generacion, self.secuencia = None, 0  # Punto de control en el almacén (ver follow)
+
+    def __len__(self):
+        return len(self._fechas)
+
+    def _codigo(self, campo, valor):
+        codigos = self._valores[campo]
+        if valor not in codigos:
+            codigos[valor] = len(codigos)
+        return codigos[valor]
+
+    def add_many(self, tickets):
+        """Agrega tickets al final del índice"""
+        vocabulario = self._vocabulario
+        for ticket in tickets:
+            doc = len(self._fechas)
+            posicion = 0
+            for campo in CAMPOS_INDEXADOS:
+                for palabra in palabras_indexadas(ticket.get(campo)):
+                    if posicion > MAX_POSICION:
+                        break
+                    termino = vocabulario.get(palabra)
+                    if termino is None:
+                        termino = vocabulario[palabra] = len(self._terminos)
+                        self._terminos.append(palabra)
+                        self._ordenados = self._juntos = None
+                    self._p_termino.append(termino)
+                    self._p_doc.append(doc)
+                    self._p_pos.append(posicion)
+                    posicion += 1
+                posicion += 1  # Una posición libre entre campos: las frases no cruzan de un campo a otro
+            self._fechas.append(_dia(ticket.get('fecha')))
+            for campo in CAMPOS_FILTRO:
+                self._codigos[campo].append(self._codigo(campo, ticket.get(campo)))
+            self._huella = _huella(ticket)
+        self._columnas = None
+        if len(self._p_doc) > max(1 << 16, len(self._docs) // 8):
+            self._integrar()
+
+    def update(self, posicion, ticket):
+        """Actualiza los filtros de un ticket ya indexado cuyo texto no cambió (al reclasificarlo)"""
+        if posicion >= len(self):
+            return
+        for campo in CAMPOS_FILTRO:
+            self._codigos[campo][posicion] = self._codigo(campo, ticket.get(campo))
+        self._columnas = None
+        if posicion < self._guardados:
+            # El punto de control quedó viejo: se borra y se vuelve a guardar en el próximo sync
+            self._guardados = 0
+            if self.ruta:
+                try:
+                    os.remove(os.path.join(os.path.dirname(__file__), '..', self.ruta))
+                except FileNotFoundError:
+                    pass
+
+    def _integrar(self):
+        """Pasa las apariciones pendientes al CSR (orden estable: quedan por ticket y posición)"""
+        if not len(self._p_doc):
+            return
+        terminos_viejos = np.repeat(np.arange(len(self._inicio) - 1, dtype=np.int32), np.diff(self._inicio))
+        terminos = np.concatenate([terminos_viejos, np.frombuffer(self._p_termino, dtype=np.int32)])
+        orden = np.argsort(terminos, kind='stable')
+        self._docs = np.concatenate([self._docs, np.frombuffer(self._p_doc, dtype=np.int32)])[orden]
+        self._pos = np.concatenate([self._pos, np.frombuffer(self._p_pos, dtype=np.uint16)])[orden]
+        conteos = np.bincount(terminos, minlength=len(self._terminos))
+        self._inicio = np.concatenate([[0], np.cumsum(conteos)]).astype(np.int64)
+        self._p_termino, self._p_doc, self._p_pos = array('i'), array('i'), array('H')
+
+    def sync(self, tickets):
+        """
+        Deja el índice al día con la lista completa de tickets del almacén.
+        Si está vacío primero lee el punto de control; después indexa solo lo agregado al final
+        (o todo, si los tickets ya no son los mismos) y guarda otro punto de control si el
+        anterior quedó muy atrás.
+
+        Returns:
+            Cantidad de tickets indexados en esta llamada
+        """
+        if not len(self) and self.ruta:
+            self._cargar(tickets)
+        indexados = len(self)
+        if indexados > len(tickets) or (indexados and self._huella != _huella(tickets[indexados - 1])):
+            self._reiniciar()
+            indexados = 0
+        self.add_many(tickets[indexados:])
+        self.generacion = None  # Una lista no es un punto de control del almacén
+        if self.ruta and (len(self) - self._guardados) * 8 > self._guardados:
+            self.save()
+        return len(tickets) - indexados
+
+    def follow(self, store):
+        """
+        Deja el índice al día leyendo del almacén solo los cambios posteriores a su punto de control
+        (ver TicketStore.changes_since): los filtros de los reclasificados se corrigen en su lugar y los
+        agregados se indexan. Si el almacén cambió de generación se parte del punto de control en disco
+        (si es de esa generación) o de cero, y se guarda otro si el anterior quedó muy atrás.
+
+        Returns:
+            Cantidad de tickets indexados en esta llamada
+        """
+        indexados = len(self)
+        cambios = store.changes_since(self.generacion, self.secuencia, indexados) if indexados else None
+        if cambios is None or self._huella != _huella(store.tickets[indexados - 1]):
+            self._reiniciar()
+            if self.ruta:
+                self._cargar(store.tickets, store.generacion)
+            cambios = store.changes_since(self.generacion, self.secuencia, len(self))
+            if cambios is None:
+                self._reiniciar()
+                cambios = store.changes_since(store.generacion, 0, 0)
+        reemplazados, agregados = cambios
+        for posicion, ticket in reemplazados.items():
+            self.update(posicion, ticket)
+        self.add_many(agregados)
+        self.generacion, self.secuencia = store.generacion, store.secuencia
+        if self.ruta and (len(self) - self._guardados) * 8 > self._guardados:
+            self.save()
+        return len(agregados)
+
+    def _terminos_prefijo(self, prefijo):
+        """Números de los términos que empiezan con el prefijo"""
+        if self._ordenados is None:
+            self._ordenados = sorted(self._terminos)
+        desde = bisect_left(self._ordenados, prefijo)
+        hasta = bisect_left(self._ordenados, prefijo + '\U0010ffff', desde)
+        return [self._vocabulario[termino] for termino in self._ordenados[desde:hasta]]
+
+    def _apariciones(self, termino):
+        """(tickets, posiciones) de las apariciones de un término, ordenadas"""
+        if termino + 1 < len(self._inicio):
+            docs = self._docs[self._inicio[termino]:self._inicio[termino + 1]]
+            pos = self._pos[self._inicio[termino]:self._inicio[termino + 1]]
+        else:
+            # Término nuevo: todavía no tiene apariciones integradas
+            docs, pos = self._docs[:0], self._pos[:0]
+        if len(self._p_doc):
+            pendientes = np.frombuffer(self._p_termino, dtype=np.int32) == termino
+            if pendientes.any():
+                docs = np.concatenate([docs, np.frombuffer(self._p_doc, dtype=np.int32)[pendientes]])
+                pos = np.concatenate([pos, np.frombuffer(self._p_pos, dtype=np.uint16)[pendientes]])
+        return docs, pos
+
+    def _terminos_con(self, palabra):
+        """Números de los términos que contienen la palabra"""
+        if self._juntos is None:
+            self._juntos = '\n'.join(self._terminos) + '\n'
+            largos = np.fromiter((len(termino) + 1 for termino in self._terminos), dtype=np.int64,
+                                 count=len(self._terminos))
+            self._comienzos = np.cumsum(largos) - largos
+        inicios = [encontrada.start() for encontrada in re.finditer(re.escape(palabra), self._juntos)]
+        return np.unique(np.searchsorted(self._comienzos, inicios, side='right') - 1)
+
+    def _tickets_con_terminos(self, terminos):
+        """Tickets (ordenados, sin repetidos) con alguno de los términos"""
+        if len(terminos) <= MAX_TERMINOS_SUELTOS:
+            listas = [self._apariciones(termino)[0] for termino in terminos]
+            return np.unique(np.concatenate(listas)) if listas else np.zeros(0, dtype=np.int32)
+        elegidos = np.zeros(len(self._terminos), dtype=bool)
+        elegidos[terminos] = True
+        integrados = np.repeat(elegidos[:len(self._inicio) - 1], np.diff(self._inicio))
+        pendientes = elegidos[np.frombuffer(self._p_termino, dtype=np.int32)]
+        return np.unique(np.concatenate([self._docs[integrados],
+                                         np.frombuffer(self._p_doc, dtype=np.int32)[pendientes]]))
+
+    def containing(self, texto):
+        """
+        Tickets en los que cada palabra del texto aparece dentro de alguna palabra indexada.
+        Como las palabras clave de las reglas se buscan como subcadenas del contenido, todo ticket
+        con la palabra clave está en el resultado (puede haber de más, nunca de menos).
+
+        Args:
+            texto: Palabra clave o frase
+
+        Returns:
+            Arreglo ordenado de posiciones, o None si el texto no tiene palabras (no se puede acotar)
+        """
+        resultado = None
+        for palabra in set(palabras_indexadas(texto)):
+            docs = self._tickets_con_terminos(self._terminos_con(palabra))
+            resultado = docs if resultado is None else np.intersect1d(resultado, docs, assume_unique=True)
+            if not len(resultado):
+                break
+        return resultado
+
+    def starting_with(self, prefijo):
+        """Tickets (ordenados) con alguna palabra que empieza con el prefijo plegado (por ejemplo, una raíz)"""
+        return self._tickets_con_terminos(self._terminos_prefijo(plegar(prefijo)))
+
+    def with_stem(self, palabra):
+        """
+        Tickets (ordenados) con alguna palabra de la misma raíz que la palabra, como compara la regla.
+        La raíz no siempre es un prefijo de la palabra ('eficiencia' -> 'eficient'): se recorren los
+        términos que empiezan con la raíz sin sus dos últimas letras y se comparan sus raíces.
+        """
+        raiz = stem(palabra)
+        prefijo = raiz[:max(len(raiz) - 2, 1)]
+        return self._tickets_con_terminos([termino for termino in self._terminos_prefijo(prefijo)
+                                           if stem(self._terminos[termino]) == raiz])
+
+    def similar_to(self, palabra, distancia):
+        """Tickets (ordenados) con alguna palabra a distancia de edición <= distancia de la palabra"""
+        palabra = plegar(palabra)
+        if self._juntos is None:
+            self._terminos_con(palabra)
+        largos = np.diff(np.append(self._comienzos, len(self._juntos))) - 1
+        cercanos = np.flatnonzero(np.abs(largos - len(palabra)) <= distancia)
+        terminos = [int(termino) for termino in cercanos
+                    if distancia_edicion(palabra, self._terminos[termino], distancia) <= distancia]
+        return self._tickets_con_terminos(terminos)
+
+    def _tickets_de(self, palabras, prefijo=False):
+        """
+        Tickets que tienen la palabra, el prefijo o la frase.
+
+        Args:
+            palabras: Palabras plegadas (varias = frase)
+            prefijo: Si es True la palabra se busca como prefijo (solo palabras sueltas)
+
+        Returns:
+            Arreglo de tickets (puede tener repetidos), o None si la consulta no tiene palabras
+        """
+        if not palabras:
+            return None
+        if len(palabras) == 1 and prefijo:
+            terminos = self._terminos_prefijo(palabras[0])
+            if not terminos:
+                return np.zeros(0, dtype=np.int32)
+            return np.concatenate([self._apariciones(termino)[0] for termino in terminos])
+
+        listas = []
+        for desplazamiento, palabra in enumerate(palabras):
+            termino = self._vocabulario.get(palabra)
+            if termino is None:
+                return np.zeros(0, dtype=np.int32)
+            listas.append((desplazamiento, *self._apariciones(termino)))
+        if len(listas) == 1:
+            return listas[0][1]
+
+        # Frase: se cruzan claves (ticket, posición donde empieza la frase), de la lista más corta a la más
+        # larga. Las claves de cada lista ya están ordenadas, así el cruce es una búsqueda binaria.
+        claves = None
+        for desplazamiento, docs, pos in sorted(listas, key=lambda lista: len(lista[1])):
+            clave = (docs.astype(np.int64) << 17) + pos.astype(np.int64) - desplazamiento
+            if claves is None:
+                claves = clave
+            elif len(clave):
+                posiciones = np.minimum(np.searchsorted(clave, claves), len(clave) - 1)
+                claves = claves[clave[posiciones] == claves]
+            else:
+                claves = clave
+            if not len(claves):
+                break
+        return (claves >> 17).astype(np.int32)
+
+    def _columnas_numpy(self):
+        if self._columnas is None:
+            self._columnas = {'fecha': np.array(self._fechas, dtype=np.int32),
+                              **{campo: np.array(self._codigos[campo], dtype=np.int16) for campo in CAMPOS_FILTRO}}
+        return self._columnas
+
+    def values(self, campo):
+        """Valores distintos de un campo de filtro ('prioridad' o 'tipo'), ordenados"""
+        return sorted(valor for valor in self._valores[campo] if valor is not None)
+
+    def _filtrar(self, desde=None, hasta=None, **valores):
+        """Máscara de los tickets que cumplen los filtros de fecha y de valores exactos"""
+        columnas = self._columnas_numpy()
+        mascara = np.ones(len(self), dtype=bool)
+        if desde is not None:
+            mascara &= columnas['fecha'] >= _dia(desde)
+        if hasta is not None:
+            mascara &= (columnas['fecha'] <= _dia(hasta)) & (columnas['fecha'] != SIN_FECHA)
+        for campo, elegidos in valores.items():
+            if elegidos is None:
+                continue
+            if isinstance(elegidos, str):
+                elegidos = [elegidos]
+            # Tabla código -> elegido (más rápido que np.isin sobre toda la columna)
+            tabla = np.zeros(len(self._valores[campo]) + 1, dtype=bool)
+            tabla[[self._valores[campo][valor] for valor in elegidos if valor in self._valores[campo]]] = True
+            mascara &= tabla[columnas[campo]]
+        return mascara
+
+    def search(self, consulta='', desde=None, hasta=None, prioridad=None, tipo=None, limite=LIMITE_RESULTADOS):
+        """
+        Busca tickets por texto y filtros.
+
+        La consulta tiene términos separados por espacios que deben estar todos (AND). Además:
+        'a OR b' pide alguno de los dos, '-a' o 'NOT a' excluye, '"a b"' es una frase
+        y 'impres*' busca por prefijo. Una consulta vacía devuelve todos los que cumplen los filtros.
+
+        Args:
+            consulta: Texto de la consulta
+            desde: Fecha mínima (date o 'AAAA-MM-DD', opcional)
+            hasta: Fecha máxima (date o 'AAAA-MM-DD', opcional)
+            prioridad: Prioridad o lista de prioridades (opcional)
+            tipo: Tipo o lista de tipos (opcional)
+            limite: Cantidad máxima de posiciones devueltas
+
+        Returns:
+            Diccionario con 'total' (tickets que coinciden) y 'posiciones' (los más nuevos primero)
+        """
+        resultado = self._filtrar(desde, hasta, prioridad=prioridad, tipo=tipo)
+        grupo = None  # Máscara del OR en curso
+        negar = unir = False
+        for menos, frase, suelta in _CONSULTA.findall(consulta or ''):
+            if not frase and suelta in ('AND', 'OR', 'NOT'):
+                unir = unir or suelta == 'OR'
+                negar = negar or suelta == 'NOT'
+                continue
+            negar = negar or bool(menos)
+            if suelta.startswith('-') and len(suelta) > 1:
+                negar, suelta = True, suelta[1:]
+            prefijo = not frase and suelta.endswith('*')
+            docs = self._tickets_de(palabras_indexadas(frase or suelta.rstrip('*')), prefijo)
+            if docs is not None:
+                if negar:
+                    resultado[docs] = False
+                else:
+                    if grupo is not None and not unir:
+                        resultado &= grupo
+                        grupo = None
+                    if grupo is None:
+                        grupo = np.zeros(len(self), dtype=bool)
+                    grupo[docs] = True
+            negar = unir = False
+        if grupo is not None:
+            resultado &= grupo
+
+        encontrados = np.flatnonzero(resultado)
+        return {'total': int(len(encontrados)),
+                'posiciones': encontrados[::-1][:max(limite, 0)].tolist()}
+
+    def save(self, ruta=None):
+        """
+        Guarda el punto de control del índice (se escribe un temporal y se reemplaza en un paso).
+
+        Returns:
+            True si se guardó, False en caso contrario
+        """
+        try:
+            ruta = os.path.join(os.path.dirname(__file__), '..', ruta or self.ruta)
+            self._integrar()
+            columnas = self._columnas_numpy()
+            datos = {
+                'terminos': np.array(json.dumps(self._terminos, ensure_ascii=False)),
+                'valores': np.array(json.dumps({campo: list(valores) for campo, valores in self._valores.items()},
+                                               ensure_ascii=False)),
+                'parametros': np.array([VERSION_FORMATO, len(self), self._huella or 0,
+                                        -1 if self.generacion is None else self.generacion, self.secuencia],
+                                       dtype=np.int64),
+                'inicio': self._inicio,
+                'docs': self._docs,
+                'pos': self._pos,
+                **columnas,
+            }
+            with escritura_atomica(ruta, 'wb') as f:
+                np.savez(f, **datos)
+            self._guardados = len(self)
+            return True
+        except Exception as e:
+            print(f"Error al guardar el índice de búsqueda: {e}")
+            return False
+
+    def _cargar(self, tickets, generacion=None):
+        """
+        Lee el punto de control si corresponde a los primeros tickets del almacén
+        (y a esa generación del almacén, si se indica).
+
+        Returns:
+            True si se cargó, False si no existe, no se pudo leer, es de otra versión o de otros tickets
+        """
+        try:
+            ruta = os.path.join(os.path.dirname(__file__), '..', self.ruta)
+            with np.load(ruta, allow_pickle=False) as datos:
+                parametros = [int(valor) for valor in datos['parametros']]
+                if len(parametros) != 5 or parametros[0] != VERSION_FORMATO:
+                    return False
+                _, guardados, huella, generacion_guardada, secuencia = parametros
+                if generacion is not None and generacion_guardada != generacion:
+                    return False
+                if guardados > len(tickets) or (guardados and huella != _huella(tickets[guardados - 1])):
+                    return False
+                self._terminos = json.loads(str(datos['terminos']))
+                self._vocabulario = {termino: numero for numero, termino in enumerate(self._terminos)}
+                self._valores = {campo: {valor: codigo for codigo, valor in enumerate(valores)}
+                                 for campo, valores in json.loads(str(datos['valores'])).items()}
+                self._inicio, self._docs, self._pos = datos['inicio'], datos['docs'], datos['pos']
+                self._fechas = array('i', datos['fecha'].astype(np.int32).tobytes())
+                self._codigos = {campo: array('h', datos[campo].astype(np.int16).tobytes()) for campo in CAMPOS_FILTRO}
+            self._huella = huella if guardados else None
+            self._guardados = guardados
+            self.generacion = None if generacion_guardada < 0 else generacion_guardada
+            self.secuencia = secuencia
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Error al cargar el índice de búsqueda: {e}")
+            self._reiniciar()
+            return False
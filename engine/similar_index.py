@@ -0,0 +1,201 @@
+# engine/similar_index.py
+# Búsqueda de tickets parecidos a uno nuevo (índice invertido TF-IDF con poda max-score)
+# Cada raíz de palabra tiene la lista de tickets que la usan con su peso (1 + ln tf) / sqrt(términos del ticket).
+# El puntaje de un ticket es la suma de idf * peso de los términos de la consulta. Para no recorrer
+# listas enteras, los términos se procesan de mayor a menor cota; cuando lo que falta sumar ya no
+# alcanza para entrar en el top-k, solo se actualizan los tickets que todavía pueden llegar (max-score).
+
+import math
+from collections import Counter
+
+import numpy as np
+
+from engine.stemmer import stem, tokens
+from engine.text_utils import PALABRAS_VACIAS
+
+# Vecinos que se devuelven por defecto
+K_SIMILARES = 5
+
+# Campos de cada ticket que se guardan en el índice para mostrar los vecinos
+CAMPOS_RESUMEN = ('id_ticket', 'fecha', 'contenido', 'tipo', 'prioridad', 'asignado_a', 'regla')
+
+
+def terminos(texto):
+    """
+    Raíces de las palabras del texto (sin palabras vacías) con su frecuencia.
+
+    Returns:
+        Counter raíz -> veces
+    """
+    return Counter(stem(token) for token in tokens(str(texto or '').lower()) if token not in PALABRAS_VACIAS)
+
+
+class _Lista:
+    """Lista invertida de un término: tickets (en orden creciente) y pesos, con los agregados pendientes aparte"""
+
+    __slots__ = ('docs', 'pesos', 'nuevos_docs', 'nuevos_pesos', 'maximo')
+
+    def __init__(self):
+        self.docs = np.zeros(0, dtype=np.int64)
+        self.pesos = np.zeros(0, dtype=np.float64)
+        self.nuevos_docs = []
+        self.nuevos_pesos = []
+        self.maximo = 0.0  # Mayor peso de la lista (cota del término)
+
+    def __len__(self):
+        return len(self.docs) + len(self.nuevos_docs)
+
+    def agregar(self, doc, peso):
+        self.nuevos_docs.append(doc)
+        self.nuevos_pesos.append(peso)
+        self.maximo = max(self.maximo, peso)
+
+    def arrays(self):
+        """Tickets y pesos como arrays (junta los pendientes, una sola vez)"""
+        if self.nuevos_docs:
+            self.docs = np.concatenate([self.docs, np.array(self.nuevos_docs, dtype=np.int64)])
+            self.pesos = np.concatenate([self.pesos, np.array(self.nuevos_pesos, dtype=np.float64)])
+            self.nuevos_docs, self.nuevos_pesos = [], []
+        return self.docs, self.pesos
+
+
+class SimilarTicketIndex:
+    """
+    Índice invertido de los tickets procesados para buscar los más parecidos a un texto.
+    Los tickets se agregan en el orden del almacén; su posición es su número dentro del índice.
+    """
+
+    def __init__(self, tickets=None):
+        """
+        Inicializa el índice.
+
+        Args:
+            tickets: Lista inicial de tickets procesados (opcional)
+        """
+        self._listas = {}  # raíz -> _Lista
+        self._resumenes = []  # Campos para mostrar de cada ticket, por posición
+        self.generacion, self.secuencia = None, 0  # Punto de control en el almacén (ver follow)
+        if tickets:
+            self.add_many(tickets)
+
+    def __len__(self):
+        return len(self._resumenes)
+
+    def add_many(self, tickets):
+        """Agrega tickets al final del índice"""
+        for ticket in tickets:
+            doc = len(self._resumenes)
+            self._resumenes.append({campo: ticket.get(campo) for campo in CAMPOS_RESUMEN})
+            conteos = terminos(ticket.get('contenido'))
+            if not conteos:
+                continue
+            norma = math.sqrt(len(conteos))
+            for termino, veces in conteos.items():
+                lista = self._listas.get(termino)
+                if lista is None:
+                    lista = self._listas[termino] = _Lista()
+                lista.agregar(doc, (1.0 + math.log(veces)) / norma)
+
+    def update(self, posicion, ticket):
+        """Actualiza los datos que se muestran de un ticket ya indexado cuyo contenido no cambió (al reclasificarlo)"""
+        if posicion < len(self._resumenes):
+            self._resumenes[posicion] = {campo: ticket.get(campo) for campo in CAMPOS_RESUMEN}
+
+    def sync(self, tickets):
+        """
+        Deja el índice al día con la lista completa de tickets del almacén.
+        Si solo se agregaron tickets al final se indexan esos; si no, se reconstruye.
+
+        Returns:
+            Cantidad de tickets indexados en esta llamada
+        """
+        indexados = len(self._resumenes)
+        mismo_inicio = (indexados <= len(tickets) and
+                        (not indexados or self._resumenes[-1]['contenido'] == tickets[indexados - 1].get('contenido')))
+        if not mismo_inicio:
+            self._listas, self._resumenes = {}, []
+            indexados = 0
+        self.add_many(tickets[indexados:])
+        self.generacion = None  # Una lista no es un punto de control del almacén
+        return len(tickets) - indexados
+
+    def follow(self, store):
+        """
+        Deja el índice al día leyendo del almacén solo los cambios posteriores a su punto de control
+        (ver TicketStore.changes_since): los reclasificados se corrigen en su lugar y los agregados
+        se indexan. Si el almacén cambió de generación se reconstruye desde cero.
+
+        Returns:
+            Cantidad de tickets indexados en esta llamada
+        """
+        indexados = len(self._resumenes)
+        cambios = store.changes_since(self.generacion, self.secuencia, indexados)
+        if cambios is None or (indexados and self._resumenes[-1]['contenido'] != store.tickets[indexados - 1].get('contenido')):
+            self._listas, self._resumenes = {}, []
+            cambios = store.changes_since(store.generacion, 0, 0)
+        reemplazados, agregados = cambios
+        for posicion, ticket in reemplazados.items():
+            self.update(posicion, ticket)
+        self.add_many(agregados)
+        self.generacion, self.secuencia = store.generacion, store.secuencia
+        return len(agregados)
+
+    def search(self, contenido, k=K_SIMILARES):
+        """
+        Busca los k tickets más parecidos a un texto.
+
+        Args:
+            contenido: Texto del ticket nuevo
+            k: Cantidad de vecinos
+
+        Returns:
+            Lista de diccionarios (campos del ticket, 'posicion' y 'similitud'), del más parecido al menos
+        """
+        n = len(self._resumenes)
+        consulta = []
+        for termino, veces in terminos(contenido).items():
+            lista = self._listas.get(termino)
+            if lista is not None and len(lista):
+                factor = math.log(1.0 + n / len(lista)) * (1.0 + math.log(veces))
+                consulta.append((factor * lista.maximo, factor, lista))
+        if not consulta or k <= 0:
+            return []
+        consulta.sort(key=lambda item: item[0], reverse=True)
+
+        # Lo máximo que suman los términos desde cada posición (el último, exactamente 0)
+        restantes = [0.0] * (len(consulta) + 1)
+        for i in range(len(consulta) - 1, -1, -1):
+            restantes[i] = restantes[i + 1] + consulta[i][0]
+
+        puntajes = np.zeros(n, dtype=np.float64)
+        umbral = 0.0  # Cota inferior del k-ésimo mejor puntaje
+        candidatos = None  # Tickets que todavía pueden entrar en el top-k (tras empezar la poda)
+        for i, (cota, factor, lista) in enumerate(consulta):
+            docs, pesos = lista.arrays()
+            restante = restantes[i]
+            if candidatos is None and restante >= umbral:
+                # Término esencial: un ticket que no apareció todavía puede entrar en el top-k
+                puntajes[docs] += factor * pesos
+                if len(docs) >= k and i + 1 < len(consulta):
+                    actuales = puntajes[docs]
+                    # El k-ésimo (caro) solo se calcula si puede alcanzar para podar el próximo término
+                    if actuales.max() > restantes[i + 1]:
+                        umbral = max(umbral, np.partition(actuales, len(docs) - k)[len(docs) - k])
+            else:
+                if candidatos is None:
+                    candidatos = np.flatnonzero(puntajes + restante >= umbral)
+                # Solo se suman los candidatos que están en la lista (búsqueda binaria sobre tickets ordenados)
+                posiciones = np.minimum(np.searchsorted(docs, candidatos), len(docs) - 1)
+                presentes = docs[posiciones] == candidatos
+                puntajes[candidatos[presentes]] += factor * pesos[posiciones[presentes]]
+                if len(candidatos) > k:
+                    umbral = max(umbral, np.partition(puntajes[candidatos], len(candidatos) - k)[len(candidatos) - k])
+                candidatos = candidatos[puntajes[candidatos] + restantes[i + 1] >= umbral]
+
+        if candidatos is None:
+            candidatos = np.flatnonzero(puntajes)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(puntajes[candidatos], len(candidatos) - k)[-k:]]
+        candidatos = candidatos[np.argsort(-puntajes[candidatos], kind='stable')]
+        return [{**self._resumenes[doc], 'posicion': doc, 'similitud': round(puntaje, 4)}
+                for doc, puntaje in zip(candidatos.tolist(), puntajes[candidatos].tolist())]
@@ -0,0 +1,410 @@
+# engine/sketches.py
+# Estructuras aproximadas (sketches) para dimensiones con muchos valores distintos
+# Todas ocupan memoria fija, se actualizan ticket por ticket y se pueden fusionar entre particiones
+
+import base64
+import hashlib
+import heapq
+import math
+import zlib
+from array import array
+
+
+def _hash64(valor):
+    """Hash estable de 64 bits (el hash() de Python cambia entre procesos)"""
+    datos = str(valor).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), 'little')
+
+
+def _comprimir(datos):
+    """Bytes -> texto base64 comprimido (los contadores vacíos ocupan casi nada)"""
+    return base64.b64encode(zlib.compress(datos)).decode('ascii')
+
+
+def _descomprimir(texto):
+    """Inverso de _comprimir"""
+    return zlib.decompress(base64.b64decode(texto))
+
+
+class CountMinSketch:
+    """
+    Cuenta aproximada de frecuencias con memoria fija (ancho × profundidad contadores).
+    La estimación nunca es menor al valor real y lo supera en como máximo
+    e/ancho · total con probabilidad 1 - e^-profundidad.
+    """
+
+    def __init__(self, ancho=1024, profundidad=4):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.total = 0
+        self.tabla = [array('q', [0]) * ancho for _ in range(profundidad)]
+
+    def _posiciones(self, valor):
+        """Posición del valor en cada fila (doble hashing a partir de un solo hash)"""
+        h = _hash64(valor)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.ancho for i in range(self.profundidad)]
+
+    def add(self, valor, cantidad=1):
+        """
+        Suma cantidad al contador del valor.
+
+        Returns:
+            La frecuencia estimada del valor después de sumar (evita volver a calcular el hash)
+        """
+        self.total += cantidad
+        estimada = None
+        for fila, posicion in zip(self.tabla, self._posiciones(valor)):
+            fila[posicion] += cantidad
+            estimada = fila[posicion] if estimada is None else min(estimada, fila[posicion])
+        return estimada
+
+    def estimate(self, valor):
+        """Frecuencia estimada del valor (cota superior)"""
+        return min(fila[posicion] for fila, posicion in zip(self.tabla, self._posiciones(valor)))
+
+    def error_bound(self):
+        """Error máximo esperado de una estimación"""
+        return math.e / self.ancho * self.total
+
+    def merge(self, otro):
+        """Fusiona otro sketch con las mismas dimensiones en este"""
+        if (self.ancho, self.profundidad) != (otro.ancho, otro.profundidad):
+            raise ValueError("Los CountMinSketch deben tener el mismo ancho y profundidad")
+        self.total += otro.total
+        for fila, fila_otro in zip(self.tabla, otro.tabla):
+            for i, valor in enumerate(fila_otro):
+                if valor:
+                    fila[i] += valor
+        return self
+
+    def to_dict(self):
+        return {
+            'ancho': self.ancho,
+            'profundidad': self.profundidad,
+            'total': self.total,
+            'tabla': [_comprimir(fila.tobytes()) for fila in self.tabla]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['ancho'], data['profundidad'])
+        sketch.total = data['total']
+        for fila, texto in zip(sketch.tabla, data['tabla']):
+            fila[:] = array('q', _descomprimir(texto))
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Top-K aproximado con k contadores (algoritmo Space-Saving).
+    Cada valor guarda su cuenta y su error máximo: la frecuencia real está entre
+    cuenta - error y cuenta. Consultar el top es O(k), sin importar cuántos tickets haya.
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.total = 0
+        self.contadores = {}  # valor -> [cuenta, error]
+
+    def add(self, valor, cantidad=1):
+        """Registra una aparición del valor"""
+        self.total += cantidad
+        contador = self.contadores.get(valor)
+        if contador is not None:
+            contador[0] += cantidad
+        elif len(self.contadores) < self.k:
+            self.contadores[valor] = [cantidad, 0]
+        else:
+            # Se reemplaza el valor con la cuenta más baja
+            minimo = min(self.contadores, key=lambda v: self.contadores[v][0])
+            cuenta_minima = self.contadores.pop(minimo)[0]
+            self.contadores[valor] = [cuenta_minima + cantidad, cuenta_minima]
+
+    def _minimo(self):
+        """Cuenta mínima si la estructura está llena (cota para valores no presentes)"""
+        if len(self.contadores) < self.k:
+            return 0
+        return min(c[0] for c in self.contadores.values())
+
+    def top(self, n=20):
+        """
+        Retorna los n valores más frecuentes.
+
+        Returns:
+            Lista de tuplas (valor, cuenta_estimada, error_maximo) de mayor a menor
+        """
+        ordenados = sorted(self.contadores.items(), key=lambda item: item[1][0], reverse=True)
+        return [(valor, cuenta, error) for valor, (cuenta, error) in ordenados[:n]]
+
+    def merge(self, otro):
+        """Fusiona otro SpaceSaving en este manteniendo las garantías de error"""
+        minimo_propio, minimo_otro = self._minimo(), otro._minimo()
+        fusion = {}
+        for valor in set(self.contadores) | set(otro.contadores):
+            cuenta_a, error_a = self.contadores.get(valor, [minimo_propio, minimo_propio])
+            cuenta_b, error_b = otro.contadores.get(valor, [minimo_otro, minimo_otro])
+            fusion[valor] = [cuenta_a + cuenta_b, error_a + error_b]
+
+        mejores = sorted(fusion.items(), key=lambda item: item[1][0], reverse=True)[:self.k]
+        self.contadores = dict(mejores)
+        self.total += otro.total
+        return self
+
+    def to_dict(self):
+        return {'k': self.k, 'total': self.total, 'contadores': self.contadores}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.total = data['total']
+        sketch.contadores = {valor: list(c) for valor, c in data['contadores'].items()}
+        return sketch
+
+
+class HeavyHitters:
+    """
+    Valores más frecuentes de un flujo con memoria fija: Count-Min para las frecuencias
+    y un montículo con los k valores de mayor frecuencia estimada.
+    A diferencia de SpaceSaving, cada valor nuevo cuesta O(log k) y no O(k), así sirve
+    para flujos con muchos valores distintos (por ejemplo, n-gramas de palabras).
+    """
+
+    def __init__(self, k=100, ancho=1 << 14, profundidad=4):
+        self.k = k
+        self.frecuencias = CountMinSketch(ancho, profundidad)
+        self.top_actual = {}  # valor -> frecuencia estimada (los k mejores)
+        self._monticulo = []  # (frecuencia, valor); puede tener entradas viejas de un valor
+
+    @property
+    def total(self):
+        return self.frecuencias.total
+
+    def _limpiar_minimo(self):
+        """Descarta del montículo las entradas que ya no reflejan la frecuencia del valor"""
+        while self._monticulo:
+            frecuencia, valor = self._monticulo[0]
+            if self.top_actual.get(valor) == frecuencia:
+                return
+            heapq.heappop(self._monticulo)
+
+    def add(self, valor, cantidad=1):
+        """Registra apariciones del valor"""
+        estimada = self.frecuencias.add(valor, cantidad)
+        if valor in self.top_actual:
+            self.top_actual[valor] = estimada
+            heapq.heappush(self._monticulo, (estimada, valor))
+            if len(self._monticulo) > 4 * self.k:
+                # Demasiadas entradas viejas: se reconstruye con las actuales
+                self._monticulo = [(f, v) for v, f in self.top_actual.items()]
+                heapq.heapify(self._monticulo)
+            return
+        if len(self.top_actual) < self.k:
+            self.top_actual[valor] = estimada
+            heapq.heappush(self._monticulo, (estimada, valor))
+            return
+        self._limpiar_minimo()
+        if estimada > self._monticulo[0][0]:
+            _, saliente = heapq.heapreplace(self._monticulo, (estimada, valor))
+            del self.top_actual[saliente]
+            self.top_actual[valor] = estimada
+
+    def top(self, n=20):
+        """
+        Retorna los n valores más frecuentes.
+
+        Returns:
+            Lista de tuplas (valor, frecuencia_estimada) de mayor a menor
+        """
+        return sorted(self.top_actual.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+class HyperLogLog:
+    """
+    Cantidad aproximada de valores distintos con 2^p registros de un byte.
+    El error relativo típico es 1.04 / sqrt(2^p) (p=10 → ~3%).
+    """
+
+    def __init__(self, p=10):
+        self.p = p
+        self.m = 1 << p
+        self.registros = bytearray(self.m)
+
+    def add(self, valor):
+        """Registra un valor"""
+        h = _hash64(valor)
+        indice = h >> (64 - self.p)
+        resto = h & ((1 << (64 - self.p)) - 1)
+        rango = (64 - self.p) - resto.bit_length() + 1
+        if rango > self.registros[indice]:
+            self.registros[indice] = rango
+
+    def count(self):
+        """Cantidad estimada de valores distintos"""
+        alfa = 0.7213 / (1 + 1.079 / self.m)
+        estimado = alfa * self.m * self.m / sum(2.0 ** -r for r in self.registros)
+        ceros = self.registros.count(0)
+        if estimado <= 2.5 * self.m and ceros:
+            # Corrección para pocos valores (conteo lineal)
+            estimado = self.m * math.log(self.m / ceros)
+        return int(round(estimado))
+
+    def relative_error(self):
+        """Error relativo típico de la estimación"""
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, otro):
+        """Fusiona otro HyperLogLog con el mismo p (máximo registro a registro)"""
+        if self.p != otro.p:
+            raise ValueError("Los HyperLogLog deben tener el mismo p")
+        self.registros = bytearray(max(a, b) for a, b in zip(self.registros, otro.registros))
+        return self
+
+    def to_dict(self):
+        return {'p': self.p, 'registros': _comprimir(bytes(self.registros))}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['p'])
+        sketch.registros = bytearray(_descomprimir(data['registros']))
+        return sketch
+
+
+class TicketSketches:
+    """
+    Sketches de los tickets procesados, separados en particiones mensuales ('AAAA-MM').
+    Cada partición tiene top-K de clientes y contenidos (Space-Saving + Count-Min)
+    y un HyperLogLog de clientes distintos por área y día.
+    Las consultas fusionan solo las particiones pedidas.
+    """
+
+    # Dimensiones con top-K aproximado
+    DIMENSIONES = ('cliente', 'contenido')
+
+    def __init__(self, k=100):
+        self.k = k
+        self.particiones = {}
+
+    def _particion(self, mes):
+        """Obtiene (o crea) la partición del mes"""
+        particion = self.particiones.get(mes)
+        if particion is None:
+            particion = {
+                'top': {d: SpaceSaving(self.k) for d in self.DIMENSIONES},
+                'frecuencias': {d: CountMinSketch() for d in self.DIMENSIONES},
+                'distintos': {}  # 'area|AAAA-MM-DD' -> HyperLogLog de clientes
+            }
+            self.particiones[mes] = particion
+        return particion
+
+    def add(self, ticket):
+        """Actualiza los sketches con un ticket procesado"""
+        fecha = str(ticket.get('fecha', '') or '')
+        particion = self._particion(fecha[:7] or 'sin_fecha')
+        for dimension in self.DIMENSIONES:
+            valor = str(ticket.get(dimension, '') or '').strip()
+            particion['top'][dimension].add(valor)
+            particion['frecuencias'][dimension].add(valor)
+
+        clave = f"{ticket.get('area', '')}|{fecha}"
+        hll = particion['distintos'].get(clave)
+        if hll is None:
+            hll = particion['distintos'][clave] = HyperLogLog()
+        hll.add(str(ticket.get('cliente', '')))
+
+    def months(self):
+        """Meses con datos, ordenados"""
+        return sorted(self.particiones)
+
+    def top(self, dimension, meses=None, n=20):
+        """
+        Top-n aproximado de una dimensión en los meses pedidos.
+
+        Args:
+            dimension: 'cliente' o 'contenido'
+            meses: Lista de meses 'AAAA-MM' (None = todos)
+            n: Cantidad de valores a retornar
+
+        Returns:
+            Tupla (lista de (valor, cuenta_estimada, error_maximo), total de tickets)
+        """
+        top = SpaceSaving(self.k)
+        frecuencias = None
+        for mes in (meses if meses is not None else self.months()):
+            particion = self.particiones.get(mes)
+            if particion is None:
+                continue
+            top.merge(particion['top'][dimension])
+            if frecuencias is None:
+                frecuencias = CountMinSketch.from_dict(particion['frecuencias'][dimension].to_dict())
+            else:
+                frecuencias.merge(particion['frecuencias'][dimension])
+
+        resultado = []
+        for valor, cuenta, error in top.top(n):
+            # Count-Min también es cota superior: se usa la más ajustada de las dos
+            estimado = min(cuenta, frecuencias.estimate(valor))
+            resultado.append((valor, estimado, min(error, int(math.ceil(frecuencias.error_bound())))))
+        return resultado, top.total
+
+    def distinct_clients(self, desde=None, hasta=None):
+        """
+        Clientes distintos por área entre dos fechas (inclusive).
+
+        Args:
+            desde: Fecha inicial 'AAAA-MM-DD' (None = sin límite)
+            hasta: Fecha final 'AAAA-MM-DD' (None = sin límite)
+
+        Returns:
+            Diccionario {area: clientes_distintos_estimados}
+        """
+        por_area = {}
+        for mes, particion in self.particiones.items():
+            if (desde and mes < desde[:7]) or (hasta and mes > hasta[:7]):
+                continue
+            for clave, hll in particion['distintos'].items():
+                area, fecha = clave.rsplit('|', 1)
+                if (desde and fecha < desde) or (hasta and fecha > hasta):
+                    continue
+                if area not in por_area:
+                    por_area[area] = HyperLogLog(hll.p)
+                por_area[area].merge(hll)
+        return {area: hll.count() for area, hll in por_area.items()}
+
+    def merge(self, otro):
+        """Fusiona los sketches de otro almacén (por ejemplo, otra partición de datos)"""
+        for mes, particion_otra in otro.particiones.items():
+            particion = self._particion(mes)
+            for dimension in self.DIMENSIONES:
+                particion['top'][dimension].merge(particion_otra['top'][dimension])
+                particion['frecuencias'][dimension].merge(particion_otra['frecuencias'][dimension])
+            for clave, hll in particion_otra['distintos'].items():
+                if clave in particion['distintos']:
+                    particion['distintos'][clave].merge(hll)
+                else:
+                    particion['distintos'][clave] = HyperLogLog.from_dict(hll.to_dict())
+        return self
+
+    def to_dict(self):
+        return {
+            'k': self.k,
+            'particiones': {
+                mes: {
+                    'top': {d: s.to_dict() for d, s in particion['top'].items()},
+                    'frecuencias': {d: s.to_dict() for d, s in particion['frecuencias'].items()},
+                    'distintos': {clave: h.to_dict() for clave, h in particion['distintos'].items()}
+                }
+                for mes, particion in self.particiones.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketches = cls(data.get('k', 100))
+        for mes, particion in data.get('particiones', {}).items():
+            sketches.particiones[mes] = {
+                'top': {d: SpaceSaving.from_dict(s) for d, s in particion['top'].items()},
+                'frecuencias': {d: CountMinSketch.from_dict(s) for d, s in particion['frecuencias'].items()},
+                'distintos': {clave: HyperLogLog.from_dict(h) for clave, h in particion['distintos'].items()}
+            }
+        return sketches
@@ -0,0 +1,246 @@
+# engine/stemmer.py
+# Raíces de palabras en español (algoritmo Snowball para español, en Python puro)
+# 'lento', 'lenta', 'lentos' y 'lentas' dan la misma raíz 'lent'; 'instalación' e 'instalar', 'instal'.
+# Las palabras se pliegan antes (sin tildes ni ñ), así 'instalacion' sin tilde da la misma raíz.
+# Las reglas con 'raices' comparan la raíz de cada palabra del ticket con las de sus palabras clave.
+
+import re
+from functools import lru_cache
+
+from engine.text_utils import plegar
+
+# Palabras distintas cuya raíz se recuerda
+MAX_CACHE_RAICES = 50000
+
+_VOCALES = set('aeiou')
+_PALABRA = re.compile(r'\w+')
+
+# Paso 0: pronombres pegados al verbo ('instalarlo', 'configurandole')
+_PRONOMBRES = ('selas', 'selos', 'sela', 'selo', 'las', 'les', 'los', 'nos', 'me', 'se', 'la', 'le', 'lo')
+_ANTES_PRONOMBRE = ('iendo', 'ando', 'ar', 'er', 'ir')
+
+# Paso 1: sufijos de sustantivos y adjetivos
+_SUFIJOS_R2 = ('anza', 'anzas', 'ico', 'ica', 'icos', 'icas', 'ismo', 'ismos', 'able', 'ables', 'ible',
+               'ibles', 'ista', 'istas', 'oso', 'osa', 'osos', 'osas', 'amiento', 'amientos',
+               'imiento', 'imientos')
+_SUFIJOS_IC = ('adora', 'ador', 'acion', 'adoras', 'adores', 'aciones', 'ante', 'antes', 'ancia', 'ancias')
+_SUFIJOS_LOGIA = ('logia', 'logias')
+_SUFIJOS_UCION = ('ucion', 'uciones')
+_SUFIJOS_ENCIA = ('encia', 'encias')
+_SUFIJOS_IDAD = ('idad', 'idades')
+_SUFIJOS_IVO = ('iva', 'ivo', 'ivas', 'ivos')
+_SUFIJOS_PASO_1 = (_SUFIJOS_R2 + _SUFIJOS_IC + _SUFIJOS_LOGIA + _SUFIJOS_UCION + _SUFIJOS_ENCIA
+                   + _SUFIJOS_IDAD + _SUFIJOS_IVO + ('amente', 'mente'))
+
+# Paso 2: terminaciones verbales
+_VERBOS_Y = ('ya', 'ye', 'yan', 'yen', 'yeron', 'yendo', 'yo', 'yas', 'yes', 'yais', 'yamos')
+_VERBOS_GU = ('en', 'es', 'eis', 'emos')
+_VERBOS = (
+    'arian', 'arias', 'aran', 'aras', 'ariais', 'aria', 'areis', 'ariamos', 'aremos', 'ara', 'are',
+    'erian', 'erias', 'eran', 'eras', 'eriais', 'eria', 'ereis', 'eriamos', 'eremos', 'era', 'ere',
+    'irian', 'irias', 'iran', 'iras', 'iriais', 'iria', 'ireis', 'iriamos', 'iremos', 'ira', 'ire',
+    'aba', 'ada', 'ida', 'ia', 'iera', 'ad', 'ed', 'id', 'ase', 'iese', 'aste', 'iste', 'an', 'aban',
+    'ian', 'ieran', 'asen', 'iesen', 'aron', 'ieron', 'ado', 'ido', 'ando', 'iendo', 'io', 'ar', 'er',
+    'ir', 'as', 'abas', 'adas', 'idas', 'ias', 'ieras', 'ases', 'ieses', 'is', 'ais', 'abais', 'iais',
+    'arais', 'ierais', 'aseis', 'ieseis', 'asteis', 'isteis', 'ados', 'idos', 'amos', 'abamos',
+    'iamos', 'imos', 'aramos', 'ieramos', 'iesemos', 'asemos'
+)
+
+# Paso 3: vocales finales
+_RESIDUALES = ('os', 'a', 'o', 'i', 'e')
+
+
+def _sufijo(palabra, sufijos, desde=0):
+    """Sufijo más largo de la lista con el que termina la palabra, empezando en 'desde' o después"""
+    mejor = ''
+    for sufijo in sufijos:
+        if len(sufijo) > len(mejor) and palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= desde:
+            mejor = sufijo
+    return mejor
+
+
+def _region_despues(palabra, inicio):
+    """Inicio de la región que sigue a la primera consonante precedida de vocal (desde 'inicio')"""
+    for i in range(inicio + 1, len(palabra)):
+        if palabra[i] not in _VOCALES and palabra[i - 1] in _VOCALES:
+            return i + 1
+    return len(palabra)
+
+
+def _regiones(palabra):
+    """Inicio de las regiones RV, R1 y R2 del algoritmo Snowball"""
+    rv = len(palabra)
+    if len(palabra) >= 2:
+        if palabra[1] not in _VOCALES:
+            # Región después de la siguiente vocal
+            rv = next((i + 1 for i in range(2, len(palabra)) if palabra[i] in _VOCALES), len(palabra))
+        elif palabra[0] in _VOCALES:
+            # Dos vocales al inicio: región después de la siguiente consonante
+            rv = next((i + 1 for i in range(2, len(palabra)) if palabra[i] not in _VOCALES), len(palabra))
+        else:
+            rv = 3
+    r1 = _region_despues(palabra, 0)
+    r2 = _region_despues(palabra, r1)
+    return min(rv, len(palabra)), r1, r2
+
+
+def _paso_1(palabra, r1, r2):
+    """Quita sufijos de sustantivos y adjetivos. Retorna (palabra, si se quitó algo)."""
+    sufijo = _sufijo(palabra, _SUFIJOS_PASO_1)
+    if not sufijo:
+        return palabra, False
+    inicio = len(palabra) - len(sufijo)
+    base = palabra[:inicio]
+
+    if sufijo == 'amente':
+        if inicio < r1:
+            return palabra, False
+        if base.endswith('iv') and len(base) - 2 >= r2:
+            base = base[:-2]
+            if base.endswith('at') and len(base) - 2 >= r2:
+                base = base[:-2]
+        else:
+            previo = _sufijo(base, ('os', 'ic', 'ad'), r2)
+            if previo:
+                base = base[:-len(previo)]
+        return base, True
+
+    if inicio < r2:
+        return palabra, False
+    if sufijo in _SUFIJOS_LOGIA:
+        return base + 'log', True
+    if sufijo in _SUFIJOS_UCION:
+        return base + 'u', True
+    if sufijo in _SUFIJOS_ENCIA:
+        return base + 'ente', True
+    if sufijo in _SUFIJOS_IC:
+        previo = _sufijo(base, ('ic',), r2)
+    elif sufijo == 'mente':
+        previo = _sufijo(base, ('ante', 'able', 'ible'), r2)
+    elif sufijo in _SUFIJOS_IDAD:
+        previo = _sufijo(base, ('abil', 'ic', 'iv'), r2)
+    elif sufijo in _SUFIJOS_IVO:
+        previo = _sufijo(base, ('at',), r2)
+    else:
+        previo = ''
+    return (base[:-len(previo)] if previo else base), True
+
+
+def _paso_2(palabra, rv):
+    """Quita terminaciones verbales dentro de RV"""
+    sufijo = _sufijo(palabra, _VERBOS_Y, rv)
+    if sufijo and palabra[:-len(sufijo)].endswith('u'):
+        return palabra[:-len(sufijo)]
+
+    sufijo = _sufijo(palabra, _VERBOS_GU + _VERBOS, rv)
+    if not sufijo:
+        return palabra
+    base = palabra[:-len(sufijo)]
+    if sufijo in _VERBOS_GU and base.endswith('gu'):
+        base = base[:-1]
+    return base
+
+
+def _stem(palabra):
+    """Raíz de una palabra ya plegada (sin cache)"""
+    if len(palabra) < 3:
+        return palabra
+    rv, r1, r2 = _regiones(palabra)
+
+    # Paso 0: pronombres pegados
+    pronombre = _sufijo(palabra, _PRONOMBRES, rv)
+    if pronombre:
+        base = palabra[:-len(pronombre)]
+        if _sufijo(base, _ANTES_PRONOMBRE, rv) or (base.endswith('yendo') and base[:-5].endswith('u')
+                                                  and len(base) - 5 >= rv):
+            palabra = base
+
+    # Paso 1 y, si no quitó nada, paso 2
+    palabra, quitado = _paso_1(palabra, r1, r2)
+    if not quitado:
+        palabra = _paso_2(palabra, rv)
+
+    # Paso 3: vocal final (y la 'u' de 'gue', 'gui')
+    sufijo = _sufijo(palabra, _RESIDUALES, rv)
+    if sufijo:
+        palabra = palabra[:-len(sufijo)]
+        if sufijo == 'e' and palabra.endswith('gu') and len(palabra) - 1 >= rv:
+            palabra = palabra[:-1]
+    return palabra
+
+
+@lru_cache(maxsize=MAX_CACHE_RAICES)
+def stem(token):
+    """
+    Raíz de una palabra en español (se pliega antes: sin mayúsculas, tildes ni ñ).
+
+    Args:
+        token: Palabra suelta
+
+    Returns:
+        La raíz
+    """
+    return _stem(plegar(token))
+
+
+def stem_sin_cache(token):
+    """Igual que stem pero sin la cache (para medir cuánto aporta)"""
+    return _stem(plegar.__wrapped__(token))
+
+
+def tokens(texto):
+    """Palabras del texto"""
+    return _PALABRA.findall(texto)
+
+
+class StemIndex:
+    """
+    Índice de raíces de las palabras clave de las reglas que usan raíces.
+    Las variantes de una misma palabra ('lento', 'lentas') quedan en una sola entrada.
+    """
+
+    def __init__(self):
+        self._reglas = {}  # raíz -> {id_regla: cuántas palabras clave de la regla tienen esa raíz}
+
+    def __bool__(self):
+        return bool(self._reglas)
+
+    def __len__(self):
+        return len(self._reglas)
+
+    def copy(self):
+        """Copia independiente (para el índice compilado)"""
+        copia = StemIndex()
+        copia._reglas = {raiz: dict(ids) for raiz, ids in self._reglas.items()}
+        return copia
+
+    def add(self, palabra, id_regla):
+        """Registra la raíz de una palabra clave de la regla"""
+        ids = self._reglas.setdefault(stem(palabra), {})
+        ids[id_regla] = ids.get(id_regla, 0) + 1
+
+    def remove(self, palabra, id_regla):
+        """Quita la raíz de una palabra clave de la regla"""
+        raiz = stem(palabra)
+        ids = self._reglas.get(raiz)
+        if not ids or id_regla not in ids:
+            return
+        ids[id_regla] -= 1
+        if not ids[id_regla]:
+            del ids[id_regla]
+            if not ids:
+                del self._reglas[raiz]
+
+    def lookup(self, texto):
+        """
+        Busca las reglas con alguna palabra clave de la misma raíz que una palabra del texto.
+
+        Returns:
+            Conjunto de IDs de reglas
+        """
+        encontradas = set()
+        for token in set(tokens(texto)):
+            ids = self._reglas.get(stem(token))
+            if ids:
+                encontradas.update(ids)
+        return encontradas
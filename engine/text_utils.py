@@ -0,0 +1,28 @@
+# engine/text_utils.py
+# Utilidades de texto compartidas por los gestores y el motor
+
+import unicodedata
+from functools import lru_cache
+
+# Palabras frecuentes que no dicen nada del problema (el modelo y la búsqueda de similares no las cuentan)
+PALABRAS_VACIAS = frozenset(
+    'a al algo ante con como de del desde el ella en entre es esta este esto hay la las le les lo los '
+    'me mi mis muy nada no nos o otra otro para pero por que se sin sobre su sus también tengo tiene un '
+    'una uno y ya yo'.split()
+)
+
+
+@lru_cache(maxsize=4096)
+def plegar(texto):
+    """
+    Forma de comparación de un texto: sin mayúsculas, sin tildes y sin espacios en los extremos.
+    Así 'Ingeniería', 'ingenieria' e 'INGENIERÍA ' son el mismo nombre.
+
+    Args:
+        texto: Texto a plegar (None se toma como vacío)
+
+    Returns:
+        Texto plegado
+    """
+    descompuesto = unicodedata.normalize('NFKD', str(texto or '').casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).strip()
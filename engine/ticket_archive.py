@@ -0,0 +1,357 @@
+# engine/ticket_archive.py
+# Archivo frío de los tickets viejos, comprimido por bloques
+# Los tickets de los meses viejos salen del almacén (facts_storage.json) y se agregan al final de un
+# archivo de bloques comprimidos por separado (lzma o gzip, de la biblioteca estándar). Cada bloque
+# tiene tickets de un solo mes ordenados por id_ticket. Un índice chico en JSON guarda dónde empieza
+# cada bloque, su mes y su rango de IDs: leer un ticket archivado es saltar a su bloque y
+# descomprimir solo ese bloque.
+# El índice guarda también las particiones mensuales de los sketches de los meses archivados, así los
+# contadores agregados (top-K y clientes distintos) siguen cubriendo lo que ya no está en el almacén.
+# Un ID se archiva una sola vez: archivar de nuevo un ticket reescribe los bloques que tenían la copia
+# anterior. Los bloques viejos quedan sin usar en el archivo de datos (el índice es el que manda) hasta
+# que se compacta: el archivo de datos se reescribe solo con los bloques vigentes.
+
+import gzip
+import json
+import lzma
+import os
+import re
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date
+
+from engine.file_utils import escritura_atomica
+from engine.sketches import TicketSketches
+
+# Compresores disponibles: formato -> (comprimir, descomprimir)
+FORMATOS = {'lzma': (lzma.compress, lzma.decompress), 'gzip': (gzip.compress, gzip.decompress)}
+FORMATO_PREDETERMINADO = 'lzma'
+
+# Tickets por bloque: más grande comprime mejor, más chico lee menos para encontrar un ticket
+TICKETS_POR_BLOQUE = 1000
+
+# Al agregar, se compacta si más de esta fracción del archivo de datos son bloques que ya no se usan
+FRACCION_SIN_USAR = 0.5
+
+# Bloques descomprimidos que se recuerdan (las consultas seguidas suelen caer en el mismo mes)
+BLOQUES_EN_CACHE = 8
+
+# Versión del formato del índice (uno de otra versión no se lee)
+VERSION_FORMATO = 1
+
+_MES = re.compile(r'\d{4}-\d{2}')
+
+
+def mes_de(ticket):
+    """Mes 'AAAA-MM' de la fecha del ticket, o None si no tiene una fecha válida"""
+    mes = str(ticket.get('fecha', '') or '')[:7]
+    return mes if _MES.fullmatch(mes) else None
+
+
+def mes_limite(meses, hoy=None):
+    """
+    Primer mes que queda en el almacén al archivar los tickets de más de 'meses' meses.
+
+    Args:
+        meses: Meses que se conservan además del actual (0 = solo el mes actual)
+        hoy: Fecha de referencia (por defecto hoy)
+
+    Returns:
+        Mes 'AAAA-MM'; se archivan los meses anteriores
+    """
+    hoy = hoy or date.today()
+    numero = hoy.year * 12 + hoy.month - 1 - meses
+    return f"{numero // 12:04d}-{numero % 12 + 1:02d}"
+
+
+def archivos_archivo(storage_file):
+    """Archivos de datos e índice del archivo frío de un archivo de tickets"""
+    base = os.path.splitext(storage_file)[0]
+    return base + '_archivo.bin', base + '_archivo.json'
+
+
+class TicketArchive:
+    """
+    Tickets archivados de un almacén. Se escribe solo agregando bloques al final;
+    el índice se reemplaza en un paso después de escribir los bloques. compact() descarta los bloques
+    reemplazados que quedaron en el archivo de datos.
+    """
+
+    def __init__(self, storage_file='knowledge/facts_storage.json'):
+        """
+        Abre el archivo frío de un archivo de tickets (vacío si todavía no se archivó nada).
+
+        Args:
+            storage_file: Archivo de tickets procesados al que pertenece
+        """
+        self.archivo_datos, self.archivo_indice = archivos_archivo(storage_file)
+        self.bloques = []  # Diccionarios con mes, inicio, largo, formato, tickets, bytes_json, primer_id,
+        # ultimo_id y seq_max (el número de secuencia más alto de sus tickets)
+        self.sketches = None  # Sketches (to_dict) de los meses archivados
+        self._cache = OrderedDict()  # número de bloque -> lista de tickets
+        self._cargar()
+
+    def _ruta(self, archivo):
+        return os.path.join(os.path.dirname(__file__), '..', archivo)
+
+    def __len__(self):
+        return sum(bloque['tickets'] for bloque in self.bloques)
+
+    def months(self):
+        """Meses con tickets archivados, ordenados"""
+        return sorted({bloque['mes'] for bloque in self.bloques})
+
+    def _cargar(self):
+        """Lee el índice (si no existe, el archivo está vacío)"""
+        try:
+            with open(self._ruta(self.archivo_indice), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != VERSION_FORMATO:
+                raise ValueError(f"versión de índice {data.get('version')} no soportada")
+            self.bloques = data['bloques']
+            self.sketches = data.get('sketches')
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error al cargar el índice del archivo de tickets: {e}")
+
+    def _guardar_indice(self):
+        """Escribe el índice en un temporal y lo reemplaza en un paso"""
+        try:
+            ruta = self._ruta(self.archivo_indice)
+            with escritura_atomica(ruta) as f:
+                json.dump({'version': VERSION_FORMATO, 'bloques': self.bloques, 'sketches': self.sketches},
+                          f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"Error al guardar el índice del archivo de tickets: {e}")
+            return False
+
+    def append(self, tickets, sketches=None, formato=FORMATO_PREDETERMINADO):
+        """
+        Agrega tickets al archivo: se agrupan por mes, se ordenan por id_ticket y se comprimen en bloques.
+        Si un ID ya estaba archivado, la copia nueva reemplaza a la anterior: los bloques que la tenían
+        se vuelven a escribir sin ella y las particiones de sus meses se recalculan desde el archivo.
+        Un ticket sin fecha que reemplaza a uno archivado queda en el mes del anterior.
+
+        Args:
+            tickets: Lista de tickets con fecha válida (o que reemplazan a uno archivado)
+            sketches: TicketSketches al día con todos los tickets de esos meses (sus particiones
+                      reemplazan a las del archivo)
+            formato: 'lzma' o 'gzip'
+
+        Returns:
+            Bytes comprimidos agregados, o None si no se pudo guardar
+        """
+        comprimir = FORMATOS[formato][0]
+        nuevos_ids = {str(ticket.get('id_ticket')) for ticket in tickets if ticket.get('id_ticket')}
+        anteriores_por_id, reescribir = self._buscar(nuevos_ids)
+
+        por_mes = {}
+        for ticket in tickets:
+            anterior = anteriores_por_id.get(str(ticket.get('id_ticket') or ''))
+            mes = mes_de(ticket) or (mes_de(anterior) if anterior else None)
+            por_mes.setdefault(mes, []).append(ticket)
+        # Los demás tickets de los bloques con copias anteriores se vuelven a escribir con los nuevos
+        recalcular = set()
+        for numero in reescribir:
+            recalcular.add(self.bloques[numero]['mes'])
+            por_mes.setdefault(self.bloques[numero]['mes'], []).extend(
+                ticket for ticket in self.read_block(numero)
+                if str(ticket.get('id_ticket') or '') not in nuevos_ids)
+        recalcular |= {mes for mes, grupo in por_mes.items()
+                       if any(str(ticket.get('id_ticket') or '') in anteriores_por_id for ticket in grupo)}
+
+        nuevos = []
+        try:
+            with open(self._ruta(self.archivo_datos), 'ab') as f:
+                inicio = f.seek(0, os.SEEK_END)
+                for mes in sorted(por_mes):
+                    grupo = sorted(por_mes[mes], key=lambda ticket: str(ticket.get('id_ticket') or ''))
+                    for desde in range(0, len(grupo), TICKETS_POR_BLOQUE):
+                        bloque = grupo[desde:desde + TICKETS_POR_BLOQUE]
+                        texto = '\n'.join(json.dumps(ticket, ensure_ascii=False) for ticket in bloque).encode('utf-8')
+                        datos = comprimir(texto)
+                        f.write(datos)
+                        nuevos.append({'mes': mes, 'inicio': inicio, 'largo': len(datos), 'formato': formato,
+                                       'tickets': len(bloque), 'bytes_json': len(texto),
+                                       'primer_id': str(bloque[0].get('id_ticket') or ''),
+                                       'ultimo_id': str(bloque[-1].get('id_ticket') or ''),
+                                       'seq_max': max(ticket.get('seq', 0) for ticket in bloque)})
+                        inicio += len(datos)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error al escribir el archivo de tickets: {e}")
+            return None
+
+        anteriores = self.bloques, self.sketches
+        self.bloques = [bloque for numero, bloque in enumerate(self.bloques) if numero not in reescribir] + nuevos
+        self._cache.clear()
+        k = sketches.k if sketches is not None else (self.sketches or {}).get('k', TicketSketches().k)
+        particiones = {}
+        if sketches is not None:
+            particiones = {mes: particion for mes, particion in sketches.to_dict()['particiones'].items()
+                           if mes in por_mes}
+        if recalcular:
+            # Las particiones que contaban la copia anterior no se pueden descontar: se recalculan
+            desde_archivo = TicketSketches(k)
+            for mes in recalcular:
+                for ticket in self.iter_tickets(mes, mes):
+                    desde_archivo.add(ticket)
+            particiones.update({mes: particion for mes, particion in desde_archivo.to_dict()['particiones'].items()
+                                if mes in recalcular})
+        if particiones:
+            self.sketches = {'k': k, 'particiones': {**(self.sketches or {}).get('particiones', {}), **particiones}}
+        if not self._guardar_indice():
+            # Los bytes escritos quedan sin usar al final del archivo: el índice es el que manda
+            self.bloques, self.sketches = anteriores
+            self._cache.clear()
+            return None
+        # 'inicio' quedó al final del archivo de datos: es su tamaño
+        if self.unused_bytes() > FRACCION_SIN_USAR * inicio:
+            self.compact()
+        return sum(bloque['largo'] for bloque in nuevos)
+
+    def unused_bytes(self):
+        """Bytes del archivo de datos que no pertenecen a ningún bloque del índice"""
+        try:
+            tamano = os.path.getsize(self._ruta(self.archivo_datos))
+        except OSError:
+            return 0
+        return max(tamano - sum(bloque['largo'] for bloque in self.bloques), 0)
+
+    def compact(self):
+        """
+        Reescribe el archivo de datos solo con los bloques vigentes (copia sus bytes comprimidos,
+        no los vuelve a comprimir) y guarda el índice con las posiciones nuevas.
+        El índice se guarda antes de reemplazar el archivo de datos: si falla, el archivo no cambia.
+
+        Returns:
+            Bytes liberados, o None si no se pudo compactar
+        """
+        liberados = self.unused_bytes()
+        if not liberados:
+            return 0
+        anteriores = self.bloques
+        ruta = self._ruta(self.archivo_datos)
+        try:
+            with open(ruta, 'rb') as origen, escritura_atomica(ruta, 'wb') as f:
+                compactados = []
+                inicio = 0
+                for bloque in anteriores:
+                    origen.seek(bloque['inicio'])
+                    datos = origen.read(bloque['largo'])
+                    f.write(datos)
+                    compactados.append({**bloque, 'inicio': inicio})
+                    inicio += len(datos)
+                f.flush()
+                os.fsync(f.fileno())
+                self.bloques = compactados
+                if not self._guardar_indice():
+                    raise OSError("no se pudo guardar el índice")
+        except Exception as e:
+            print(f"Error al compactar el archivo de tickets: {e}")
+            self.bloques = anteriores
+            return None
+        return liberados
+
+    def _buscar(self, ids):
+        """
+        Busca varios IDs leyendo una sola vez cada bloque cuyo rango de IDs incluye alguno.
+
+        Returns:
+            (diccionario id_ticket -> ticket archivado, números de los bloques donde se encontraron)
+        """
+        ordenados = sorted(ids)
+        encontrados, bloques = {}, set()
+        for numero, bloque in enumerate(self.bloques):
+            i = bisect_left(ordenados, bloque['primer_id'])
+            if i == len(ordenados) or ordenados[i] > bloque['ultimo_id']:
+                continue
+            for ticket in self.read_block(numero):
+                id_ticket = str(ticket.get('id_ticket') or '')
+                if id_ticket in ids:
+                    encontrados[id_ticket] = ticket
+                    bloques.add(numero)
+        return encontrados, bloques
+
+    def archived_sketches(self):
+        """TicketSketches de los meses archivados, o None si no hay"""
+        return TicketSketches.from_dict(self.sketches) if self.sketches else None
+
+    def read_block(self, numero):
+        """
+        Lee un bloque: salta a su posición y descomprime solo ese bloque.
+
+        Returns:
+            Lista de tickets del bloque
+        """
+        tickets = self._cache.get(numero)
+        if tickets is not None:
+            self._cache.move_to_end(numero)
+            return tickets
+        bloque = self.bloques[numero]
+        with open(self._ruta(self.archivo_datos), 'rb') as f:
+            f.seek(bloque['inicio'])
+            datos = f.read(bloque['largo'])
+        texto = FORMATOS[bloque['formato']][1](datos).decode('utf-8')
+        tickets = [json.loads(linea) for linea in texto.split('\n')]
+        self._cache[numero] = tickets
+        if len(self._cache) > BLOQUES_EN_CACHE:
+            self._cache.popitem(last=False)
+        return tickets
+
+    def get_ticket(self, id_ticket):
+        """
+        Busca un ticket archivado por ID leyendo solo los bloques cuyo rango de IDs lo incluye.
+
+        Returns:
+            El ticket, o None si no está archivado
+        """
+        id_ticket = str(id_ticket)
+        for numero in range(len(self.bloques) - 1, -1, -1):
+            bloque = self.bloques[numero]
+            if bloque['primer_id'] <= id_ticket <= bloque['ultimo_id']:
+                for ticket in self.read_block(numero):
+                    if str(ticket.get('id_ticket') or '') == id_ticket:
+                        return ticket
+        return None
+
+    def get_tickets(self, ids):
+        """
+        Busca varios tickets archivados a la vez (cada bloque se lee una sola vez).
+
+        Args:
+            ids: IDs de ticket
+
+        Returns:
+            Diccionario id_ticket -> ticket con los que están archivados
+        """
+        return self._buscar({str(id_ticket) for id_ticket in ids if id_ticket})[0]
+
+    def iter_tickets(self, desde=None, hasta=None):
+        """
+        Recorre los tickets archivados de un rango de meses, bloque por bloque.
+
+        Args:
+            desde: Primer mes 'AAAA-MM' (None = sin límite)
+            hasta: Último mes 'AAAA-MM' (None = sin límite)
+        """
+        for numero, bloque in enumerate(self.bloques):
+            if (desde and bloque['mes'] < desde) or (hasta and bloque['mes'] > hasta):
+                continue
+            yield from self.read_block(numero)
+
+    def iter_since(self, secuencia):
+        """
+        Recorre los tickets archivados con número de secuencia mayor a 'secuencia' (un registro conserva
+        el suyo al archivarse), leyendo solo los bloques que pueden tenerlos.
+
+        Args:
+            secuencia: Número de secuencia del punto de control
+        """
+        for numero, bloque in enumerate(self.bloques):
+            # Los bloques escritos antes de guardar seq_max se revisan siempre
+            if bloque.get('seq_max', secuencia + 1) > secuencia:
+                yield from (ticket for ticket in self.read_block(numero) if ticket.get('seq', 0) > secuencia)
@@ -0,0 +1,661 @@
+# engine/ticket_store.py
+# Almacenamiento de tickets procesados y su vista columnar para estadísticas e informes
+
+import hashlib
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+import pandas as pd
+
+from engine.file_utils import escritura_atomica
+from engine.sketches import TicketSketches
+from engine.similar_index import SimilarTicketIndex
+from engine.incidents import IncidentDetector
+from engine.search_index import TicketSearchIndex, archivo_indice
+from engine.ticket_archive import TicketArchive, FORMATO_PREDETERMINADO, mes_de, mes_limite
+
+# Columnas con pocos valores distintos: se guardan como categorías (códigos enteros)
+COLUMNAS_CATEGORICAS = ['tipo', 'prioridad', 'area', 'asignado_a', 'regla', 'cliente']
+
+# Campos que agregan la clasificación y el almacén (no cuentan para saber si un ticket cambió)
+CAMPOS_RESULTADO = ('regla', 'tipo', 'prioridad', 'asignado_a', 'confianza', 'fecha_procesamiento',
+                    'version_reglas', 'huella', 'version', 'historial', 'seq')
+
+# Modos de upsert_tickets para un ID que ya existe
+MODO_REEMPLAZAR = 'reemplazar'  # El registro nuevo reemplaza al anterior
+MODO_VERSIONAR = 'versionar'  # El registro nuevo reemplaza al anterior y lo guarda en 'historial'
+
+
+def huella_contenido(ticket):
+    """
+    Resumen de los datos del ticket tal como llegó (sin los campos de la clasificación).
+    Junto con la versión de las reglas indica si hace falta volver a procesarlo.
+
+    Returns:
+        Texto hexadecimal de 16 caracteres
+    """
+    datos = {campo: valor for campo, valor in ticket.items() if campo not in CAMPOS_RESULTADO}
+    texto = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _vigente(actual, huella, version_reglas):
+    """True si el registro guardado tiene esos datos y se clasificó con esa versión de las reglas"""
+    return (actual.get('version_reglas') == version_reglas
+            and (actual.get('huella') or huella_contenido(actual)) == huella)
+
+
+class TicketStore:
+    """
+    Clase para gestionar los tickets procesados del sistema.
+    Carga y guarda facts_storage.json y entrega una vista columnar (DataFrame)
+    para que estadísticas, informes y línea de comandos no recorran el JSON a mano.
+    """
+
+    def __init__(self, storage_file='knowledge/facts_storage.json', sketches_file=None):
+        """
+        Inicializa el almacén de tickets.
+
+        Args:
+            storage_file: Ruta al archivo JSON de tickets procesados
+            sketches_file: Ruta al archivo de sketches (por defecto <storage_file>_sketches.json)
+        """
+        self.storage_file = storage_file
+        self.sketches_file = sketches_file or os.path.splitext(storage_file)[0] + '_sketches.json'
+        self.tickets = []
+        self._df = None  # Vista columnar en caché, se invalida al cambiar los tickets
+        self._sketches = None  # Se cargan al primer uso
+        self._por_id = {}  # id_ticket -> posición del último registro con ese ID
+        self._archivo = None  # Archivo frío de los meses viejos, se abre al primer uso
+        self.secuencia = 0  # Último número de secuencia ('seq') asignado a un registro
+        self.generacion = 0  # Cambia cuando los registros cambian de posición o de datos (ver tail)
+        self._cambios_seq = []  # Registro de cambios: números de secuencia en orden...
+        self._cambios_pos = []  # ...y la posición del registro que recibió cada uno
+        self.load_tickets()
+
+    def _ruta(self, archivo=None):
+        """Ruta absoluta del archivo de tickets (o de otro archivo relativo al proyecto)"""
+        return os.path.join(os.path.dirname(__file__), '..', archivo or self.storage_file)
+
+    def load_tickets(self):
+        """Carga los tickets desde el archivo JSON"""
+        try:
+            with open(self._ruta(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                self.tickets = data.get('tickets_procesados', [])
+            self.generacion = data.get('generacion', 0)
+            self._numerar(data.get('secuencia', 0))
+            self._df = None
+            self._indexar_ids()
+            return True
+        except FileNotFoundError:
+            print(f"Archivo {self.storage_file} no encontrado. Creando uno nuevo...")
+            self.tickets = []
+            self.secuencia = self.generacion = 0
+            self._df = None
+            self._indexar_ids()
+            self.save_tickets()
+            return False
+        except Exception as e:
+            print(f"Error al cargar tickets: {e}")
+            return False
+
+    def save_tickets(self):
+        """
+        Guarda los tickets en el archivo JSON.
+        Se escribe un archivo temporal y se reemplaza el original en un solo paso,
+        así un error a mitad de escritura nunca deja el archivo de tickets corrupto.
+        """
+        try:
+            data = {'tickets_procesados': self.tickets, 'secuencia': self.secuencia, 'generacion': self.generacion}
+            with escritura_atomica(self._ruta()) as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            self._df = None
+            return True
+        except Exception as e:
+            print(f"Error al guardar tickets: {e}")
+            return False
+
+    def _indexar_ids(self):
+        """Reconstruye el índice por id_ticket (si hay repetidos queda el último) y el registro de cambios"""
+        self._por_id = {ticket.get('id_ticket'): posicion for posicion, ticket in enumerate(self.tickets)
+                        if ticket.get('id_ticket')}
+        self._cambios_pos = sorted(range(len(self.tickets)), key=lambda posicion: self.tickets[posicion]['seq'])
+        self._cambios_seq = [self.tickets[posicion]['seq'] for posicion in self._cambios_pos]
+
+    def _numerar(self, secuencia):
+        """Da número de secuencia a los registros que no tienen (archivos anteriores o agregados por fuera)"""
+        self.secuencia = max([secuencia] + [ticket.get('seq', 0) for ticket in self.tickets])
+        for ticket in self.tickets:
+            if 'seq' not in ticket:
+                self.secuencia += 1
+                ticket['seq'] = self.secuencia
+
+    def _anotar(self, posiciones):
+        """Asigna un número de secuencia nuevo a los registros de esas posiciones, en ese orden"""
+        for posicion in posiciones:
+            self.secuencia += 1
+            self.tickets[posicion]['seq'] = self.secuencia
+            self._cambios_seq.append(self.secuencia)
+            self._cambios_pos.append(posicion)
+        if len(self._cambios_seq) > 2 * len(self.tickets) + 1000:
+            # Demasiadas entradas de registros que volvieron a cambiar: se rehace
+            self._indexar_ids()
+
+    def tail(self, desde=0):
+        """
+        Recorre los cambios posteriores a un número de secuencia. Cada registro agregado o reemplazado
+        recibe un número ('seq') mayor que todos los anteriores; marcar la versión de las reglas de un
+        ticket que no cambió no cuenta como cambio. Dentro de una misma generación las posiciones no se
+        mueven: los cambios en posiciones ya vistas son reemplazos con los mismos datos (otra clasificación).
+
+        Args:
+            desde: Último número de secuencia ya procesado (0 = todos los registros)
+
+        Returns:
+            Iterador de (seq, posición, ticket) en orden de secuencia; un registro que cambió varias
+            veces aparece una sola vez, con su último número
+        """
+        for numero in range(bisect_right(self._cambios_seq, desde), len(self._cambios_seq)):
+            secuencia, posicion = self._cambios_seq[numero], self._cambios_pos[numero]
+            if self.tickets[posicion]['seq'] == secuencia:
+                yield secuencia, posicion, self.tickets[posicion]
+
+    def changes_since(self, generacion, secuencia, procesados):
+        """
+        Cambios pendientes para un consumidor incremental (índices derivados, sketches) cuyo punto de
+        control es (generacion, secuencia) y que ya procesó los primeros 'procesados' registros.
+
+        Returns:
+            (reemplazados, agregados): diccionario posición -> ticket de los ya procesados que cambiaron
+            y lista de los registros agregados al final; None si el consumidor tiene que empezar de cero
+            (otra generación o un punto de control que no es de estos tickets)
+        """
+        if generacion != self.generacion or secuencia > self.secuencia or procesados > len(self.tickets):
+            return None
+        reemplazados = {}
+        if procesados:
+            for _, posicion, ticket in self.tail(secuencia):
+                if posicion < procesados:
+                    reemplazados[posicion] = ticket
+        return reemplazados, self.tickets[procesados:]
+
+    def get_all_tickets(self):
+        """Retorna todos los tickets procesados"""
+        return self.tickets
+
+    def get_ticket(self, id_ticket):
+        """
+        Retorna el ticket con ese ID (el último registro si hay repetidos); si ya no está en el almacén
+        se busca en el archivo de meses viejos. None si no existe.
+        """
+        posicion = self._por_id.get(id_ticket)
+        if posicion is not None:
+            return self.tickets[posicion]
+        return self.get_archive().get_ticket(id_ticket) if id_ticket else None
+
+    def get_archive(self):
+        """Retorna el archivo frío de los tickets de meses viejos (ver engine.ticket_archive)"""
+        if self._archivo is None:
+            self._archivo = TicketArchive(self.storage_file)
+        return self._archivo
+
+    def archive_old(self, meses, formato=FORMATO_PREDETERMINADO, hoy=None):
+        """
+        Pasa al archivo comprimido los tickets de los meses anteriores a los últimos 'meses' meses
+        y reescribe el almacén solo con los recientes. Los sketches no cambian: las particiones de los
+        meses archivados se guardan en el archivo y siguen contando.
+        Los tickets que ya estaban archivados reemplazan a su copia anterior. Así, volver a archivar
+        después de una interrupción entre la escritura del archivo y la del almacén no los duplica.
+
+        Args:
+            meses: Meses que quedan en el almacén además del actual
+            formato: 'lzma' o 'gzip'
+            hoy: Fecha de referencia (por defecto hoy)
+
+        Returns:
+            Diccionario con 'tickets', 'meses', 'bytes_antes', 'bytes_despues', 'bytes_archivo',
+            'bytes_ahorrados' (el archivo cuenta bloques e índice), 'compresion' (JSON / bloques) y
+            'tickets_por_segundo', o None si no se pudo guardar
+        """
+        inicio = time.perf_counter()
+        limite = mes_limite(meses, hoy)
+        viejos, quedan = [], []
+        for ticket in self.tickets:
+            mes = mes_de(ticket)
+            (viejos if mes is not None and mes < limite else quedan).append(ticket)
+        bytes_antes = os.path.getsize(self._ruta())
+        resumen = {'tickets': len(viejos), 'meses': sorted({mes_de(ticket) for ticket in viejos}),
+                   'bytes_antes': bytes_antes, 'bytes_despues': bytes_antes, 'bytes_archivo': 0,
+                   'bytes_ahorrados': 0, 'compresion': None, 'tickets_por_segundo': None}
+        if not viejos:
+            return resumen
+
+        # Los sketches tienen que estar al día antes de copiar las particiones de los meses archivados
+        sketches = self.get_sketches()
+        archivo = self.get_archive()
+        bloques_previos = len(archivo.bloques)
+        indice_antes = _tamano(archivo._ruta(archivo.archivo_indice))
+        bytes_bloques = archivo.append(viejos, sketches, formato)
+        if bytes_bloques is None:
+            return None
+        self.tickets = quedan
+        self.generacion += 1
+        self._indexar_ids()
+        # Se recalculan desde las particiones archivadas (las de los meses con copias reemplazadas
+        # ya no cuentan la anterior) y los tickets que quedan en el almacén
+        guardado = self.save_tickets() and self.rebuild_sketches()
+        _invalidar_indices(self)
+        if not guardado:
+            return None
+
+        bytes_despues = os.path.getsize(self._ruta())
+        bytes_archivo = bytes_bloques + _tamano(archivo._ruta(archivo.archivo_indice)) - indice_antes
+        bytes_json = sum(bloque['bytes_json'] for bloque in archivo.bloques[bloques_previos:])
+        segundos = time.perf_counter() - inicio
+        resumen.update({'bytes_despues': bytes_despues, 'bytes_archivo': bytes_archivo,
+                        'bytes_ahorrados': bytes_antes - bytes_despues - bytes_archivo,
+                        'compresion': round(bytes_json / bytes_bloques, 2),
+                        'tickets_por_segundo': round(len(viejos) / segundos) if segundos else None})
+        return resumen
+
+    def pending_tickets(self, tickets, version_reglas):
+        """
+        Filtra los tickets que hace falta (re)procesar: los nuevos, los que cambiaron
+        y los que se clasificaron con otra versión de las reglas. Solo busca por ID, no escribe nada.
+
+        Args:
+            tickets: Lista de tickets (sin clasificar o ya clasificados)
+            version_reglas: Versión actual de las reglas (ver classification_engine.version_reglas)
+
+        Returns:
+            Lista de los tickets pendientes, en el mismo orden
+        """
+        # Los IDs que no están en el almacén se buscan juntos en el archivo (cada bloque se lee una vez)
+        archivados = self.get_archive().get_tickets([ticket.get('id_ticket') for ticket in tickets
+                                                     if ticket.get('id_ticket') not in self._por_id])
+        pendientes = []
+        for ticket in tickets:
+            id_ticket = ticket.get('id_ticket')
+            posicion = self._por_id.get(id_ticket) if id_ticket else None
+            if posicion is not None:
+                actual = self.tickets[posicion]
+            else:
+                actual = archivados.get(str(id_ticket)) if id_ticket else None
+            if actual is None or not _vigente(actual, huella_contenido(ticket), version_reglas):
+                pendientes.append(ticket)
+        return pendientes
+
+    def add_tickets(self, tickets):
+        """
+        Agrega tickets procesados y actualiza los sketches en una sola escritura.
+
+        Args:
+            tickets: Lista de diccionarios de tickets procesados
+
+        Returns:
+            True si se guardaron tickets y sketches, False en caso contrario
+        """
+        sketches = self.get_sketches()
+        inicio = len(self.tickets)
+        for ticket in tickets:
+            if ticket.get('id_ticket'):
+                self._por_id[ticket['id_ticket']] = len(self.tickets)
+            self.tickets.append(dict(ticket))
+            sketches.add(ticket)
+        self._anotar(range(inicio, len(self.tickets)))
+        guardado = self.save_tickets() and self.save_sketches()
+        if guardado:
+            _actualizar_indices(self)
+        return guardado
+
+    def add_ticket(self, ticket):
+        """Agrega un ticket procesado"""
+        return self.add_tickets([ticket])
+
+    def upsert_tickets(self, tickets, modo=MODO_REEMPLAZAR):
+        """
+        Guarda tickets procesados sin repetir IDs: los nuevos se agregan al final y los que ya
+        existen reemplazan a su registro (en su lugar) solo si cambiaron los datos o la versión
+        de las reglas. Si nada cambió no se escribe nada.
+        Un ticket que ya está en el archivo de meses viejos no vuelve al almacén: si cambió,
+        se reemplaza dentro del archivo.
+
+        Args:
+            tickets: Lista de tickets procesados (con 'version_reglas')
+            modo: MODO_REEMPLAZAR, o MODO_VERSIONAR para guardar el registro anterior en 'historial'
+
+        Returns:
+            Diccionario con 'agregados', 'reemplazados' y 'sin_cambios', o None si no se pudo guardar
+        """
+        # Los IDs que no están en el almacén se buscan juntos en el archivo (cada bloque se lee una vez)
+        archivados = self.get_archive().get_tickets([ticket.get('id_ticket') for ticket in tickets
+                                                     if ticket.get('id_ticket') not in self._por_id])
+        nuevos = {}  # id_ticket (o posición en el lote si no tiene) -> ticket
+        reemplazos = {}  # posición -> ticket
+        reemplazos_archivo = {}  # id_ticket -> ticket que reemplaza a uno archivado
+        sin_cambios = 0
+        for numero, ticket in enumerate(tickets):
+            id_ticket = ticket.get('id_ticket')
+            ticket = {**ticket, 'huella': huella_contenido(ticket)}
+            posicion = self._por_id.get(id_ticket) if id_ticket else None
+            if posicion is not None:
+                actual = reemplazos.get(posicion, self.tickets[posicion])
+            elif id_ticket and str(id_ticket) in archivados:
+                actual = reemplazos_archivo.get(str(id_ticket), archivados[str(id_ticket)])
+            else:
+                # Un ID repetido dentro del mismo lote se queda con el último
+                nuevos[id_ticket or numero] = ticket
+                continue
+            if _vigente(actual, ticket['huella'], ticket.get('version_reglas')):
+                sin_cambios += 1
+                continue
+            ticket['version'] = actual.get('version', 1) + 1
+            if modo == MODO_VERSIONAR:
+                anterior = {campo: valor for campo, valor in actual.items() if campo != 'historial'}
+                ticket['historial'] = actual.get('historial', []) + [anterior]
+            if posicion is None:
+                reemplazos_archivo[str(id_ticket)] = ticket
+            else:
+                reemplazos[posicion] = ticket
+
+        resumen = {'agregados': len(nuevos), 'reemplazados': len(reemplazos) + len(reemplazos_archivo),
+                   'sin_cambios': sin_cambios}
+        if reemplazos:
+            guardado = self._guardar_reemplazos(reemplazos, list(nuevos.values()))
+        else:
+            guardado = not nuevos or self.add_tickets(list(nuevos.values()))
+        if guardado and reemplazos_archivo:
+            # Las particiones de los meses archivados cambiaron: los sketches se recalculan
+            guardado = (self.get_archive().append(list(reemplazos_archivo.values())) is not None
+                        and self.rebuild_sketches())
+        return resumen if guardado else None
+
+    def update_classifications(self, resultados, version_reglas, confirmados=()):
+        """
+        Guarda en una sola escritura la nueva clasificación de tickets que ya están en el almacén
+        (sus datos no cambian) y marca con la versión de las reglas los que se confirmaron sin cambios.
+
+        Args:
+            resultados: Diccionario posición -> resultado del motor (regla, tipo, prioridad, asignado_a...)
+            version_reglas: Versión de las reglas con la que se reclasificaron
+            confirmados: Posiciones cuya clasificación guardada sigue valiendo con esa versión
+
+        Returns:
+            True si se guardó (o no había nada que guardar), False en caso contrario
+        """
+        fecha_procesamiento = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        reemplazos = {}
+        for posicion, resultado in resultados.items():
+            actual = self.tickets[posicion]
+            datos = {campo: valor for campo, valor in actual.items() if campo not in CAMPOS_RESULTADO}
+            reemplazos[posicion] = {**datos, **resultado, 'fecha_procesamiento': fecha_procesamiento,
+                                    'version_reglas': version_reglas,
+                                    'huella': actual.get('huella') or huella_contenido(actual),
+                                    'version': actual.get('version', 1) + 1}
+        confirmados = [posicion for posicion in confirmados
+                       if posicion not in reemplazos and self.tickets[posicion].get('version_reglas') != version_reglas]
+        for posicion in confirmados:
+            self.tickets[posicion]['version_reglas'] = version_reglas
+        if reemplazos:
+            return self._guardar_reemplazos(reemplazos)
+        if not confirmados:
+            return True
+        guardado = self.save_tickets()
+        if guardado:
+            _actualizar_indices(self)
+        return guardado
+
+    def _guardar_reemplazos(self, reemplazos, nuevos=()):
+        """
+        Reemplaza registros en su lugar, agrega los nuevos al final y guarda.
+        Si los reemplazos solo cambian la clasificación (misma huella), los sketches siguen valiendo
+        y los índices derivados los corrigen en su lugar (ver tail); si cambian datos, se recalculan.
+        """
+        mismos_datos = all(ticket.get('huella') == (self.tickets[posicion].get('huella')
+                                                    or huella_contenido(self.tickets[posicion]))
+                           for posicion, ticket in reemplazos.items())
+        sketches = self.get_sketches() if mismos_datos and nuevos else None
+        inicio = len(self.tickets)
+        for posicion, ticket in reemplazos.items():
+            self.tickets[posicion] = ticket
+        for ticket in nuevos:
+            if ticket.get('id_ticket'):
+                self._por_id[ticket['id_ticket']] = len(self.tickets)
+            self.tickets.append(ticket)
+            if sketches is not None:
+                sketches.add(ticket)
+        self._anotar(sorted(reemplazos))
+        self._anotar(range(inicio, len(self.tickets)))
+
+        if not mismos_datos:
+            # Cambiaron tickets del medio: otra generación, los sketches se recalculan y los índices se rehacen
+            self.generacion += 1
+            guardado = self.save_tickets() and self.rebuild_sketches()
+            _invalidar_indices(self)
+            return guardado
+        guardado = self.save_tickets() and (sketches is None or self.save_sketches())
+        if guardado:
+            _actualizar_indices(self)
+        return guardado
+
+    def compact_duplicates(self):
+        """
+        Deja un solo registro por id_ticket (el último procesado, en su lugar) y guarda.
+        Sirve para limpiar una vez los repetidos que dejaban las cargas anteriores al upsert.
+
+        Returns:
+            Cantidad de registros eliminados, o None si no se pudo guardar
+        """
+        ultimos = set(self._por_id.values())
+        quedan = [ticket for posicion, ticket in enumerate(self.tickets)
+                  if not ticket.get('id_ticket') or posicion in ultimos]
+        eliminados = len(self.tickets) - len(quedan)
+        if not eliminados:
+            return 0
+        self.tickets = quedan
+        self.generacion += 1
+        self._indexar_ids()
+        guardado = self.save_tickets() and self.rebuild_sketches()
+        _invalidar_indices(self)
+        return eliminados if guardado else None
+
+    def get_sketches(self):
+        """
+        Retorna los sketches de los tickets (top-K de clientes y contenidos,
+        clientes distintos por área y día). Si el archivo no existe se reconstruyen; si quedó atrás
+        solo se suman los tickets agregados desde su punto de control.
+        """
+        if self._sketches is None:
+            try:
+                with open(self._ruta(self.sketches_file), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                cambios = self.changes_since(data.get('generacion'), data.get('secuencia', 0),
+                                             data.get('num_tickets', len(self.tickets) + 1))
+                if cambios is None:
+                    # El archivo de tickets se reescribió (o los sketches son de un formato anterior)
+                    self.rebuild_sketches()
+                else:
+                    # Los reemplazos de una misma generación no cambian los datos que cuentan los sketches
+                    self._sketches = TicketSketches.from_dict(data)
+                    for ticket in cambios[1]:
+                        self._sketches.add(ticket)
+                    if cambios[1]:
+                        self.save_sketches()
+            except FileNotFoundError:
+                self.rebuild_sketches()
+            except Exception as e:
+                print(f"Error al cargar sketches: {e}")
+                self.rebuild_sketches()
+        return self._sketches
+
+    def rebuild_sketches(self):
+        """
+        Recalcula los sketches recorriendo todos los tickets y los guarda.
+        Parte de las particiones de los meses archivados (esos tickets ya no están en el almacén).
+        """
+        self._sketches = self.get_archive().archived_sketches() or TicketSketches()
+        for ticket in self.tickets:
+            self._sketches.add(ticket)
+        return self.save_sketches()
+
+    def save_sketches(self):
+        """Guarda los sketches en su archivo (derivado de los tickets, se puede borrar)"""
+        try:
+            with escritura_atomica(self._ruta(self.sketches_file)) as f:
+                data = self._sketches.to_dict()
+                data.update({'num_tickets': len(self.tickets), 'secuencia': self.secuencia,
+                             'generacion': self.generacion})
+                json.dump(data, f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"Error al guardar sketches: {e}")
+            return False
+
+    def to_dataframe(self, desde=None, hasta=None):
+        """
+        Retorna los tickets como DataFrame columnar.
+        Las columnas de baja cardinalidad son categóricas y la fecha es datetime,
+        así los conteos y filtros se hacen vectorizados sobre códigos enteros.
+        Sin rango de fechas son solo los tickets del almacén (los meses archivados no están, ver
+        archived_months); con rango se suman los tickets archivados de esos meses.
+
+        Args:
+            desde: Primera fecha del rango (date, Timestamp o 'AAAA-MM-DD'; None = sin rango)
+            hasta: Última fecha del rango, incluida
+
+        Returns:
+            DataFrame con una fila por ticket (sin rango se reutiliza mientras no cambien los datos)
+        """
+        if self._df is None:
+            self._df = _columnar(self.tickets)
+        if desde is None or hasta is None:
+            return self._df
+
+        inicio, fin = pd.Timestamp(desde), pd.Timestamp(hasta)
+        df = self._df
+        if 'fecha' in df.columns:
+            df = df[(df['fecha'] >= inicio) & (df['fecha'] <= fin)]
+        archivados = list(self.get_archive().iter_tickets(inicio.strftime('%Y-%m'), fin.strftime('%Y-%m')))
+        if not archivados:
+            return df
+        # Misma conversión para los tickets archivados y los del almacén (las categorías quedan unidas)
+        df = _columnar(archivados + [self.tickets[posicion] for posicion in df.index])
+        return df[(df['fecha'] >= inicio) & (df['fecha'] <= fin)].reset_index(drop=True)
+
+    def archived_months(self):
+        """Meses 'AAAA-MM' con tickets archivados (no están en to_dataframe() sin rango de fechas)"""
+        return self.get_archive().months()
+
+
+def _columnar(tickets):
+    """DataFrame de una lista de tickets, con categorías y fechas convertidas"""
+    df = pd.DataFrame(tickets)
+    if 'fecha' in df.columns:
+        df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            df[columna] = df[columna].astype('category')
+    return df
+
+
+# Índices derivados de los tickets (similares, incidentes, búsqueda) por archivo:
+# (ruta, clase) -> (firma del archivo, índice)
+_indices = {}
+_lock_indices = threading.Lock()
+
+
+def _tamano(ruta):
+    """Tamaño del archivo en bytes (0 si no existe)"""
+    try:
+        return os.path.getsize(ruta)
+    except OSError:
+        return 0
+
+
+def _firma_archivo(ruta):
+    """(mtime, tamaño) del archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+        return estado.st_mtime_ns, estado.st_size
+    except OSError:
+        return None
+
+
+def _actualizar_indices(store):
+    """
+    Pone al día los índices derivados ya construidos con lo que el almacén acaba de guardar:
+    cada uno lee los cambios posteriores a su punto de control (ver TicketStore.tail).
+    """
+    ruta = os.path.abspath(store._ruta())
+    with _lock_indices:
+        for (ruta_indice, clase), (_, indice) in list(_indices.items()):
+            if ruta_indice == ruta:
+                indice.follow(store)
+                _indices[(ruta, clase)] = (_firma_archivo(ruta), indice)
+
+
+def _invalidar_indices(store):
+    """
+    Descarta los índices derivados del almacén (y el punto de control de la búsqueda) después de
+    cambiar de generación; se reconstruyen al próximo uso.
+    """
+    ruta = os.path.abspath(store._ruta())
+    with _lock_indices:
+        for clave in [clave for clave in _indices if clave[0] == ruta]:
+            del _indices[clave]
+        try:
+            os.remove(store._ruta(archivo_indice(store.storage_file)))
+        except FileNotFoundError:
+            pass
+
+
+def _indice_derivado(storage_file, clase, *argumentos):
+    """
+    Índice derivado del archivo de tickets, construido una vez por proceso (clase(*argumentos)).
+    Se pone al día con cada escritura del almacén; si el archivo cambió por fuera, se relee y se
+    procesa solo lo posterior al punto de control del índice (o todo, si es de otra generación).
+    """
+    ruta = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', storage_file))
+    with _lock_indices:
+        guardado = _indices.get((ruta, clase))
+        if guardado is None or guardado[0] != _firma_archivo(ruta):
+            indice = guardado[1] if guardado is not None else clase(*argumentos)
+            indice.follow(TicketStore(storage_file))
+            guardado = _indices[(ruta, clase)] = (_firma_archivo(ruta), indice)
+        return guardado[1]
+
+
+def get_similar_index(storage_file='knowledge/facts_storage.json'):
+    """
+    Retorna el índice de tickets similares del archivo de tickets (ver _indice_derivado).
+
+    Returns:
+        SimilarTicketIndex
+    """
+    return _indice_derivado(storage_file, SimilarTicketIndex)
+
+
+def get_incident_detector(storage_file='knowledge/facts_storage.json'):
+    """
+    Retorna el agrupador de tickets casi iguales del archivo de tickets (ver _indice_derivado).
+
+    Returns:
+        IncidentDetector
+    """
+    return _indice_derivado(storage_file, IncidentDetector)
+
+
+def get_search_index(storage_file='knowledge/facts_storage.json'):
+    """
+    Retorna el índice de búsqueda de texto del archivo de tickets (ver _indice_derivado).
+    Guarda su punto de control junto al archivo de tickets (<storage_file>_busqueda.npz).
+
+    Returns:
+        TicketSearchIndex
+    """
+    return _indice_derivado(storage_file, TicketSearchIndex, archivo_indice(storage_file))
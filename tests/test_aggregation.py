@@ -0,0 +1,59 @@
+# tests/test_aggregation.py
+# Pruebas del motor de conteos de estadísticas
+
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from engine.aggregation import count_dimensions, to_frame
+
+
+def _df():
+    return pd.DataFrame({
+        'tipo': ['REDES', 'HARDWARE', 'REDES', 'SOFTWARE', None, 'REDES'],
+        'prioridad': ['Alta', 'Media', 'Alta', 'Baja', 'Alta', 'Media'],
+        'area': ['TI', 'Ventas', 'Ventas', 'TI', 'TI', 'TI'],
+    })
+
+
+def test_conteos_igual_que_groupby():
+    """Los conteos coinciden con un groupby por columna (los nulos se ignoran igual)"""
+    df = _df()
+    for categorica in (False, True):
+        datos = df.astype('category') if categorica else df
+        conteos = count_dimensions(datos, ['tipo', 'prioridad', 'area'])
+        for columna in ['tipo', 'prioridad', 'area']:
+            esperado = df.groupby(columna).size().to_dict()
+            assert conteos[columna].to_dict() == esperado
+
+
+def test_conteos_ordenados_y_sin_categorias_vacias():
+    """Se omiten categorías sin tickets y el orden es de mayor a menor"""
+    df = _df().astype('category')
+    filtrado = df[df['area'] == 'Ventas']
+    conteo = count_dimensions(filtrado, ['tipo'])['tipo']
+
+    assert conteo.to_dict() == {'HARDWARE': 1, 'REDES': 1}
+    assert list(count_dimensions(df, ['tipo'])['tipo'].index)[0] == 'REDES'
+
+
+def test_tabla_cruzada_area_prioridad():
+    """El cruce área × prioridad coincide con pd.crosstab"""
+    df = _df()
+    tabla = count_dimensions(df, [], cruces=[('area', 'prioridad')])[('area', 'prioridad')]
+    esperado = pd.crosstab(df['area'], df['prioridad'])
+
+    assert tabla.loc['TI', 'Alta'] == esperado.loc['TI', 'Alta']
+    assert tabla.values.sum() == esperado.values.sum()
+
+
+def test_to_frame_formato_graficos():
+    """to_frame entrega las columnas que usan los gráficos"""
+    conteo = count_dimensions(_df(), ['prioridad'])['prioridad']
+    frame = to_frame(conteo, 'prioridad')
+
+    assert list(frame.columns) == ['prioridad', 'Cantidad']
+    assert frame['Cantidad'].sum() == 6
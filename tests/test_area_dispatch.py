@@ -0,0 +1,82 @@
+# tests/test_area_dispatch.py
+# Pruebas del despacho por área: cada ticket recorre el índice general y solo el de su área
+
+import sys
+import os
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.matcher import RuleMatcher, alias_areas
+from engine.text_utils import plegar
+
+CATALOGO = [
+    {'id_area': 'A002', 'nombre': 'Contabilidad'},
+    {'id_area': 'A003', 'nombre': 'Ingeniería'},
+]
+REGLAS = [
+    {'id_regla': 'R01', 'nombre': 'ERP contable', 'palabras_clave': ['sistema', 'erp'], 'areas': ['A002']},
+    {'id_regla': 'R02', 'nombre': 'Planos', 'palabras_clave': ['plano', 'autocad'], 'areas': ['Ingeniería']},
+    {'id_regla': 'R03', 'nombre': 'Sistema', 'palabras_clave': ['sistema', 'plano']},
+    {'id_regla': 'R04', 'nombre': 'Licencias', 'palabras_clave': ['licencia'],
+     'palabras_excluidas': ['prueba'], 'areas': ['A002', 'A003']},
+    {'id_regla': 'R05', 'nombre': 'Licencia general', 'palabras_clave': ['licencia', 'erp']},
+]
+AREAS = ['A002', 'contabilidad', 'Ingeniería ', 'INGENIERIA', 'A003', 'Ventas', None]
+PALABRAS = ['sistema', 'erp', 'plano', 'autocad', 'licencia', 'prueba', 'hola']
+
+
+def _cumple(regla, texto, area):
+    """Evaluación de referencia con el área ya resuelta a su ID"""
+    alias = alias_areas(CATALOGO)
+    areas = {alias.get(plegar(a), plegar(a)) for a in regla.get('areas') or []}
+    clave = alias.get(plegar(area), plegar(area))
+    return (any(p in texto for p in regla['palabras_clave'])
+            and not any(p in texto for p in regla.get('palabras_excluidas') or [])
+            and (not areas or clave in areas))
+
+
+def test_despacho_equivale_a_la_referencia():
+    """Trie, versión compilada y lote dan la primera regla que cumple, con áreas por ID o nombre"""
+    matcher = RuleMatcher(REGLAS, areas=CATALOGO)
+    compilado = matcher.compiled()
+    aleatorio = random.Random(11)
+    casos = [(" ".join(aleatorio.sample(PALABRAS, aleatorio.randint(1, 3))), aleatorio.choice(AREAS))
+             for _ in range(300)]
+    en_lote = compilado.match_many([t for t, _ in casos], [a for _, a in casos])
+
+    for (texto, area), regla_lote in zip(casos, en_lote):
+        esperada = next((r['id_regla'] for r in REGLAS if _cumple(r, texto, area)), None)
+        for regla in (matcher.match(texto, area), compilado.match(texto, area), regla_lote):
+            assert (regla['id_regla'] if regla else None) == esperada, (texto, area)
+
+
+def test_orden_global_entre_indices():
+    """Una regla de área anterior gana a la general; una posterior no"""
+    matcher = RuleMatcher(REGLAS, areas=CATALOGO)
+
+    assert matcher.match("falla el sistema", "Contabilidad")['id_regla'] == 'R01'
+    assert matcher.match("falla el sistema", "Ventas")['id_regla'] == 'R03'
+    assert matcher.match("no abre el plano", "A003")['id_regla'] == 'R02'
+    assert matcher.match("no abre el plano")['id_regla'] == 'R03'
+    # Las palabras de reglas de área no están en el índice general
+    assert 'autocad' not in matcher.keywords_in("autocad")
+    assert matcher.match("autocad", "Ventas") is None
+
+
+def test_cambios_de_regla_y_de_catalogo():
+    """Actualizar una regla la mueve de área y renombrar un área se resuelve con set_areas"""
+    matcher = RuleMatcher(REGLAS, areas=CATALOGO)
+
+    matcher.update_rule({**REGLAS[1], 'areas': ['A002']})
+    assert matcher.match("autocad", "A003") is None
+    assert matcher.match("autocad", "A002")['id_regla'] == 'R02'
+
+    matcher.remove_rule('R01')
+    assert matcher.match("erp", "A002")['id_regla'] == 'R05'
+
+    # La regla guarda el ID, así que sigue valiendo con el nombre nuevo
+    matcher.set_areas([{'id_area': 'A002', 'nombre': 'Finanzas'}, CATALOGO[1]])
+    assert matcher.match("autocad", "Finanzas")['id_regla'] == 'R02'
+    assert matcher.compiled().match("autocad", "finanzas")['id_regla'] == 'R02'
@@ -0,0 +1,95 @@
+# tests/test_areas_manager.py
+# Pruebas del gestor de áreas: búsquedas por índice, lotes y gestor compartido
+
+import sys
+import os
+import json
+import threading
+import time
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.areas_manager import AreasManager, get_areas_manager
+
+
+def _archivo(tmp_path, areas):
+    ruta = tmp_path / "areas.json"
+    ruta.write_text(json.dumps({'areas': areas}, ensure_ascii=False), encoding='utf-8')
+    return str(ruta)
+
+
+def test_busqueda_sin_mayusculas_ni_tildes(tmp_path):
+    """Los nombres se comparan plegados y los IDs nuevos siguen al más alto"""
+    manager = AreasManager(_archivo(tmp_path, [
+        {'id_area': 'A001', 'nombre': 'Ingeniería'},
+        {'id_area': 'A007', 'nombre': 'Logística'},
+    ]))
+
+    assert manager.get_area_by_name(" INGENIERIA ")['id_area'] == 'A001'
+    assert manager.get_area_by_id('A007')['nombre'] == 'Logística'
+    assert not manager.add_area("logistica")
+    assert manager.add_area("Ventas")
+    assert manager.get_area_by_name("ventas")['id_area'] == 'A008'
+
+    assert manager.update_area('A001', nombre="Ingeniería de Planta")
+    assert manager.get_area_by_name("ingenieria") is None
+    assert manager.get_area_by_name("ingeniería de planta")['id_area'] == 'A001'
+
+
+def test_lotes_con_una_escritura(tmp_path):
+    """Un lote se guarda completo o no se aplica"""
+    ruta = _archivo(tmp_path, [{'id_area': 'A001', 'nombre': 'Ventas'}])
+    manager = AreasManager(ruta)
+
+    assert manager.add_areas([{'nombre': 'Marketing'}, {'nombre': 'Compras', 'descripcion': 'Proveedores'}])
+    assert [a['id_area'] for a in AreasManager(ruta).get_all_areas()] == ['A001', 'A002', 'A003']
+
+    # 'marketing' repite un nombre: no se agrega ninguna
+    assert not manager.add_areas([{'nombre': 'Legal'}, {'nombre': 'marketing'}])
+    assert manager.get_area_by_name("Legal") is None
+    assert len(AreasManager(ruta).get_all_areas()) == 3
+
+    assert not manager.update_areas([{'id_area': 'A002', 'nombre': 'Mercadeo'}, {'id_area': 'A009', 'nombre': 'X'}])
+    assert manager.get_area_by_name("Marketing")['id_area'] == 'A002'
+    assert manager.update_areas([{'id_area': 'A002', 'nombre': 'Mercadeo'}, {'id_area': 'A003', 'descripcion': ''}])
+    assert AreasManager(ruta).get_area_by_name("mercadeo")['id_area'] == 'A002'
+
+
+def test_gestor_compartido(tmp_path):
+    """El gestor compartido no relee el archivo salvo que otro lo cambie, y avisa a los suscriptores"""
+    ruta = _archivo(tmp_path, [{'id_area': 'A001', 'nombre': 'Ventas'}])
+    compartido = get_areas_manager(ruta)
+    assert get_areas_manager(ruta) is compartido
+
+    catalogos = []
+    compartido.subscribe(lambda areas: catalogos.append([a['nombre'] for a in areas]))
+    assert compartido.add_area("Compras")
+    assert catalogos == [['Ventas', 'Compras']]
+
+    # Otro proceso edita el archivo
+    otro = AreasManager(ruta)
+    assert otro.delete_area('A001')
+    assert get_areas_manager(ruta).get_area_by_id('A001') is None
+    assert catalogos[-1] == ['Compras']
+
+
+def test_lote_de_otro_hilo_no_se_lleva_los_cambios(tmp_path):
+    """Un alta de otro hilo espera a que termine el lote en curso y no se pierde al restaurar su respaldo"""
+    manager = AreasManager(_archivo(tmp_path, [{'id_area': 'A001', 'nombre': 'Ventas'}]))
+    abierto = threading.Event()
+
+    def cambios_fallidos():
+        manager._agregar("Temporal")
+        abierto.set()
+        time.sleep(0.2)
+        return False
+
+    hilo = threading.Thread(target=manager._en_lote, args=(cambios_fallidos,))
+    hilo.start()
+    abierto.wait()
+    assert manager.add_area("Compras")
+    hilo.join()
+
+    assert manager.get_areas_names() == ['Ventas', 'Compras']
+    assert AreasManager(manager.areas_file).get_areas_names() == ['Ventas', 'Compras']
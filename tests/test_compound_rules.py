@@ -0,0 +1,112 @@
+# tests/test_compound_rules.py
+# Pruebas de las reglas compuestas (todas / ninguna / áreas) evaluadas con máscaras de bits
+
+import sys
+import os
+import json
+import random
+
+import pandas as pd
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.classification_engine import clasificar_contenido
+from engine.matcher import RuleMatcher
+from engine.replay import classify_tickets
+from engine.rules_manager import RulesManager
+
+REGLAS = [
+    {'id_regla': 'R01', 'nombre': 'Atasco sin toner', 'palabras_clave': ['impresora', 'escaner'],
+     'palabras_requeridas': ['atasco'], 'palabras_excluidas': ['toner']},
+    {'id_regla': 'R02', 'nombre': 'Red de Finanzas', 'palabras_clave': ['red', 'wifi'], 'areas': ['Finanzas']},
+    {'id_regla': 'R03', 'nombre': 'Impresora', 'palabras_clave': ['impresora', 'toner']},
+    {'id_regla': 'R04', 'nombre': 'Solo requeridas', 'palabras_clave': [], 'palabras_requeridas': ['vpn', 'lenta']},
+    {'id_regla': 'R05', 'nombre': 'Red', 'palabras_clave': ['red']},
+]
+AREAS = ['Finanzas', 'finanzas ', 'Logística', None]
+PALABRAS = ['impresora', 'escaner', 'atasco', 'toner', 'red', 'wifi', 'vpn', 'lenta', 'hola', 'equipo']
+
+
+def _cumple(regla, texto, area):
+    """Evaluación de referencia, directa sobre el texto"""
+    clave = regla.get('palabras_clave') or []
+    return ((not clave or any(p in texto for p in clave))
+            and all(p in texto for p in regla.get('palabras_requeridas') or [])
+            and not any(p in texto for p in regla.get('palabras_excluidas') or [])
+            and (not regla.get('areas') or str(area or '').strip().lower() in
+                 {a.lower() for a in regla['areas']}))
+
+
+def _casos():
+    aleatorio = random.Random(7)
+    return [(" ".join(aleatorio.sample(PALABRAS, aleatorio.randint(1, 4))), aleatorio.choice(AREAS))
+            for _ in range(400)]
+
+
+def test_match_equivale_a_la_referencia():
+    """El trie, la versión compilada y el lote con NumPy dan la primera regla que cumple"""
+    matcher = RuleMatcher(REGLAS)
+    compilado = matcher.compiled()
+    casos = _casos() + [("la impresora tiene un atasco", None), ("atasco de toner en la impresora", None),
+                        ("sin red", "Finanzas"), ("sin red", "Ventas"), ("la vpn está lenta", None)]
+    en_lote = compilado.match_many([t for t, _ in casos], [a for _, a in casos])
+
+    for (texto, area), regla_lote in zip(casos, en_lote):
+        esperada = next((r['id_regla'] for r in REGLAS if _cumple(r, texto, area)), None)
+        for regla in (matcher.match(texto, area), compilado.match(texto, area), regla_lote):
+            assert (regla['id_regla'] if regla else None) == esperada, (texto, area)
+
+
+def test_cambios_incrementales_de_condiciones():
+    """Editar y eliminar reglas compuestas actualiza sus máscaras y poda el trie"""
+    matcher = RuleMatcher(REGLAS)
+    assert matcher.match("atasco en la impresora")['id_regla'] == 'R01'
+
+    matcher.update_rule({**REGLAS[0], 'palabras_excluidas': ['impresora']})
+    assert matcher.match("atasco en la impresora")['id_regla'] == 'R03'
+    assert matcher.match("atasco en el escaner")['id_regla'] == 'R01'
+
+    matcher.remove_rule('R01')
+    matcher.remove_rule('R04')
+    assert matcher.match("atasco en el escaner") is None
+    assert matcher.match("la vpn está lenta") is None
+    assert 'atasco' not in matcher.keywords_in("atasco")
+
+
+def test_esquema_y_validacion(tmp_path):
+    """El gestor guarda las condiciones, rechaza contradicciones y las exporta en CSV"""
+    ruta = tmp_path / "reglas.json"
+    ruta.write_text(json.dumps({'reglas_personalizadas': []}), encoding='utf-8')
+    manager = RulesManager(str(ruta))
+
+    assert manager.add_rule("Atasco", [], "HARDWARE", "Alta", "Soporte",
+                            palabras_requeridas=["impresora", "atasco"], palabras_excluidas=["toner"],
+                            areas=["Finanzas"])
+    assert not manager.validate_rules()
+    regla = manager.get_rule_by_id("R01")
+    assert manager.validate_rule({**regla, 'palabras_excluidas': ['atasco']})
+    assert manager.validate_rule({**regla, 'palabras_requeridas': []})
+
+    archivo_csv = str(tmp_path / "reglas.csv")
+    assert manager.export_rules(archivo_csv)
+    otro = tmp_path / "otro.json"
+    otro.write_text(json.dumps({'reglas_personalizadas': []}), encoding='utf-8')
+    copia = RulesManager(str(otro))
+    assert copia.import_rules(archivo_csv) == 1
+    importada = copia.get_rule_by_id("R01")
+    assert importada['palabras_requeridas'] == ["impresora", "atasco"]
+    assert importada['palabras_excluidas'] == ["toner"]
+    assert importada['areas'] == ["Finanzas"]
+
+
+def test_clasificacion_por_area():
+    """El motor y la clasificación en lote usan el área del ticket"""
+    indice = RuleMatcher(REGLAS)
+    assert clasificar_contenido("no hay red", indice, area="Finanzas")['regla'].endswith("(R02)")
+    assert clasificar_contenido("no hay red", indice, area="Ventas")['regla'].endswith("(R05)")
+
+    df = pd.DataFrame({'contenido': ["No hay red", "No hay red", "No hay red"],
+                       'area': ["Finanzas", "Ventas", "Finanzas"]})
+    resultado = classify_tickets(df, REGLAS)
+    assert [r.split('(')[-1] for r in resultado['regla']] == ["R02)", "R05)", "R02)"]
@@ -0,0 +1,128 @@
+# tests/test_fallback_model.py
+# Pruebas del modelo estadístico para los tickets que no coinciden con ninguna regla
+
+import sys
+import os
+import json
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from engine.classification_engine import clasificar_contenido, RESULTADO_SIN_CLASIFICAR
+from engine.fallback_model import FallbackClassifier, REGLA_MODELO, etiqueta_entrenamiento
+from engine.matcher import RuleMatcher
+from engine.ticket_store import TicketStore
+
+RED = ('REDES', 'Media', 'Equipo de Redes')
+IMPRESION = ('HARDWARE', 'Baja', 'Equipo de Hardware')
+
+TICKETS = [
+    {'contenido': "el wifi del piso se corta", 'regla': "Regla: Red", 'tipo': 'REDES',
+     'prioridad': 'Media', 'asignado_a': 'Equipo de Redes'},
+    {'contenido': "sin conexión wifi en la sala", 'regla': "Regla: Red", 'tipo': 'REDES',
+     'prioridad': 'Media', 'asignado_a': 'Equipo de Redes'},
+    {'contenido': "la impresora no saca hojas", 'regla': "Regla: Impresora", 'tipo': 'HARDWARE',
+     'prioridad': 'Baja', 'asignado_a': 'Equipo de Hardware'},
+    {'contenido': "impresoras atascadas con hojas", 'regla': "Regla: Impresora", 'tipo': 'HARDWARE',
+     'prioridad': 'Baja', 'asignado_a': 'Equipo de Hardware'},
+    # No sirven para entrenar: no los decidió una regla
+    {'contenido': "el wifi anda mal", 'regla': 'Sin clasificar', 'tipo': 'SOFTWARE',
+     'prioridad': 'Baja', 'asignado_a': 'Equipo de Software'},
+    {'contenido': "hojas en blanco", 'regla': REGLA_MODELO, 'tipo': 'REDES',
+     'prioridad': 'Media', 'asignado_a': 'Equipo de Redes'},
+    {'contenido': "", 'regla': 'Error: Contenido vacío', 'tipo': 'ERROR',
+     'prioridad': 'Baja', 'asignado_a': 'Sin asignar'},
+]
+
+
+def _entrenado():
+    """Modelo entrenado con los tickets de ejemplo"""
+    modelo = FallbackClassifier()
+    assert modelo.fit_tickets(TICKETS) == 4
+    return modelo
+
+
+def test_prediccion_y_confianza():
+    """Predice por las palabras conocidas (también variantes) y no decide sin evidencia"""
+    modelo = _entrenado()
+    assert [etiqueta_entrenamiento(t) for t in TICKETS[4:]] == [None, None, None]
+    assert modelo.vistos == len(TICKETS) and len(modelo) == 4
+
+    clase, confianza = modelo.predict("otra vez se cortó el wifi")
+    assert clase == RED and confianza >= modelo.umbral
+    assert modelo.predict("las impresoras sin hojas")[0] == IMPRESION
+    assert modelo.predict("nada que ver con esto") is None  # Ninguna palabra conocida
+    assert modelo.predict("wifi e impresora") is None  # Empate: no está seguro
+
+    textos = ["wifi caído", "", "hojas atascadas", "hola"]
+    assert modelo.predict_many(textos) == [modelo.predict(t) for t in textos]
+
+
+def test_guardar_cargar_e_integrar_con_el_motor(tmp_path):
+    """El archivo guarda el modelo completo y el motor solo lo usa cuando ninguna regla coincide"""
+    modelo = _entrenado()
+    ruta = str(tmp_path / "modelo.npz")
+    assert modelo.save(ruta)
+    cargado = FallbackClassifier.load(ruta)
+    assert cargado.clases == modelo.clases and cargado.vistos == modelo.vistos
+    textos = ["wifi caído", "hojas atascadas", "wifi e impresora"]
+    assert cargado.predict_many(textos) == modelo.predict_many(textos)
+    assert FallbackClassifier.load(str(tmp_path / "no_existe.npz")) is None
+
+    reglas = RuleMatcher([{'id_regla': 'R01', 'nombre': 'Wifi', 'palabras_clave': ['wifi'],
+                           'tipo': 'SOFTWARE', 'prioridad': 'Alta', 'asignado_a': 'Equipo'}])
+    vacio = RuleMatcher([])
+    # Coincide una regla: el modelo no interviene
+    assert clasificar_contenido("se corta el wifi", reglas, vacio, modelo=cargado)['regla'].endswith('(R01)')
+    # Sin regla: decide el modelo, o queda sin clasificar si no está seguro
+    resultado = clasificar_contenido("se corta el wifi", vacio, vacio, modelo=cargado)
+    assert resultado['regla'] == REGLA_MODELO and resultado['tipo'] == 'REDES' and resultado['confianza'] > 0
+    assert clasificar_contenido("hola", vacio, vacio, modelo=cargado) == RESULTADO_SIN_CLASIFICAR
+    assert clasificar_contenido("se corta el wifi", vacio, vacio) == RESULTADO_SIN_CLASIFICAR
+
+
+def test_entrenamiento_incremental_por_linea_de_comandos(tmp_path):
+    """Cada entrenamiento agrega solo los tickets nuevos del almacén"""
+    almacen = tmp_path / "tickets.json"
+    salida = str(tmp_path / "modelo.npz")
+    almacen.write_text(json.dumps({'tickets_procesados': TICKETS[:2]}), encoding='utf-8')
+    assert cli.main(['entrenar-modelo', '--almacen', str(almacen), '--salida', salida]) == 0
+    assert len(FallbackClassifier.load(salida)) == 2
+
+    almacen.write_text(json.dumps({'tickets_procesados': TICKETS}), encoding='utf-8')
+    assert cli.main(['entrenar-modelo', '--almacen', str(almacen), '--salida', salida]) == 0
+    modelo = FallbackClassifier.load(salida)
+    assert len(modelo) == 4 and modelo.vistos == len(TICKETS)
+    assert sorted(modelo.clases) == sorted([RED, IMPRESION])
+
+    # Sin tickets nuevos no cambia; --desde-cero vuelve a contar todo una sola vez
+    assert cli.main(['entrenar-modelo', '--almacen', str(almacen), '--salida', salida]) == 0
+    assert cli.main(['entrenar-modelo', '--almacen', str(almacen), '--salida', salida, '--desde-cero']) == 0
+    assert len(FallbackClassifier.load(salida)) == 4
+
+
+def test_entrenar_no_saltea_tickets_al_archivar(tmp_path):
+    """El punto de control es (generación, secuencia): archivar achica el almacén sin hacer saltear tickets"""
+    almacen = str(tmp_path / "tickets.json")
+    salida = str(tmp_path / "modelo.npz")
+    entrenar = ['entrenar-modelo', '--almacen', almacen, '--salida', salida]
+    with open(almacen, 'w', encoding='utf-8') as f:
+        json.dump({'tickets_procesados': [{**ticket, 'id_ticket': f'TK{i:03d}', 'fecha': '2025-01-10'}
+                                          for i, ticket in enumerate(TICKETS[:4])]}, f)
+    assert cli.main(entrenar) == 0
+
+    # Llegan tickets (dos de un mes viejo) y se archivan los meses viejos antes de volver a entrenar
+    store = TicketStore(almacen)
+    assert store.add_tickets([{**ticket, 'id_ticket': f'TK1{i:02d}', 'fecha': '2025-01-20'}
+                              for i, ticket in enumerate(TICKETS[:2])])
+    assert store.add_tickets([{**TICKETS[2], 'id_ticket': 'TK200', 'fecha': date.today().isoformat()}])
+    assert store.archive_old(1)['tickets'] == 6
+    assert cli.main(entrenar) == 0
+    modelo = FallbackClassifier.load(salida)
+    assert len(modelo) == 7
+    assert (modelo.generacion, modelo.secuencia, modelo.vistos) == (store.generacion, store.secuencia, 1)
+
+    assert cli.main(entrenar) == 0
+    assert len(FallbackClassifier.load(salida)) == 7
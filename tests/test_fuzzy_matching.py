@@ -0,0 +1,95 @@
+# tests/test_fuzzy_matching.py
+# Pruebas de la coincidencia con errores de tipeo (índice de borrados)
+
+import sys
+import os
+
+import pandas as pd
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.fuzzy_index import FuzzyIndex, distancia_edicion, distancia_permitida
+from engine.matcher import RuleMatcher
+from engine.replay import replay_diff
+from engine.rule_analyzer import analyze_rules
+from engine.rules_manager import RulesManager
+
+REGLAS = [
+    {'id_regla': 'R01', 'nombre': 'Phishing', 'palabras_clave': ['phishing', 'correo sospechoso'], 'difuso': 1},
+    {'id_regla': 'R02', 'nombre': 'Impresora', 'palabras_clave': ['impresora'], 'difuso': 2,
+     'palabras_excluidas': ['toner']},
+    {'id_regla': 'R03', 'nombre': 'Contraseña', 'palabras_clave': ['contraseña', 'red'], 'difuso': 1},
+    {'id_regla': 'R04', 'nombre': 'Internet', 'palabras_clave': ['internet']},
+]
+
+
+def test_distancia_y_largo_minimo():
+    """Damerau-Levenshtein con corte y sin tolerancia en palabras cortas o frases"""
+    assert distancia_edicion("impresra", "impresora", 2) == 1
+    assert distancia_edicion("imrpesora", "impresora", 2) == 1  # Letras invertidas
+    assert distancia_edicion("imprsra", "impresora", 1) == 2  # Supera el máximo
+    assert distancia_permitida("red", 2) == 0
+    assert distancia_permitida("wifi", 2) == 1
+    assert distancia_permitida("correo sospechoso", 1) == 0
+
+    indice = FuzzyIndex()
+    indice.add("phishing", 'R01', 1)
+    indice.add("phishing", 'R02', 2)
+    assert indice.lookup("un correo de phising") == {'R01', 'R02'}
+    assert indice.lookup("un correo de pishin") == {'R02'}
+    indice.remove("phishing", 'R02')
+    assert indice.lookup("un correo de pishin") == set()
+    indice.remove("phishing", 'R01')
+    assert not indice and not indice._variantes
+
+
+def test_match_con_errores_equivale_a_la_referencia():
+    """Trie, versión compilada y lote encuentran la misma regla con palabras mal escritas"""
+    matcher = RuleMatcher(REGLAS)
+    compilado = matcher.compiled()
+    casos = ["me llegó un phising", "la imprsora no imprime", "la imprsora no tiene toner",
+             "olvidé la contrasena", "no hay rex", "sin internt", "sin internet", "phishing y contrasena"]
+    esperadas = ['R01', 'R02', None, 'R03', None, None, 'R04', 'R01']
+
+    en_lote = compilado.match_many(casos)
+    for texto, esperada, regla_lote in zip(casos, esperadas, en_lote):
+        for regla in (matcher.match(texto), compilado.match(texto), regla_lote):
+            assert (regla['id_regla'] if regla else None) == esperada, texto
+
+    # Quitar la tolerancia de una regla la deja solo con coincidencia exacta
+    matcher.update_rule({**REGLAS[0], 'difuso': 0})
+    assert matcher.match("me llegó un phising") is None
+    assert matcher.match("me llegó un phishing")['id_regla'] == 'R01'
+
+
+def test_palabra_clave_que_tambien_es_requerida_se_exige_exacta():
+    """Una coincidencia con errores o por raíz no da por cumplida una requerida que también es clave"""
+    base = {'id_regla': 'R01', 'nombre': 'Toner', 'palabras_clave': ['impresora', 'toner'],
+            'palabras_requeridas': ['toner']}
+    casos = ["la impresora no imprime", "la impresora no tiene toner", "la imprsora no tiene toner"]
+    for variante, esperadas in (({}, [None, 'R01', 'R01']), ({'difuso': 1}, [None, 'R01', 'R01']),
+                                ({'raices': True}, [None, 'R01', 'R01'])):
+        matcher = RuleMatcher([{**base, **variante}])
+        compilado = matcher.compiled()
+        for texto, esperada, regla_lote in zip(casos, esperadas, compilado.match_many(casos)):
+            for regla in (matcher.match(texto), compilado.match(texto), regla_lote):
+                assert (regla['id_regla'] if regla else None) == esperada, (variante, texto)
+
+
+def test_reglas_y_simulacion_difusas(tmp_path):
+    """El gestor valida 'difuso', el analizador no la poda y la simulación ve los tickets con errores"""
+    manager = RulesManager(str(tmp_path / "reglas.json"))
+    assert manager.add_rule("Impresora", ["impresora"], "HARDWARE", "Media", "Equipo", difuso=1)
+    assert manager.add_rule("Impresora rota", ["impresora rota"], "HARDWARE", "Alta", "Equipo", difuso=1)
+    assert manager.validate_rules() == []
+    assert manager.validate_rule({**manager.get_rule_by_id('R01'), 'difuso': 3})
+
+    # 'impresora rota' contiene 'impresora', pero es una frase: sí está sombreada
+    analisis = analyze_rules(manager.get_all_rules(), reglas_base=[])
+    assert [s['id_regla'] for s in analisis['sombreadas']] == ['R02']
+
+    df = pd.DataFrame({'contenido': ["la impresra no imprime", "la impresora no imprime", "hola"]})
+    borrador = [{**manager.get_rule_by_id('R01'), 'tipo': 'IMPRESION'}, manager.get_rule_by_id('R02')]
+    diff = replay_diff(df, borrador, manager.get_all_rules())
+    assert diff['cambiados'] == 2
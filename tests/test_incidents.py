@@ -0,0 +1,85 @@
+# tests/test_incidents.py
+# Pruebas del agrupador de tickets casi iguales (MinHash + LSH)
+
+import sys
+import os
+import json
+import random
+
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.incidents import IncidentDetector, SIN_INCIDENTE, firmas, shingles
+from engine.ticket_store import TicketStore, get_incident_detector
+
+RAFAGA = [
+    "no tengo internet",
+    "la impresora no imprime",
+    "Sin internet en Contabilidad",
+    "internet caído en ventas",
+    "mi impresora no imprime nada",
+    "olvidé mi contraseña",
+    "NO HAY INTERNET!!",
+    "",
+]
+
+
+def test_agrupa_rafagas_y_separa_lo_distinto(monkeypatch):
+    """Los tickets parecidos van al mismo incidente; los distintos y los vacíos no"""
+    detector = IncidentDetector()
+    asignados = [detector.add(texto) for texto in RAFAGA]
+    internet, impresora, contrasena = asignados[0], asignados[1], asignados[5]
+    assert asignados == [internet, impresora, internet, internet, impresora, contrasena, internet, SIN_INCIDENTE]
+    assert len({internet, impresora, contrasena}) == 3
+
+    grupos = detector.clusters()
+    assert [(g['incidente'], g['posiciones']) for g in grupos] == [(internet, [0, 2, 3, 6]), (impresora, [1, 4])]
+    assert len(detector.clusters(minimo=1)) == 3 and detector.incident_of(4) == impresora
+
+    # Lote y de a uno dan lo mismo
+    assert IncidentDetector([{'contenido': texto} for texto in RAFAGA]).add_many([]) == []
+    assert list(IncidentDetector([{'contenido': texto} for texto in RAFAGA])._asignados) == asignados
+
+    # Con pocos incidentes activos, los usados hace más tiempo dejan de recibir tickets
+    monkeypatch.setattr('engine.incidents.MAX_INCIDENTES_ACTIVOS', 4)
+    for texto in ["pantalla negra", "teclado roto", "mouse sin pilas", "vpn lenta", "correo lleno"]:
+        detector.add(texto)
+    assert detector._activos <= 4
+    assert detector.add("otra vez no tengo internet") not in (internet, SIN_INCIDENTE)
+    assert detector.add("el correo está lleno") == detector.incident_of(len(detector) - 3)
+
+
+def test_firma_estima_jaccard():
+    """La fracción de posiciones iguales de dos firmas se acerca al Jaccard de los trigramas"""
+    aleatorio = random.Random(3)
+    palabras = "internet impresora correo servidor lento caido red sistema acceso pantalla".split()
+    textos = [' '.join(aleatorio.sample(palabras, 4)) for _ in range(60)]
+    matriz, validos = firmas(textos)
+    assert validos.all() and np.array_equal(matriz, firmas(textos)[0])  # Firmas estables
+
+    errores = []
+    for i in range(0, 60, 2):
+        a, b = set(shingles(textos[i])), set(shingles(textos[i + 1]))
+        errores.append(abs(len(a & b) / len(a | b) - (matriz[i] == matriz[i + 1]).mean()))
+    assert np.mean(errores) < 0.06
+    assert firmas([""])[1].tolist() == [False]
+
+
+def test_detector_compartido_sigue_al_almacen(tmp_path):
+    """Cada add_tickets agrupa los tickets nuevos y un archivo reescrito se agrupa de nuevo"""
+    archivo = tmp_path / "tickets.json"
+    archivo.write_text(json.dumps({'tickets_procesados': [{'contenido': RAFAGA[0]}]}), encoding='utf-8')
+    ruta = str(archivo)
+    detector = get_incident_detector(ruta)
+    assert len(detector) == 1
+
+    assert TicketStore(ruta).add_tickets([{'contenido': texto} for texto in RAFAGA[1:4]])
+    assert get_incident_detector(ruta) is detector
+    assert [g['posiciones'] for g in detector.clusters()] == [[0, 2, 3]]
+
+    archivo.write_text(json.dumps({'tickets_procesados': [{'contenido': RAFAGA[1]}, {'contenido': RAFAGA[4]}]}),
+                       encoding='utf-8')
+    os.utime(ruta, ns=(1, 1))
+    assert [g['posiciones'] for g in get_incident_detector(ruta).clusters()] == [[0, 1]]
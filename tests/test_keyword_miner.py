@@ -0,0 +1,71 @@
+# tests/test_keyword_miner.py
+# Pruebas de las palabras clave propuestas a partir de los tickets sin clasificar
+
+import sys
+import os
+import json
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.keyword_miner import KeywordMiner, frases, palabras_existentes, propose_rules, load_proposals
+from engine.rules_manager import RulesManager
+
+SIN_CLASIFICAR = 'Sin clasificar'
+
+
+def _tickets():
+    """Tickets sin clasificar con dos problemas repetidos, más uno que ya clasificó una regla"""
+    textos = (["El lector de huellas no reconoce mi dedo"] * 4 +
+              ["lector de huellas roto en Contabilidad", "La cámara web se ve borrosa",
+               "cámara web borrosa otra vez", "Cámara Web borrosa en la reunión", "pedido de sillas nuevas"])
+    tickets = [{'contenido': texto, 'regla': SIN_CLASIFICAR} for texto in textos]
+    tickets.append({'contenido': "lector de huellas", 'regla': 'Problema de Hardware'})
+    return tickets
+
+
+def test_frases_sin_palabras_vacias_en_los_extremos():
+    """Las frases pueden tener palabras vacías en el medio pero no en los extremos; los números las cortan"""
+    resultado = frases("La Cámara web no anda en el piso 3 desde ayer")
+    assert resultado['camara web'] == 'cámara web' and resultado['web no anda'] == 'web no anda'
+    assert resultado['camara'] == 'cámara' and 'ayer' in resultado
+    assert 'no anda' not in resultado and 'anda en' not in resultado and 'piso 3' not in resultado
+    assert 'la' not in resultado and '3' not in resultado
+    assert all(clave.count(' ') < 3 for clave in frases("uno dos tres cuatro cinco seis"))
+
+
+def test_candidatas_ordenadas_por_tickets_y_solapamiento():
+    """Gana la frase más frecuente; las contenidas en otra y las que ya son palabra clave no salen"""
+    minero = KeywordMiner(k=50)
+    assert minero.add_tickets(_tickets()) == 9
+
+    candidatas = minero.candidates(palabras_existentes([{'palabras_clave': ['Cámara']}]), min_tickets=2)
+    por_frase = {c['frase']: c for c in candidatas}
+    assert candidatas[0] == {'palabra': 'lector de huellas', 'frase': 'lector de huellas', 'tickets': 5,
+                             'solapamiento': 0, 'puntaje': 5}
+    # 'lector' y 'huellas' solo aparecen dentro de 'lector de huellas'
+    assert 'lector' not in por_frase and 'huellas' not in por_frase
+    # 'cámara' ya es palabra clave: 'cámara web' queda con la mitad del puntaje y la escritura más usada
+    assert por_frase['camara web']['palabra'] == 'cámara web' and por_frase['camara web']['puntaje'] == 1.5
+    assert 'camara' not in por_frase and 'sillas' not in por_frase
+
+
+def test_propuestas_se_cargan_inactivas_en_una_transaccion(tmp_path):
+    """Las propuestas se agregan como reglas inactivas, todas o ninguna"""
+    ruta = tmp_path / "reglas.json"
+    ruta.write_text(json.dumps({'reglas_personalizadas': []}), encoding='utf-8')
+    manager = RulesManager(str(ruta))
+    minero = KeywordMiner()
+    minero.add_tickets(_tickets())
+    propuestas = propose_rules(minero.candidates(min_tickets=3))
+    assert propuestas and all(p['nombre'].startswith('Propuesta: ') for p in propuestas)
+
+    assert load_proposals(manager, propuestas) == len(propuestas)
+    reglas = RulesManager(str(ruta)).get_all_rules()
+    assert [r['palabras_clave'] for r in reglas] == [p['palabras_clave'] for p in propuestas]
+    assert not any(r['activa'] for r in reglas)
+
+    # Una propuesta inválida deja las reglas como estaban
+    invalidas = propose_rules(minero.candidates(min_tickets=3)) + [{**propuestas[0], 'prioridad': 'Urgentísima'}]
+    assert load_proposals(manager, invalidas) is None
+    assert len(RulesManager(str(ruta)).get_all_rules()) == len(propuestas)
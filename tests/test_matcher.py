@@ -0,0 +1,106 @@
+# tests/test_matcher.py
+# Pruebas del índice de palabras clave y su actualización por eventos del gestor de reglas
+
+import sys
+import os
+import json
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.matcher import RuleMatcher
+from engine.rules_manager import RulesManager
+from engine.classification_engine import REGLAS_BASE
+
+
+def _primera_regla(reglas, texto):
+    """Búsqueda lineal de referencia (la que hacía el motor antes del índice)"""
+    for regla in reglas:
+        if regla.get('activa', True) and any(p.lower() in texto for p in regla['palabras_clave']):
+            return regla['id_regla']
+    return None
+
+
+def _textos(semilla=3):
+    """Textos de prueba armados con palabras clave de las reglas base y relleno"""
+    aleatorio = random.Random(semilla)
+    palabras = [p for regla in REGLAS_BASE for p in regla['palabras_clave']] + ["hola", "equipo", "oficina"]
+    return [" ".join(aleatorio.sample(palabras, 3)) for _ in range(300)] + ["", "nada que ver"]
+
+
+def test_match_equivale_a_la_busqueda_lineal():
+    """El índice devuelve la misma regla que recorrer las reglas en orden"""
+    matcher = RuleMatcher(REGLAS_BASE)
+    for texto in _textos():
+        regla = matcher.match(texto)
+        assert (regla['id_regla'] if regla else None) == _primera_regla(REGLAS_BASE, texto)
+
+
+def test_cambios_incrementales_mantienen_el_orden():
+    """Editar, desactivar y eliminar reglas actualiza el índice sin reconstruirlo"""
+    reglas = [dict(r) for r in REGLAS_BASE]
+    matcher = RuleMatcher(reglas)
+
+    reglas[5] = {**reglas[5], 'palabras_clave': ['internet', 'fibra']}
+    matcher.update_rule(reglas[5])
+    reglas[0] = {**reglas[0], 'activa': False}
+    matcher.update_rule(reglas[0])
+    matcher.remove_rule(reglas[7]['id_regla'])
+    del reglas[7]
+    nueva = {'id_regla': 'R99', 'nombre': 'Fibra', 'palabras_clave': ['fibra', 'router'], 'activa': True}
+    matcher.add_rule(nueva)
+    reglas.append(nueva)
+
+    for texto in _textos() + ["el router no tiene fibra", "virus en la pantalla"]:
+        regla = matcher.match(texto)
+        assert (regla['id_regla'] if regla else None) == _primera_regla(reglas, texto)
+    assert [r['id_regla'] for r in matcher.get_active_rules()] == [r['id_regla'] for r in reglas if r.get('activa', True)]
+
+
+def test_eventos_del_gestor_actualizan_el_indice(tmp_path):
+    """El índice suscrito al gestor sigue las altas, ediciones y bajas, incluidas las transacciones"""
+    ruta = tmp_path / "reglas.json"
+    ruta.write_text(json.dumps({'reglas_personalizadas': []}), encoding='utf-8')
+    manager = RulesManager(str(ruta))
+    matcher = RuleMatcher(manager.get_all_rules())
+    eventos = []
+    manager.subscribe(matcher.aplicar_evento)
+    manager.subscribe(eventos.append)
+
+    manager.add_rule("Wifi", ["wifi"], "REDES", "Alta", "Redes")
+    manager.add_rule("Impresora", ["impresora", "wifi"], "HARDWARE", "Media", "Hardware")
+    assert matcher.match("la impresora no conecta al wifi")['id_regla'] == "R01"
+
+    manager.toggle_rule_status("R01")
+    assert matcher.match("la impresora no conecta al wifi")['id_regla'] == "R02"
+
+    manager.update_rule("R02", palabras_clave=["toner"])
+    assert matcher.match("sin wifi") is None
+    assert eventos[-1]['anterior']['palabras_clave'] == ["impresora", "wifi"]
+
+    # Dentro de una transacción los eventos se emiten solo si se guardó
+    try:
+        with manager.transaction():
+            manager.delete_rule("R02")
+            manager.add_rule("Inválida", [], "REDES", "Alta", "Redes")
+    except ValueError:
+        pass
+    assert matcher.match("falta toner")['id_regla'] == "R02"
+
+    with manager.transaction():
+        manager.delete_rule("R02")
+    assert matcher.match("falta toner") is None
+    assert [e['evento'] for e in eventos] == ['add', 'add', 'toggle', 'update', 'delete']
+
+
+def test_version_compilada_equivale_al_trie():
+    """CompiledMatcher da el mismo resultado que el trie, incluso con palabras que son prefijo de otras"""
+    reglas = [dict(r) for r in REGLAS_BASE] + [
+        {'id_regla': 'P1', 'nombre': 'Redes sociales', 'palabras_clave': ['redes sociales', 'facebook']},
+        {'id_regla': 'P0', 'nombre': 'Red', 'palabras_clave': ['re', 'c++']},
+    ]
+    matcher = RuleMatcher(reglas)
+    compilado = matcher.compiled()
+    for texto in _textos() + ["no abre facebook ni redes sociales", "error en c++", "reiniciar"]:
+        assert compilado.match(texto) == matcher.match(texto)
@@ -0,0 +1,87 @@
+# tests/test_metrics.py
+# Pruebas de las métricas del motor de clasificación
+
+import sys
+import os
+import stat
+import threading
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.metrics import ClassificationMetrics, REGLA_SIN_CLASIFICAR, get_metrics
+from engine.classification_engine import TicketClassificationEngine
+from engine.ticket_fact import Ticket
+
+
+def test_contadores_por_regla_y_por_hilo():
+    """Los contadores de varios hilos se suman al leer"""
+    metricas = ClassificationMetrics()
+
+    def trabajar():
+        for i in range(1000):
+            metricas.record("Regla: Red" if i % 4 else REGLA_SIN_CLASIFICAR, 0.0002)
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    datos = metricas.snapshot()
+    assert datos['clasificaciones'] == datos['cantidad'] == 4000
+    assert datos['sin_clasificar'] == 1000
+    assert datos['por_regla'] == {"Regla: Red": 3000, REGLA_SIN_CLASIFICAR: 1000}
+    assert ClassificationMetrics.percentile(datos, 0.5) == 0.00025
+
+    # Los contadores de los hilos que terminaron se juntan en uno solo sin perder nada
+    assert metricas._hilos == []
+    metricas.record("Regla: Red", 0.0002)
+    assert len(metricas._hilos) == 1 and metricas.snapshot()['por_regla']["Regla: Red"] == 3001
+
+    metricas.reset()
+    assert metricas.snapshot()['cantidad'] == 0
+    assert ClassificationMetrics.percentile(metricas.snapshot(), 0.5) is None
+
+
+def test_formato_prometheus(tmp_path):
+    """El volcado tiene buckets acumulados y +Inf igual al total"""
+    metricas = ClassificationMetrics(limites=(0.001, 0.01))
+    metricas.record('Regla "A"', 0.0005)
+    metricas.record('Regla "A"', 0.005)
+    metricas.record(REGLA_SIN_CLASIFICAR, 2.0)
+
+    texto = metricas.to_prometheus()
+    assert 'ticket_rule_hits_total{regla="Regla \\"A\\""} 2' in texto
+    assert "ticket_unclassified_total 1" in texto
+    assert 'ticket_classification_seconds_bucket{le="0.001"} 1' in texto
+    assert 'ticket_classification_seconds_bucket{le="0.01"} 2' in texto
+    assert 'ticket_classification_seconds_bucket{le="+Inf"} 3' in texto
+    assert "ticket_classification_seconds_count 3" in texto
+
+    ruta = tmp_path / "metricas.prom"
+    assert metricas.write_prometheus(str(ruta))
+    assert ruta.read_text(encoding='utf-8') == texto
+
+    # El colector de node_exporter tiene que poder leerlo: no queda con los permisos 0600 del temporal
+    assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o644
+    os.chmod(ruta, 0o640)
+    assert metricas.write_prometheus(str(ruta))
+    assert stat.S_IMODE(os.stat(ruta).st_mode) == 0o640
+    assert [archivo.name for archivo in tmp_path.iterdir()] == ["metricas.prom"]
+
+
+def test_el_motor_registra_cada_clasificacion():
+    """Cada run() del motor suma una clasificación con la regla aplicada"""
+    metricas = get_metrics()
+    antes = metricas.snapshot()
+
+    for contenido in ["creo que tengo un virus", "xyzzy"]:
+        motor = TicketClassificationEngine()
+        motor.reset()
+        motor.declare(Ticket(contenido=contenido))
+        motor.run()
+
+    despues = metricas.snapshot()
+    assert despues['cantidad'] - antes['cantidad'] == 2
+    assert despues['sin_clasificar'] - antes['sin_clasificar'] == 1
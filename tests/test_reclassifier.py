@@ -0,0 +1,124 @@
+# tests/test_reclassifier.py
+# Pruebas de la reclasificación acotada después de editar reglas
+
+import sys
+import os
+import json
+import copy
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.classification_engine import clasificar_contenido, version_reglas
+from engine.fallback_model import get_fallback_model
+from engine.matcher import RuleMatcher
+from engine.reclassifier import rule_impact, reclassify_after_edit, CAMPOS_CLASIFICACION
+from engine.ticket_store import TicketStore, get_search_index
+
+
+def _regla(id_regla, palabras, **extra):
+    return {'id_regla': id_regla, 'nombre': f"Regla {id_regla}", 'palabras_clave': palabras, 'tipo': 'HARDWARE',
+            'prioridad': 'Media', 'asignado_a': 'Soporte', 'activa': True, **extra}
+
+
+def _clasificar(reglas, ticket):
+    return clasificar_contenido(str(ticket.get('contenido', '')).lower(), RuleMatcher(reglas),
+                                area=ticket.get('area'), modelo=get_fallback_model())
+
+
+def test_alcance_de_cada_tipo_de_edicion():
+    """Cambiar solo palabras clave alcanza las agregadas y quitadas; cambiar una condición, todas"""
+    reglas = [_regla('R1', ['impresora', 'toner']), _regla('R2', ['correo'], difuso=1),
+              _regla('R3', ['lentitud'])]
+    etiqueta = "Regla Personalizada: Regla R1 (R1)"
+
+    def alcance(**cambios_r1):
+        despues = copy.deepcopy(reglas)
+        despues[0].update(cambios_r1)
+        return rule_impact(reglas, despues)
+
+    assert alcance(nombre="Otra") == {'todos': False, 'palabras': set(), 'difusas': {}, 'raices': set(),
+                                      'etiquetas': {etiqueta}}
+    assert alcance(palabras_clave=['Impresora', 'escáner'])['palabras'] == {'toner', 'escáner'}
+    assert alcance(palabras_requeridas=['no'])['palabras'] == {'impresora', 'toner'}
+    assert alcance(tipo='REDES', palabras_clave=[], palabras_requeridas=['papel'])['palabras'] == \
+        {'impresora', 'toner', 'papel'}
+
+    despues = copy.deepcopy(reglas)
+    despues[1]['palabras_clave'] = ['correo', 'outlook']
+    despues[2]['raices'] = True
+    resultado = rule_impact(reglas, despues)
+    assert resultado['palabras'] == {'outlook', 'lentitud'} and resultado['difusas'] == {'outlook': 1}
+    assert resultado['raices'] == {'lentitud'}
+
+    # Desactivar es como eliminar; agregar una regla nueva no tiene tickets asignados
+    despues = copy.deepcopy(reglas) + [_regla('R4', ['vpn'])]
+    despues[1]['activa'] = False
+    resultado = rule_impact(reglas, despues)
+    assert resultado['palabras'] == {'correo', 'vpn'} and resultado['etiquetas'] == {"Regla Personalizada: Regla R2 (R2)"}
+    assert rule_impact(reglas, [reglas[1], reglas[0], reglas[2]])['todos']
+
+
+def test_reclasifica_solo_lo_afectado_y_da_lo_mismo_que_todo(tmp_path):
+    """Tras varias ediciones, reclasificar el subconjunto deja lo mismo que reclasificar todo el almacén"""
+    aleatorio = random.Random(11)
+    palabras = ("impresora toner escaner correo outlook red wifi vpn lenta clave usuario pantalla "
+                "mouse teclado servidor caido virus archivo").split()
+    reglas = [_regla('R1', ['impresora', 'toner']), _regla('R2', ['correo'], difuso=1),
+              _regla('R3', ['vpn', 'wifi'], palabras_requeridas=['lenta']), _regla('R4', ['virus'], raices=True)]
+    tickets = [{'id_ticket': f'TK{i}', 'contenido': ' '.join(aleatorio.choices(palabras, k=4))} for i in range(400)]
+    version = version_reglas(reglas)
+    tickets = [{**t, **_clasificar(reglas, t), 'version_reglas': version if i % 5 else 'vieja'}
+               for i, t in enumerate(tickets)]
+    ruta = tmp_path / "tickets.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    store = TicketStore(str(ruta))
+    indice = get_search_index(str(ruta))
+
+    ediciones = [
+        lambda r: r[0]['palabras_clave'].append('escaner'),
+        lambda r: r[1]['palabras_clave'].remove('correo') or r[1]['palabras_clave'].append('outlook'),
+        lambda r: r[2].update(palabras_requeridas=[]),
+        lambda r: r[3].update(activa=False),
+        lambda r: r.append(_regla('R5', ['clave usuario'], tipo='SEGURIDAD')),
+        lambda r: r[0].update(prioridad='Alta'),
+        lambda r: r.insert(0, r.pop(2)),
+    ]
+    for editar in ediciones:
+        antes = copy.deepcopy(reglas)
+        editar(reglas)
+        resumen = reclassify_after_edit(store, antes, reglas, indice=indice)
+        assert resumen is not None
+        guardados = TicketStore(str(ruta)).get_all_tickets()
+        for ticket in guardados:
+            esperado = _clasificar(reglas, ticket)
+            assert all(ticket.get(campo) == esperado.get(campo) for campo in CAMPOS_CLASIFICACION)
+        assert resumen['candidatos'] < len(tickets) or editar is ediciones[-1]
+        assert indice.search('', tipo='SEGURIDAD')['total'] == sum(t['tipo'] == 'SEGURIDAD' for t in guardados)
+
+        # Los que estaban al día pasan a la versión nueva; los de una versión vieja que no se revisaron
+        # la conservan (quedan pendientes) hasta que un cambio de orden obliga a revisar todo
+        versiones = {t['version_reglas'] for t in guardados}
+        assert version_reglas(antes) not in versiones and version_reglas(reglas) in versiones
+        assert ('vieja' in versiones) == (editar is not ediciones[-1])
+
+
+def test_raiz_que_no_es_prefijo_de_la_palabra(tmp_path):
+    """'eficiente' y 'eficiencia' tienen la misma raíz aunque 'eficient' no empiece 'eficiencia'"""
+    reglas = [_regla('R1', ['impresora'])]
+    tickets = [{'id_ticket': 'TK1', 'contenido': 'Baja eficiencia del servidor'},
+               {'id_ticket': 'TK2', 'contenido': 'la impresora no imprime'}]
+    version = version_reglas(reglas)
+    tickets = [{**t, **_clasificar(reglas, t), 'version_reglas': version} for t in tickets]
+    ruta = tmp_path / "tickets.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    store = TicketStore(str(ruta))
+
+    antes = copy.deepcopy(reglas)
+    reglas.append(_regla('R2', ['eficiente'], raices=True, tipo='RENDIMIENTO'))
+    assert get_search_index(str(ruta)).with_stem('eficiente').tolist() == [0]
+    resumen = reclassify_after_edit(store, antes, reglas)
+    assert resumen['candidatos'] == 1 and resumen['reclasificados'] == 1
+    guardado = TicketStore(str(ruta)).get_ticket('TK1')
+    assert guardado['tipo'] == 'RENDIMIENTO' and guardado['tipo'] == _clasificar(reglas, guardado)['tipo']
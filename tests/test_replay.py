@@ -0,0 +1,122 @@
+# tests/test_replay.py
+# Pruebas de la simulación "qué pasaría si" con un borrador de reglas
+
+import sys
+import os
+
+import pandas as pd
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine.replay as replay
+import engine.classification_engine as classification_engine
+from engine.classification_engine import TicketClassificationEngine
+from engine.fallback_model import FallbackClassifier, REGLA_MODELO
+from engine.replay import classify_tickets, replay_diff, draft_ruleset
+from engine.rules_manager import RulesManager
+from engine.ticket_fact import Ticket
+
+CONTENIDOS = [
+    "Mi impresora no imprime", "no tengo internet en la oficina", "creo que tengo un virus",
+    "necesito instalar office", "la computadora está lenta", "", "   ", "el toner se acabó",
+    "la impresora no se conecta a la red", "consulta sobre vacaciones", "Mi impresora no imprime",
+]
+
+
+def _tickets():
+    return pd.DataFrame({
+        'id_ticket': [f"TK{i:03d}" for i in range(len(CONTENIDOS))],
+        'fecha': pd.to_datetime(["2025-10-01"] * len(CONTENIDOS)),
+        'contenido': CONTENIDOS,
+    })
+
+
+def test_clasificacion_en_lote_igual_al_motor():
+    """classify_tickets da el mismo resultado que un motor experta por ticket"""
+    reglas = RulesManager().get_all_rules()
+    resultado = classify_tickets(_tickets(), reglas)
+
+    for contenido, (_, fila) in zip(CONTENIDOS, resultado.iterrows()):
+        motor = TicketClassificationEngine()
+        motor.reset()
+        motor.declare(Ticket(contenido=contenido))
+        motor.run()
+        assert fila.to_dict() == motor.resultados[0]
+
+
+def test_diff_de_un_borrador():
+    """El diff cuenta los tickets que cambian y coincide con reclasificar todo"""
+    reglas = RulesManager().get_all_rules()
+    impresora = next(r for r in reglas if 'impresora' in r['palabras_clave'])
+    borrador = draft_ruleset(reglas, {**impresora, 'prioridad': 'Alta', 'palabras_clave': ['impresora', 'toner']})
+    df = _tickets()
+
+    diff = replay_diff(df, borrador, reglas)
+    antes, despues = classify_tickets(df, reglas), classify_tickets(df, borrador)
+    for campo in ('tipo', 'prioridad', 'asignado_a'):
+        assert diff['por_campo'][campo] == int((antes[campo] != despues[campo]).sum())
+    assert diff['cambiados'] == int(((antes != despues)[['tipo', 'prioridad', 'asignado_a']]).any(axis=1).sum())
+    assert diff['por_campo']['prioridad'] >= 2
+    assert set(diff['ejemplos']['prioridad_despues']) == {'Alta'}
+    assert diff['distintos'] == len(set(CONTENIDOS))
+
+    # Sin cambios no hay diferencias
+    assert replay_diff(df, reglas, reglas)['cambiados'] == 0
+
+
+def test_diff_en_paralelo_y_con_cambio_de_orden(monkeypatch):
+    """Repartir en procesos o reordenar reglas da el mismo diff que reclasificar todo en serie"""
+    reglas = RulesManager().get_all_rules()
+    df = _tickets()
+    reordenadas = list(reversed(reglas))
+    esperado = replay_diff(df, reordenadas, reglas)
+
+    monkeypatch.setattr(replay, 'MIN_TEXTOS_PARALELO', 2)
+    paralelo = replay_diff(df, reordenadas, reglas, procesos=2)
+    assert paralelo['por_campo'] == esperado['por_campo']
+    assert paralelo['cambiados'] == esperado['cambiados']
+
+
+def test_textos_sin_regla_los_decide_el_modelo(monkeypatch):
+    """Con un modelo entrenado, la simulación clasifica como el motor los textos que ninguna regla toma"""
+    modelo = FallbackClassifier()
+    modelo.fit_tickets([
+        {'contenido': texto, 'regla': "Regla: Red", 'tipo': 'REDES', 'prioridad': 'Media',
+         'asignado_a': 'Equipo de Redes'} for texto in ("la sala pierde la conexión", "cortes de conexión en la sala")
+    ] + [
+        {'contenido': texto, 'regla': "Regla: Impresora", 'tipo': 'HARDWARE', 'prioridad': 'Baja',
+         'asignado_a': 'Equipo de Hardware'} for texto in ("la impresora no saca hojas", "impresoras atascadas con hojas")
+    ])
+    monkeypatch.setattr(replay, 'get_fallback_model', lambda: modelo)
+    monkeypatch.setattr(classification_engine, 'get_fallback_model', lambda: modelo)
+    contenidos = ["conexión caída en la sala", "atascadas las hojas", "consulta sobre vacaciones", "",
+                  "conexión caída en la sala"]
+    df = pd.DataFrame({
+        'id_ticket': [f"TK{i:03d}" for i in range(len(contenidos))],
+        'fecha': pd.to_datetime(["2025-10-01"] * len(contenidos)),
+        'contenido': contenidos,
+    })
+    reglas = RulesManager().get_all_rules()
+
+    resultado = classify_tickets(df, reglas)
+    assert list(resultado['regla'][:2]) == [REGLA_MODELO, REGLA_MODELO]
+    assert list(resultado['tipo'][:2]) == ['REDES', 'HARDWARE']
+    for contenido, (_, fila) in zip(contenidos, resultado.iterrows()):
+        motor = TicketClassificationEngine()
+        motor.reset()
+        motor.declare(Ticket(contenido=contenido))
+        motor.run()
+        assert fila.to_dict() == {campo: motor.resultados[0][campo] for campo in replay.CAMPOS_RESULTADO}
+
+    # Una regla del borrador que toma los textos de la sala cambia lo que antes decidía el modelo
+    borrador = draft_ruleset(reglas, {'id_regla': 'TCE-99', 'nombre': 'Sala', 'palabras_clave': ['sala'],
+                                      'tipo': 'SOFTWARE', 'prioridad': 'Alta', 'asignado_a': 'Equipo de Software',
+                                      'activa': True})
+    diff = replay_diff(df, borrador, reglas)
+    assert diff['cambiados'] == 2
+    assert set(diff['ejemplos']['tipo_antes']) == {'REDES'}
+
+    # En paralelo todos los lotes comparten la tabla de resultados del modelo
+    monkeypatch.setattr(replay, 'MIN_TEXTOS_PARALELO', 2)
+    assert replay_diff(df, borrador, reglas, procesos=2)['cambiados'] == 2
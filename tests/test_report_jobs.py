@@ -0,0 +1,122 @@
+# tests/test_report_jobs.py
+# Pruebas de la cola de informes en segundo plano
+
+import sys
+import os
+import json
+import threading
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.report_jobs import ReportJobManager, file_version, LISTO, ERROR
+from engine.ticket_archive import archivos_archivo
+from engine.ticket_store import TicketStore
+
+
+def _esperar(trabajo, segundos=5):
+    """Espera a que el trabajo termine"""
+    evento = threading.Event()
+    for _ in range(int(segundos * 100)):
+        if trabajo.terminado():
+            return
+        evento.wait(0.01)
+    raise AssertionError("El trabajo no terminó a tiempo")
+
+
+def test_solicitudes_identicas_comparten_trabajo():
+    """Dos solicitudes iguales en curso comparten un solo trabajo"""
+    liberar = threading.Event()
+    llamadas = []
+
+    def generador(df, parametros, progreso):
+        llamadas.append(parametros)
+        progreso("Gráficos", 0.5)
+        liberar.wait(5)
+        return b"%PDF"
+
+    gestor = ReportJobManager(generador)
+    parametros = {'inicio': '2025-10-01', 'fin': '2025-10-31', 'graficos': ['Tipo']}
+
+    primero = gestor.submit(None, parametros, "v1")
+    segundo = gestor.submit(None, dict(parametros), "v1")
+    assert primero is segundo
+
+    liberar.set()
+    _esperar(primero)
+    gestor.shutdown()
+
+    assert primero.estado == LISTO
+    assert primero.resultado == b"%PDF"
+    assert primero.avance == 1.0
+    assert len(llamadas) == 1
+
+
+def test_nueva_version_de_datos_genera_otro_trabajo():
+    """Si cambian los datos, el informe en caché no se reutiliza"""
+    gestor = ReportJobManager(lambda df, parametros, progreso: b"%PDF")
+    parametros = {'inicio': '2025-10-01', 'fin': '2025-10-31', 'graficos': []}
+
+    primero = gestor.submit(None, parametros, "v1")
+    _esperar(primero)
+    assert gestor.submit(None, parametros, "v1") is primero
+    assert gestor.submit(None, parametros, "v2") is not primero
+    gestor.shutdown()
+
+
+def test_version_con_archivo_cambia_al_reemplazar_un_ticket_archivado(tmp_path):
+    """Un upsert que solo toca tickets archivados no cambia el almacén, pero sí la versión con el archivo"""
+    tickets = [{'id_ticket': f"TK{i:03d}", 'contenido': "sin red", 'fecha': f"2025-{8 + i % 5:02d}-10",
+                'tipo': 'REDES', 'version_reglas': 'v1'} for i in range(20)]
+    ruta = tmp_path / "facts_storage.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    ruta = str(ruta)
+    store = TicketStore(ruta)
+    store.archive_old(2, hoy=date(2025, 12, 15))
+    indice = archivos_archivo(ruta)[1]
+    solo_almacen, con_archivo = file_version(ruta), file_version(ruta, indice)
+
+    assert store.upsert_tickets([{**tickets[0], 'tipo': 'SOFTWARE', 'version_reglas': 'v2'}])['reemplazados'] == 1
+    assert file_version(ruta) == solo_almacen
+    assert file_version(ruta, indice) != con_archivo
+    assert file_version(ruta, str(tmp_path / "no_existe.json")).endswith("+0")
+
+
+def test_error_se_reintenta():
+    """Un trabajo con error queda marcado y se vuelve a encolar al pedirlo otra vez"""
+    intentos = []
+
+    def generador(df, parametros, progreso):
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise ValueError("falló")
+        return b"%PDF"
+
+    gestor = ReportJobManager(generador)
+    primero = gestor.submit(None, {'graficos': []}, "v1")
+    _esperar(primero)
+    assert primero.estado == ERROR
+    assert "falló" in primero.error
+
+    segundo = gestor.submit(None, {'graficos': []}, "v1")
+    _esperar(segundo)
+    gestor.shutdown()
+    assert segundo is not primero
+    assert segundo.estado == LISTO
+
+
+def test_cache_descarta_los_mas_antiguos():
+    """La caché no crece más allá de max_informes"""
+    gestor = ReportJobManager(lambda df, parametros, progreso: b"%PDF", max_informes=2)
+    trabajos = []
+    for i in range(4):
+        trabajo = gestor.submit(None, {'n': i}, "v1")
+        _esperar(trabajo)
+        trabajos.append(trabajo)
+    gestor.shutdown()
+
+    claves = [t.clave for t in gestor.get_jobs()]
+    assert len(claves) == 2
+    assert trabajos[-1].clave in claves
+    assert trabajos[0].clave not in claves
@@ -0,0 +1,128 @@
+# tests/test_report_pdf.py
+# Pruebas del informe PDF y de su generación desde la línea de comandos
+
+import sys
+import os
+import gzip
+import json
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+from engine import report_pdf
+from engine.report_pdf import generar_informe_pdf, generar_detalle_csv, _recortar_detalle
+from engine.ticket_store import TicketStore
+import cli
+
+
+def _tickets(n=30):
+    """Tickets de prueba con prioridades y áreas variadas"""
+    return [{
+        'id_ticket': f"TK{i:03d}",
+        'contenido': "la impresora no imprime y muestra un error largo en pantalla",
+        'cliente': f"Cliente {i % 4}",
+        'area': ["Contabilidad", "Ingeniería", "Ventas"][i % 3],
+        'fecha': f"2025-10-{1 + i % 28:02d}",
+        'regla': "Regla: Problema de Impresora",
+        'tipo': "HARDWARE",
+        'prioridad': ["Alta", "Media", "Baja"][i % 3],
+        'asignado_a': "Equipo de Hardware"
+    } for i in range(n)]
+
+
+def _almacen(tmp_path, tickets):
+    """Crea un facts_storage.json temporal y retorna su ruta"""
+    ruta = tmp_path / "facts_storage.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    return str(ruta)
+
+
+def test_informe_vectorial_con_progreso(tmp_path):
+    """El informe con gráficos vectoriales es un PDF válido e informa su avance"""
+    df = TicketStore(_almacen(tmp_path, _tickets())).to_dataframe()
+    fases = []
+    buffer = generar_informe_pdf(df, ["Tipo", "Prioridad", "Área"], date(2025, 10, 1), date(2025, 10, 31),
+                                 progreso=lambda fase, avance: fases.append((fase, avance)))
+
+    assert buffer.getvalue().startswith(b"%PDF")
+    assert fases[-1] == ("Listo", 1.0)
+    assert any(fase == "Gráficos" for fase, _ in fases)
+
+
+def test_progreso_por_bloque_de_la_tabla(tmp_path):
+    """La tabla de detalle informa su avance después de cada LongTable"""
+    df = TicketStore(_almacen(tmp_path, _tickets())).to_dataframe()
+    fases = []
+    generar_informe_pdf(df, [], date(2025, 10, 1), date(2025, 10, 31), filas_por_bloque=8,
+                        progreso=lambda fase, avance: fases.append((fase, avance)))
+
+    assert [avance for fase, avance in fases if fase == "Tabla de detalle"] == [0, 8 / 30, 16 / 30, 24 / 30, 1.0]
+
+
+def test_top_n_prioriza_alta():
+    """El recorte deja primero los tickets de prioridad Alta"""
+    df = pd.DataFrame(_tickets())
+    detalle, omitidos = _recortar_detalle(df, 5)
+
+    assert len(detalle) == 5
+    assert len(omitidos) == len(df) - 5
+    assert set(detalle['prioridad']) == {"Alta"}
+
+
+def test_detalle_csv_comprimido():
+    """El CSV adjunto se puede descomprimir y conserva todas las filas"""
+    df = pd.DataFrame(_tickets())
+    buffer = generar_detalle_csv(df)
+
+    with gzip.open(buffer, 'rt', encoding='utf-8') as f:
+        df_leido = pd.read_csv(f)
+    assert len(df_leido) == len(df)
+
+
+def test_cli_informe_por_area(tmp_path):
+    """La línea de comandos genera un PDF por área en paralelo"""
+    almacen = _almacen(tmp_path, _tickets())
+    salida = tmp_path / "informes"
+
+    codigo = cli.main(['informe', '--desde', '2025-10-01', '--hasta', '2025-10-31',
+                       '--por', 'area', '--procesos', '2', '--salida', str(salida), '--almacen', almacen])
+
+    assert codigo == 0
+    archivos = sorted(os.listdir(salida))
+    assert len(archivos) == 3
+    assert "informe_Ingenieria_2025-10-01_2025-10-31.pdf" in archivos
+
+
+def test_cli_procesos_menor_a_uno(tmp_path, capsys):
+    """--procesos 0 o negativo se rechaza al leer los argumentos, antes de crear el pool"""
+    almacen = _almacen(tmp_path, _tickets())
+    for procesos in ('0', '-2'):
+        with pytest.raises(SystemExit) as salida:
+            cli.main(['informe', '--desde', '2025-10-01', '--hasta', '2025-10-31', '--por', 'area',
+                      '--procesos', procesos, '--salida', str(tmp_path / "informes"), '--almacen', almacen])
+        assert salida.value.code == 2
+        assert "--procesos" in capsys.readouterr().err
+    assert not os.path.exists(tmp_path / "informes")
+
+
+def test_informe_sin_campos_internos(tmp_path, monkeypatch):
+    """La tabla del PDF y el CSV llevan las columnas del informe, no las que agrega el almacén (ni 'seq')"""
+    store = TicketStore(_almacen(tmp_path, []))
+    assert store.upsert_tickets([{**ticket, 'version_reglas': 'v1'} for ticket in _tickets(5)], modo='versionar')
+    assert store.upsert_tickets([{**ticket, 'version_reglas': 'v2'} for ticket in _tickets(5)], modo='versionar')
+    df = store.to_dataframe()
+    assert {'huella', 'version', 'version_reglas', 'historial', 'seq'} <= set(df.columns)
+
+    cabeceras = []
+    original = report_pdf._tablas_por_bloques
+    monkeypatch.setattr(report_pdf, '_tablas_por_bloques',
+                        lambda df, *args: cabeceras.append(list(df.columns)) or original(df, *args))
+    generar_informe_pdf(df, ["Tipo"], date(2025, 10, 1), date(2025, 10, 31))
+    with gzip.open(generar_detalle_csv(df), 'rt', encoding='utf-8') as f:
+        cabeceras.append(f.readline().strip().split(','))
+
+    esperadas = ['id_ticket', 'fecha', 'cliente', 'area', 'contenido', 'regla', 'tipo', 'prioridad', 'asignado_a']
+    assert cabeceras == [esperadas, esperadas]
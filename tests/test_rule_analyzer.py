@@ -0,0 +1,73 @@
+# tests/test_rule_analyzer.py
+# Pruebas del análisis de reglas sombreadas y palabras clave muertas
+
+import sys
+import os
+import json
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.classification_engine import clasificar_contenido
+from engine.matcher import RuleMatcher
+from engine.rule_analyzer import analyze_rules, prune_rules
+from engine.rules_manager import RulesManager
+from tests.test_matcher import _textos
+
+
+def _regla(id_regla, palabras, activa=True):
+    return {'id_regla': id_regla, 'nombre': f"Regla {id_regla}", 'palabras_clave': palabras,
+            'tipo': 'REDES', 'prioridad': 'Media', 'asignado_a': 'Redes', 'activa': activa}
+
+
+def _gestor(tmp_path, reglas):
+    ruta = tmp_path / "reglas.json"
+    ruta.write_text(json.dumps({'reglas_personalizadas': reglas}), encoding='utf-8')
+    return RulesManager(str(ruta))
+
+
+def test_reglas_base_sombreadas():
+    """'siga' y 'siaf' del Sistema Corporativo ya las toma la regla ERP"""
+    analisis = analyze_rules([])
+    muertas = {(m['id_regla'], m['palabra']): m['id_ganadora'] for m in analisis['palabras_muertas']}
+    assert muertas[('BASE-07', 'siga')] == 'BASE-03'
+    assert muertas[('BASE-07', 'siaf')] == 'BASE-03'
+    assert muertas[('BASE-09', 'lentos')] == 'BASE-09'  # 'lento' de la misma regla
+    assert not analisis['sombreadas']
+    assert {'palabra': 'siga', 'reglas': ['BASE-03', 'BASE-07']} in analisis['duplicadas']
+
+
+def test_reglas_personalizadas_tapan_a_las_base():
+    """Una regla personalizada que repite una regla base la deja sombreada; las inactivas no cuentan"""
+    analisis = analyze_rules([_regla('R01', ['impresora', 'toner', 'impresion', 'escaner', 'atasco']),
+                              _regla('R02', ['virus'], activa=False)])
+    sombreadas = {s['id_regla']: s['ganadoras'] for s in analisis['sombreadas']}
+    assert sombreadas == {'BASE-10': ['R01']}
+
+
+def test_podar_no_cambia_la_clasificacion(tmp_path):
+    """Después de podar, cada texto se clasifica igual que antes"""
+    reglas = [
+        _regla('R01', ['wifi', 'red']),
+        _regla('R02', ['wifi lento', 'impresora', 'impresora rota']),
+        _regla('R03', ['wifi', 'internet lento']),
+        _regla('R04', ['red', 'redes']),
+    ]
+    manager = _gestor(tmp_path, reglas)
+    textos = _textos() + ["wifi lento", "internet lento", "impresora rota", "redes sociales"]
+    antes = [clasificar_contenido(t, RuleMatcher(manager.get_all_rules())) for t in textos]
+
+    resultado = prune_rules(manager)
+    assert resultado == {'reglas': 1, 'palabras': 3}  # R04; 'wifi lento', 'impresora rota' y 'wifi' de R03
+    assert [r['id_regla'] for r in manager.get_all_rules()] == ['R01', 'R02', 'R03']
+    assert manager.get_rule_by_id('R02')['palabras_clave'] == ['impresora']
+    assert manager.get_rule_by_id('R03')['palabras_clave'] == ['internet lento']
+
+    despues = [clasificar_contenido(t, RuleMatcher(manager.get_all_rules())) for t in textos]
+    assert despues == antes
+    assert not analyze_rules(manager.get_all_rules(), reglas_base=[])['palabras_muertas']
+
+    # Desactivar en lugar de eliminar
+    manager = _gestor(tmp_path, reglas)
+    assert prune_rules(manager, desactivar=True)['reglas'] == 1
+    assert [r['activa'] for r in manager.get_all_rules()] == [True, True, True, False]
@@ -0,0 +1,120 @@
+# tests/test_rules_transactions.py
+# Pruebas del índice, las transacciones y la importación/exportación masiva de reglas
+
+import sys
+import os
+import json
+import threading
+import time
+
+import pytest
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.rules_manager import RulesManager
+
+
+def _manager(tmp_path, reglas=None):
+    """Crea un gestor sobre un archivo temporal (no toca knowledge/rules_data.json)"""
+    ruta = tmp_path / "reglas.json"
+    ruta.write_text(json.dumps({'reglas_personalizadas': reglas or []}), encoding='utf-8')
+    return RulesManager(str(ruta))
+
+
+def _contar_guardados(manager, monkeypatch):
+    """Cuenta las llamadas a save_rules del gestor"""
+    guardados = []
+    original = manager.save_rules
+
+    def save_rules():
+        guardados.append(1)
+        return original()
+
+    monkeypatch.setattr(manager, 'save_rules', save_rules)
+    return guardados
+
+
+def test_transaccion_guarda_una_sola_vez(tmp_path, monkeypatch):
+    """Varias ediciones dentro de una transacción se guardan con una sola escritura"""
+    manager = _manager(tmp_path)
+    guardados = _contar_guardados(manager, monkeypatch)
+
+    with manager.transaction():
+        for i in range(50):
+            manager.add_rule(f"Regla {i}", [f"palabra{i}"], "SOFTWARE", "Media", "Soporte")
+        manager.toggle_rule_status("R01")
+        manager.delete_rule("R02")
+
+    assert len(guardados) == 1
+    assert manager.get_rule_by_id("R50")['nombre'] == "Regla 49"
+    assert manager.get_rule_by_id("R02") is None
+
+    recargado = RulesManager(manager.rules_file)
+    assert len(recargado.get_all_rules()) == 49
+    assert recargado.get_rule_by_id("R01")['activa'] is False
+    assert recargado.add_rule("Otra", ["otra"], "REDES", "Baja", "Redes")
+    assert recargado.get_rule_by_id("R51") is not None
+
+
+def test_transaccion_invalida_no_modifica_nada(tmp_path):
+    """Si la validación falla se restauran las reglas y el archivo queda intacto"""
+    manager = _manager(tmp_path)
+    manager.add_rule("Válida", ["vpn"], "REDES", "Alta", "Redes")
+    contenido = open(manager.rules_file, encoding='utf-8').read()
+
+    with pytest.raises(ValueError):
+        with manager.transaction():
+            manager.add_rule("Sin palabras", [], "REDES", "Urgente", "Redes")
+
+    assert [r['id_regla'] for r in manager.get_all_rules()] == ["R01"]
+    assert manager.get_rule_by_id("R02") is None
+    assert open(manager.rules_file, encoding='utf-8').read() == contenido
+
+
+def test_importar_y_exportar_csv_y_json(tmp_path, monkeypatch):
+    """Exportar e importar conserva las reglas; importar miles de reglas escribe una vez"""
+    origen = _manager(tmp_path)
+    with origen.transaction():
+        for i in range(5000):
+            origen.add_rule(f"Regla {i}", [f"clave {i}", "error, grave"], "HARDWARE", "Baja", "Soporte")
+
+    ruta_csv, ruta_json = str(tmp_path / "reglas.csv"), str(tmp_path / "exportadas.json")
+    assert origen.export_rules(ruta_csv)
+    assert origen.export_rules(ruta_json)
+
+    destino = RulesManager(str(tmp_path / "destino.json"))
+    guardados = _contar_guardados(destino, monkeypatch)
+    assert destino.import_rules(ruta_csv) == 5000
+    assert len(guardados) == 1
+    assert destino.get_rule_by_id("R4999")['palabras_clave'] == ["clave 4998", "error, grave"]
+
+    # Reimportar el JSON actualiza por ID en lugar de duplicar
+    assert destino.import_rules(ruta_json) == 5000
+    assert len(destino.get_all_rules()) == 5000
+    assert destino.import_rules(str(tmp_path / "no_existe.csv")) == -1
+
+
+def test_transaccion_de_otro_hilo_no_se_lleva_las_ediciones(tmp_path):
+    """Una edición de otro hilo espera a que termine la transacción en curso y no se pierde con su rollback"""
+    manager = _manager(tmp_path)
+    abierta = threading.Event()
+
+    def transaccion_fallida():
+        try:
+            with manager.transaction():
+                manager.add_rule("De la transacción", ["uno"], "REDES", "Baja", "Redes")
+                abierta.set()
+                time.sleep(0.2)
+                raise RuntimeError("falla a mitad de la transacción")
+        except RuntimeError:
+            pass
+
+    hilo = threading.Thread(target=transaccion_fallida)
+    hilo.start()
+    abierta.wait()
+    assert manager.add_rule("De otro hilo", ["dos"], "REDES", "Baja", "Redes")
+    hilo.join()
+
+    assert [r['nombre'] for r in manager.get_all_rules()] == ["De otro hilo"]
+    assert [r['nombre'] for r in RulesManager(manager.rules_file).get_all_rules()] == ["De otro hilo"]
@@ -0,0 +1,128 @@
+# tests/test_search_index.py
+# Pruebas del índice de búsqueda de texto de los tickets procesados
+
+import sys
+import os
+import json
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.search_index import TicketSearchIndex, archivo_indice, palabras_indexadas
+from engine.ticket_store import TicketStore, get_search_index, _indices
+
+TICKETS = [
+    {'id_ticket': 'TK-001', 'contenido': "La impresora no enciende", 'cliente': 'Ana Pérez',
+     'fecha': '2025-10-01', 'prioridad': 'Alta', 'tipo': 'HARDWARE'},
+    {'id_ticket': 'TK-002', 'contenido': "No enciende la pantalla", 'cliente': 'Luis',
+     'fecha': '2025-10-02', 'prioridad': 'Media', 'tipo': 'HARDWARE'},
+    {'id_ticket': 'TK-003', 'contenido': "Impresión lenta en la red", 'cliente': 'ana',
+     'fecha': '2025-10-03', 'prioridad': 'Baja', 'tipo': 'REDES'},
+    {'id_ticket': 'TK-004', 'contenido': "La red WiFi no anda", 'cliente': 'Marta',
+     'fecha': '2025-10-04', 'prioridad': 'Alta', 'tipo': 'REDES'},
+]
+
+
+def _buscar(indice, consulta, **filtros):
+    return [TICKETS[p]['id_ticket'] for p in indice.search(consulta, **filtros)['posiciones']]
+
+
+def test_consultas_booleanas_frases_y_prefijos():
+    """Términos plegados, prefijos, frases, OR, NOT y filtros, los más nuevos primero"""
+    indice = TicketSearchIndex()
+    indice.sync(TICKETS)
+    assert _buscar(indice, 'IMPRESORA') == ['TK-001']
+    assert _buscar(indice, 'impres*') == ['TK-003', 'TK-001']
+    assert _buscar(indice, '"no enciende"') == ['TK-002', 'TK-001']
+    assert _buscar(indice, '"enciende la pantalla"') == ['TK-002']
+    assert _buscar(indice, '"pantalla enciende"') == []
+    assert _buscar(indice, 'red OR impresora') == ['TK-004', 'TK-003', 'TK-001']
+    assert _buscar(indice, 'red -wifi') == ['TK-003'] and _buscar(indice, 'red NOT wifi') == ['TK-003']
+    # Cliente e ID también se buscan, pero una frase no cruza de un campo a otro
+    assert _buscar(indice, 'ana') == ['TK-003', 'TK-001'] and _buscar(indice, 'TK-002') == ['TK-002']
+    assert _buscar(indice, '"enciende ana"') == []
+    # Filtros solos o con texto
+    assert _buscar(indice, '', prioridad='Alta') == ['TK-004', 'TK-001']
+    assert _buscar(indice, 'red', tipo=['REDES'], desde='2025-10-04') == ['TK-004']
+    assert _buscar(indice, 'enciende', hasta='2025-10-01', prioridad=['Alta', 'Media']) == ['TK-001']
+    assert indice.search('enciende', limite=1) == {'total': 2, 'posiciones': [1]}
+    assert indice.values('prioridad') == ['Alta', 'Baja', 'Media']
+
+
+def test_igual_que_recorrer_todos_los_tickets():
+    """Con apariciones integradas y pendientes, el índice da lo mismo que revisar ticket por ticket"""
+    aleatorio = random.Random(5)
+    palabras = "impresora red lenta no enciende pantalla correo clave de la servidor caido".split()
+    tickets = [{'contenido': ' '.join(aleatorio.choices(palabras, k=6)), 'prioridad': aleatorio.choice('AB'),
+                'fecha': f"2025-10-{aleatorio.randint(1, 28):02d}"} for _ in range(400)]
+    indice = TicketSearchIndex()
+    indice.sync(tickets[:250])
+    indice._integrar()
+    indice.sync(tickets)  # Los últimos quedan pendientes
+
+    def tiene(ticket, frase):
+        return f" {frase} " in f" {' '.join(palabras_indexadas(ticket['contenido']))} "
+
+    encontrados = 0
+    for _ in range(60):
+        a, b, c, d = aleatorio.sample(palabras, 4)
+        esperados = [i for i, t in enumerate(tickets)
+                     if tiene(t, f"{a} {b}") and (tiene(t, c) or tiene(t, d)) and not tiene(t, f"no {d}")
+                     and t['prioridad'] == 'A' and t['fecha'] >= '2025-10-10']
+        resultado = indice.search(f'"{a} {b}" {c} OR {d} -"no {d}"', prioridad='A', desde='2025-10-10', limite=1000)
+        assert resultado['posiciones'] == esperados[::-1]
+        encontrados += len(esperados)
+    assert encontrados > 0
+
+
+def test_indice_compartido_guarda_y_retoma_el_punto_de_control(tmp_path):
+    """add_tickets actualiza el índice; al abrirlo de nuevo se lee el .npz y se indexa solo lo nuevo"""
+    archivo = tmp_path / "tickets.json"
+    archivo.write_text(json.dumps({'tickets_procesados': TICKETS[:2]}), encoding='utf-8')
+    ruta = str(archivo)
+    indice = get_search_index(ruta)
+    assert os.path.exists(archivo_indice(ruta)) and indice._guardados == 2
+
+    assert TicketStore(ruta).add_tickets(TICKETS[2:])
+    assert get_search_index(ruta) is indice and indice.search('red')['total'] == 2
+
+    # Otro proceso: parte del punto de control
+    _indices.clear()
+    otro = TicketSearchIndex(archivo_indice(ruta))
+    assert otro.sync(TicketStore(ruta).get_all_tickets()) == 4 - indice._guardados
+    assert otro.search('impres*') == indice.search('impres*')
+
+    # Tickets reescritos por fuera: el punto de control no corresponde y se reconstruye
+    archivo.write_text(json.dumps({'tickets_procesados': TICKETS[3:]}), encoding='utf-8')
+    os.utime(ruta, ns=(1, 1))
+    assert get_search_index(ruta).search('red')['posiciones'] == [0]
+
+
+def test_subcadenas_errores_y_raices_como_las_reglas():
+    """containing, similar_to y starting_with encuentran todo ticket que tenga la palabra buscada"""
+    aleatorio = random.Random(8)
+    palabras = "impresora impresión reimpresión toner tóner correo correos corréo red redes lenta".split()
+    tickets = [{'contenido': ' '.join(aleatorio.choices(palabras, k=3)), 'tipo': 'A'} for _ in range(300)]
+    indice = TicketSearchIndex()
+    indice.sync(tickets[:200])
+    indice._integrar()
+    indice.sync(tickets)  # Los últimos quedan pendientes
+
+    plegados = [palabras_indexadas(t['contenido']) for t in tickets]
+    for texto in ('impres', 'presion', 'red', 'on', 'CORREO', 'impresora toner'):
+        esperados = [i for i, palabras_ticket in enumerate(plegados)
+                     if all(any(p in w for w in palabras_ticket) for p in palabras_indexadas(texto))]
+        assert indice.containing(texto).tolist() == esperados
+    assert indice.containing('¡!') is None
+    assert indice.similar_to('corroe', 1).tolist() == [i for i, ps in enumerate(plegados) if 'correo' in ps]
+    assert indice.starting_with('Impres').tolist() == [i for i, ps in enumerate(plegados)
+                                                       if any(w.startswith('impres') for w in ps)]
+
+    # Con muchos términos se junta con una máscara sobre el CSR: mismo resultado
+    assert indice._tickets_con_terminos(list(range(len(indice._terminos)))).tolist() == list(range(300))
+
+    # update cambia los filtros de un ticket ya indexado
+    indice.update(5, {**tickets[5], 'tipo': 'B'})
+    indice.update(999, {'tipo': 'B'})  # Fuera del índice: lo agregará sync
+    assert indice.search('', tipo='B')['posiciones'] == [5]
@@ -0,0 +1,90 @@
+# tests/test_similar_index.py
+# Pruebas de la búsqueda de tickets similares (índice invertido TF-IDF con poda max-score)
+
+import sys
+import os
+import json
+import math
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.classification_engine import buscar_tickets_similares
+from engine.similar_index import SimilarTicketIndex, terminos
+from engine.ticket_store import TicketStore, get_similar_index
+
+PALABRAS = ("impresora papel atasco internet lento wifi correo contraseña bloqueada office instalar "
+            "pantalla negra teclado mouse virus servidor caído red vpn acceso sistema").split()
+
+
+def _por_fuerza_bruta(tickets, contenido):
+    """Puntajes TF-IDF de todos los tickets, sin índice"""
+    documentos = [terminos(t['contenido']) for t in tickets]
+    frecuencias = {}
+    for conteos in documentos:
+        for termino in conteos:
+            frecuencias[termino] = frecuencias.get(termino, 0) + 1
+    puntajes = []
+    for conteos in documentos:
+        puntaje = 0.0
+        for termino, veces in terminos(contenido).items():
+            if termino in conteos:
+                idf = math.log(1 + len(tickets) / frecuencias[termino])
+                puntaje += idf * (1 + math.log(veces)) * (1 + math.log(conteos[termino])) / math.sqrt(len(conteos))
+        puntajes.append(puntaje)
+    return puntajes
+
+
+def test_poda_da_el_mismo_top_k_que_recorrer_todo():
+    """Los vecinos con poda coinciden con los mejores puntajes calculados ticket por ticket"""
+    aleatorio = random.Random(7)
+    tickets = [{'id_ticket': f"TK{i}", 'contenido': ' '.join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 8)))}
+               for i in range(600)]
+    indice = SimilarTicketIndex(tickets)
+    for _ in range(40):
+        consulta = ' '.join(aleatorio.choices(PALABRAS, k=aleatorio.randint(1, 6)))
+        puntajes = _por_fuerza_bruta(tickets, consulta)
+        vecinos = indice.search(consulta, k=5)
+        esperados = sorted((p for p in puntajes if p > 0), reverse=True)[:5]
+        assert [v['similitud'] for v in vecinos] == [round(p, 4) for p in esperados], consulta
+        for vecino in vecinos:
+            assert round(puntajes[vecino['posicion']], 4) == vecino['similitud']
+
+    assert indice.search("nada que ver", k=5) == []
+    assert indice.search("impresora", k=0) == []
+
+
+def test_variantes_y_datos_del_vecino():
+    """Encuentra variantes de las palabras y devuelve cómo se resolvió el ticket parecido"""
+    indice = SimilarTicketIndex([
+        {'id_ticket': 'TK1', 'contenido': "La impresora del piso no imprime", 'tipo': 'HARDWARE',
+         'asignado_a': 'Equipo de Hardware', 'regla': 'Regla: Impresora'},
+        {'id_ticket': 'TK2', 'contenido': "No tengo internet", 'tipo': 'REDES'},
+        {'id_ticket': 'TK3', 'contenido': "", 'tipo': 'ERROR'},
+    ])
+    vecinos = indice.search("las impresoras no imprimen")
+    assert [v['id_ticket'] for v in vecinos] == ['TK1']
+    assert vecinos[0]['asignado_a'] == 'Equipo de Hardware' and vecinos[0]['posicion'] == 0
+    assert len(indice) == 3
+
+
+def test_indice_compartido_se_actualiza_al_guardar(tmp_path):
+    """Cada add_tickets agrega al índice y un archivo reescrito por fuera se vuelve a indexar"""
+    archivo = tmp_path / "tickets.json"
+    archivo.write_text(json.dumps({'tickets_procesados': [
+        {'id_ticket': 'TK1', 'contenido': "olvidé mi contraseña"}]}), encoding='utf-8')
+    ruta = str(archivo)
+    indice = get_similar_index(ruta)
+    assert [v['id_ticket'] for v in buscar_tickets_similares("contraseña", storage_file=ruta)] == ['TK1']
+
+    assert TicketStore(ruta).add_tickets([{'id_ticket': 'TK2', 'contenido': "mi contraseña expiró"}])
+    assert get_similar_index(ruta) is indice and len(indice) == 2
+    assert {v['id_ticket'] for v in buscar_tickets_similares("contraseña", storage_file=ruta)} == {'TK1', 'TK2'}
+
+    # Otro proceso reescribió el archivo: se indexa de nuevo
+    archivo.write_text(json.dumps({'tickets_procesados': [
+        {'id_ticket': 'TK9', 'contenido': "pantalla negra"}]}), encoding='utf-8')
+    os.utime(ruta, ns=(1, 1))
+    assert [v['id_ticket'] for v in buscar_tickets_similares("pantalla", storage_file=ruta)] == ['TK9']
+    assert buscar_tickets_similares("contraseña", storage_file=ruta) == []
@@ -0,0 +1,114 @@
+# tests/test_sketches.py
+# Pruebas de los sketches aproximados y su mantenimiento en el almacén de tickets
+
+import sys
+import os
+import json
+import random
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.sketches import CountMinSketch, SpaceSaving, HeavyHitters, HyperLogLog, TicketSketches
+from engine.ticket_store import TicketStore
+
+
+def _flujo(n, semilla=7):
+    """Flujo con distribución sesgada: pocos valores muy frecuentes y una cola larga"""
+    aleatorio = random.Random(semilla)
+    return [f"cliente_{int(aleatorio.paretovariate(1.2))}" for _ in range(n)]
+
+
+def test_space_saving_y_count_min_acotan_el_error():
+    """El top-K y las estimaciones respetan las cotas de error declaradas"""
+    valores = _flujo(20000)
+    reales = {}
+    top = SpaceSaving(k=50)
+    frecuencias = CountMinSketch()
+    for valor in valores:
+        reales[valor] = reales.get(valor, 0) + 1
+        top.add(valor)
+        frecuencias.add(valor)
+
+    for valor, cuenta, error in top.top(10):
+        assert cuenta - error <= reales[valor] <= cuenta
+        assert reales[valor] <= frecuencias.estimate(valor) <= reales[valor] + frecuencias.error_bound()
+
+    exactos = sorted(reales, key=reales.get, reverse=True)[:5]
+    assert [valor for valor, _, _ in top.top(5)] == exactos
+
+
+def test_heavy_hitters_sigue_a_los_mas_frecuentes():
+    """El montículo sobre Count-Min encuentra los valores más frecuentes con k fijo"""
+    valores = _flujo(20000)
+    reales = {}
+    top = HeavyHitters(k=20)
+    for valor in valores:
+        reales[valor] = reales.get(valor, 0) + 1
+        top.add(valor)
+
+    assert len(top.top_actual) == 20 and top.total == len(valores)
+    exactos = sorted(reales, key=reales.get, reverse=True)[:5]
+    assert [valor for valor, _ in top.top(5)] == exactos
+    for valor, cuenta in top.top(10):
+        assert reales[valor] <= cuenta <= reales[valor] + top.frecuencias.error_bound()
+
+
+def test_fusion_de_particiones_equivale_a_un_solo_flujo():
+    """Fusionar sketches de dos particiones da el mismo resultado que procesarlo todo junto"""
+    valores = _flujo(10000)
+    mitad_a, mitad_b = HyperLogLog(), HyperLogLog()
+    cm_a, cm_b = CountMinSketch(), CountMinSketch()
+    for i, valor in enumerate(valores):
+        (mitad_a if i % 2 else mitad_b).add(valor)
+        (cm_a if i % 2 else cm_b).add(valor)
+
+    completo = HyperLogLog()
+    for valor in valores:
+        completo.add(valor)
+
+    assert mitad_a.merge(mitad_b).count() == completo.count()
+    distintos = len(set(valores))
+    assert abs(completo.count() - distintos) <= 4 * completo.relative_error() * distintos
+
+    cm_a.merge(cm_b)
+    assert cm_a.total == len(valores)
+    copia = CountMinSketch.from_dict(json.loads(json.dumps(cm_a.to_dict())))
+    assert copia.estimate(valores[0]) == cm_a.estimate(valores[0])
+
+
+def test_ticket_sketches_por_mes_y_area():
+    """Las consultas usan solo los meses y días pedidos"""
+    sketches = TicketSketches()
+    for dia, cliente in [("2025-10-01", "Ana"), ("2025-10-01", "Luis"), ("2025-10-02", "Ana"),
+                         ("2025-11-03", "Eva")]:
+        sketches.add({'fecha': dia, 'cliente': cliente, 'area': "SOPORTE", 'contenido': "sin internet"})
+
+    top, total = sketches.top('cliente', ['2025-10'])
+    assert total == 3
+    assert top[0][:2] == ("Ana", 2)
+
+    assert sketches.distinct_clients("2025-10-01", "2025-10-31") == {"SOPORTE": 2}
+    assert sketches.distinct_clients("2025-10-02", "2025-11-30") == {"SOPORTE": 2}
+
+    copia = TicketSketches.from_dict(json.loads(json.dumps(sketches.to_dict())))
+    assert copia.top('contenido')[1] == 4
+
+
+def test_store_mantiene_y_reconstruye_sketches(tmp_path):
+    """Agregar tickets actualiza los sketches y un archivo desactualizado se reconstruye"""
+    ruta = tmp_path / "facts.json"
+    ruta.write_text(json.dumps({'tickets_procesados': [
+        {'fecha': "2025-10-01", 'cliente': "Ana", 'area': "REDES", 'contenido': "wifi"}
+    ]}), encoding='utf-8')
+
+    store = TicketStore(str(ruta))
+    store.add_ticket({'fecha': "2025-10-05", 'cliente': "Ana", 'area': "REDES", 'contenido': "vpn"})
+    assert (tmp_path / "facts_sketches.json").exists()
+    assert TicketStore(str(ruta)).get_sketches().top('cliente')[0] == [("Ana", 2, 0)]
+
+    # Ticket agregado por fuera del almacén: los sketches lo suman al cargarse
+    datos = json.loads(ruta.read_text(encoding='utf-8'))
+    datos['tickets_procesados'].append({'fecha': "2025-10-06", 'cliente': "Luis", 'area': "REDES"})
+    ruta.write_text(json.dumps(datos), encoding='utf-8')
+    assert TicketStore(str(ruta)).get_sketches().distinct_clients() == {"REDES": 2}
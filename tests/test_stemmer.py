@@ -0,0 +1,79 @@
+# tests/test_stemmer.py
+# Pruebas del stemmer en español y de las reglas que comparan por raíz
+
+import sys
+import os
+
+import pandas as pd
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.matcher import RuleMatcher
+from engine.replay import replay_diff
+from engine.rule_analyzer import analyze_rules
+from engine.rules_manager import RulesManager
+from engine.stemmer import stem, stem_sin_cache
+
+REGLAS = [
+    {'id_regla': 'R01', 'nombre': 'Lentitud', 'palabras_clave': ['lento', 'lenta', 'muy lento'], 'raices': True},
+    {'id_regla': 'R02', 'nombre': 'Instalación', 'palabras_clave': ['instalar'], 'raices': True,
+     'palabras_excluidas': ['office']},
+    {'id_regla': 'R03', 'nombre': 'Impresora', 'palabras_clave': ['impresora']},
+    {'id_regla': 'R04', 'nombre': 'Office', 'palabras_clave': ['office', 'instalación']},
+]
+
+
+def test_raices_de_variantes():
+    """Las variantes de una palabra dan la misma raíz (con o sin tildes y con o sin cache)"""
+    grupos = [
+        ['lento', 'lenta', 'lentos', 'lentas', 'lentamente'],
+        ['instalar', 'instalación', 'instalacion', 'instalarlo', 'instalando'],
+        ['impresora', 'impresoras', 'IMPRESORA'],
+        ['contraseña', 'contraseñas', 'contrasena'],
+    ]
+    for grupo in grupos:
+        assert len({stem(palabra) for palabra in grupo}) == 1, grupo
+        assert all(stem(palabra) == stem_sin_cache(palabra) for palabra in grupo)
+    assert stem('lento') == 'lent'
+    assert stem('red') != stem('credencial')
+
+
+def test_match_por_raiz_equivale_en_todos_los_indices():
+    """Trie, versión compilada y lote coinciden por raíz y las palabras sueltas salen del trie"""
+    matcher = RuleMatcher(REGLAS)
+    compilado = matcher.compiled()
+    casos = ["las computadoras están lentas", "se instaló mal", "hay que instalarlo de nuevo",
+             "la instalación de office falló", "impresoras sin papel", "está muy lento",
+             "instalaciones lentas"]
+    esperadas = ['R01', 'R02', 'R02', 'R04', 'R03', 'R01', 'R01']
+
+    en_lote = compilado.match_many(casos)
+    for texto, esperada, regla_lote in zip(casos, esperadas, en_lote):
+        for regla in (matcher.match(texto), compilado.match(texto), regla_lote):
+            assert (regla['id_regla'] if regla else None) == esperada, texto
+
+    # 'lento' y 'lenta' comparten una entrada de raíz; 'muy lento' es una frase y queda en el trie
+    assert len(matcher._raices) == 2
+    assert set(matcher.keywords_in("muy lento e instalar")) == {'muy lento'}
+
+    matcher.update_rule({**REGLAS[1], 'raices': False})
+    assert matcher.match("se instaló mal") is None
+    assert matcher._raices.lookup("se instaló mal") == set()
+
+
+def test_reglas_y_simulacion_por_raiz(tmp_path):
+    """El gestor guarda 'raices', el analizador no poda esas palabras y la simulación ve las variantes"""
+    manager = RulesManager(str(tmp_path / "reglas.json"))
+    assert manager.add_rule("Red", ["red"], "REDES", "Media", "Equipo", raices=True)
+    assert manager.add_rule("Credenciales", ["credencial"], "SEGURIDAD", "Alta", "Equipo")
+    assert manager.validate_rules() == []
+    assert manager.validate_rule({**manager.get_rule_by_id('R01'), 'raices': 'si'})
+
+    # Con raíces 'red' no coincide dentro de 'credencial': R02 no está sombreada
+    assert analyze_rules(manager.get_all_rules(), reglas_base=[])['sombreadas'] == []
+
+    df = pd.DataFrame({'contenido': ["se cayeron las redes", "credencial vencida", "hola"]})
+    borrador = [{**manager.get_rule_by_id('R01'), 'prioridad': 'Alta'}, manager.get_rule_by_id('R02')]
+    diff = replay_diff(df, borrador, manager.get_all_rules())
+    assert diff['cambiados'] == 1
@@ -0,0 +1,247 @@
+# tests/test_ticket_archive.py
+# Pruebas del archivo frío de los tickets de meses viejos
+
+import sys
+import os
+import json
+from datetime import date
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli
+from engine.ticket_archive import TicketArchive, mes_limite, archivos_archivo
+from engine.ticket_store import TicketStore, get_search_index
+
+HOY = date(2025, 12, 15)
+
+
+def _tickets(cantidad, inicio=0):
+    """Tickets repartidos entre agosto y diciembre de 2025 (y uno sin fecha)"""
+    meses = ['2025-08', '2025-09', '2025-10', '2025-11', '2025-12']
+    tickets = [{'id_ticket': f'TK{i:05d}', 'contenido': f'problema de red número {i % 7}',
+                'cliente': f'cliente {i % 13}', 'area': 'Ventas' if i % 2 else 'Compras',
+                'fecha': f"{meses[i % 5]}-{i % 28 + 1:02d}", 'tipo': 'REDES', 'version_reglas': 'v1'}
+               for i in range(inicio, inicio + cantidad)]
+    return tickets + [{'id_ticket': f'TKSIN{inicio}', 'contenido': 'sin fecha', 'version_reglas': 'v1'}]
+
+
+def _datos(ticket):
+    """Ticket sin el número de secuencia que le pone el almacén"""
+    return {campo: valor for campo, valor in ticket.items() if campo != 'seq'}
+
+
+def _crear_almacen(tmp_path, tickets):
+    ruta = tmp_path / "facts_storage.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    return str(ruta)
+
+
+def test_archivar_achica_el_almacen_y_conserva_los_contadores(tmp_path):
+    """Los meses viejos pasan al archivo; los sketches y la búsqueda por ID siguen cubriéndolos"""
+    tickets = _tickets(500)
+    ruta = _crear_almacen(tmp_path, tickets)
+    store = TicketStore(ruta)
+    sketches_antes = store.get_sketches().to_dict()
+    assert get_search_index(ruta).search('red')['total'] == 500
+
+    resumen = store.archive_old(1, hoy=HOY)
+    assert resumen['tickets'] == 300 and resumen['meses'] == ['2025-08', '2025-09', '2025-10']
+    assert resumen['bytes_ahorrados'] > 0 and resumen['compresion'] > 3
+    quedan = TicketStore(ruta).get_all_tickets()
+    assert len(quedan) == 201 and all(t.get('fecha', '2025-11') >= '2025-11' for t in quedan)
+
+    # Contadores agregados: los mismos antes y después, y también al recalcularlos desde cero
+    assert store.get_sketches().to_dict() == sketches_antes
+    recalculado = TicketStore(ruta)
+    recalculado.rebuild_sketches()
+    assert recalculado.get_sketches().to_dict() == sketches_antes
+    assert recalculado.get_sketches().top('cliente', ['2025-08'])[1] == 100
+
+    # Un ticket archivado se sigue encontrando (y no cuenta como pendiente), la búsqueda de texto es del almacén
+    assert _datos(recalculado.get_ticket('TK00005')) == tickets[5]
+    assert recalculado.pending_tickets(tickets[:10], 'v1') == []
+    assert get_search_index(ruta).search('red')['total'] == 200
+    assert store.archive_old(1, hoy=HOY)['tickets'] == 0
+
+
+def test_un_ticket_se_lee_descomprimiendo_un_solo_bloque(tmp_path, monkeypatch):
+    """Cada bloque es de un mes y está ordenado por ID; leer un ticket salta a su bloque"""
+    monkeypatch.setattr('engine.ticket_archive.TICKETS_POR_BLOQUE', 40)
+    # IDs correlativos en el tiempo, como los que llegan de la mesa de ayuda
+    tickets = [{'id_ticket': f'TK{i:05d}', 'contenido': f'falla {i}', 'fecha': f"2025-{8 + i // 100:02d}-01"}
+               for i in range(500)]
+    ruta = _crear_almacen(tmp_path, tickets)
+    assert TicketStore(ruta).archive_old(0, formato='gzip', hoy=HOY)['tickets'] == 400
+
+    archivo = TicketArchive(ruta)
+    assert archivo.months() == ['2025-08', '2025-09', '2025-10', '2025-11']
+    assert len(archivo) == 400 and len(archivo.bloques) == 12
+    assert all(b['primer_id'] <= b['ultimo_id'] for b in archivo.bloques)
+
+    leidos = []
+    leer = TicketArchive.read_block
+    monkeypatch.setattr(TicketArchive, 'read_block', lambda self, numero: leidos.append(numero) or leer(self, numero))
+    assert _datos(archivo.get_ticket('TK00131')) == tickets[131]
+    assert len(leidos) == 1
+    assert archivo.get_ticket('TK99999') is None and len(leidos) == 1
+    assert [t['id_ticket'] for t in archivo.iter_tickets('2025-10', '2025-10')] == \
+        [f'TK{i:05d}' for i in range(200, 300)]
+
+
+def test_archivar_de_nuevo_agrega_bloques(tmp_path):
+    """Un segundo archivado agrega bloques al final; un ticket tardío de un mes archivado se suma a su mes"""
+    assert mes_limite(0, HOY) == '2025-12' and mes_limite(13, HOY) == '2024-11'
+    ruta = _crear_almacen(tmp_path, _tickets(100))
+    store = TicketStore(ruta)
+    store.archive_old(2, hoy=HOY)
+    datos, _ = archivos_archivo(ruta)
+    tamano = os.path.getsize(datos)
+
+    tardio = {'id_ticket': 'TK90000', 'contenido': 'llegó tarde', 'cliente': 'nuevo', 'fecha': '2025-08-30'}
+    assert store.add_tickets([tardio])
+    sketches = store.get_sketches().to_dict()
+    resumen = store.archive_old(2, hoy=HOY)
+    assert resumen['tickets'] == 1 and os.path.getsize(datos) > tamano
+    assert _datos(TicketStore(ruta).get_ticket('TK90000')) == tardio
+
+    recalculado = TicketStore(ruta)
+    recalculado.rebuild_sketches()
+    assert recalculado.get_sketches().to_dict() == sketches
+    assert recalculado.get_sketches().top('cliente', ['2025-08'])[1] == 21
+
+
+def test_archivar_de_nuevo_un_id_reemplaza_la_copia_anterior(tmp_path):
+    """Volver a archivar tickets ya archivados (por ejemplo tras cortarse el guardado del almacén) no los duplica"""
+    tickets = _tickets(100)
+    ruta = _crear_almacen(tmp_path, tickets)
+    original = open(ruta, encoding='utf-8').read()
+    store = TicketStore(ruta)
+    sketches = store.get_sketches().to_dict()
+    assert store.archive_old(2, hoy=HOY)['tickets'] == 40
+
+    # El archivo quedó escrito pero el almacén no: los mismos tickets vuelven a estar en el almacén
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(original)
+    os.remove(store.sketches_file)
+    otra_vez = TicketStore(ruta)
+    assert otra_vez.archive_old(2, hoy=HOY)['tickets'] == 40
+    assert len(TicketArchive(ruta)) == 40
+    assert otra_vez.get_sketches().to_dict() == sketches
+    assert otra_vez.get_sketches().top('cliente', ['2025-08'])[1] == 20
+
+    # Una versión nueva de un ticket archivado reemplaza a la anterior y a lo que contaban los sketches
+    cambiado = {**tickets[0], 'cliente': 'cliente nuevo'}
+    assert otra_vez.get_archive().append([cambiado]) is not None
+    archivo = TicketArchive(ruta)
+    assert len(archivo) == 40 and _datos(archivo.get_ticket('TK00000')) == cambiado
+    assert archivo.get_tickets(['TK00000', 'TK00005', 'TK99999']).keys() == {'TK00000', 'TK00005'}
+    top, total = archivo.archived_sketches().top('cliente', ['2025-08'])
+    assert total == 20 and ('cliente nuevo', 1, 0) in top
+
+
+def test_compactar_descarta_los_bloques_reemplazados(tmp_path, monkeypatch):
+    """Los bloques reemplazados se descartan al compactar (a mano o al pasar la fracción sin usar)"""
+    tickets = _tickets(100)
+    ruta = _crear_almacen(tmp_path, tickets)
+    TicketStore(ruta).archive_old(2, hoy=HOY)
+    datos, _ = archivos_archivo(ruta)
+    archivo = TicketArchive(ruta)
+    assert archivo.unused_bytes() == 0 and archivo.compact() == 0
+
+    # Con una fracción alta no se compacta solo: los bloques viejos quedan sin usar
+    monkeypatch.setattr('engine.ticket_archive.FRACCION_SIN_USAR', 10)
+    cambiados = [{**ticket, 'cliente': 'cliente nuevo'} for ticket in tickets[:40] if ticket['fecha'] < '2025-10']
+    assert archivo.append(cambiados) is not None
+    tamano, sin_usar = os.path.getsize(datos), archivo.unused_bytes()
+    assert sin_usar > 0
+    esperados = {t['id_ticket']: t for t in archivo.iter_tickets()}
+
+    # Si el índice no se puede guardar, el archivo de datos no se reemplaza
+    monkeypatch.setattr(TicketArchive, '_guardar_indice', lambda self: False)
+    assert archivo.compact() is None and os.path.getsize(datos) == tamano
+    assert {t['id_ticket']: t for t in TicketArchive(ruta).iter_tickets()} == esperados
+    monkeypatch.undo()
+    monkeypatch.setattr('engine.ticket_archive.FRACCION_SIN_USAR', 10)
+
+    assert archivo.compact() == sin_usar
+    assert os.path.getsize(datos) == tamano - sin_usar and archivo.unused_bytes() == 0
+    recargado = TicketArchive(ruta)
+    assert {t['id_ticket']: t for t in recargado.iter_tickets()} == esperados
+    assert recargado.get_ticket('TK00000')['cliente'] == 'cliente nuevo'
+
+    # Con la fracción por defecto, reemplazar casi todo compacta al agregar
+    monkeypatch.setattr('engine.ticket_archive.FRACCION_SIN_USAR', 0.5)
+    assert recargado.append([{**ticket, 'cliente': 'otro'} for ticket in esperados.values()]) is not None
+    assert recargado.unused_bytes() == 0
+    assert TicketArchive(ruta).get_ticket('TK00005')['cliente'] == 'otro'
+
+
+def test_cli_archivar_compacta(tmp_path, monkeypatch, capsys):
+    """El comando archivar descarta los bloques sin usar aunque no haya tickets nuevos para archivar"""
+    tickets = _tickets(100)
+    ruta = _crear_almacen(tmp_path, tickets)
+    TicketStore(ruta).archive_old(2, hoy=HOY)
+    monkeypatch.setattr('engine.ticket_archive.FRACCION_SIN_USAR', 10)
+    assert TicketArchive(ruta).append([{**tickets[0], 'cliente': 'cliente nuevo'}]) is not None
+    assert TicketArchive(ruta).unused_bytes() > 0
+
+    assert cli.main(['archivar', '--meses', '1200', '--almacen', ruta]) == 0
+    assert "compactado" in capsys.readouterr().out
+    assert TicketArchive(ruta).unused_bytes() == 0
+    assert TicketArchive(ruta).get_ticket('TK00000')['cliente'] == 'cliente nuevo'
+
+
+def test_upsert_de_un_ticket_archivado_no_lo_devuelve_al_almacen(tmp_path):
+    """Con otra versión de las reglas, un ticket archivado se reemplaza dentro del archivo"""
+    tickets = _tickets(100)
+    ruta = _crear_almacen(tmp_path, tickets)
+    store = TicketStore(ruta)
+    store.archive_old(2, hoy=HOY)
+    en_almacen = len(store.get_all_tickets())
+
+    assert store.upsert_tickets(tickets[:10]) == {'agregados': 0, 'reemplazados': 0, 'sin_cambios': 10}
+    reclasificados = [{**ticket, 'version_reglas': 'v2'} for ticket in tickets[:10]]
+    pendientes = store.pending_tickets(reclasificados, 'v2')
+    assert len(pendientes) == 10
+    assert store.upsert_tickets(pendientes) == {'agregados': 0, 'reemplazados': 10, 'sin_cambios': 0}
+
+    recargado = TicketStore(ruta)
+    assert len(recargado.get_all_tickets()) == en_almacen and len(recargado.get_archive()) == 40
+    assert recargado.get_ticket('TK00005')['version_reglas'] == 'v2'
+    assert recargado.get_ticket('TK00005')['version'] == 2
+    assert recargado.pending_tickets(reclasificados, 'v2') == []
+    sketches = recargado.get_sketches().to_dict()
+    recargado.rebuild_sketches()
+    assert recargado.get_sketches().to_dict() == sketches
+    assert recargado.get_sketches().top('cliente', ['2025-08'])[1] == 20
+
+
+def test_pendientes_buscan_en_el_archivo_una_sola_vez(tmp_path, monkeypatch):
+    """pending_tickets busca juntos en el archivo los IDs que no están en el almacén"""
+    tickets = _tickets(100)
+    store = TicketStore(_crear_almacen(tmp_path, tickets))
+    store.archive_old(2, hoy=HOY)
+    busquedas = []
+    original = TicketArchive._buscar
+    monkeypatch.setattr(TicketArchive, '_buscar', lambda self, ids: busquedas.append(set(ids)) or original(self, ids))
+
+    reclasificados = [{**ticket, 'version_reglas': 'v2'} for ticket in tickets]
+    assert len(store.pending_tickets(reclasificados, 'v2')) == len(tickets)
+    assert store.pending_tickets(tickets, 'v1') == []
+    assert len(busquedas) == 2 and all(len(ids) == 40 for ids in busquedas)
+
+
+def test_rango_de_fechas_incluye_los_meses_archivados(tmp_path):
+    """Sin rango la vista es del almacén; con rango suma los tickets archivados de esos meses"""
+    tickets = _tickets(100)
+    store = TicketStore(_crear_almacen(tmp_path, tickets))
+    store.archive_old(2, hoy=HOY)
+    assert store.archived_months() == ['2025-08', '2025-09']
+    assert len(store.to_dataframe()) == 61
+
+    df = store.to_dataframe('2025-09-10', '2025-10-31')
+    esperados = {t['id_ticket'] for t in tickets if '2025-09-10' <= t.get('fecha', '') <= '2025-10-31'}
+    assert set(df['id_ticket']) == esperados and len(df) == len(esperados)
+    assert str(df['tipo'].dtype) == 'category' and str(df['fecha'].dtype).startswith('datetime64')
+    assert len(store.to_dataframe('2025-11-01', '2025-11-30')) == 20
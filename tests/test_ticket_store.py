@@ -0,0 +1,194 @@
+# tests/test_ticket_store.py
+# Pruebas del almacén de tickets procesados
+
+import sys
+import os
+import json
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.ticket_store import (TicketStore, MODO_VERSIONAR, huella_contenido, get_search_index,
+                                 get_similar_index)
+from engine.search_index import TicketSearchIndex, archivo_indice
+from engine.incidents import IncidentDetector
+
+
+def _crear_almacen(tmp_path, tickets):
+    """Crea un facts_storage.json temporal y retorna su ruta"""
+    ruta = tmp_path / "facts_storage.json"
+    ruta.write_text(json.dumps({'tickets_procesados': tickets}), encoding='utf-8')
+    return str(ruta)
+
+
+def test_vista_columnar_categorica(tmp_path):
+    """La vista columnar usa categorías y fechas reales"""
+    tickets = [
+        {'id_ticket': 'TK1', 'contenido': 'sin internet', 'tipo': 'REDES', 'prioridad': 'Alta', 'fecha': '2025-10-28'},
+        {'id_ticket': 'TK2', 'contenido': 'impresora', 'tipo': 'HARDWARE', 'prioridad': 'Media', 'fecha': '2025-10-29'},
+    ]
+    store = TicketStore(_crear_almacen(tmp_path, tickets))
+    df = store.to_dataframe()
+
+    assert len(df) == 2
+    assert str(df['tipo'].dtype) == 'category'
+    assert str(df['fecha'].dtype).startswith('datetime64')
+    # Se reutiliza mientras no cambien los datos
+    assert store.to_dataframe() is df
+
+
+def test_archivo_inexistente_crea_uno_nuevo(tmp_path):
+    """Si el archivo no existe se crea vacío"""
+    ruta = str(tmp_path / "nuevo.json")
+    store = TicketStore(ruta)
+
+    assert store.get_all_tickets() == []
+    assert os.path.exists(ruta)
+
+
+def test_upsert_no_repite_ids_ni_escribe_si_nada_cambio(tmp_path, monkeypatch):
+    """Reprocesar el mismo lote no agrega registros ni escribe; un cambio reemplaza en su lugar"""
+    store = TicketStore(_crear_almacen(tmp_path, []))
+    lote = [{'id_ticket': f'TK{i}', 'contenido': f'problema {i}', 'tipo': 'REDES', 'version_reglas': 'v1'}
+            for i in range(3)]
+    assert store.upsert_tickets(lote) == {'agregados': 3, 'reemplazados': 0, 'sin_cambios': 0}
+
+    escrituras = []
+    monkeypatch.setattr(store, 'save_tickets', lambda: escrituras.append(1) or True)
+    assert store.pending_tickets(lote, 'v1') == []
+    assert store.upsert_tickets(lote) == {'agregados': 0, 'reemplazados': 0, 'sin_cambios': 3}
+    assert not escrituras
+    monkeypatch.undo()
+
+    # Otra versión de reglas o datos distintos: se reemplaza el registro (y se guarda el anterior si se pide)
+    assert [t['id_ticket'] for t in store.pending_tickets(lote, 'v2')] == ['TK0', 'TK1', 'TK2']
+    cambiado = {**lote[1], 'contenido': 'problema distinto', 'tipo': 'HARDWARE'}
+    assert store.upsert_tickets([cambiado, {**lote[2], 'version_reglas': 'v2'}], modo=MODO_VERSIONAR) == \
+        {'agregados': 0, 'reemplazados': 2, 'sin_cambios': 0}
+    guardados = TicketStore(store.storage_file).get_all_tickets()
+    assert [t['id_ticket'] for t in guardados] == ['TK0', 'TK1', 'TK2']
+    assert guardados[1]['tipo'] == 'HARDWARE' and guardados[1]['version'] == 2
+    assert guardados[1]['historial'][0]['contenido'] == 'problema 1'
+    recalculado = TicketStore(store.storage_file)
+    recalculado.rebuild_sketches()
+    assert store.get_sketches().to_dict() == recalculado.get_sketches().to_dict()
+
+
+def test_huella_ignora_la_clasificacion():
+    """La huella cambia con los datos del ticket y no con el resultado de la clasificación"""
+    ticket = {'id_ticket': 'TK1', 'contenido': 'sin internet', 'area': 'Ventas'}
+    clasificado = {**ticket, 'tipo': 'REDES', 'prioridad': 'Alta', 'version_reglas': 'v1', 'huella': 'x'}
+    assert huella_contenido(ticket) == huella_contenido(clasificado)
+    assert huella_contenido(ticket) != huella_contenido({**ticket, 'area': 'Compras'})
+
+
+def test_compactar_repetidos_deja_el_ultimo(tmp_path):
+    """La compactación deja el último registro de cada ID y rehace sketches e índices"""
+    tickets = [{'id_ticket': 'TK001', 'contenido': 'viejo'}, {'id_ticket': 'TK002', 'contenido': 'otro'},
+               {'id_ticket': 'TK001', 'contenido': 'nuevo'}, {'contenido': 'sin id'}, {'contenido': 'sin id'}]
+    ruta = _crear_almacen(tmp_path, tickets)
+    store = TicketStore(ruta)
+    assert get_search_index(ruta).search('viejo')['total'] == 1
+
+    assert store.compact_duplicates() == 1
+    assert [t['contenido'] for t in TicketStore(ruta).get_all_tickets()] == ['otro', 'nuevo', 'sin id', 'sin id']
+    assert store.get_ticket('TK001')['contenido'] == 'nuevo'
+    assert get_search_index(ruta).search('viejo')['total'] == 0
+    recalculado = TicketStore(ruta)
+    recalculado.rebuild_sketches()
+    assert store.get_sketches().to_dict() == recalculado.get_sketches().to_dict()
+    assert store.compact_duplicates() == 0
+
+
+def test_reclasificar_corrige_los_indices_en_su_lugar(tmp_path, monkeypatch):
+    """Si solo cambia la clasificación no se recalculan sketches ni se reconstruyen los índices"""
+    tickets = [{'id_ticket': f'TK{i}', 'contenido': f'problema {i}', 'tipo': 'REDES', 'version_reglas': 'v1'}
+               for i in range(4)]
+    ruta = _crear_almacen(tmp_path, tickets)
+    store = TicketStore(ruta)
+    busqueda, similares = get_search_index(ruta), get_similar_index(ruta)
+    store.get_sketches()
+    monkeypatch.setattr(store, 'rebuild_sketches', lambda: (_ for _ in ()).throw(AssertionError("recalculó")))
+
+    resultado = {'regla': 'Regla: Otra', 'tipo': 'HARDWARE', 'prioridad': 'Alta', 'asignado_a': 'Soporte'}
+    assert store.update_classifications({1: resultado}, 'v2', confirmados=[0, 1])
+    guardados = TicketStore(ruta).get_all_tickets()
+    assert [t['version_reglas'] for t in guardados] == ['v2', 'v2', 'v1', 'v1']
+    assert guardados[1]['tipo'] == 'HARDWARE' and guardados[1]['version'] == 2
+    assert guardados[1]['huella'] == huella_contenido(tickets[1])
+
+    assert get_search_index(ruta) is busqueda and get_similar_index(ruta) is similares
+    assert busqueda.search('', tipo='HARDWARE')['posiciones'] == [1]
+    assert similares.search('problema 1', k=1)[0]['tipo'] == 'HARDWARE'
+    assert busqueda._guardados == 4 and os.path.exists(archivo_indice(ruta))  # Punto de control al día
+    # Un reemplazo con otros datos sí rehace todo
+    monkeypatch.undo()
+    assert store.upsert_tickets([{**tickets[2], 'contenido': 'otra cosa'}])['reemplazados'] == 1
+    assert get_search_index(ruta) is not busqueda and get_search_index(ruta).search('otra')['posiciones'] == [2]
+
+
+def test_tail_entrega_cada_cambio_una_vez_en_orden(tmp_path):
+    """Los registros reciben números crecientes; un reclasificado aparece de nuevo con su último número"""
+    ruta = _crear_almacen(tmp_path, [{'id_ticket': 'TK0', 'contenido': 'anterior al registro de cambios'}])
+    store = TicketStore(ruta)
+    assert [(seq, posicion) for seq, posicion, _ in store.tail()] == [(1, 0)]
+
+    assert store.add_tickets([{'id_ticket': f'TK{i}', 'contenido': f'falla {i}', 'version_reglas': 'v1'}
+                              for i in (1, 2, 3)])
+    resultado = {'regla': 'Regla: Otra', 'tipo': 'HARDWARE'}
+    assert store.update_classifications({1: resultado}, 'v1', confirmados=[0])
+    assert store.update_classifications({}, 'v2', confirmados=[0, 1, 2, 3])  # Solo la versión: no es un cambio
+    assert store.update_classifications({1: {**resultado, 'tipo': 'REDES'}}, 'v2')
+    assert [(seq, posicion) for seq, posicion, _ in store.tail(1)] == [(3, 2), (4, 3), (6, 1)]
+    assert list(store.tail(6)) == []
+
+    # El número de secuencia se guarda con el archivo y no cuenta para la huella
+    otro = TicketStore(ruta)
+    assert (otro.secuencia, otro.generacion) == (6, 0) and list(otro.tail(4))[0][2]['tipo'] == 'REDES'
+    assert otro.pending_tickets([{'id_ticket': 'TK3', 'contenido': 'falla 3'}], 'v2') == []
+    reemplazados, agregados = otro.changes_since(0, 3, 3)
+    assert list(reemplazados) == [1] and [t['id_ticket'] for t in agregados] == ['TK3']
+
+    # Compactar mueve registros: otra generación, los consumidores empiezan de cero
+    assert otro.add_tickets([{'id_ticket': 'TK1', 'contenido': 'falla 1 otra vez'}])
+    assert otro.compact_duplicates() == 1 and otro.generacion == 1
+    assert otro.changes_since(0, 7, 4) is None and TicketStore(ruta).generacion == 1
+
+
+def test_consumidores_procesan_solo_lo_posterior_a_su_punto_de_control(tmp_path, monkeypatch):
+    """Índices y sketches siguen al almacén con tail; con otra generación se rehacen desde cero"""
+    ruta = _crear_almacen(tmp_path, [{'id_ticket': f'TK{i}', 'contenido': f'problema {i}', 'cliente': 'Ana',
+                                      'area': 'Ventas', 'fecha': '2025-10-01', 'tipo': 'REDES'} for i in range(50)])
+    store = TicketStore(ruta)
+    store.get_sketches()
+    sketches_guardados = (tmp_path / "facts_storage_sketches.json").read_text(encoding='utf-8')
+    busqueda, detector = TicketSearchIndex(archivo_indice(ruta)), IncidentDetector()
+    assert busqueda.follow(store) == 50 and detector.follow(store) == 50
+    assert busqueda.follow(store) == 0 and busqueda._guardados == 50
+
+    assert store.update_classifications({7: {'regla': 'Regla: Otra', 'tipo': 'HARDWARE'}}, 'v2')
+    assert store.add_tickets([{'id_ticket': 'TK50', 'contenido': 'problema nuevo', 'cliente': 'Luis',
+                               'area': 'Ventas', 'fecha': '2025-10-02'}])
+    agregados = []
+    monkeypatch.setattr(TicketSearchIndex, 'add_many',
+                        lambda self, tickets, original=TicketSearchIndex.add_many:
+                        agregados.extend(tickets) or original(self, tickets))
+
+    # Otro proceso: parte del punto de control en disco y lee solo la cola
+    otro = TicketSearchIndex(archivo_indice(ruta))
+    assert otro.follow(TicketStore(ruta)) == 1 and [t['id_ticket'] for t in agregados] == ['TK50']
+    assert otro.search('problema')['total'] == 51 and otro.search('', tipo='HARDWARE')['posiciones'] == [7]
+    assert busqueda.follow(store) == 1 and detector.follow(store) == 1
+    assert busqueda.search('', tipo='HARDWARE')['posiciones'] == [7]
+
+    # Sketches atrasados: se suman solo los agregados, sin recalcular
+    (tmp_path / "facts_storage_sketches.json").write_text(sketches_guardados, encoding='utf-8')
+    nuevo = TicketStore(ruta)
+    monkeypatch.setattr(nuevo, 'rebuild_sketches', lambda: (_ for _ in ()).throw(AssertionError("recalculó")))
+    assert nuevo.get_sketches().distinct_clients() == {'Ventas': 2}
+    monkeypatch.undo()
+
+    # Un cambio de datos es otra generación: se indexa todo de nuevo
+    assert store.upsert_tickets([{'id_ticket': 'TK3', 'contenido': 'otra cosa'}])['reemplazados'] == 1
+    assert busqueda.follow(store) == 51 and busqueda.search('otra')['posiciones'] == [3]
+    assert detector.follow(store) == 51
@@ -23,8 +23,9 @@ from estadisticas import mostrar_estadisticas
 # Agregar el directorio raíz al path de Python
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from engine.classification_engine import TicketClassificationEngine
+from engine.classification_engine import TicketClassificationEngine, buscar_tickets_similares, version_reglas
 from engine.ticket_fact import Ticket
+from engine.ticket_store import TicketStore
 
 def normalizar(texto):
     texto = texto.lower()
@@ -58,25 +59,22 @@ def cargar_tickets_desde_json(archivo):
 # Función para guardar ticket procesado
 def guardar_ticket_procesado(ticket_data, resultado):
     """Guarda el ticket procesado en facts_storage.json"""
+    return guardar_tickets_procesados([(ticket_data, resultado)])
+
+def guardar_tickets_procesados(procesados, version=None):
+    """
+    Guarda varios tickets procesados en una sola escritura (actualiza también los sketches).
+    Un ID que ya estaba reemplaza a su registro en lugar de repetirse.
+    """
     try:
-        ruta = os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'facts_storage.json')
-        
-        # Leer datos existentes
-        with open(ruta, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-        
-        # Agregar nuevo ticket
-        ticket_completo = {
-            **ticket_data,
-            **resultado,
-            'fecha_procesamiento': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        datos['tickets_procesados'].append(ticket_completo)
-        
-        # Guardar
-        with open(ruta, 'w', encoding='utf-8') as f:
-            json.dump(datos, f, indent=2, ensure_ascii=False)
-        
+        fecha_procesamiento = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        version = version or version_reglas()
+        tickets = [
+            {**ticket_data, **resultado, 'fecha_procesamiento': fecha_procesamiento, 'version_reglas': version}
+            for ticket_data, resultado in procesados
+        ]
+        if TicketStore().upsert_tickets(tickets) is None:
+            raise IOError("no se pudo escribir el almacén de tickets")
         return True
     except Exception as e:
         st.error(f"Error al guardar: {e}")
@@ -205,12 +203,14 @@ elif opcion == "📊 Dashboard":
         tickets = cargar_tickets_desde_json('tests/default_tickets.json')
         
         if tickets:
-            st.success(f"✅ Se cargaron {len(tickets)} tickets")
+            # Solo se procesan los tickets nuevos, los que cambiaron y los clasificados con otras reglas
+            version = version_reglas()
+            pendientes = TicketStore().pending_tickets(tickets, version)
+            st.success(f"✅ Se cargaron {len(tickets)} tickets ({len(tickets) - len(pendientes)} ya estaban al día)")
             
-            # Procesar cada ticket
-            for ticket in tickets:
-                resultado = clasificar_ticket(ticket)
-                guardar_ticket_procesado(ticket, resultado)
+            # Procesar cada ticket y guardar el lote de una vez
+            if pendientes:
+                guardar_tickets_procesados([(ticket, clasificar_ticket(ticket)) for ticket in pendientes], version)
             
             st.balloons()
             st.rerun()
@@ -224,9 +224,56 @@ elif opcion == "📊 Dashboard":
             datos = json.load(f)
             tickets_procesados = datos.get('tickets_procesados', [])
         
-        if tickets_procesados:
+        vista = st.radio("Vista", ["Lista", "Agrupada por incidente"], horizontal=True, key="vista_dashboard")
+
+        if tickets_procesados and vista == "Agrupada por incidente":
+            # Tickets casi iguales juntos (por ejemplo, muchos "sin internet" durante una caída)
+            from engine.ticket_store import get_incident_detector
+            incidentes = get_incident_detector().clusters()
+            agrupados = sum(incidente['tamano'] for incidente in incidentes)
+            st.caption(f"{len(incidentes)} incidentes con tickets repetidos · {agrupados} tickets agrupados · "
+                       f"{len(tickets_procesados) - agrupados} tickets sueltos")
+            for incidente in incidentes:
+                grupo = [tickets_procesados[posicion] for posicion in incidente['posiciones']
+                         if posicion < len(tickets_procesados)]
+                primero = grupo[0]
+                with st.expander(f"🚨 {incidente['tamano']} tickets - {primero.get('contenido', 'N/A')[:80]}"):
+                    st.dataframe(
+                        pd.DataFrame(grupo).reindex(columns=['id_ticket', 'fecha', 'cliente', 'area', 'contenido', 'tipo', 'asignado_a']),
+                        hide_index=True,
+                        use_container_width=True
+                    )
+            if not incidentes:
+                st.info("No hay tickets casi iguales entre los procesados.")
+        elif tickets_procesados:
+            # Búsqueda de texto con filtros (índice invertido que se actualiza al guardar tickets)
+            from engine.ticket_store import get_search_index
+            indice_busqueda = get_search_index()
+            col_busqueda, col_tipo, col_prioridad, col_fechas = st.columns([3, 2, 2, 2])
+            with col_busqueda:
+                consulta = st.text_input("🔍 Buscar", key="busqueda_dashboard",
+                                         placeholder='impresora -toner, "no enciende", impres*, red OR wifi')
+            with col_tipo:
+                tipos = st.multiselect("Tipo", indice_busqueda.values('tipo'), key="tipos_dashboard")
+            with col_prioridad:
+                prioridades = st.multiselect("Prioridad", indice_busqueda.values('prioridad'), key="prioridades_dashboard")
+            with col_fechas:
+                fechas = st.date_input("Fechas", value=(), key="fechas_dashboard")
+
+            if consulta or tipos or prioridades or fechas:
+                resultado = indice_busqueda.search(consulta,
+                                                   desde=fechas[0] if len(fechas) > 0 else None,
+                                                   hasta=fechas[1] if len(fechas) > 1 else None,
+                                                   prioridad=prioridades or None, tipo=tipos or None, limite=200)
+                mostrados = [tickets_procesados[posicion] for posicion in resultado['posiciones']
+                             if posicion < len(tickets_procesados)]
+                st.caption(f"{resultado['total']} tickets encontrados"
+                           + (f" · se muestran los {len(mostrados)} más nuevos" if resultado['total'] > len(mostrados) else ""))
+            else:
+                mostrados = tickets_procesados
+
             # Mostrar en tabla
-            for ticket in tickets_procesados:
+            for ticket in mostrados:
                 with st.expander(f"🎫 {ticket.get('id_ticket', 'N/A')} - {ticket.get('cliente', 'Sin nombre')}"):
                     col1, col2 = st.columns(2)
                     
@@ -260,9 +307,9 @@ elif opcion == "📊 Dashboard":
 elif opcion == "➕ Nuevo Ticket":
     st.header("Crear Nuevo Ticket")
 
-    # Cargar áreas desde el gestor
-    from engine.areas_manager import AreasManager
-    areas_manager = AreasManager()
+    # Áreas del gestor compartido (sin leer el archivo en cada recarga de la página)
+    from engine.areas_manager import get_areas_manager
+    areas_manager = get_areas_manager()
     json_areas = areas_manager.get_areas_names()
     
     if not json_areas:
@@ -294,8 +341,9 @@ elif opcion == "➕ Nuevo Ticket":
                     'fecha': fecha.strftime('%Y-%m-%d')
                 }
                 
-                # Clasificar
+                # Clasificar y buscar tickets parecidos (antes de guardar, para no encontrarse a sí mismo)
                 resultado = clasificar_ticket(nuevo_ticket)
+                similares = buscar_tickets_similares(contenido)
                 
                 # Guardar
                 if guardar_ticket_procesado(nuevo_ticket, resultado):
@@ -309,6 +357,15 @@ elif opcion == "➕ Nuevo Ticket":
                     - Asignado a: {resultado['asignado_a']}
                     - Regla aplicada: {resultado['regla']}
                     """)
+
+                    # Tickets parecidos y cómo se resolvieron
+                    if similares:
+                        st.markdown("**🔎 Tickets similares:**")
+                        st.dataframe(
+                            pd.DataFrame(similares)[['id_ticket', 'fecha', 'contenido', 'tipo', 'asignado_a', 'regla', 'similitud']],
+                            hide_index=True,
+                            use_container_width=True
+                        )
                     
                     st.balloons()
             else:
@@ -2,38 +2,47 @@
 
 #BIBLIOTECAS A UTILIZAR
 import streamlit as st # Interfaz de usuario
-import os, json # Manejo de archivos y JSON
+import os # Manejo de archivos
 import pandas as pd # Manipulación de datos
 import plotly.express as px # Visualización de datos de forma más dinámica, este es el modulo simplificado de plotly
+import sys
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.ticket_store import TicketStore
+from engine.ticket_archive import archivos_archivo
+from engine.aggregation import count_dimensions, to_frame
+from engine.report_jobs import ReportJobManager, file_version, LISTO, ERROR
+from engine.report_pdf import generar_informe_pdf, generar_detalle_csv, MOTOR_VECTORIAL, MOTOR_PLOTLY
 
 def mostrar_estadisticas():
     #PARTE 1
     try:
         os.environ["PATH"] += os.pathsep + "/usr/bin"
         ruta = os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'facts_storage.json')
-        with open(ruta, 'r', encoding='utf-8') as f:
-            datos = json.load(f)
-            tickets = datos.get('tickets_procesados', [])
-        
-        if tickets:
-            # Contadores
-            categorias = {}
-            prioridades = {}
-            equipos = {}
-            
-            for ticket in tickets:
-                tipo = ticket.get('tipo', 'Sin clasificar')
-                categorias[tipo] = categorias.get(tipo, 0) + 1
-                prioridad = ticket.get('prioridad', 'Sin prioridad')
-                prioridades[prioridad] = prioridades.get(prioridad, 0) + 1
-                equipo = ticket.get('asignado_a', 'Sin asignar')
-                equipos[equipo] = equipos.get(equipo, 0) + 1
+
+        # Vista columnar de los tickets (categorías + fechas ya convertidas)
+        store = TicketStore()
+        df_tickets = store.to_dataframe()
+        meses_archivados = store.archived_months()
+
+        if not df_tickets.empty:
+            if meses_archivados:
+                periodo = " a ".join(dict.fromkeys([meses_archivados[0], meses_archivados[-1]]))
+                st.info(f"Los totales no incluyen los meses archivados ({periodo}). Elige un rango de fechas "
+                        f"que los abarque en la visualización con filtros para verlos en los gráficos y el informe.")
+
+            # Contadores (una sola llamada vectorizada para todas las dimensiones)
+            conteos = count_dimensions(df_tickets, ['tipo', 'prioridad'])
+            categorias = conteos['tipo'].to_dict()
+            prioridades = conteos['prioridad'].to_dict()
 
             # KPIs principales con animación
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                cuenta = len(tickets)
+                cuenta = len(df_tickets)
                 st.write("### 📊 Total Tickets")
                 st.markdown(f"""
                 <div style='text-align: center; animation: grow 1s ease-out;'>
@@ -98,12 +107,6 @@ def mostrar_estadisticas():
             # --- Selector de visualización ---
             st.markdown("### 📊 Visualización interactiva con filtros")
 
-            # Convertir a DataFrame completo
-            df_tickets = pd.DataFrame(tickets)
-
-            # Convertir fechas
-            df_tickets["fecha"] = pd.to_datetime(df_tickets["fecha"], errors="coerce")
-
             # --- FILTROS ---
             col1, col2, col3 = st.columns(3)
 
@@ -119,7 +122,8 @@ def mostrar_estadisticas():
                 fecha_max = df_tickets["fecha"].max()
                 fecha_rango = st.date_input(
                     "Rango de fechas:",
-                    value=(fecha_min if pd.notna(fecha_min) else None, fecha_max if pd.notna(fecha_max) else None)
+                    value=(fecha_min if pd.notna(fecha_min) else None, fecha_max if pd.notna(fecha_max) else None),
+                    help="Si el rango llega a meses archivados, sus tickets se leen del archivo."
                 )
 
             with col3:
@@ -129,16 +133,18 @@ def mostrar_estadisticas():
                     index=0
                 )
 
-            # Aplicar filtro de fecha
-            if isinstance(fecha_rango, tuple) and len(fecha_rango) == 2:
+            # Aplicar filtro de fecha (los meses archivados del rango se suman desde el archivo)
+            rango_con_archivo = isinstance(fecha_rango, tuple) and len(fecha_rango) == 2
+            if rango_con_archivo:
                 inicio, fin = fecha_rango
-                df_filtrado = df_tickets[
-                    (df_tickets["fecha"] >= pd.to_datetime(inicio)) &
-                    (df_tickets["fecha"] <= pd.to_datetime(fin))
-                ]
+                df_filtrado = store.to_dataframe(inicio, fin)
             else:
                 df_filtrado = df_tickets.copy()
 
+            # Descripción de los filtros activos (forma parte de la clave de caché del informe)
+            filtros_aplicados = {'rango': [str(f) for f in fecha_rango] if isinstance(fecha_rango, tuple) else str(fecha_rango),
+                                 'filtro': filtro_secundario}
+
             if filtro_secundario != "Ninguno":
                 # Filtro secundario
                 mapeo_filtros = {
@@ -152,6 +158,7 @@ def mostrar_estadisticas():
                 if columna_filtro in df_filtrado.columns:
                     opciones_filtro = ["Todos"] + sorted(df_filtrado[columna_filtro].dropna().unique())
                     seleccion_filtro = st.selectbox(f"Selecciona {filtro_secundario}:", opciones_filtro)
+                    filtros_aplicados['seleccion'] = seleccion_filtro
                     if seleccion_filtro != "Todos":
                         df_filtrado = df_filtrado[df_filtrado[columna_filtro] == seleccion_filtro]
                 else:
@@ -170,10 +177,31 @@ def mostrar_estadisticas():
             }
             columna = mapeo_columnas.get(opcion_grafico.lower(), opcion_grafico.lower().replace(" ", "_"))
 
+            # Cliente y Contenido tienen muchos valores distintos: se puede usar el top-K de los sketches
+            usar_sketches = False
+            if columna in ("cliente", "contenido"):
+                usar_sketches = st.checkbox(
+                    "Vista aproximada (sketches por mes, tiempo constante)",
+                    value=True,
+                    disabled=filtro_secundario != "Ninguno",
+                    help="Usa el top-K mantenido al guardar tickets. Agrupa por meses completos "
+                         "y no admite filtro secundario."
+                ) and filtro_secundario == "Ninguno"
+
             if columna not in df_filtrado.columns:
                 st.warning(f"No hay datos para la categoría '{opcion_grafico}'.")
             else:
-                conteo = df_filtrado.groupby(columna).size().reset_index(name="Cantidad")
+                if usar_sketches:
+                    if isinstance(fecha_rango, tuple) and len(fecha_rango) == 2:
+                        meses = [str(m) for m in pd.period_range(fecha_rango[0], fecha_rango[1], freq='M')]
+                    else:
+                        meses = None
+                    top, total_aprox = store.get_sketches().top(columna, meses, n=20)
+                    conteo = pd.DataFrame(top, columns=[columna, "Cantidad", "Error máx."])
+                    st.caption(f"Cuentas aproximadas de los meses {', '.join(meses) if meses else 'con datos'}: "
+                               f"el valor real está entre Cantidad − Error máx. y Cantidad.")
+                else:
+                    conteo = to_frame(count_dimensions(df_filtrado, [columna])[columna], columna)
 
                 # --- MOSTRAR ---
                 if opcion_grafico == "Contenido":
@@ -193,9 +221,22 @@ def mostrar_estadisticas():
                         color_continuous_scale="Viridis"
                     )
                     st.plotly_chart(fig, use_container_width=True, key=f"chart_{opcion_grafico}")
-                
+                    if usar_sketches:
+                        st.dataframe(conteo, use_container_width=True)
+
+                if columna == "area" and isinstance(fecha_rango, tuple) and len(fecha_rango) == 2:
+                    # Clientes distintos por área (HyperLogLog por área y día)
+                    distintos = store.get_sketches().distinct_clients(str(fecha_rango[0]), str(fecha_rango[1]))
+                    if distintos:
+                        st.markdown("### 👥 Clientes distintos por área (aprox.)")
+                        st.dataframe(
+                            pd.DataFrame(sorted(distintos.items(), key=lambda x: -x[1]),
+                                         columns=["Área", "Clientes distintos"]),
+                            use_container_width=True
+                        )
+
                 # --- MÉTRICAS ---
-                total = conteo["Cantidad"].sum()
+                total = total_aprox if usar_sketches else conteo["Cantidad"].sum()
                 st.markdown(f"""
                 <div style='background-color: rgba(150,150,171,0.2);
                             padding: 1rem; border-radius: 10px; text-align: center;
@@ -223,7 +264,24 @@ def mostrar_estadisticas():
                     default=["Tipo", "Prioridad"]
                 )
 
-                # Generar PDF al hacer clic
+                # Los gráficos vectoriales no necesitan kaleido/chromium y son más rápidos
+                graficos_vectoriales = st.checkbox(
+                    "Usar gráficos vectoriales (más rápido, sin navegador)",
+                    value=True
+                )
+                motor_graficos = MOTOR_VECTORIAL if graficos_vectoriales else MOTOR_PLOTLY
+
+                # Para rangos muy grandes se limita la tabla del PDF y se adjunta el detalle en CSV
+                col1, col2 = st.columns(2)
+                with col1:
+                    max_filas_detalle = st.number_input(
+                        "Máximo de tickets en la tabla del PDF (0 = todos):",
+                        min_value=0, value=1000, step=100
+                    )
+                with col2:
+                    adjuntar_csv = st.checkbox("Adjuntar detalle completo (CSV comprimido)", value=False)
+
+                # Generar PDF al hacer clic: el informe se encola y se genera en segundo plano
                 if st.button("📊 Generar Informe Ejecutivo (PDF)"):
                     df_informe = df_filtrado[
                         (df_filtrado["fecha"] >= pd.to_datetime(inicio_pdf)) &
@@ -233,13 +291,26 @@ def mostrar_estadisticas():
                     if df_informe.empty:
                         st.warning("No hay tickets en el rango seleccionado.")
                     else:
-                        pdf_buffer = generar_informe_pdf(df_informe, graficos_seleccionados, inicio_pdf, fin_pdf)
-                        st.download_button(
-                            label="⬇️ Descargar Informe PDF",
-                            data=pdf_buffer,
-                            file_name=f"informe_tickets_{inicio_pdf}_{fin_pdf}.pdf",
-                            mime="application/pdf"
-                        )
+                        parametros = {
+                            'inicio': inicio_pdf,
+                            'fin': fin_pdf,
+                            'graficos': graficos_seleccionados,
+                            'motor_graficos': motor_graficos,
+                            'max_filas_detalle': max_filas_detalle or None,
+                            'adjuntar_csv': adjuntar_csv,
+                            'filtros': filtros_aplicados
+                        }
+                        # Un rango puede traer tickets del archivo frío, que cambia sin tocar el almacén
+                        version_datos = (file_version(ruta, archivos_archivo(ruta)[1]) if rango_con_archivo
+                                         else file_version(ruta))
+                        trabajo = _gestor_informes().submit(df_informe, parametros, version_datos)
+                        claves = st.session_state.setdefault("informes_solicitados", [])
+                        if trabajo.clave not in claves:
+                            claves.insert(0, trabajo.clave)
+                        st.info("⏳ Informe en cola. Puedes seguir usando la aplicación mientras se genera.")
+
+                if st.session_state.get("informes_solicitados"):
+                    mostrar_informes_solicitados()
 
             # CSS animación
             st.markdown("""
@@ -259,118 +330,65 @@ def mostrar_estadisticas():
 
 
 
-# FUNCIONES AUXILIARES PARA INFORME PDF °°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°
+# INFORMES EN SEGUNDO PLANO °°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°°
 
 
-from reportlab.lib.pagesizes import letter # Tamaño carta
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-import io
-import tempfile
-import textwrap
-from reportlab.lib.styles import ParagraphStyle
-def generar_informe_pdf(df_filtrado, graficos_seleccionados, inicio, fin):
-    """Genera el informe ejecutivo PDF con los gráficos seleccionados y tabla completa"""
-# Crea un estilo de texto más pequeño
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter,
-                            rightMargin=30, leftMargin=30,
-                            topMargin=30, bottomMargin=18)
-    styles = getSampleStyleSheet()
-    elements = []
-    estilo_celda = ParagraphStyle(
-        name="TablaCelda",
-        parent=styles["BodyText"],
-        fontSize=7,        # 👈 aquí cambias el tamaño
-        leading=9,         # separación entre líneas
-        alignment=1,       # 0=izq, 1=centro, 2=der, 4=justificado
-    )
-
-    # --- ENCABEZADO ---
-    elements.append(Paragraph("<b>Informe Ejecutivo de Tickets del Sistema</b>", styles['Title']))
-    elements.append(Paragraph(
-        f"Periodo analizado: {inicio.strftime('%Y-%m-%d')} a {fin.strftime('%Y-%m-%d')}",
-        styles['Normal']
-    ))
-    elements.append(Spacer(1, 12))
-
-    # --- RESUMEN PRINCIPAL ---
-    total_tickets = len(df_filtrado)
-    elementos_resumen = f"""
-    Total de tickets analizados: <b>{total_tickets}</b><br/>
-    Categorías incluidas: {', '.join(graficos_seleccionados)}
-    """
-    elements.append(Paragraph(elementos_resumen, styles['Normal']))
-    elements.append(Spacer(1, 18))
-
-    # --- GRÁFICOS SELECCIONADOS ---
-    temp_files = []
-    for categoria in graficos_seleccionados:
-        columna = categoria.lower().replace(" ", "_").replace("área", "area")
-        if columna not in df_filtrado.columns:
+def _construir_informe(df_informe, parametros, progreso):
+    """Trabajo que corre en el pool: genera el PDF y, si se pidió, el CSV comprimido"""
+    pdf_buffer = generar_informe_pdf(df_informe, parametros['graficos'], parametros['inicio'], parametros['fin'],
+                                     motor_graficos=parametros['motor_graficos'],
+                                     max_filas_detalle=parametros['max_filas_detalle'],
+                                     progreso=progreso)
+    csv_buffer = generar_detalle_csv(df_informe) if parametros['adjuntar_csv'] else None
+    return {
+        'pdf': pdf_buffer.getvalue(),
+        'csv': csv_buffer.getvalue() if csv_buffer else None
+    }
+
+
+@st.cache_resource
+def _gestor_informes():
+    """Un solo gestor de trabajos por proceso, compartido entre sesiones"""
+    return ReportJobManager(_construir_informe)
+
+
+@st.fragment(run_every=2)
+def mostrar_informes_solicitados():
+    """Lista los informes pedidos en esta sesión con su progreso y botones de descarga"""
+    st.markdown("#### 📥 Informes solicitados")
+    gestor = _gestor_informes()
+
+    for clave in list(st.session_state.get("informes_solicitados", [])):
+        trabajo = gestor.get_job(clave)
+        if trabajo is None:
+            # Expiró de la caché
+            st.session_state["informes_solicitados"].remove(clave)
             continue
 
-        conteo = df_filtrado.groupby(columna).size().reset_index(name="Cantidad")
-
-        fig = px.bar(
-            conteo,
-            x=columna,
-            y="Cantidad",
-            title=f"Distribución por {categoria}",
-            color="Cantidad",
-            color_continuous_scale="Viridis"
-        )
-
-        # Guardar imagen temporal del gráfico
-        temp_path = os.path.join(tempfile.gettempdir(), f"grafico_{columna}.png")
-        fig.write_image(temp_path)
-        temp_files.append(temp_path)
-
-        elements.append(Paragraph(f"<b>Gráfico: {categoria}</b>", styles['Heading2']))
-        elements.append(Image(temp_path, width=6*inch, height=3*inch))
-        elements.append(Spacer(1, 12))
-
-    # --- TABLA FINAL DE TICKETS ---
-    elements.append(Paragraph("<b>📋 Detalle de Tickets Analizados</b>", styles['Heading2']))
-
-    # Convertir DataFrame en lista de listas
-    data = [list(df_filtrado.columns)] + df_filtrado.astype(str).values.tolist()
-
-    # Aplicar a todas las celdas menos la cabecera
-    for i in range(1, len(data)):
-        for j in range(len(data[i])):
-            data[i][j] = Paragraph(str(data[i][j]), estilo_celda)
-    # --- Calcular ancho proporcional ---
-    num_cols = len(data[0])
-    total_width = 7.5 * inch  # ancho de página útil en letter
-    col_widths = [total_width / num_cols for _ in range(num_cols)]
-
-    tabla = Table(data, repeatRows=1, colWidths=col_widths)
-
-    tabla.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#00DED2")),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.gray),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 7),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-    ]))
-
-    elements.append(tabla)
-
-    # --- GENERAR PDF ---
-    doc.build(elements)
-    buffer.seek(0)
-
-    # Limpiar archivos temporales
-    for f in temp_files:
-        try:
-            os.remove(f)
-        except:
-            pass
-
-    return buffer
+        inicio, fin = trabajo.parametros['inicio'], trabajo.parametros['fin']
+        st.write(f"**{inicio} a {fin}** · {', '.join(trabajo.parametros['graficos']) or 'sin gráficos'} "
+                 f"· solicitado {trabajo.fecha_solicitud}")
+
+        if trabajo.estado == LISTO:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="⬇️ Descargar Informe PDF",
+                    data=trabajo.resultado['pdf'],
+                    file_name=f"informe_tickets_{inicio}_{fin}.pdf",
+                    mime="application/pdf",
+                    key=f"pdf_{clave}"
+                )
+            with col2:
+                if trabajo.resultado['csv']:
+                    st.download_button(
+                        label="⬇️ Descargar Detalle Completo (CSV.GZ)",
+                        data=trabajo.resultado['csv'],
+                        file_name=f"detalle_tickets_{inicio}_{fin}.csv.gz",
+                        mime="application/gzip",
+                        key=f"csv_{clave}"
+                    )
+        elif trabajo.estado == ERROR:
+            st.error(f"Error al generar el informe: {trabajo.error}")
+        else:
+            st.progress(trabajo.avance, text=f"{trabajo.fase} ({trabajo.avance * 100:.0f}%)")
@@ -9,7 +9,7 @@ import pandas as pd
 # Agregar el directorio raíz al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from engine.areas_manager import AreasManager
+from engine.areas_manager import get_areas_manager
 
 def mostrar_gestion_areas():
     """
@@ -19,8 +19,8 @@ def mostrar_gestion_areas():
     
     st.header("🏢 Gestión de Áreas de la Empresa")
     
-    # Inicializar el gestor de áreas
-    areas_manager = AreasManager()
+    # Gestor de áreas compartido (se lee una vez por proceso)
+    areas_manager = get_areas_manager()
     
     # Crear pestañas
     tab1, tab2, tab3 = st.tabs([
@@ -4,6 +4,8 @@
 import streamlit as st
 import sys
 import os
+import copy
+import tempfile
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -11,7 +13,38 @@ import plotly.graph_objects as go
 # Agregar el directorio raíz al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from engine.rules_manager import RulesManager
+from engine.rules_manager import get_rules_manager, DISTANCIAS_DIFUSAS
+from engine.areas_manager import get_areas_manager
+from engine.replay import replay_diff, draft_ruleset
+from engine.ticket_store import TicketStore
+from engine.metrics import get_metrics, ARCHIVO_PROMETHEUS
+from engine.rule_analyzer import analyze_rules, prune_rules, ORIGEN_PERSONALIZADA
+from engine.reclassifier import reclassify_after_edit
+
+# Texto de cada opción de tolerancia a errores de tipeo
+TEXTOS_DIFUSO = {0: "Ninguno (coincidencia exacta)", 1: "1 letra", 2: "Hasta 2 letras"}
+
+
+def _reclasificar_guardados(reglas_antes):
+    """
+    Reclasifica los tickets guardados que pudo cambiar la edición de reglas recién guardada
+    (ver engine.reclassifier) y deja el resumen para mostrarlo después del rerun.
+    """
+    st.session_state['reclasificacion'] = reclassify_after_edit(TicketStore(), reglas_antes,
+                                                                get_rules_manager().get_all_rules())
+
+
+def _mostrar_reclasificacion():
+    """Muestra el resumen de la última reclasificación (una sola vez)"""
+    if 'reclasificacion' not in st.session_state:
+        return
+    resumen = st.session_state.pop('reclasificacion')
+    if resumen is None:
+        st.warning("⚠️ No se pudieron reclasificar los tickets guardados con las reglas nuevas")
+    else:
+        st.info(f"🔁 Tickets guardados revisados: {resumen['candidatos']} | "
+                f"Reclasificados: {resumen['reclasificados']} ({resumen['segundos']:.2f} s)")
+
 
 def mostrar_gestion_reglas():
     """
@@ -22,7 +55,15 @@ def mostrar_gestion_reglas():
     st.header("🔧 Gestión de Reglas")
     
     # Inicializar el gestor de reglas
-    rules_manager = RulesManager()
+    rules_manager = get_rules_manager()  # Compartido: sus eventos actualizan el índice del motor
+    # Copia de las reglas antes de cualquier edición de esta ejecución (para reclasificar lo que cambie)
+    reglas_antes = copy.deepcopy(rules_manager.get_all_rules())
+    _mostrar_reclasificacion()
+    # Las reglas se limitan a áreas por su ID (sigue valiendo si el área se renombra)
+    nombres_areas = {area['id_area']: area['nombre'] for area in get_areas_manager().get_all_areas()}
+
+    def nombre_area(id_area):
+        return nombres_areas.get(id_area, id_area)
     
     # Crear pestañas
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -111,7 +152,17 @@ def mostrar_gestion_reglas():
                             st.write(f"**Última modificación:** {regla['fecha_modificacion']}")
                     
                     st.write("**Palabras clave:**")
-                    st.write(", ".join(regla['palabras_clave']))
+                    st.write(", ".join(regla['palabras_clave']) or "—")
+                    if regla.get('palabras_requeridas'):
+                        st.write(f"**Requiere todas:** {', '.join(regla['palabras_requeridas'])}")
+                    if regla.get('palabras_excluidas'):
+                        st.write(f"**Excluye:** {', '.join(regla['palabras_excluidas'])}")
+                    if regla.get('areas'):
+                        st.write(f"**Solo áreas:** {', '.join(nombre_area(a) for a in regla['areas'])}")
+                    if regla.get('difuso'):
+                        st.write(f"**Errores de tipeo tolerados:** {TEXTOS_DIFUSO[regla['difuso']]}")
+                    if regla.get('raices'):
+                        st.write("**Compara por raíz:** Sí")
                     
                     # Botones de acción
                     col_btn1, col_btn2 = st.columns(2)
@@ -123,6 +174,7 @@ def mostrar_gestion_reglas():
                         if st.button(f"🔄 {nuevo_estado_texto}", key=f"toggle_{regla['id_regla']}"):
                             if rules_manager.toggle_rule_status(regla['id_regla']):
                                 st.success(f"Regla {nuevo_estado_texto.lower()}da exitosamente")
+                                _reclasificar_guardados(reglas_antes)
                                 st.rerun()
                             else:
                                 st.error("Error al cambiar estado de la regla")
@@ -131,6 +183,7 @@ def mostrar_gestion_reglas():
                         if st.button("🗑️ Eliminar", key=f"delete_{regla['id_regla']}"):
                             if rules_manager.delete_rule(regla['id_regla']):
                                 st.success("Regla eliminada exitosamente")
+                                _reclasificar_guardados(reglas_antes)
                                 st.rerun()
                             else:
                                 st.error("Error al eliminar la regla")
@@ -150,6 +203,31 @@ def mostrar_gestion_reglas():
             } for r in reglas_filtradas])
             
             st.dataframe(df_reglas, use_container_width=True)
+
+        # Importación y exportación masiva (una sola escritura del archivo de reglas)
+        with st.expander("📦 Importar / Exportar reglas"):
+            formato = st.radio("Formato:", ["csv", "json"], horizontal=True, key="formato_reglas")
+            with tempfile.TemporaryDirectory() as carpeta:
+                ruta_exportada = os.path.join(carpeta, f"reglas.{formato}")
+                if rules_manager.export_rules(ruta_exportada):
+                    with open(ruta_exportada, 'rb') as f:
+                        st.download_button(f"⬇️ Descargar reglas ({formato.upper()})", f.read(),
+                                           file_name=f"reglas.{formato}")
+
+            archivo = st.file_uploader("Importar reglas", type=["csv", "json"], key="importar_reglas")
+            reemplazar = st.checkbox("Reemplazar las reglas actuales", value=False)
+            if archivo is not None and st.button("📥 Importar"):
+                with tempfile.TemporaryDirectory() as carpeta:
+                    ruta_importada = os.path.join(carpeta, archivo.name)
+                    with open(ruta_importada, 'wb') as f:
+                        f.write(archivo.getvalue())
+                    cantidad = rules_manager.import_rules(ruta_importada, reemplazar=reemplazar)
+                if cantidad >= 0:
+                    st.success(f"✅ Se importaron {cantidad} reglas")
+                    _reclasificar_guardados(reglas_antes)
+                    st.rerun()
+                else:
+                    st.error("Error al importar las reglas (no se modificó nada)")
     
     # TAB 2: Agregar Regla
     with tab2:
@@ -200,6 +278,29 @@ def mostrar_gestion_reglas():
                 placeholder="Ej: red, internet, wifi, conexión, desconectado",
                 help="Palabras que activarán esta regla"
             )
+
+            st.write("**Condiciones adicionales (opcional):**")
+            col_requeridas, col_excluidas = st.columns(2)
+            with col_requeridas:
+                requeridas_texto = st.text_input(
+                    "Requiere todas estas palabras",
+                    placeholder="Ej: impresora, atasco",
+                    help="El ticket debe contener todas (si no hay palabras clave, estas activan la regla)"
+                )
+            with col_excluidas:
+                excluidas_texto = st.text_input(
+                    "Y ninguna de estas",
+                    placeholder="Ej: toner",
+                    help="Si el ticket contiene alguna, la regla no se aplica"
+                )
+            areas_regla = st.multiselect("Solo para las áreas (vacío = todas)", list(nombres_areas),
+                                         format_func=nombre_area)
+            difuso = st.selectbox("Errores de tipeo tolerados en las palabras clave", DISTANCIAS_DIFUSAS,
+                                  format_func=TEXTOS_DIFUSO.get,
+                                  help="Ej: con 1 letra, 'impresra' activa la palabra 'impresora' "
+                                       "(solo palabras de 4 letras o más; 2 errores desde 7 letras)")
+            raices = st.checkbox("Comparar las palabras clave por raíz",
+                                 help="Ej: 'lento' también encuentra 'lenta', 'lentos' y 'lentas'")
             
             st.markdown("---")
             
@@ -209,8 +310,11 @@ def mostrar_gestion_reglas():
                 submitted = st.form_submit_button("✅ Crear Regla", use_container_width=True)
             
             if submitted:
+                palabras_requeridas = _separar_palabras(requeridas_texto)
+                palabras_excluidas = _separar_palabras(excluidas_texto)
+
                 # Validar campos
-                if not nombre or not palabras_clave_texto or not asignado_a:
+                if not nombre or not (palabras_clave_texto or palabras_requeridas) or not asignado_a:
                     st.error("❌ Por favor complete todos los campos obligatorios (*)")
                 else:
                     # Procesar palabras clave
@@ -219,9 +323,14 @@ def mostrar_gestion_reglas():
                         for palabra in palabras_clave_texto.split(',') 
                         if palabra.strip()
                     ]
+                    errores = rules_manager.validate_rule({
+                        'id_regla': 'nueva', 'nombre': nombre, 'palabras_clave': palabras_clave,
+                        'tipo': tipo, 'prioridad': prioridad, 'asignado_a': asignado_a, 'activa': activa,
+                        'palabras_requeridas': palabras_requeridas, 'palabras_excluidas': palabras_excluidas
+                    })
                     
-                    if not palabras_clave:
-                        st.error("❌ Debe ingresar al menos una palabra clave")
+                    if errores:
+                        st.error("❌ " + "; ".join(error.split(': ', 1)[1] for error in errores))
                     else:
                         # Agregar la regla
                         if rules_manager.add_rule(
@@ -230,7 +339,12 @@ def mostrar_gestion_reglas():
                             tipo=tipo,
                             prioridad=prioridad,
                             asignado_a=asignado_a,
-                            activa=activa
+                            activa=activa,
+                            palabras_requeridas=palabras_requeridas,
+                            palabras_excluidas=palabras_excluidas,
+                            areas=areas_regla,
+                            difuso=difuso,
+                            raices=raices
                         ):
                             st.success("✅ Regla creada exitosamente!")
                             st.balloons()
@@ -242,13 +356,19 @@ def mostrar_gestion_reglas():
                             - **Tipo:** {tipo}
                             - **Prioridad:** {prioridad}
                             - **Asignado a:** {asignado_a}
-                            - **Palabras clave:** {', '.join(palabras_clave)}
+                            - **Palabras clave:** {', '.join(palabras_clave) or '—'}
+                            - **Requiere todas:** {', '.join(palabras_requeridas) or '—'}
+                            - **Excluye:** {', '.join(palabras_excluidas) or '—'}
+                            - **Áreas:** {', '.join(nombre_area(a) for a in areas_regla) or 'Todas'}
+                            - **Errores de tipeo tolerados:** {TEXTOS_DIFUSO[difuso]}
+                            - **Compara por raíz:** {'Sí' if raices else 'No'}
                             - **Estado:** {'Activa' if activa else 'Inactiva'}
                             """)
                             
                             # Esperar un momento antes de recargar
                             import time
                             time.sleep(1)
+                            _reclasificar_guardados(reglas_antes)
                             st.rerun()
                         else:
                             st.error("❌ Error al crear la regla. Por favor intente nuevamente.")
@@ -315,33 +435,103 @@ def mostrar_gestion_reglas():
                         value=", ".join(regla_actual['palabras_clave']),
                         height=100
                     )
+
+                    col_requeridas, col_excluidas = st.columns(2)
+                    with col_requeridas:
+                        nuevas_requeridas_texto = st.text_input(
+                            "Requiere todas estas palabras",
+                            value=", ".join(regla_actual.get('palabras_requeridas') or [])
+                        )
+                    with col_excluidas:
+                        nuevas_excluidas_texto = st.text_input(
+                            "Y ninguna de estas",
+                            value=", ".join(regla_actual.get('palabras_excluidas') or [])
+                        )
+                    areas_actuales = regla_actual.get('areas') or []
+                    nuevas_areas = st.multiselect(
+                        "Solo para las áreas (vacío = todas)",
+                        list(nombres_areas) + [a for a in areas_actuales if a not in nombres_areas],
+                        default=areas_actuales,
+                        format_func=nombre_area
+                    )
+                    nuevo_difuso = st.selectbox(
+                        "Errores de tipeo tolerados en las palabras clave",
+                        DISTANCIAS_DIFUSAS,
+                        index=DISTANCIAS_DIFUSAS.index(regla_actual.get('difuso', 0)),
+                        format_func=TEXTOS_DIFUSO.get
+                    )
+                    nuevas_raices = st.checkbox(
+                        "Comparar las palabras clave por raíz",
+                        value=regla_actual.get('raices', False)
+                    )
+
+                    rango_simulacion = st.date_input(
+                        "Tickets a simular (rango de fechas, vacío = los no archivados)",
+                        value=()
+                    )
                     
                     st.markdown("---")
                     
-                    submitted = st.form_submit_button("💾 Guardar Cambios", use_container_width=True)
+                    col_guardar, col_simular = st.columns(2)
+                    with col_guardar:
+                        submitted = st.form_submit_button("💾 Guardar Cambios", use_container_width=True)
+                    with col_simular:
+                        simular = st.form_submit_button("🔍 Simular con tickets históricos", use_container_width=True)
+
+                    # Procesar palabras clave
+                    nuevas_palabras_clave = [
+                        palabra.strip().lower() 
+                        for palabra in nuevas_palabras_clave_texto.split(',') 
+                        if palabra.strip()
+                    ]
+                    nuevas_requeridas = _separar_palabras(nuevas_requeridas_texto)
+                    nuevas_excluidas = _separar_palabras(nuevas_excluidas_texto)
                     
                     if submitted:
-                        # Procesar palabras clave
-                        nuevas_palabras_clave = [
-                            palabra.strip().lower() 
-                            for palabra in nuevas_palabras_clave_texto.split(',') 
-                            if palabra.strip()
-                        ]
-                        
-                        # Actualizar la regla
-                        if rules_manager.update_rule(
-                            id_regla=id_regla_seleccionada,
-                            nombre=nuevo_nombre,
-                            palabras_clave=nuevas_palabras_clave,
-                            tipo=nuevo_tipo,
-                            prioridad=nueva_prioridad,
-                            asignado_a=nuevo_asignado_a,
-                            activa=nueva_activa
-                        ):
+                        # Actualizar la regla (la transacción valida antes de guardar y si falla no cambia nada)
+                        try:
+                            with rules_manager.transaction():
+                                actualizada = rules_manager.update_rule(
+                                    id_regla=id_regla_seleccionada,
+                                    nombre=nuevo_nombre,
+                                    palabras_clave=nuevas_palabras_clave,
+                                    tipo=nuevo_tipo,
+                                    prioridad=nueva_prioridad,
+                                    asignado_a=nuevo_asignado_a,
+                                    activa=nueva_activa,
+                                    palabras_requeridas=nuevas_requeridas,
+                                    palabras_excluidas=nuevas_excluidas,
+                                    areas=nuevas_areas,
+                                    difuso=nuevo_difuso,
+                                    raices=nuevas_raices
+                                )
+                            error = None
+                        except (ValueError, IOError) as e:
+                            actualizada, error = False, e
+                        if actualizada:
                             st.success("✅ Regla actualizada exitosamente!")
+                            _reclasificar_guardados(reglas_antes)
                             st.rerun()
                         else:
-                            st.error("❌ Error al actualizar la regla")
+                            st.error(f"❌ Error al actualizar la regla{f': {error}' if error else ''}")
+
+                if simular:
+                    # Reclasificar los tickets guardados con el borrador, sin guardar la regla
+                    borrador = {
+                        **regla_actual,
+                        'nombre': nuevo_nombre,
+                        'palabras_clave': nuevas_palabras_clave,
+                        'tipo': nuevo_tipo,
+                        'prioridad': nueva_prioridad,
+                        'asignado_a': nuevo_asignado_a,
+                        'activa': nueva_activa,
+                        'palabras_requeridas': nuevas_requeridas,
+                        'palabras_excluidas': nuevas_excluidas,
+                        'areas': nuevas_areas,
+                        'difuso': nuevo_difuso,
+                        'raices': nuevas_raices
+                    }
+                    mostrar_simulacion(rules_manager.get_all_rules(), borrador, rango_simulacion)
     
     # TAB 4: Estadísticas
     with tab4:
@@ -400,3 +590,179 @@ def mostrar_gestion_reglas():
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.info("No hay datos para mostrar")
+
+        st.markdown("---")
+        mostrar_analisis_reglas(rules_manager)
+
+        st.markdown("---")
+        mostrar_metricas_clasificacion()
+
+
+def _separar_palabras(texto):
+    """Lista de palabras en minúsculas a partir de un texto separado por comas"""
+    return [palabra.strip().lower() for palabra in (texto or '').split(',') if palabra.strip()]
+
+
+def mostrar_analisis_reglas(rules_manager):
+    """
+    Muestra las reglas que nunca se aplican (otra regla anterior gana siempre),
+    las palabras clave que sobran y permite podar las reglas personalizadas.
+
+    Args:
+        rules_manager: Instancia de RulesManager
+    """
+    analisis = analyze_rules(rules_manager.get_all_rules())
+
+    st.subheader("🧹 Reglas Sombreadas y Palabras Clave que Sobran")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reglas sombreadas", len(analisis['sombreadas']))
+    col2.metric("Palabras clave muertas", len(analisis['palabras_muertas']),
+                delta=f"{analisis['palabras_efectivas']} de {analisis['total_palabras']} efectivas",
+                delta_color="off")
+    col3.metric("Palabras repetidas", len(analisis['duplicadas']))
+
+    if not analisis['sombreadas'] and not analisis['palabras_muertas']:
+        st.success("Todas las reglas activas pueden aplicarse.")
+        return
+
+    with st.expander("Ver detalle"):
+        if analisis['sombreadas']:
+            st.write("**Reglas que nunca se aplican**")
+            st.dataframe(pd.DataFrame([
+                {'Origen': s['origen'], 'ID': s['id_regla'], 'Regla': s['nombre'],
+                 'Tapada por': ", ".join(s['ganadoras'])}
+                for s in analisis['sombreadas']
+            ]), use_container_width=True)
+        if analisis['palabras_muertas']:
+            st.write("**Palabras clave que nunca deciden la clasificación**")
+            st.dataframe(pd.DataFrame([
+                {'Origen': m['origen'], 'ID': m['id_regla'], 'Palabra': m['palabra'],
+                 'Gana': f"'{m['palabra_ganadora']}' de {m['id_ganadora']}"}
+                for m in analisis['palabras_muertas']
+            ]), use_container_width=True)
+
+    podables = sum(1 for m in analisis['palabras_muertas'] if m['origen'] == ORIGEN_PERSONALIZADA)
+    if not podables:
+        st.info("Lo que sobra está en las reglas base, que no se pueden editar desde aquí.")
+        return
+
+    desactivar = st.checkbox("Desactivar las reglas sombreadas en lugar de eliminarlas", value=True)
+    if st.button(f"🧹 Podar reglas personalizadas ({podables} palabras clave)"):
+        reglas_antes = copy.deepcopy(rules_manager.get_all_rules())
+        resultado = prune_rules(rules_manager, desactivar=desactivar)
+        if resultado is None:
+            st.error("❌ Error al podar las reglas")
+        else:
+            st.success(f"✅ Reglas podadas: {resultado['reglas']} | Palabras clave quitadas: {resultado['palabras']}")
+            _reclasificar_guardados(reglas_antes)
+            st.rerun()
+
+
+def _formatear_segundos(segundos):
+    """Duración legible (µs, ms o s)"""
+    if segundos is None:
+        return "—"
+    if segundos == float('inf'):
+        return "> 1 s"
+    if segundos < 0.001:
+        return f"{segundos * 1e6:.0f} µs"
+    if segundos < 1:
+        return f"{segundos * 1000:.1f} ms"
+    return f"{segundos:.2f} s"
+
+
+def mostrar_metricas_clasificacion():
+    """
+    Muestra los aciertos por regla, los tickets sin clasificar y la latencia del motor
+    desde que arrancó el servidor.
+    """
+    metricas = get_metrics()
+    datos = metricas.snapshot()
+
+    st.subheader("⏱️ Uso de Reglas y Latencia")
+    if not datos['clasificaciones']:
+        st.info("Aún no se clasificaron tickets desde que arrancó la aplicación.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Clasificaciones", datos['clasificaciones'])
+    col2.metric("Sin clasificar", datos['sin_clasificar'],
+                delta=f"{datos['sin_clasificar'] / datos['clasificaciones']:.0%}", delta_color="inverse")
+    col3.metric("Latencia p50", _formatear_segundos(metricas.percentile(datos, 0.5)))
+    col4.metric("Latencia p95", _formatear_segundos(metricas.percentile(datos, 0.95)))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        df_aciertos = pd.DataFrame(list(datos['por_regla'].items())[:20], columns=['Regla', 'Aciertos'])
+        fig = px.bar(df_aciertos, x='Aciertos', y='Regla', orientation='h', title="Aciertos por regla")
+        fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        df_latencia = pd.DataFrame([
+            {'Hasta': _formatear_segundos(limite), 'Clasificaciones': cantidad}
+            for limite, cantidad in datos['buckets']
+        ])
+        fig = px.bar(df_latencia, x='Hasta', y='Clasificaciones', title="Latencia por clasificación")
+        st.plotly_chart(fig, use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("⬇️ Descargar métricas (Prometheus)", metricas.to_prometheus(),
+                           file_name="metricas_clasificacion.prom", mime="text/plain")
+    with col2:
+        if st.button("💾 Escribir archivo .prom"):
+            ruta = os.path.join(os.path.dirname(__file__), '..', ARCHIVO_PROMETHEUS)
+            if metricas.write_prometheus(ruta):
+                st.success(f"Métricas guardadas en {ARCHIVO_PROMETHEUS}")
+            else:
+                st.error("Error al escribir las métricas")
+    with col3:
+        if st.button("🔄 Reiniciar métricas"):
+            metricas.reset()
+            st.rerun()
+
+
+def mostrar_simulacion(reglas, regla_borrador, rango):
+    """
+    Muestra cuántos tickets históricos cambiarían de tipo, prioridad o equipo
+    si se guardara el borrador de la regla.
+
+    Args:
+        reglas: Reglas vigentes
+        regla_borrador: Regla con los cambios sin guardar
+        rango: Tupla (desde, hasta) de fechas (incluye los meses archivados), o vacía para usar
+               los tickets del almacén
+    """
+    store = TicketStore()
+    if isinstance(rango, tuple) and len(rango) == 2:
+        # Los meses archivados del rango también se simulan
+        df = store.to_dataframe(rango[0], rango[1])
+    else:
+        df = store.to_dataframe()
+    if df.empty or 'contenido' not in df.columns:
+        st.info("No hay tickets procesados para simular.")
+        return
+
+    diff = replay_diff(df, draft_ruleset(reglas, regla_borrador), reglas)
+
+    st.markdown("### 🔍 Resultado de la simulación")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Tickets cambiados", f"{diff['cambiados']} / {diff['total']}")
+    col2.metric("Cambian de tipo", diff['por_campo']['tipo'])
+    col3.metric("Cambian de prioridad", diff['por_campo']['prioridad'])
+    col4.metric("Cambian de equipo", diff['por_campo']['asignado_a'])
+    st.caption(f"{diff['distintos']} contenidos distintos reclasificados en {diff['segundos']:.2f} s")
+
+    if diff['cambiados'] == 0:
+        st.success("El borrador no cambia la clasificación de ningún ticket.")
+        return
+
+    nombres = {'tipo': "Tipo", 'prioridad': "Prioridad", 'asignado_a': "Asignado a"}
+    for campo, transiciones in diff['transiciones'].items():
+        if not transiciones.empty:
+            st.write(f"**{nombres[campo]}**")
+            st.dataframe(transiciones.rename(columns={'antes': 'Antes', 'despues': 'Después', 'cantidad': 'Tickets'}),
+                         use_container_width=True)
+
+    st.write("**Ejemplos de tickets que cambian**")
+    st.dataframe(diff['ejemplos'], use_container_width=True)